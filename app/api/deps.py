@@ -1,11 +1,17 @@
 from __future__ import annotations
 
+import math
 from dataclasses import dataclass
-from typing import Any, Optional
+from typing import Any, Optional, Union
 
+import httpx
 from fastapi import Depends, HTTPException, Request, status
 
 from app.config import get_settings
+from app.core.admission import AdmissionTimeoutError
+from app.core.circuit_breaker import CircuitOpenError
+from app.core.image_executor import ImageExecutorBusyError, ImageJobTimeoutError
+from app.core.key_pool import NoKeyAvailableError
 from app.core.supabase_auth import verify_supabase_jwt
 
 
@@ -57,3 +63,50 @@ async def get_auth_context(
 
 async def get_current_user(context: AuthContext = Depends(get_auth_context)) -> AuthContext:
     return context
+
+
+def provider_busy_error(exc: Union[AdmissionTimeoutError, NoKeyAvailableError]) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail=str(exc),
+        headers={"Retry-After": str(math.ceil(exc.retry_after))},
+    )
+
+
+def upstream_unavailable_error(exc: CircuitOpenError) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail=str(exc),
+        headers={"Retry-After": str(math.ceil(exc.retry_after))},
+    )
+
+
+def image_processing_unavailable_error(exc: Union[ImageExecutorBusyError, ImageJobTimeoutError]) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail=str(exc),
+        headers={"Retry-After": str(math.ceil(getattr(exc, "retry_after", 1.0)))},
+    )
+
+
+def upstream_error_summary(exc: BaseException) -> dict[str, Any]:
+    """
+    The HTTP error a failed upstream call would have been answered with, as
+    JSON, for responses that report per-item failures instead of raising.
+    """
+    if isinstance(exc, HTTPException):
+        error = exc
+    elif isinstance(exc, (AdmissionTimeoutError, NoKeyAvailableError)):
+        error = provider_busy_error(exc)
+    elif isinstance(exc, CircuitOpenError):
+        error = upstream_unavailable_error(exc)
+    elif isinstance(exc, httpx.HTTPStatusError):
+        detail = exc.response.text if exc.response is not None else str(exc)
+        error = HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=detail)
+    else:
+        error = HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=str(exc))
+    summary: dict[str, Any] = {"status_code": error.status_code, "detail": error.detail}
+    retry_after = (error.headers or {}).get("Retry-After")
+    if retry_after is not None:
+        summary["retry_after"] = int(retry_after)
+    return summary
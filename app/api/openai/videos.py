@@ -8,7 +8,10 @@ from fastapi import APIRouter, File, Form, Header, HTTPException, UploadFile, st
 from fastapi.responses import Response, StreamingResponse
 from PIL import Image, ImageOps, UnidentifiedImageError
 
+from app.api.deps import image_processing_unavailable_error
 from app.config import get_settings
+from app.core.http_clients import get_http_client
+from app.core.image_executor import ImageExecutorBusyError, ImageJobTimeoutError, get_image_executor
 
 router = APIRouter()
 
@@ -106,7 +109,6 @@ async def create_video(
     input_reference: Optional[UploadFile] = File(default=None),
     authorization: Optional[str] = Header(default=None),
 ):
-    settings = get_settings()
     url = _upstream_url("/v1/videos")
     headers = {"Authorization": _normalize_authorization(authorization)}
 
@@ -132,15 +134,19 @@ async def create_video(
         if blob:
             try:
                 target_w, target_h = _parse_video_size(size)
-                prepared, mime = _prepare_reference_image(blob, target_w=target_w, target_h=target_h)
+                # Runs in the image worker pool (see image_executor); must stay module-level.
+                prepared, mime = await get_image_executor().run(
+                    _prepare_reference_image, blob, target_w=target_w, target_h=target_h
+                )
             except ValueError as exc:
                 raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(exc)) from exc
+            except (ImageExecutorBusyError, ImageJobTimeoutError) as exc:
+                raise image_processing_unavailable_error(exc) from exc
 
             multipart["input_reference"] = ("input_reference.png", prepared, mime)
 
     try:
-        async with httpx.AsyncClient(timeout=settings.REQUEST_TIMEOUT) as client:
-            upstream = await client.post(url, files=multipart, headers=headers)
+        upstream = await get_http_client(url).post(url, files=multipart, headers=headers)
         return _proxy_response(upstream)
     except httpx.HTTPError as exc:
         raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=str(exc)) from exc
@@ -151,13 +157,11 @@ async def get_video_status(
     video_id: str,
     authorization: Optional[str] = Header(default=None),
 ):
-    settings = get_settings()
     url = _upstream_url(f"/v1/videos/{video_id}")
     headers = {"Authorization": _normalize_authorization(authorization)}
 
     try:
-        async with httpx.AsyncClient(timeout=settings.REQUEST_TIMEOUT) as client:
-            upstream = await client.get(url, headers=headers)
+        upstream = await get_http_client(url).get(url, headers=headers)
         return _proxy_response(upstream)
     except httpx.HTTPError as exc:
         raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=str(exc)) from exc
@@ -168,23 +172,20 @@ async def get_video_content(
     video_id: str,
     authorization: Optional[str] = Header(default=None),
 ):
-    settings = get_settings()
     url = _upstream_url(f"/v1/videos/{video_id}/content")
     headers = {"Authorization": _normalize_authorization(authorization)}
 
-    client = httpx.AsyncClient(timeout=settings.REQUEST_TIMEOUT, headers=headers)
-    request = client.build_request("GET", url)
+    client = get_http_client(url)
+    request = client.build_request("GET", url, headers=headers)
 
     try:
         upstream = await client.send(request, stream=True)
     except httpx.HTTPError as exc:
-        await client.aclose()
         raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=str(exc)) from exc
 
     if upstream.status_code >= 400:
         body = await upstream.aread()
         await upstream.aclose()
-        await client.aclose()
         media_type = upstream.headers.get("content-type") or None
         return Response(content=body, status_code=upstream.status_code, media_type=media_type)
 
@@ -196,6 +197,5 @@ async def get_video_content(
                 yield chunk
         finally:
             await upstream.aclose()
-            await client.aclose()
 
     return StreamingResponse(_aiter(), status_code=upstream.status_code, media_type=media_type)
@@ -1,15 +1,28 @@
 from __future__ import annotations
 
 import asyncio
-from typing import Any, Optional
+import json
+from functools import partial
+from typing import Any, AsyncIterator, Awaitable, Iterable, Optional
 
 import httpx
 from fastapi import APIRouter, Depends, File, Form, Header, HTTPException, UploadFile, status
-
-from app.api.deps import AuthContext, get_current_user
+from fastapi.responses import StreamingResponse
+
+from app.api.deps import (
+    AuthContext,
+    get_current_user,
+    provider_busy_error,
+    upstream_error_summary,
+    upstream_unavailable_error,
+)
 from app.clients.gemini_image_client import GeminiImageClient
 from app.clients.image_edits_client import ImageEditsClient
 from app.config import get_settings
+from app.core.admission import AdmissionTimeoutError
+from app.core.circuit_breaker import CircuitOpenError
+from app.core.fan_out import as_completed_slots
+from app.core.key_pool import NoKeyAvailableError
 
 router = APIRouter()
 
@@ -82,6 +95,42 @@ def _extract_first_image_url(response_json: Any) -> str | None:
     return None
 
 
+def _sse(event: str, data: Any) -> bytes:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, separators=(',', ':'))}\n\n".encode()
+
+
+async def _stream_images(calls: Iterable[Awaitable[Any]]) -> AsyncIterator[bytes]:
+    """
+    Server-Sent Events for an n-image request: an `image` event per slot as
+    soon as its call returns, an `error` event per failed slot, and an `end`
+    event listing which slots succeeded and which failed.
+    """
+    succeeded: list[int] = []
+    failed: list[dict[str, Any]] = []
+    async for slot in as_completed_slots(calls):
+        error = slot.error
+        if error is None:
+            item = _extract_first_openai_image_data_item(slot.value)
+            if item:
+                succeeded.append(slot.index)
+                yield _sse("image", {"index": slot.index, "data": item})
+                continue
+            error = RuntimeError(f"Upstream response #{slot.index + 1} did not contain any image data")
+        failure = {"index": slot.index, **upstream_error_summary(error)}
+        failed.append(failure)
+        yield _sse("error", failure)
+    failed.sort(key=lambda failure: failure["index"])
+    yield _sse("end", {"succeeded": sorted(succeeded), "failed": failed})
+
+
+def _event_stream_response(calls: Iterable[Awaitable[Any]]) -> StreamingResponse:
+    return StreamingResponse(
+        _stream_images(calls),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.post("/images/edits")
 async def images_edits(
     model: str = Form(...),
@@ -90,11 +139,13 @@ async def images_edits(
     response_format: Optional[str] = Form(default=None),
     aspect_ratio: Optional[str] = Form(default=None),
     image_size: Optional[str] = Form(default=None),
+    stream: bool = Form(default=False),
     image: list[UploadFile] = File(default=[]),
     x_api_key: Optional[str] = Header(default=None),
     x_base_url: Optional[str] = Header(default=None),
     _auth: AuthContext = Depends(get_current_user),
 ):
+    """Image edits; `stream=true` returns each image as it completes (see `_stream_images`)."""
     n = max(1, min(10, n))
     is_gemini = GeminiImageClient.is_gemini_model(model)
 
@@ -121,37 +172,44 @@ async def images_edits(
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Failed to read uploaded files: {exc}")
 
     try:
-        provider_responses: list[Any] = []
-
         if is_gemini:
-            async with GeminiImageClient(api_key=api_key, base_url=base_url) as client:
-                calls = [
-                    client.generate_image(
-                        model=model,
-                        prompt=prompt,
-                        aspect_ratio=aspect_ratio,
-                        image_size=image_size,
-                        images=provider_images,
-                    )
-                    for _ in range(n)
-                ]
-                provider_responses = await asyncio.gather(*calls)
+            gemini = GeminiImageClient(api_key=api_key, base_url=base_url)
+            send = partial(
+                gemini.send,
+                gemini.prepare_generate_image(
+                    model=model,
+                    prompt=prompt,
+                    aspect_ratio=aspect_ratio,
+                    image_size=image_size,
+                    images=provider_images,
+                ),
+            )
         else:
-            async with ImageEditsClient(api_key=api_key, base_url=base_url) as client:
-                calls = [
-                    client.images_edits(
-                        model=model,
-                        prompt=prompt,
-                        response_format=response_format,
-                        aspect_ratio=aspect_ratio,
-                        image_size=image_size,
-                        images=provider_images,
-                    )
-                    for _ in range(n)
-                ]
-                provider_responses = await asyncio.gather(*calls)
+            client = ImageEditsClient(api_key=api_key, base_url=base_url)
+            send = partial(
+                client.send,
+                client.prepare_images_edits(
+                    model=model,
+                    prompt=prompt,
+                    response_format=response_format,
+                    aspect_ratio=aspect_ratio,
+                    image_size=image_size,
+                    images=provider_images,
+                ),
+            )
+    except Exception as exc:
+        raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=str(exc))
+
+    if stream:
+        return _event_stream_response((send() for _ in range(n)))
 
+    try:
+        provider_responses = await asyncio.gather(*(send() for _ in range(n)))
         provider_response = _aggregate_openai_image_responses(provider_responses, expected_count=n)
+    except (AdmissionTimeoutError, NoKeyAvailableError) as exc:
+        raise provider_busy_error(exc) from exc
+    except CircuitOpenError as exc:
+        raise upstream_unavailable_error(exc) from exc
     except httpx.HTTPStatusError as exc:
         detail = exc.response.text if exc.response is not None else str(exc)
         raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=detail)
@@ -184,10 +242,12 @@ async def images_generations(
     size: Optional[str] = Form(default=None),
     aspect_ratio: Optional[str] = Form(default=None),
     response_format: Optional[str] = Form(default=None),
+    stream: bool = Form(default=False),
     x_api_key: Optional[str] = Header(default=None),
     x_base_url: Optional[str] = Header(default=None),
     _auth: AuthContext = Depends(get_current_user),
 ):
+    """Text-to-image; `stream=true` returns each image as it completes (see `_stream_images`)."""
     if not prompt or not prompt.strip():
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Prompt is required")
     if len(prompt) > 1000:
@@ -215,34 +275,41 @@ async def images_generations(
         )
 
     try:
-        provider_responses: list[Any] = []
-
         if is_gemini:
-            async with GeminiImageClient(api_key=api_key, base_url=base_url) as client:
-                calls = [
-                    client.generate_image(
-                        model=model,
-                        prompt=prompt,
-                        aspect_ratio=aspect_ratio,
-                        image_size=size,
-                    )
-                    for _ in range(n)
-                ]
-                provider_responses = await asyncio.gather(*calls)
+            gemini = GeminiImageClient(api_key=api_key, base_url=base_url)
+            send = partial(
+                gemini.send,
+                gemini.prepare_generate_image(
+                    model=model,
+                    prompt=prompt,
+                    aspect_ratio=aspect_ratio,
+                    image_size=size,
+                ),
+            )
         else:
-            async with ImageEditsClient(api_key=api_key, base_url=base_url) as client:
-                calls = [
-                    client.images_generations(
-                        model=model,
-                        prompt=prompt,
-                        size=size,
-                        response_format=response_format,
-                    )
-                    for _ in range(n)
-                ]
-                provider_responses = await asyncio.gather(*calls)
+            client = ImageEditsClient(api_key=api_key, base_url=base_url)
+            send = partial(
+                client.send,
+                client.prepare_images_generations(
+                    model=model,
+                    prompt=prompt,
+                    size=size,
+                    response_format=response_format,
+                ),
+            )
+    except Exception as exc:
+        raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=str(exc))
 
+    if stream:
+        return _event_stream_response((send() for _ in range(n)))
+
+    try:
+        provider_responses = await asyncio.gather(*(send() for _ in range(n)))
         provider_response = _aggregate_openai_image_responses(provider_responses, expected_count=n)
+    except (AdmissionTimeoutError, NoKeyAvailableError) as exc:
+        raise provider_busy_error(exc) from exc
+    except CircuitOpenError as exc:
+        raise upstream_unavailable_error(exc) from exc
     except httpx.HTTPStatusError as exc:
         detail = exc.response.text if exc.response is not None else str(exc)
         raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=detail)
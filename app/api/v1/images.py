@@ -3,21 +3,45 @@ from __future__ import annotations
 import asyncio
 import json
 import logging
-from typing import Any, Optional
+from functools import lru_cache, partial
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterable, Optional
 from urllib.parse import urlparse
+from uuid import uuid4
 
 import httpx
-from fastapi import APIRouter, Depends, File, Form, Header, HTTPException, UploadFile, status
+from fastapi import APIRouter, Depends, File, Form, Header, HTTPException, Request, UploadFile, status
+from fastapi.responses import Response, StreamingResponse
 from sqlalchemy import desc, select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import load_only
 
-from app.api.deps import get_current_user
+from app.api.deps import (
+    get_auth_context,
+    get_current_user,
+    provider_busy_error,
+    upstream_error_summary,
+    upstream_unavailable_error,
+)
 from app.clients.image_edits_client import ImageEditsClient
 from app.clients.gemini_image_client import GeminiImageClient
 from app.config import get_settings
+from app.core.admission import AdmissionTimeoutError
+from app.core.circuit_breaker import CircuitOpenError
 from app.core.encryption import EncryptionError, decrypt_for_user, encrypt_for_user
-from app.db.session import get_db
+from app.core.fan_out import as_completed_slots
+from app.core.idempotency import Idempotency, IdempotencyConflictError, blob_digest
+from app.core.key_pool import NoKeyAvailableError
+from app.core.media_store import (
+    delete_media,
+    externalize_images,
+    media_entries,
+    read_media,
+    stream_media,
+    verify_media_signature,
+    with_media_urls,
+)
+from app.core.storage_backend import StorageBackendError
+from app.db.session import get_db, get_session_factory
 from app.models.database import User, UserImage
 from app.models.schemas import UserImageCreate, UserImageDetail, UserImageSummary, UserImageUpdate
 
@@ -25,6 +49,78 @@ router = APIRouter()
 logger = logging.getLogger(__name__)
 
 
+@lru_cache()
+def _get_image_idempotency() -> Idempotency[str]:
+    return Idempotency()
+
+
+async def _generate_and_store(
+    db: AsyncSession,
+    user: User,
+    call_provider: Callable[[], Awaitable[Any]],
+    *,
+    flight_payload: dict[str, Any],
+    api_key: str,
+    idempotency_key: Optional[str],
+    title: Optional[str],
+    model: str,
+    prompt: str,
+    request_dict: dict[str, Any],
+) -> UserImageDetail:
+    """
+    Call the provider and store its images as one flight shared by duplicate
+    submissions (retries) of the same user: they all get the record the first
+    one stored. Only the record id is remembered, never the images.
+
+    The flight can outlive the request that started it, so it stores through
+    its own session instead of that request's `db` and `user`.
+    """
+    user_id = user.id
+
+    async def call_and_store() -> str:
+        try:
+            provider_response = await call_provider()
+        except (AdmissionTimeoutError, NoKeyAvailableError) as exc:
+            raise provider_busy_error(exc) from exc
+        except CircuitOpenError as exc:
+            raise upstream_unavailable_error(exc) from exc
+        except httpx.HTTPStatusError as exc:
+            detail = exc.response.text if exc.response is not None else str(exc)
+            raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=detail)
+        except Exception as exc:
+            raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=str(exc))
+
+        response_dict = provider_response if isinstance(provider_response, dict) else {"raw": provider_response}
+        async with get_session_factory()() as session:
+            owner = await session.get(User, user_id)
+            if owner is None:
+                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+            record, _ = await _store_image_record(
+                session,
+                owner,
+                title=title,
+                model=model,
+                prompt=prompt,
+                record_status="completed",
+                request_dict=request_dict,
+                response_dict=response_dict,
+            )
+            return str(record.id)
+
+    payload = {**flight_payload, "title": title, "api_key": blob_digest(api_key.encode())}
+    try:
+        record_id = await _get_image_idempotency().run(
+            user_id, payload, call_and_store, idempotency_key=idempotency_key
+        )
+    except IdempotencyConflictError as exc:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(exc)) from exc
+
+    record = await db.get(UserImage, record_id)
+    if not record:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Image not found")
+    return _image_detail(record)
+
+
 def _json_dumps(data: Any) -> bytes:
     return json.dumps(data, default=str, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
 
@@ -33,6 +129,20 @@ def _json_loads(payload: bytes) -> Any:
     return json.loads(payload.decode("utf-8"))
 
 
+def _image_detail(record: UserImage) -> UserImageDetail:
+    try:
+        request_payload = decrypt_for_user(user_id=record.user_id, blob=record.request_encrypted)
+        response_payload = decrypt_for_user(user_id=record.user_id, blob=record.response_encrypted)
+    except EncryptionError as exc:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(exc))
+
+    return UserImageDetail(
+        **UserImageSummary.model_validate(record).model_dump(),
+        request=_json_loads(request_payload),
+        response=with_media_urls(record.id, _json_loads(response_payload)),
+    )
+
+
 def _ensure_owner(image: UserImage, user: User) -> None:
     if user.is_admin:
         return
@@ -111,6 +221,137 @@ def _aggregate_openai_image_responses(responses: list[Any], *, expected_count: i
     return {"data": data}
 
 
+def _sse(event: str, data: Any) -> bytes:
+    return b"event: " + event.encode() + b"\ndata: " + _json_dumps(data) + b"\n\n"
+
+
+def _event_stream_response(events: AsyncIterator[bytes]) -> StreamingResponse:
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def _store_image_record(
+    db: AsyncSession,
+    user: User,
+    *,
+    title: Optional[str],
+    model: str,
+    prompt: str,
+    record_status: str,
+    request_dict: dict[str, Any],
+    response_dict: dict[str, Any],
+) -> tuple[UserImage, dict[str, Any]]:
+    """
+    Persist a generated image. Inline `b64_json` images are moved to the media
+    store first so the record only holds references to them; returns the
+    record and the response as stored, with signed media URLs added.
+    """
+    image_id = str(uuid4())
+    try:
+        response_dict, media = await externalize_images(user.id, response_dict)
+    except (EncryptionError, StorageBackendError, OSError) as exc:
+        logger.exception("Failed to store generated image media for user_id=%s", user.id)
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(exc))
+    stored_media = media_entries(response_dict) if media else []
+
+    try:
+        request_blob = encrypt_for_user(user_id=user.id, plaintext=_json_dumps(request_dict))
+        response_blob = encrypt_for_user(user_id=user.id, plaintext=_json_dumps(response_dict))
+    except EncryptionError as exc:
+        await delete_media(user.id, stored_media)
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(exc))
+
+    size_bytes = len(request_blob) + len(response_blob) + sum(item.size_bytes for item in media)
+    if user.storage_used_bytes + size_bytes > user.storage_quota_bytes:
+        await delete_media(user.id, stored_media)
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="Storage quota exceeded")
+
+    record = UserImage(
+        id=image_id,
+        user_id=user.id,
+        title=title,
+        model=str(model),
+        prompt=str(prompt),
+        status=record_status,
+        image_url=_extract_first_image_url(response_dict),
+        request_encrypted=request_blob,
+        response_encrypted=response_blob,
+        size_bytes=size_bytes,
+    )
+
+    try:
+        user.storage_used_bytes += size_bytes
+        db.add(record)
+        db.add(user)
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        logger.exception("Failed to persist generated image for user_id=%s", user.id)
+        await delete_media(user.id, stored_media)
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to save image record")
+
+    await db.refresh(record)
+    return record, with_media_urls(record.id, response_dict)
+
+
+async def _stream_and_store_images(
+    db: AsyncSession,
+    user: User,
+    calls: Iterable[Awaitable[Any]],
+    *,
+    title: Optional[str],
+    model: str,
+    prompt: str,
+    request_dict: dict[str, Any],
+) -> AsyncIterator[bytes]:
+    """
+    Server-Sent Events for an n-image request: an `image` event per slot as
+    soon as its call returns, an `error` event per failed slot, and an `end`
+    event once all are done. The images that did arrive are stored as one
+    record (status `partial` if some slots failed) whose summary `end` carries.
+    """
+    items: dict[int, dict[str, Any]] = {}
+    errors: list[dict[str, Any]] = []
+    async for slot in as_completed_slots(calls):
+        error = slot.error
+        if error is None:
+            item = _extract_first_openai_image_data_item(slot.value)
+            if item:
+                items[slot.index] = item
+                yield _sse("image", {"index": slot.index, "data": item})
+                continue
+            error = RuntimeError(f"Upstream response #{slot.index + 1} did not contain any image data")
+        failure = {"index": slot.index, **upstream_error_summary(error)}
+        errors.append(failure)
+        yield _sse("error", failure)
+
+    errors.sort(key=lambda failure: failure["index"])
+    summary: dict[str, Any] = {"succeeded": sorted(items), "failed": errors, "image": None}
+    if items:
+        response_dict: dict[str, Any] = {"data": [items[index] for index in sorted(items)]}
+        if errors:
+            response_dict["errors"] = errors
+        try:
+            record, _ = await _store_image_record(
+                db,
+                user,
+                title=title,
+                model=model,
+                prompt=prompt,
+                record_status="partial" if errors else "completed",
+                request_dict=request_dict,
+                response_dict=response_dict,
+            )
+        except HTTPException as exc:
+            summary["store_error"] = upstream_error_summary(exc)
+        else:
+            summary["image"] = UserImageSummary.model_validate(record).model_dump(mode="json")
+    yield _sse("end", summary)
+
+
 @router.post("/images/edits", response_model=UserImageDetail, status_code=status.HTTP_201_CREATED)
 async def images_edits_and_store(
     model: str = Form(...),
@@ -120,12 +361,19 @@ async def images_edits_and_store(
     aspect_ratio: Optional[str] = Form(default=None),
     image_size: Optional[str] = Form(default=None),
     title: Optional[str] = Form(default=None),
+    stream: bool = Form(default=False),
     image: list[UploadFile] = File(default=[]),
     x_api_key: Optional[str] = Header(default=None),
     x_base_url: Optional[str] = Header(default=None),
+    idempotency_key: Optional[str] = Header(default=None, max_length=255),
     user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
+    """
+    Image edits, stored for the user. With `stream=true` the response is an
+    event stream (see `_stream_and_store_images`) that keeps whichever images
+    succeed; streamed requests are not de-duplicated by Idempotency-Key.
+    """
     n = max(1, min(10, n))
     is_gemini = GeminiImageClient.is_gemini_model(model)
 
@@ -151,43 +399,31 @@ async def images_edits_and_store(
     except Exception as exc:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Failed to read uploaded files: {exc}")
 
-    try:
-        provider_responses: list[Any] = []
-
+    def prepare_provider_call() -> Callable[[], Awaitable[Any]]:
         if is_gemini:
-            async with GeminiImageClient(api_key=api_key, base_url=base_url) as client:
-                calls = [
-                    client.generate_image(
-                        model=model,
-                        prompt=prompt,
-                        aspect_ratio=aspect_ratio,
-                        image_size=image_size,
-                        images=provider_images,
-                    )
-                    for _ in range(n)
-                ]
-                provider_responses = await asyncio.gather(*calls)
-        else:
-            async with ImageEditsClient(api_key=api_key, base_url=base_url) as client:
-                calls = [
-                    client.images_edits(
-                        model=model,
-                        prompt=prompt,
-                        response_format=response_format,
-                        aspect_ratio=aspect_ratio,
-                        image_size=image_size,
-                        images=provider_images,
-                    )
-                    for _ in range(n)
-                ]
-                provider_responses = await asyncio.gather(*calls)
-
-        provider_response = _aggregate_openai_image_responses(provider_responses, expected_count=n)
-    except httpx.HTTPStatusError as exc:
-        detail = exc.response.text if exc.response is not None else str(exc)
-        raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=detail)
-    except Exception as exc:
-        raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=str(exc))
+            gemini = GeminiImageClient(api_key=api_key, base_url=base_url)
+            return partial(
+                gemini.send,
+                gemini.prepare_generate_image(
+                    model=model,
+                    prompt=prompt,
+                    aspect_ratio=aspect_ratio,
+                    image_size=image_size,
+                    images=provider_images,
+                ),
+            )
+        client = ImageEditsClient(api_key=api_key, base_url=base_url)
+        return partial(
+            client.send,
+            client.prepare_images_edits(
+                model=model,
+                prompt=prompt,
+                response_format=response_format,
+                aspect_ratio=aspect_ratio,
+                image_size=image_size,
+                images=provider_images,
+            ),
+        )
 
     image_meta = [
         {"filename": filename, "content_type": content_type, "size_bytes": len(blob)}
@@ -242,45 +478,51 @@ async def images_edits_and_store(
             },
         },
     }
-    response_dict: dict[str, Any] = provider_response if isinstance(provider_response, dict) else {"raw": provider_response}
 
     try:
-        request_blob = encrypt_for_user(user_id=user.id, plaintext=_json_dumps(request_dict))
-        response_blob = encrypt_for_user(user_id=user.id, plaintext=_json_dumps(response_dict))
-    except EncryptionError as exc:
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(exc))
+        send = prepare_provider_call()
+    except Exception as exc:
+        raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=str(exc))
 
-    size_bytes = len(request_blob) + len(response_blob)
-    if user.storage_used_bytes + size_bytes > user.storage_quota_bytes:
-        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="Storage quota exceeded")
+    if stream:
+        return _event_stream_response(
+            _stream_and_store_images(
+                db,
+                user,
+                (send() for _ in range(n)),
+                title=title,
+                model=model,
+                prompt=prompt,
+                request_dict=request_dict,
+            )
+        )
 
-    record = UserImage(
-        user_id=user.id,
-        title=title,
-        model=str(model),
-        prompt=str(prompt),
-        status="completed",
-        image_url=_extract_first_image_url(provider_response),
-        request_encrypted=request_blob,
-        response_encrypted=response_blob,
-        size_bytes=size_bytes,
-    )
+    async def call_provider() -> dict[str, Any]:
+        provider_responses = await asyncio.gather(*(send() for _ in range(n)))
+        return _aggregate_openai_image_responses(provider_responses, expected_count=n)
 
-    try:
-        user.storage_used_bytes += size_bytes
-        db.add(record)
-        db.add(user)
-        await db.commit()
-    except Exception:
-        await db.rollback()
-        logger.exception("Failed to persist generated image for user_id=%s", user.id)
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to save image record")
-
-    await db.refresh(record)
-    return UserImageDetail(
-        **UserImageSummary.model_validate(record).model_dump(),
-        request=request_dict,
-        response=response_dict,
+    flight_payload = {
+        "endpoint": "edits",
+        "model": model,
+        "prompt": prompt,
+        "n": n,
+        "response_format": response_format,
+        "aspect_ratio": aspect_ratio,
+        "image_size": image_size,
+        "base_url": base_url,
+        "images": [blob_digest(blob) for _, blob, _ in provider_images],
+    }
+    return await _generate_and_store(
+        db,
+        user,
+        call_provider,
+        flight_payload=flight_payload,
+        api_key=api_key,
+        idempotency_key=idempotency_key,
+        title=title,
+        model=model,
+        prompt=prompt,
+        request_dict=request_dict,
     )
 
 
@@ -293,12 +535,20 @@ async def images_generations_and_store(
     aspect_ratio: Optional[str] = Form(default=None),
     response_format: Optional[str] = Form(default=None),
     title: Optional[str] = Form(default=None),
+    stream: bool = Form(default=False),
     x_api_key: Optional[str] = Header(default=None),
     x_base_url: Optional[str] = Header(default=None),
+    idempotency_key: Optional[str] = Header(default=None, max_length=255),
     user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
-    """Text-to-image generation endpoint supporting Gemini and legacy formats."""
+    """
+    Text-to-image generation endpoint supporting Gemini and legacy formats.
+
+    With `stream=true` the response is an event stream (see
+    `_stream_and_store_images`) that keeps whichever images succeed; streamed
+    requests are not de-duplicated by Idempotency-Key.
+    """
     # Validate inputs
     if not prompt or not prompt.strip():
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Prompt is required")
@@ -323,43 +573,31 @@ async def images_generations_and_store(
             detail="IMAGE_GEN_API_BASE_URL is not configured",
         )
 
-    try:
-        provider_responses: list[Any] = []
-
+    def prepare_provider_call() -> Callable[[], Awaitable[Any]]:
         # Use GeminiImageClient for Gemini models
         if is_gemini:
-            async with GeminiImageClient(api_key=api_key, base_url=base_url) as client:
-                calls = [
-                    client.generate_image(
-                        model=model,
-                        prompt=prompt,
-                        aspect_ratio=aspect_ratio,
-                        image_size=size,  # size maps to image_size for Gemini
-                    )
-                    for _ in range(n)
-                ]
-                provider_responses = await asyncio.gather(*calls)
-        else:
-            async with ImageEditsClient(api_key=api_key, base_url=base_url) as client:
-                # Some upstream providers reject the `n` parameter. Treat `n` as
-                # concurrency and issue single-image requests.
-                calls = [
-                    client.images_generations(
-                        model=model,
-                        prompt=prompt,
-                        size=size,
-                        response_format=response_format,
-                    )
-                    for _ in range(n)
-                ]
-                provider_responses = await asyncio.gather(*calls)
-
-        provider_response = _aggregate_openai_image_responses(provider_responses, expected_count=n)
-    except httpx.HTTPStatusError as exc:
-        detail = exc.response.text if exc.response is not None else str(exc)
-        raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=detail)
-    except Exception as exc:
-        raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=str(exc))
+            gemini = GeminiImageClient(api_key=api_key, base_url=base_url)
+            return partial(
+                gemini.send,
+                gemini.prepare_generate_image(
+                    model=model,
+                    prompt=prompt,
+                    aspect_ratio=aspect_ratio,
+                    image_size=size,  # size maps to image_size for Gemini
+                ),
+            )
+        # Some upstream providers reject the `n` parameter. Treat `n` as
+        # concurrency and issue single-image requests.
+        client = ImageEditsClient(api_key=api_key, base_url=base_url)
+        return partial(
+            client.send,
+            client.prepare_images_generations(
+                model=model,
+                prompt=prompt,
+                size=size,
+                response_format=response_format,
+            ),
+        )
 
     if is_gemini:
         provider_request_endpoint = f"/v1beta/models/{model}:generateContent"
@@ -401,45 +639,50 @@ async def images_generations_and_store(
             },
         },
     }
-    response_dict: dict[str, Any] = provider_response if isinstance(provider_response, dict) else {"raw": provider_response}
 
     try:
-        request_blob = encrypt_for_user(user_id=user.id, plaintext=_json_dumps(request_dict))
-        response_blob = encrypt_for_user(user_id=user.id, plaintext=_json_dumps(response_dict))
-    except EncryptionError as exc:
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(exc))
-
-    size_bytes = len(request_blob) + len(response_blob)
-    if user.storage_used_bytes + size_bytes > user.storage_quota_bytes:
-        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="Storage quota exceeded")
+        send = prepare_provider_call()
+    except Exception as exc:
+        raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=str(exc))
 
-    record = UserImage(
-        user_id=user.id,
-        title=title,
-        model=str(model),
-        prompt=str(prompt),
-        status="completed",
-        image_url=_extract_first_image_url(provider_response),
-        request_encrypted=request_blob,
-        response_encrypted=response_blob,
-        size_bytes=size_bytes,
-    )
+    if stream:
+        return _event_stream_response(
+            _stream_and_store_images(
+                db,
+                user,
+                (send() for _ in range(n)),
+                title=title,
+                model=model,
+                prompt=prompt,
+                request_dict=request_dict,
+            )
+        )
 
-    try:
-        user.storage_used_bytes += size_bytes
-        db.add(record)
-        db.add(user)
-        await db.commit()
-    except Exception:
-        await db.rollback()
-        logger.exception("Failed to persist generated image for user_id=%s", user.id)
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to save image record")
+    async def call_provider() -> dict[str, Any]:
+        provider_responses = await asyncio.gather(*(send() for _ in range(n)))
+        return _aggregate_openai_image_responses(provider_responses, expected_count=n)
 
-    await db.refresh(record)
-    return UserImageDetail(
-        **UserImageSummary.model_validate(record).model_dump(),
-        request=request_dict,
-        response=response_dict,
+    flight_payload = {
+        "endpoint": "generations",
+        "model": model,
+        "prompt": prompt,
+        "n": n,
+        "size": size,
+        "aspect_ratio": aspect_ratio,
+        "response_format": response_format,
+        "base_url": base_url,
+    }
+    return await _generate_and_store(
+        db,
+        user,
+        call_provider,
+        flight_payload=flight_payload,
+        api_key=api_key,
+        idempotency_key=idempotency_key,
+        title=title,
+        model=model,
+        prompt=prompt,
+        request_dict=request_dict,
     )
 
 
@@ -484,18 +727,68 @@ async def get_image(
     if not record:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Image not found")
     _ensure_owner(record, user)
+    return _image_detail(record)
+
+
+async def _media_viewer(request: Request) -> Optional[User]:
+    """The signed-in user, or None when the request carries a signed media URL instead."""
+    if "sig" in request.query_params:
+        return None
+    return await get_current_user(await get_auth_context(request))
+
+
+@router.get("/images/{image_id}/media/{media_id}")
+async def get_image_media(
+    image_id: str,
+    media_id: str,
+    expires: Optional[int] = None,
+    sig: Optional[str] = None,
+    user: Optional[User] = Depends(_media_viewer),
+    db: AsyncSession = Depends(get_db),
+    if_none_match: Optional[str] = Header(default=None),
+):
+    if user is None:
+        try:
+            signed = expires is not None and verify_media_signature(image_id, media_id, expires, sig or "")
+        except EncryptionError as exc:
+            raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(exc))
+        if not signed:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid or expired media link")
+
+    record = await db.get(UserImage, image_id)
+    if not record:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Image not found")
+    if user is not None:
+        _ensure_owner(record, user)
 
     try:
-        request_payload = decrypt_for_user(user_id=record.user_id, blob=record.request_encrypted)
         response_payload = decrypt_for_user(user_id=record.user_id, blob=record.response_encrypted)
     except EncryptionError as exc:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(exc))
+    entry = next((item for item in media_entries(_json_loads(response_payload)) if item["media_id"] == media_id), None)
+    if entry is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Media not found")
 
-    return UserImageDetail(
-        **UserImageSummary.model_validate(record).model_dump(),
-        request=_json_loads(request_payload),
-        response=_json_loads(response_payload),
-    )
+    # A media id always names the same bytes.
+    etag = f'"{media_id}"'
+    headers = {"ETag": etag, "Cache-Control": "private, max-age=31536000, immutable"}
+    if if_none_match and (if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    media_type = str(entry.get("content_type") or "application/octet-stream")
+    try:
+        if entry.get("encrypted"):
+            content = await read_media(record.user_id, entry)
+            return Response(content=content, media_type=media_type, headers=headers)
+        chunks = await stream_media(record.user_id, entry)
+    except FileNotFoundError:
+        chunks = None
+    except (EncryptionError, StorageBackendError) as exc:
+        logger.exception("Failed to read media_id=%s of image_id=%s", media_id, image_id)
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(exc))
+    if chunks is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Media not found")
+    return StreamingResponse(chunks, media_type=media_type, headers=headers)
 
 
 @router.patch("/images/{image_id}", response_model=UserImageSummary)
@@ -601,6 +894,13 @@ async def delete_image(
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Image not found")
     _ensure_owner(record, user)
 
+    owner_id = record.user_id
+    media: list[dict[str, Any]] = []
+    try:
+        media = media_entries(_json_loads(decrypt_for_user(user_id=owner_id, blob=record.response_encrypted)))
+    except (EncryptionError, ValueError):
+        logger.warning("Could not read media references of image_id=%s; its media files are left in place", image_id)
+
     try:
         owner = await db.get(User, record.user_id)
         if owner:
@@ -612,4 +912,5 @@ async def delete_image(
         await db.rollback()
         logger.exception("Failed to delete image_id=%s for user_id=%s", image_id, user.id)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to delete image record")
+    await delete_media(owner_id, media)
     return None
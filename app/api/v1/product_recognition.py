@@ -5,11 +5,14 @@ from typing import Optional
 
 from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile, status
 
-from app.api.deps import AuthContext, get_current_user
+from app.api.deps import AuthContext, get_current_user, image_processing_unavailable_error, provider_busy_error
 from app.clients.llm_client import ProductRecognitionError, recognize_product_with_metadata
+from app.core.admission import AdmissionTimeoutError
+from app.core.image_executor import ImageExecutorBusyError, ImageJobTimeoutError, get_image_executor
+from app.core.key_pool import NoKeyAvailableError
 from app.core.product_storage import (
+    ImageProbe,
     ProductStorageError,
-    get_image_format,
     image_to_base64,
     prepare_image_for_llm,
 )
@@ -34,14 +37,18 @@ async def recognize_product_preview(
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Empty image file")
 
     try:
-        detected_format = get_image_format(image_data)
+        # Header only; the pixels are decoded once, by prepare_image_for_llm.
+        probe = ImageProbe(image_data)
     except ProductStorageError:
         raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Invalid or unsupported image file")
 
-    if detected_format not in {"jpeg", "png"}:
+    if probe.format not in {"jpeg", "png"}:
         raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Only JPEG and PNG images are supported")
 
-    llm_image_data, preprocessing = prepare_image_for_llm(image_data)
+    try:
+        llm_image_data, preprocessing = await get_image_executor().run(prepare_image_for_llm, probe)
+    except (ImageExecutorBusyError, ImageJobTimeoutError) as exc:
+        raise image_processing_unavailable_error(exc) from exc
     llm_mime_type = "image/jpeg" if preprocessing["processed_format"] in {"jpg", "jpeg"} else "image/png"
 
     try:
@@ -69,6 +76,8 @@ async def recognize_product_preview(
             confidence=recognition_result.confidence,
             metadata=recognition_metadata,
         )
+    except (AdmissionTimeoutError, NoKeyAvailableError) as exc:
+        raise provider_busy_error(exc) from exc
     except (ProductRecognitionError, Exception) as exc:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
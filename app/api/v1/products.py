@@ -1,3 +1,4 @@
+import hashlib
 from datetime import datetime
 from typing import Optional, List, Any, Dict
 from uuid import uuid4
@@ -6,8 +7,12 @@ from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile, s
 from sqlalchemy import select, func, update, delete
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api.deps import get_current_user, get_db
-from app.models.database import Product, ProductImage, User
+from app.api.deps import get_current_user, get_db, image_processing_unavailable_error, provider_busy_error
+from app.core.admission import AdmissionTimeoutError
+from app.core.image_executor import ImageExecutorBusyError, ImageJobTimeoutError, get_image_executor
+from app.core.key_pool import NoKeyAvailableError
+from app.core.product_blobs import ProductBlobRef, acquire_product_blobs, release_product_blob
+from app.models.database import Product, ProductImage, ProductImageBlob, User
 from app.models.schemas import (
     ProductUpdate,
     ProductSummary,
@@ -17,9 +22,8 @@ from app.models.schemas import (
     ProductRecognitionResponse,
 )
 from app.core.product_storage import (
-    save_product_image,
     delete_product_image,
-    get_image_format,
+    ImageProbe,
     prepare_image_for_llm,
     image_to_base64,
     ProductStorageError,
@@ -82,21 +86,24 @@ async def recognize_product_preview(
 
     # Detect image format
     try:
-        detected_format = get_image_format(image_data)
+        probe = ImageProbe(image_data)
     except ProductStorageError:
         raise HTTPException(
             status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
             detail="Invalid or unsupported image file",
         )
 
-    if detected_format not in {"jpeg", "png"}:
+    if probe.format not in {"jpeg", "png"}:
         raise HTTPException(
             status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
             detail="Only JPEG and PNG images are supported",
         )
 
     # Prepare image for AI recognition (convert/compress for LLM input)
-    llm_image_data, preprocessing = prepare_image_for_llm(image_data)
+    try:
+        llm_image_data, preprocessing = await get_image_executor().run(prepare_image_for_llm, probe)
+    except (ImageExecutorBusyError, ImageJobTimeoutError) as exc:
+        raise image_processing_unavailable_error(exc) from exc
     llm_mime_type = "image/jpeg" if preprocessing["processed_format"] in {"jpg", "jpeg"} else "image/png"
 
     # AI recognition with optional raw text
@@ -128,6 +135,8 @@ async def recognize_product_preview(
             metadata=recognition_metadata,
         )
 
+    except (AdmissionTimeoutError, NoKeyAvailableError) as e:
+        raise provider_busy_error(e) from e
     except (ProductRecognitionError, Exception) as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -215,21 +224,21 @@ async def create_product(
             )
 
         try:
-            detected_format = get_image_format(image_data)
+            probe = ImageProbe(image_data)
         except ProductStorageError:
             raise HTTPException(
                 status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
                 detail="Invalid or unsupported image file",
             )
 
-        if detected_format not in {"jpeg", "png"}:
+        if probe.format not in {"jpeg", "png"}:
             raise HTTPException(
                 status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
                 detail="Only JPEG and PNG images are supported",
             )
 
         filename_ext = Path(upload.filename or "").suffix.lower().lstrip(".")
-        if detected_format == "png":
+        if probe.format == "png":
             img_format = "png"
         else:
             img_format = filename_ext if filename_ext in {"jpg", "jpeg"} else "jpeg"
@@ -237,6 +246,7 @@ async def create_product(
         image_payloads.append(
             {
                 "data": image_data,
+                "probe": probe,
                 "format": img_format,
                 "filename": upload.filename or f"image-{idx}",
             }
@@ -260,7 +270,10 @@ async def create_product(
         )
 
     # Prepare image for AI recognition (convert/compress for LLM input only)
-    llm_image_data, preprocessing = prepare_image_for_llm(primary_payload["data"])
+    try:
+        llm_image_data, preprocessing = await get_image_executor().run(prepare_image_for_llm, primary_payload["probe"])
+    except (ImageExecutorBusyError, ImageJobTimeoutError) as exc:
+        raise image_processing_unavailable_error(exc) from exc
     llm_mime_type = "image/jpeg" if preprocessing["processed_format"] in {"jpg", "jpeg"} else "image/png"
 
     # AI recognition based on mode
@@ -372,7 +385,19 @@ async def create_product(
     final_features = manual_features if manual_features is not None else recognition_result.features
     final_characteristics = manual_characteristics if manual_characteristics is not None else recognition_result.characteristics
 
-    requested_size = sum(len(payload["data"]) for payload in image_payloads)
+    # Quota is charged per stored blob: bytes this user already stored are free to reuse.
+    new_blobs: Dict[str, int] = {}
+    for payload in image_payloads:
+        payload["sha256"] = hashlib.sha256(payload["data"]).hexdigest()
+        new_blobs.setdefault(payload["sha256"], len(payload["data"]))
+    stored_result = await db.execute(
+        select(ProductImageBlob.sha256)
+        .where(ProductImageBlob.user_id == current_user.id)
+        .where(ProductImageBlob.sha256.in_(list(new_blobs)))
+    )
+    for sha256 in stored_result.scalars().all():
+        new_blobs.pop(sha256, None)
+    requested_size = sum(new_blobs.values())
 
     # Fast fail quota check (authoritative check is the conditional UPDATE below)
     if current_user.storage_used_bytes + requested_size > current_user.storage_quota_bytes:
@@ -391,6 +416,56 @@ async def create_product(
     # Generate product ID
     product_id = str(uuid4())
 
+    primary_image_url = None
+    blob_refs: List[ProductBlobRef] = []
+    product_images: List[ProductImage] = []
+    total_image_size = 0
+
+    async def discard_new_blobs() -> None:
+        # Only blobs created by this (rolled back) request; existing ones may be shared.
+        for ref in blob_refs:
+            if not ref.deduplicated:
+                try:
+                    await delete_product_image(ref.image_url)
+                except Exception:
+                    pass
+
+    # Store images (one blob per distinct content, written in parallel)
+    try:
+        blob_refs = await acquire_product_blobs(
+            db, current_user.id, [(payload["data"], payload["format"]) for payload in image_payloads]
+        )
+        for idx, ref in enumerate(blob_refs):
+            is_primary = idx == primary_index
+            if is_primary:
+                primary_image_url = ref.image_url
+            total_image_size += ref.size_bytes
+            product_image = ProductImage(
+                id=str(uuid4()),
+                product_id=product_id,
+                user_id=current_user.id,
+                image_url=ref.image_url,
+                image_size_bytes=ref.size_bytes,
+                is_primary=is_primary,
+                blob_sha256=ref.sha256,
+            )
+            product_images.append(product_image)
+            db.add(product_image)
+    except ProductStorageError as e:
+        await db.rollback()
+        await discard_new_blobs()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to save product image: {str(e)}"
+        )
+    except Exception:
+        await db.rollback()
+        await discard_new_blobs()
+        raise
+
+    # Charge what was actually stored (a concurrent upload may have stored some of it first)
+    requested_size = sum(ref.size_bytes for ref in blob_refs if not ref.deduplicated)
+
     # Reserve quota atomically (prevents concurrent uploads exceeding quota)
     reserve_stmt = (
         update(User)
@@ -401,6 +476,7 @@ async def create_product(
     reserve_result = await db.execute(reserve_stmt)
     if (reserve_result.rowcount or 0) != 1:
         await db.rollback()
+        await discard_new_blobs()
         fresh_user = await db.get(User, current_user.id)
         if fresh_user:
             quota = fresh_user.storage_quota_bytes
@@ -420,57 +496,6 @@ async def create_product(
             },
         )
 
-    primary_image_url = None
-    saved_image_urls: List[str] = []
-    product_images: List[ProductImage] = []
-    total_image_size = 0
-
-    # Save images to file system
-    try:
-        for idx, payload in enumerate(image_payloads):
-            image_id = str(uuid4())
-            is_primary = idx == primary_index
-            image_url, image_size = save_product_image(
-                user_id=current_user.id,
-                product_id=product_id,
-                image_data=payload["data"],
-                original_format=payload["format"],
-                image_id=None if is_primary else image_id,
-            )
-            if is_primary:
-                primary_image_url = image_url
-            saved_image_urls.append(image_url)
-            total_image_size += image_size
-            product_image = ProductImage(
-                id=image_id,
-                product_id=product_id,
-                user_id=current_user.id,
-                image_url=image_url,
-                image_size_bytes=image_size,
-                is_primary=is_primary,
-            )
-            product_images.append(product_image)
-            db.add(product_image)
-    except ProductStorageError as e:
-        await db.rollback()
-        for url in saved_image_urls:
-            try:
-                delete_product_image(url)
-            except Exception:
-                pass
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Failed to save product image: {str(e)}"
-        )
-    except Exception:
-        await db.rollback()
-        for url in saved_image_urls:
-            try:
-                delete_product_image(url)
-            except Exception:
-                pass
-        raise
-
     # Create product record
     product = Product(
         id=product_id,
@@ -479,7 +504,7 @@ async def create_product(
         dimensions=final_dimensions,
         features=final_features,
         characteristics=final_characteristics,
-        original_image_url=primary_image_url or saved_image_urls[0],
+        original_image_url=primary_image_url or blob_refs[0].image_url,
         recognition_confidence=ai_confidence,
         recognition_metadata=recognition_metadata,
         image_size_bytes=total_image_size,
@@ -491,10 +516,7 @@ async def create_product(
         await db.commit()
     except Exception:
         await db.rollback()
-        try:
-            delete_product_image(image_url)
-        except Exception:
-            pass
+        await discard_new_blobs()
         raise
 
     await db.refresh(product)
@@ -692,16 +714,28 @@ async def delete_product_endpoint(
     images_result = await db.execute(images_stmt)
     product_images = images_result.scalars().all()
 
+    # Blob files are unlinked only after the commit that freed them
+    freed_images: List[ProductImage] = []
+    reclaimed_size = product.image_size_bytes
+
     if product_images:
+        if any(image.blob_sha256 for image in product_images):
+            # Blob quota is charged once per content, so refund only blobs nobody uses anymore.
+            reclaimed_size = sum(image.image_size_bytes for image in product_images if not image.blob_sha256)
         for image in product_images:
+            if image.blob_sha256:
+                if await release_product_blob(db, product.user_id, image.blob_sha256) == 0:
+                    freed_images.append(image)
+                    reclaimed_size += image.image_size_bytes
+                continue
             try:
-                delete_product_image(image.image_url)
+                await delete_product_image(image.image_url)
             except ProductStorageError:
                 pass
         await db.execute(delete(ProductImage).where(ProductImage.product_id == product_id))
     else:
         try:
-            delete_product_image(product.original_image_url)
+            await delete_product_image(product.original_image_url)
         except ProductStorageError:
             pass
 
@@ -709,7 +743,7 @@ async def delete_product_endpoint(
     stmt = (
         update(User)
         .where(User.id == product.user_id)
-        .values(storage_used_bytes=User.storage_used_bytes - product.image_size_bytes)
+        .values(storage_used_bytes=User.storage_used_bytes - reclaimed_size)
     )
     await db.execute(stmt)
 
@@ -717,4 +751,10 @@ async def delete_product_endpoint(
     await db.delete(product)
     await db.commit()
 
+    for image in freed_images:
+        try:
+            await delete_product_image(image.image_url)
+        except ProductStorageError:
+            pass
+
     return None
@@ -1,14 +1,123 @@
-from typing import List
-
-from fastapi import APIRouter, Depends, HTTPException, Path
-
-from app.api.deps import AuthContext, get_current_user
-from app.api.v1.video import get_task_manager
-from app.core.task_manager import TaskManager
-from app.models.schemas import TaskResponse
+from typing import AsyncIterator, List
+
+from fastapi import APIRouter, Depends, HTTPException, Path, Query
+from fastapi.responses import StreamingResponse
+
+from app.api.deps import AuthContext, get_current_user
+from app.api.v1.video import get_task_manager
+from app.core.task_manager import TaskManager
+from app.core.task_store import TERMINAL_STATUSES
+from app.models.schemas import TaskResponse, TaskStatusBatchRequest, TaskStatusBatchResponse
 
 router = APIRouter()
 
+SSE_KEEPALIVE_SECONDS = 15.0
+
+
+async def _owned_task_ids(task_manager: TaskManager, user_id: str, requested: List[str]) -> List[str]:
+    if not requested:
+        return await task_manager.list_task_ids(user_id)
+    task_ids = list(dict.fromkeys(requested))
+    if len(await task_manager.get_tasks(task_ids, user_id)) != len(task_ids):
+        raise HTTPException(status_code=404, detail="Task not found")
+    return task_ids
+
+
+def _sse(event: str, data: str) -> bytes:
+    return f"event: {event}\ndata: {data}\n\n".encode()
+
+
+async def _stream_task_events(task_manager: TaskManager, task_ids: List[str]) -> AsyncIterator[bytes]:
+    # Subscribe before taking the snapshot so no change can slip in between.
+    with task_manager.events.subscribe(task_ids) as subscription:
+        pending = set()
+        for task in (await task_manager.get_tasks(task_ids)).values():
+            task_id = task.task_id
+            subscription.seed(task)
+            yield _sse("snapshot", task.model_dump_json())
+            if task.status not in TERMINAL_STATUSES:
+                pending.add(task_id)
+
+        while pending:
+            event = await subscription.get(timeout=SSE_KEEPALIVE_SECONDS)
+            if event is None:
+                yield b": keep-alive\n\n"
+                continue
+            task = event.task
+            if event.kind == "final":
+                # Events skip large results kept on disk; the final one carries the full task.
+                task = await task_manager.get_task_status(event.task_id) or task
+            yield _sse(event.kind, task.model_dump_json())
+            if event.kind == "final":
+                pending.discard(event.task_id)
+
+        yield _sse("end", "{}")
+
+
+def _event_stream_response(task_manager: TaskManager, task_ids: List[str]) -> StreamingResponse:
+    return StreamingResponse(
+        _stream_task_events(task_manager, task_ids),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/tasks/events")
+async def stream_tasks_events(
+    task_id: List[str] = Query(default=[], description="任务ID，可重复；为空时订阅当前用户的全部任务"),
+    task_manager: TaskManager = Depends(get_task_manager),
+    auth: AuthContext = Depends(get_current_user),
+):
+    """
+    Server-Sent Events for several tasks: a `snapshot` per task, then `progress`,
+    `status` and `final` events (each carrying the full TaskResponse), and `end`
+    once every task is terminal.
+    """
+    return _event_stream_response(task_manager, await _owned_task_ids(task_manager, auth.user_id, task_id))
+
+
+@router.post("/tasks/status", response_model=TaskStatusBatchResponse)
+async def get_tasks_status(
+    body: TaskStatusBatchRequest,
+    wait: float = Query(0, ge=0, le=60, description="长轮询秒数：阻塞直到任一任务发生变化或超时"),
+    task_manager: TaskManager = Depends(get_task_manager),
+    auth: AuthContext = Depends(get_current_user),
+):
+    """
+    Current state of many tasks in one round trip.
+
+    With `wait`, the call blocks until any of the requested (non-terminal)
+    tasks changes or `wait` seconds pass, then returns the state of all of
+    them. Ids that do not exist or belong to someone else are reported in
+    `not_found`.
+    """
+    task_ids = list(dict.fromkeys(body.task_ids))
+    owned = list(await task_manager.get_tasks(task_ids, auth.user_id))
+
+    changed = True
+    if wait > 0:
+        changed = False
+        with task_manager.events.subscribe(owned) as subscription:
+            # Snapshot taken after subscribing so a change in between still wakes us up.
+            snapshot = await task_manager.get_tasks(owned)
+            for task in snapshot.values():
+                subscription.seed(task)
+            if any(task.status not in TERMINAL_STATUSES for task in snapshot.values()):
+                changed = await subscription.get(timeout=wait) is not None
+
+    tasks = await task_manager.get_tasks(owned)
+    not_found = [tid for tid in task_ids if tid not in tasks]
+    return TaskStatusBatchResponse(tasks=list(tasks.values()), not_found=not_found, changed=changed)
+
+
+@router.get("/tasks/{task_id}/events")
+async def stream_task_events(
+    task_id: str = Path(..., description="任务ID"),
+    task_manager: TaskManager = Depends(get_task_manager),
+    auth: AuthContext = Depends(get_current_user),
+):
+    return _event_stream_response(task_manager, await _owned_task_ids(task_manager, auth.user_id, [task_id]))
+
 
 @router.get("/tasks/{task_id}", response_model=TaskResponse)
 async def get_task_status(
@@ -16,11 +125,7 @@ async def get_task_status(
     task_manager: TaskManager = Depends(get_task_manager),
     auth: AuthContext = Depends(get_current_user),
 ):
-    owner = task_manager.task_owners.get(task_id)
-    if not owner or owner != auth.user_id:
-        raise HTTPException(status_code=404, detail="Task not found")
-
-    task = await task_manager.get_task_status(task_id)
+    task = (await task_manager.get_tasks([task_id], auth.user_id)).get(task_id)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
     return task
@@ -32,7 +137,7 @@ async def cancel_task(
     task_manager: TaskManager = Depends(get_task_manager),
     auth: AuthContext = Depends(get_current_user),
 ):
-    owner = task_manager.task_owners.get(task_id)
+    owner = await task_manager.get_task_owner(task_id)
     if not owner or owner != auth.user_id:
         raise HTTPException(status_code=404, detail="Task not found or already completed")
 
@@ -44,5 +149,4 @@ async def cancel_task(
 
 @router.get("/tasks", response_model=List[TaskResponse])
 async def list_tasks(task_manager: TaskManager = Depends(get_task_manager), auth: AuthContext = Depends(get_current_user)):
-    allowed_task_ids = {tid for tid, owner in task_manager.task_owners.items() if owner == auth.user_id}
-    return [task for task_id, task in task_manager.results.items() if task_id in allowed_task_ids]
+    return await task_manager.list_tasks(auth.user_id)
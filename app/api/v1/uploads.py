@@ -1,34 +1,41 @@
 from __future__ import annotations
 
+import asyncio
 from pathlib import Path
 from typing import Optional
 from uuid import uuid4
 
 from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile, status
 from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.deps import AuthContext, get_current_user
-from app.core.product_storage import ProductStorageError, delete_product_image, get_image_format, save_product_image
+from app.core.product_blobs import acquire_product_blobs, parse_blob_image_url, release_product_blob
+from app.core.product_storage import (
+    ImageProbe,
+    ProductStorageError,
+    delete_product_image,
+    product_image_key_for_url,
+    save_product_image,
+)
+from app.db.session import get_optional_db
 
 router = APIRouter()
 
 
 def _is_own_product_image_url(image_url: str, user_id: str) -> bool:
-    value = str(image_url or "").strip()
-    if not value:
-        return False
-
-    if value.startswith("/static/"):
-        value = value[len("/static") :]
-
-    prefix = f"/uploads/products/{user_id}/"
-    return value.startswith(prefix)
+    key = product_image_key_for_url(image_url)
+    return key is not None and key.startswith(f"products/{user_id}/")
 
 
 class ProductImageUploadItem(BaseModel):
     image_url: str
     is_primary: bool
     image_size_bytes: int
+    # Set when the image is stored content-addressed (requires the backend database).
+    content_sha256: Optional[str] = None
+    # True when the user had already stored these bytes, so no new storage was used.
+    deduplicated: bool = False
 
 
 class ProductImageUploadResponse(BaseModel):
@@ -50,6 +57,7 @@ async def upload_product_images(
     primary_index: int = Form(default=0),
     images: list[UploadFile] = File(...),
     auth: AuthContext = Depends(get_current_user),
+    db: Optional[AsyncSession] = Depends(get_optional_db),
 ):
     if not images:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="At least one image file is required")
@@ -58,16 +66,18 @@ async def upload_product_images(
         raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="primary_index is out of range")
 
     saved: list[ProductImageUploadItem] = []
+    # Files this request created; blobs that already existed may be shared and are never removed here.
     saved_urls: list[str] = []
 
     try:
+        validated: list[tuple[bytes, str]] = []
         for idx, upload in enumerate(images):
             raw = await upload.read()
             if not raw:
                 raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Empty image file at index {idx}")
 
             try:
-                detected_format = get_image_format(raw)
+                detected_format = ImageProbe(raw).format
             except ProductStorageError:
                 raise HTTPException(
                     status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
@@ -85,48 +95,94 @@ async def upload_product_images(
                 img_format = "png"
             else:
                 img_format = filename_ext if filename_ext in {"jpg", "jpeg"} else "jpeg"
-
-            is_primary = idx == primary_index
-            image_id: Optional[str] = None if is_primary else str(uuid4())
-            image_url, image_size = save_product_image(
-                user_id=auth.user_id,
-                product_id=product_id,
-                image_data=raw,
-                original_format=img_format,
-                image_id=image_id,
+            validated.append((raw, img_format))
+
+        if db is not None:
+            refs = await acquire_product_blobs(db, auth.user_id, validated)
+            saved_urls.extend(ref.image_url for ref in refs if not ref.deduplicated)
+            for idx, ref in enumerate(refs):
+                saved.append(
+                    ProductImageUploadItem(
+                        image_url=ref.image_url,
+                        is_primary=idx == primary_index,
+                        image_size_bytes=ref.size_bytes,
+                        content_sha256=ref.sha256,
+                        deduplicated=ref.deduplicated,
+                    )
+                )
+            await db.commit()
+            return ProductImageUploadResponse(product_id=product_id, images=saved)
+
+        # All images of the product are written in parallel.
+        results = await asyncio.gather(
+            *(
+                save_product_image(
+                    user_id=auth.user_id,
+                    product_id=product_id,
+                    image_data=raw,
+                    original_format=img_format,
+                    image_id=None if idx == primary_index else str(uuid4()),
+                )
+                for idx, (raw, img_format) in enumerate(validated)
+            ),
+            return_exceptions=True,
+        )
+        saved_urls.extend(result[0] for result in results if not isinstance(result, BaseException))
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+        for idx, (image_url, image_size) in enumerate(results):
+            saved.append(
+                ProductImageUploadItem(image_url=image_url, is_primary=idx == primary_index, image_size_bytes=image_size)
             )
-            saved_urls.append(image_url)
-            saved.append(ProductImageUploadItem(image_url=image_url, is_primary=is_primary, image_size_bytes=image_size))
 
         return ProductImageUploadResponse(product_id=product_id, images=saved)
     except HTTPException:
+        if db is not None:
+            await db.rollback()
         # Cleanup files we already wrote.
-        for url in saved_urls:
-            try:
-                delete_product_image(url)
-            except Exception:
-                pass
+        await _discard_uploads(saved_urls)
         raise
     except Exception as exc:
-        for url in saved_urls:
-            try:
-                delete_product_image(url)
-            except Exception:
-                pass
+        if db is not None:
+            await db.rollback()
+        await _discard_uploads(saved_urls)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(exc))
 
 
+async def _discard_uploads(image_urls: list[str]) -> None:
+    for url in image_urls:
+        try:
+            await delete_product_image(url)
+        except Exception:
+            pass
+
+
 @router.post("/uploads/products/delete", response_model=ProductImageDeleteResponse)
 async def delete_product_image_upload(
     payload: ProductImageDeleteRequest,
     auth: AuthContext = Depends(get_current_user),
+    db: Optional[AsyncSession] = Depends(get_optional_db),
 ):
     image_url = str(payload.image_url or "").strip()
     if not _is_own_product_image_url(image_url, auth.user_id):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not allowed")
 
+    blob = parse_blob_image_url(image_url)
+    if blob is not None and db is not None:
+        # Drop one reference; the file goes only with the last one, after the commit.
+        try:
+            remaining = await release_product_blob(db, auth.user_id, blob[1])
+            await db.commit()
+        except Exception as exc:
+            await db.rollback()
+            raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(exc))
+        if remaining == 0:
+            await _discard_uploads([image_url])
+        return ProductImageDeleteResponse(deleted=remaining is not None)
+
     try:
-        deleted = bool(delete_product_image(image_url))
+        deleted = bool(await delete_product_image(image_url))
     except Exception as exc:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(exc))
 
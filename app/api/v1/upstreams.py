@@ -0,0 +1,23 @@
+from fastapi import APIRouter, Depends
+
+from app.api.deps import AuthContext, get_current_user
+from app.core.circuit_breaker import get_breakers
+from app.core.hedging import get_hedges
+from app.core.key_pool import get_key_pools
+
+router = APIRouter()
+
+
+@router.get("/upstreams")
+async def get_upstream_health(_: AuthContext = Depends(get_current_user)):
+    """
+    Circuit breaker state and recent error rate / latency of the configured
+    upstream hosts, usage of each pooled API key (keys are masked), and how
+    often hedged image requests fired and won. Hosts supplied by callers are
+    left out: they belong to other users' requests.
+    """
+    return {
+        "upstreams": get_breakers().snapshot(pinned_only=True),
+        "key_pools": get_key_pools().snapshot(),
+        "hedging": get_hedges().snapshot(),
+    }
@@ -1,16 +1,36 @@
+import math
 from functools import lru_cache
 from typing import Optional
 
-from fastapi import APIRouter, Depends, Header, HTTPException
-
-from app.api.deps import AuthContext, get_current_user
-from app.config import get_settings
-from app.core.task_manager import TaskManager
-from app.models.schemas import TaskResponse, VideoGenerationRequest
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+
+from app.api.deps import AuthContext, get_current_user
+from app.config import get_settings
+from app.core.fair_scheduler import QueueFullError
+from app.core.idempotency import IdempotencyConflictError
+from app.core.task_manager import TaskManager
+from app.models.schemas import TaskPriority, TaskResponse, TaskStatus, VideoGenerationRequest
 
 router = APIRouter()
 
 
+def queue_full_error(exc: QueueFullError) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="Too many queued video tasks, retry later",
+        headers={"Retry-After": str(math.ceil(exc.retry_after))},
+    )
+
+
+def ensure_task_succeeded(task: Optional[TaskResponse]) -> TaskResponse:
+    """Raise with the task's error unless it completed, as awaiting the task itself used to."""
+    if task is None:
+        raise RuntimeError("Task result missing")
+    if task.status in (TaskStatus.FAILED, TaskStatus.CANCELLED):
+        raise RuntimeError(task.error or f"Task {task.status.value}")
+    return task
+
+
 @lru_cache()
 def get_task_manager() -> TaskManager:
     settings = get_settings()
@@ -22,12 +42,22 @@ async def generate_video(
     request: VideoGenerationRequest,
     task_manager: TaskManager = Depends(get_task_manager),
     x_api_key: Optional[str] = Header(default=None),
+    idempotency_key: Optional[str] = Header(default=None, max_length=255),
     auth: AuthContext = Depends(get_current_user),
 ):
     try:
-        task_id = await task_manager.create_task(request, api_key=x_api_key, owner_user_id=auth.user_id)
+        task_id = await task_manager.create_task(
+            request,
+            api_key=x_api_key,
+            owner_user_id=auth.user_id,
+            idempotency_key=idempotency_key,
+        )
         task_status = await task_manager.get_task_status(task_id)
         return task_status
+    except QueueFullError as e:
+        raise queue_full_error(e) from e
+    except IdempotencyConflictError as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e)) from e
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -36,17 +66,24 @@ async def generate_video(
 async def generate_video_sync(
     request: VideoGenerationRequest,
     task_manager: TaskManager = Depends(get_task_manager),
-    x_api_key: Optional[str] = Header(default=None),
-    auth: AuthContext = Depends(get_current_user),
-):
-    try:
-        task_id = await task_manager.create_task(request, api_key=x_api_key, owner_user_id=auth.user_id)
-
-        task = task_manager.tasks.get(task_id)
-        if task:
-            await task
-
-        result = await task_manager.get_task_status(task_id)
-        return result
+    x_api_key: Optional[str] = Header(default=None),
+    idempotency_key: Optional[str] = Header(default=None, max_length=255),
+    auth: AuthContext = Depends(get_current_user),
+):
+    try:
+        task_id = await task_manager.create_task(
+            request,
+            api_key=x_api_key,
+            owner_user_id=auth.user_id,
+            priority=TaskPriority.INTERACTIVE,
+            idempotency_key=idempotency_key,
+        )
+
+        # A failed task is an error response, wherever it ran.
+        return ensure_task_succeeded(await task_manager.wait_for_task(task_id))
+    except QueueFullError as e:
+        raise queue_full_error(e) from e
+    except IdempotencyConflictError as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e)) from e
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
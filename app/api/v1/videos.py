@@ -2,19 +2,23 @@ from __future__ import annotations
 
 import json
 import logging
+from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, status
 from sqlalchemy import desc, select
 from sqlalchemy.orm import load_only
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.deps import get_current_user
-from app.api.v1.video import get_task_manager
+from app.api.v1.video import ensure_task_succeeded, get_task_manager, queue_full_error
 from app.core.encryption import EncryptionError, decrypt_for_user, encrypt_for_user
+from app.core.fair_scheduler import QueueFullError
+from app.core.idempotency import IdempotencyConflictError
 from app.core.task_manager import TaskManager
 from app.db.session import get_db
 from app.models.database import User, UserVideo
 from app.models.schemas import (
+    TaskPriority,
     UserVideoCreate,
     UserVideoDetail,
     UserVideoGenerateRequest,
@@ -47,17 +51,26 @@ async def generate_and_store_video_sync(
     user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
     task_manager: TaskManager = Depends(get_task_manager),
+    idempotency_key: Optional[str] = Header(default=None, max_length=255),
 ):
     try:
-        task_id = await task_manager.create_task(payload.generation, api_key=None, owner_user_id=user.id)
-        task = task_manager.tasks.get(task_id)
-        if task:
-            await task
-        result = await task_manager.get_task_status(task_id)
+        task_id = await task_manager.create_task(
+            payload.generation,
+            api_key=None,
+            owner_user_id=user.id,
+            priority=TaskPriority.INTERACTIVE,
+            idempotency_key=idempotency_key,
+        )
+        result = await task_manager.wait_for_task(task_id)
         if not result:
             raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Task result missing")
+        ensure_task_succeeded(result)
     except HTTPException:
         raise
+    except QueueFullError as exc:
+        raise queue_full_error(exc) from exc
+    except IdempotencyConflictError as exc:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(exc)) from exc
     except Exception as exc:
         raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=str(exc))
 
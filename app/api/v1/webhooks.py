@@ -0,0 +1,59 @@
+import json
+
+from fastapi import APIRouter, Depends, HTTPException, Path, Query, Request, status
+
+from app.api.v1.video import get_task_manager
+from app.config import get_settings
+from app.core.task_manager import TaskManager
+from app.core.webhooks import SIGNATURE_HEADER, verify_callback_token, verify_payload_signature
+
+router = APIRouter()
+
+
+@router.post("/webhooks/video/{task_id}")
+async def receive_video_webhook(
+    request: Request,
+    task_id: str = Path(..., description="任务ID"),
+    token: str = Query(..., description="回调令牌"),
+    task_manager: TaskManager = Depends(get_task_manager),
+):
+    """
+    Completion callback registered with the provider as `notify_hook`.
+
+    The URL token is an HMAC of the task id, so a callback can only target the
+    task it was issued for. The body must carry `X-Webhook-Signature`
+    (`sha256=<hex>` HMAC of the raw body with the same secret). With
+    VIDEO_WEBHOOK_SIGNED off, for providers that cannot sign, an unsigned
+    callback is only a wake-up: its body is ignored and the task's status is
+    queried from the provider right away.
+    """
+    settings = get_settings()
+    secret = settings.VIDEO_WEBHOOK_SECRET
+    if not secret:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Webhooks are not enabled")
+    if not verify_callback_token(task_id, token, secret):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid callback token")
+
+    body = await request.body()
+    signature = request.headers.get(SIGNATURE_HEADER)
+    if signature is None and settings.VIDEO_WEBHOOK_SIGNED:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Missing signature")
+    if signature is not None and not verify_payload_signature(body, signature, secret):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid signature")
+
+    payload = None
+    if signature is not None:
+        try:
+            payload = json.loads(body)
+        except ValueError as exc:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid JSON body") from exc
+        if not isinstance(payload, dict):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid JSON body")
+
+    try:
+        accepted = await task_manager.handle_webhook(task_id, payload)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+
+    # Late or duplicate callbacks (task already finished) are acknowledged so the provider stops retrying.
+    return {"accepted": accepted}
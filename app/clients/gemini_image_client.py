@@ -8,6 +8,11 @@ import httpx
 from tenacity import AsyncRetrying, retry_if_exception_type, stop_after_attempt, wait_exponential
 
 from app.config import get_settings
+from app.core.admission import get_admission
+from app.core.circuit_breaker import UpstreamEndpoint, get_breakers, upstream_endpoints
+from app.core.hedging import get_hedges
+from app.core.http_clients import PreparedRequest, get_http_client
+from app.core.key_pool import with_api_key
 
 
 class GeminiImageClient:
@@ -20,17 +25,26 @@ class GeminiImageClient:
         "gemini-2.0-flash-exp",
     }
 
-    def __init__(self, api_key: str, base_url: Optional[str] = None):
-        settings = get_settings()
+    # Admission control bucket (see app/core/admission.py).
+    provider = "gemini"
+
+    def __init__(self, api_key: str, base_url: Optional[str] = None, *, hedge: Optional[bool] = None):
         self.api_key = api_key
         self.base_url = self._normalize_base_url(base_url or "https://yunwu.ai")
-        self.client = httpx.AsyncClient(
-            timeout=settings.REQUEST_TIMEOUT,
-            headers={
-                "Authorization": f"Bearer {api_key}",
-                "Content-Type": "application/json",
-            },
+        settings = get_settings()
+        self.endpoints = upstream_endpoints(
+            self.base_url,
+            api_key,
+            configured_base_url=settings.IMAGE_EDIT_API_BASE_URL,
+            configured_api_key=settings.IMAGE_EDIT_API_KEY,
+            alternates=settings.IMAGE_EDIT_API_ALTERNATES,
+            normalize=self._normalize_base_url,
         )
+        self.hedge = settings.HEDGE_ENABLED if hedge is None else hedge
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        return get_http_client(self.base_url)
 
     @staticmethod
     def _normalize_base_url(base_url: str) -> str:
@@ -51,9 +65,13 @@ class GeminiImageClient:
         """Check if the model should use Gemini API format."""
         return model in cls.GEMINI_MODELS or model.startswith("gemini-")
 
+    @staticmethod
+    def _model_path(model: str) -> str:
+        return f"/v1beta/models/{model}:generateContent"
+
     def _build_url(self, model: str) -> str:
         """Build the generateContent URL for a model."""
-        return f"{self.base_url}/v1beta/models/{model}:generateContent"
+        return f"{self.base_url}{self._model_path(model)}"
 
     async def generate_image(
         self,
@@ -77,8 +95,30 @@ class GeminiImageClient:
         Returns:
             Dict with generated image data in b64_json format
         """
-        url = self._build_url(model)
+        return await self.send(
+            self.prepare_generate_image(
+                model=model,
+                prompt=prompt,
+                aspect_ratio=aspect_ratio,
+                image_size=image_size,
+                images=images,
+            )
+        )
 
+    @classmethod
+    def prepare_generate_image(
+        cls,
+        *,
+        model: str,
+        prompt: str,
+        aspect_ratio: str | None = None,
+        image_size: str | None = None,
+        images: Iterable[tuple[str, bytes, str]] | None = None,
+    ) -> PreparedRequest:
+        """
+        Build and serialize the generateContent body once (reference images are
+        base64-encoded here), for `send` to reuse across an n-way fan-out.
+        """
         # Build parts array
         parts: list[dict[str, Any]] = []
 
@@ -123,24 +163,48 @@ class GeminiImageClient:
         if image_config:
             payload["generationConfig"]["imageConfig"] = image_config
 
-        settings = get_settings()
-        retrying = AsyncRetrying(
-            stop=stop_after_attempt(settings.MAX_RETRIES),
-            wait=wait_exponential(multiplier=settings.RETRY_BACKOFF_FACTOR),
-            retry=retry_if_exception_type((httpx.TimeoutException, httpx.NetworkError)),
-            reraise=True,
-        )
+        return PreparedRequest.json(cls._model_path(model), payload)
 
-        async for attempt in retrying:
-            with attempt:
-                response = await self.client.post(url, json=payload)
-                response.raise_for_status()
-                gemini_response = response.json()
-
-                # Convert Gemini response to OpenAI-compatible format
-                return self._convert_response(gemini_response)
+    async def send(self, prepared: PreparedRequest) -> dict[str, Any]:
+        """Send a prepared generateContent request; returns the OpenAI-compatible response."""
+        settings = get_settings()
 
-        raise RuntimeError("Unreachable")
+        async def send_to(upstream: UpstreamEndpoint) -> dict[str, Any]:
+            url = f"{upstream.base_url}{prepared.path}"
+
+            async def send_with(api_key: str) -> dict[str, Any]:
+                headers = prepared.headers(api_key)
+                retrying = AsyncRetrying(
+                    stop=stop_after_attempt(settings.MAX_RETRIES),
+                    wait=wait_exponential(multiplier=settings.RETRY_BACKOFF_FACTOR),
+                    retry=retry_if_exception_type((httpx.TimeoutException, httpx.NetworkError)),
+                    reraise=True,
+                )
+                async for attempt in retrying:
+                    with attempt:
+                        async with get_admission().admit(self.provider, api_key):
+                            async with get_breakers().get(url).guard():
+                                response = await get_http_client(url).post(url, content=prepared.content, headers=headers)
+                                response.raise_for_status()
+                        return response.json()
+
+                raise RuntimeError("Unreachable")
+
+            # A pooled key is swapped for the least-loaded key of its pool (see key_pool)
+            return await with_api_key(upstream.api_key, send_with)
+
+        async def send_once() -> dict[str, Any]:
+            # Healthiest endpoint first, failing over to alternates (see circuit_breaker)
+            return await get_breakers().call(self.endpoints, send_to)
+
+        if self.hedge:
+            # A slow call is raced against a duplicate (see hedging)
+            gemini_response = await get_hedges().get(f"{self.provider}:{prepared.path}").run(send_once)
+        else:
+            gemini_response = await send_once()
+
+        # Convert Gemini response to OpenAI-compatible format
+        return self._convert_response(gemini_response)
 
     def _convert_response(self, gemini_response: dict[str, Any]) -> dict[str, Any]:
         """Convert Gemini response to OpenAI-compatible format."""
@@ -194,7 +258,8 @@ class GeminiImageClient:
         return {"data": data}
 
     async def close(self) -> None:
-        await self.client.aclose()
+        # Pooled client; closed at application shutdown.
+        return None
 
     async def __aenter__(self):
         return self
@@ -7,17 +7,34 @@ import httpx
 from tenacity import AsyncRetrying, retry_if_exception_type, stop_after_attempt, wait_exponential
 
 from app.config import get_settings
+from app.core.admission import get_admission
+from app.core.circuit_breaker import UpstreamEndpoint, get_breakers, upstream_endpoints
+from app.core.hedging import get_hedges
+from app.core.http_clients import PreparedRequest, get_http_client
+from app.core.key_pool import with_api_key
 
 
 class ImageEditsClient:
-    def __init__(self, api_key: str, base_url: Optional[str] = None):
+    # Admission control bucket (see app/core/admission.py).
+    provider = "image_edits"
+
+    def __init__(self, api_key: str, base_url: Optional[str] = None, *, hedge: Optional[bool] = None):
         settings = get_settings()
         self.api_key = api_key
-        self.base_url = self._normalize_base_url(base_url or settings.IMAGE_EDIT_API_BASE_URL)
-        self.client = httpx.AsyncClient(
-            timeout=settings.REQUEST_TIMEOUT,
-            headers={"Authorization": f"Bearer {api_key}"},
+        self.base_url = self._normalize_base_url(base_url or settings.IMAGE_EDIT_API_BASE_URL)
+        self.endpoints = upstream_endpoints(
+            self.base_url,
+            api_key,
+            configured_base_url=settings.IMAGE_EDIT_API_BASE_URL,
+            configured_api_key=settings.IMAGE_EDIT_API_KEY,
+            alternates=settings.IMAGE_EDIT_API_ALTERNATES,
+            normalize=self._normalize_base_url,
         )
+        self.hedge = settings.HEDGE_ENABLED if hedge is None else hedge
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        return get_http_client(self.base_url)
 
     @staticmethod
     def _normalize_base_url(base_url: str) -> str:
@@ -33,13 +50,68 @@ class ImageEditsClient:
 
         return value.rstrip("/")
 
-    def _build_url(self, endpoint: str) -> str:
+    def _build_url(self, endpoint: str, base_url: Optional[str] = None) -> str:
         ep = str(endpoint or "").strip()
         if not ep:
             raise ValueError("endpoint 不能为空")
         if not ep.startswith("/"):
             ep = "/" + ep
-        return f"{self.base_url}{ep}"
+        return f"{base_url or self.base_url}{ep}"
+
+    async def send(self, prepared: PreparedRequest) -> Any:
+        """
+        POST a prepared request to the healthiest endpoint (see circuit_breaker),
+        retrying timeouts and connection errors, and failing over to an
+        alternate endpoint when one keeps failing. A pooled key is swapped for
+        the least-loaded key of its pool (see key_pool). With hedging on, a
+        slow call is raced against a duplicate (see hedging).
+        """
+        settings = get_settings()
+
+        async def send_to(upstream: UpstreamEndpoint) -> Any:
+            url = self._build_url(prepared.path, upstream.base_url)
+
+            async def send_with(api_key: str) -> Any:
+                headers = prepared.headers(api_key)
+                retrying = AsyncRetrying(
+                    stop=stop_after_attempt(settings.MAX_RETRIES),
+                    wait=wait_exponential(multiplier=settings.RETRY_BACKOFF_FACTOR),
+                    retry=retry_if_exception_type((httpx.TimeoutException, httpx.NetworkError)),
+                    reraise=True,
+                )
+                async for attempt in retrying:
+                    with attempt:
+                        async with get_admission().admit(self.provider, api_key):
+                            async with get_breakers().get(url).guard():
+                                response = await get_http_client(url).post(url, content=prepared.content, headers=headers)
+                                response.raise_for_status()
+                        return response.json()
+
+                raise RuntimeError("Unreachable")
+
+            return await with_api_key(upstream.api_key, send_with)
+
+        async def send_once() -> Any:
+            return await get_breakers().call(self.endpoints, send_to)
+
+        if not self.hedge:
+            return await send_once()
+        return await get_hedges().get(f"{self.provider}:{prepared.path}").run(send_once)
+
+    @staticmethod
+    def prepare_images_generations(
+        *,
+        model: str,
+        prompt: str,
+        size: str | None = None,
+        response_format: str | None = None,
+    ) -> PreparedRequest:
+        payload: dict[str, Any] = {"model": model, "prompt": prompt}
+        if size:
+            payload["size"] = size
+        if response_format:
+            payload["response_format"] = response_format
+        return PreparedRequest.json("/v1/images/generations", payload)
 
     async def images_generations(
         self,
@@ -54,35 +126,15 @@ class ImageEditsClient:
 
         Note: Some upstream providers reject the `n` parameter. Callers SHOULD
         perform batching/concurrency themselves and this client will not send
-        `n` upstream.
+        `n` upstream. For fan-out, `prepare_images_generations` once and
+        `send` the prepared request n times.
         """
-        endpoint = "/v1/images/generations"
-        url = self._build_url(endpoint)
-
-        payload: dict[str, Any] = {"model": model, "prompt": prompt}
-        if size:
-            payload["size"] = size
-        if response_format:
-            payload["response_format"] = response_format
-
-        settings = get_settings()
-        retrying = AsyncRetrying(
-            stop=stop_after_attempt(settings.MAX_RETRIES),
-            wait=wait_exponential(multiplier=settings.RETRY_BACKOFF_FACTOR),
-            retry=retry_if_exception_type((httpx.TimeoutException, httpx.NetworkError)),
-            reraise=True,
+        return await self.send(
+            self.prepare_images_generations(model=model, prompt=prompt, size=size, response_format=response_format)
         )
 
-        async for attempt in retrying:
-            with attempt:
-                response = await self.client.post(url, json=payload)
-                response.raise_for_status()
-                return response.json()
-
-        raise RuntimeError("Unreachable")
-
-    async def images_edits(
-        self,
+    @staticmethod
+    def prepare_images_edits(
         *,
         model: str,
         prompt: str,
@@ -90,10 +142,8 @@ class ImageEditsClient:
         aspect_ratio: str | None = None,
         image_size: str | None = None,
         images: Iterable[tuple[str, bytes, str]] | None = None,
-    ) -> Any:
-        endpoint = "/v1/images/edits"
-        url = self._build_url(endpoint)
-
+    ) -> PreparedRequest:
+        """Encode the multipart body (reference images included) once."""
         data: dict[str, str] = {"model": model, "prompt": prompt}
         if response_format:
             data["response_format"] = response_format
@@ -107,24 +157,32 @@ class ImageEditsClient:
             for filename, content, content_type in images:
                 files.append(("image", (filename, content, content_type)))
 
-        settings = get_settings()
-        retrying = AsyncRetrying(
-            stop=stop_after_attempt(settings.MAX_RETRIES),
-            wait=wait_exponential(multiplier=settings.RETRY_BACKOFF_FACTOR),
-            retry=retry_if_exception_type((httpx.TimeoutException, httpx.NetworkError)),
-            reraise=True,
-        )
+        return PreparedRequest.multipart("/v1/images/edits", data, files)
 
-        async for attempt in retrying:
-            with attempt:
-                response = await self.client.post(url, data=data, files=files)
-                response.raise_for_status()
-                return response.json()
-
-        raise RuntimeError("Unreachable")
+    async def images_edits(
+        self,
+        *,
+        model: str,
+        prompt: str,
+        response_format: str | None = None,
+        aspect_ratio: str | None = None,
+        image_size: str | None = None,
+        images: Iterable[tuple[str, bytes, str]] | None = None,
+    ) -> Any:
+        return await self.send(
+            self.prepare_images_edits(
+                model=model,
+                prompt=prompt,
+                response_format=response_format,
+                aspect_ratio=aspect_ratio,
+                image_size=image_size,
+                images=images,
+            )
+        )
 
     async def close(self) -> None:
-        await self.client.aclose()
+        # Pooled client; closed at application shutdown.
+        return None
 
     async def __aenter__(self):
         return self
@@ -1,8 +1,9 @@
+import asyncio
 import os
 from typing import Optional, Any, Dict, Tuple
 from dotenv import load_dotenv
 from pydantic import BaseModel, Field
-from tenacity import retry, stop_after_attempt, wait_exponential
+from tenacity import retry, retry_if_not_exception_type, stop_after_attempt, wait_exponential
 
 try:
     from structllm import StructLLM
@@ -10,6 +11,8 @@ try:
 except ImportError:
     STRUCTLLM_AVAILABLE = False
 
+from app.core.admission import AdmissionTimeoutError, get_admission
+from app.core.key_pool import NoKeyAvailableError, with_api_key
 from app.models.schemas import ProductRecognitionResult
 
 load_dotenv()
@@ -55,13 +58,13 @@ def _safe_dump_raw_response(raw_response: Any) -> Dict[str, Any]:
     return {"raw_response": str(raw_response)}
 
 
-def create_llm_client() -> Optional[object]:
-    """Create StructLLM client instance"""
+def create_llm_client(api_key: Optional[str] = None) -> Optional[object]:
+    """Create StructLLM client instance (for the configured key unless `api_key` is given)"""
     if not STRUCTLLM_AVAILABLE:
         return None
 
     config = LLMConfig()
-    api_key = (config.api_key or "").strip()
+    api_key = (api_key or config.api_key or "").strip()
     if not api_key or api_key in _PLACEHOLDER_API_KEYS:
         return None
 
@@ -79,6 +82,7 @@ def create_llm_client() -> Optional[object]:
 @retry(
     stop=stop_after_attempt(3),
     wait=wait_exponential(multiplier=1, min=1, max=10),
+    retry=retry_if_not_exception_type((AdmissionTimeoutError, NoKeyAvailableError)),
     reraise=True
 )
 async def recognize_product_with_metadata(
@@ -99,6 +103,8 @@ async def recognize_product_with_metadata(
 
     Raises:
         ProductRecognitionError: If recognition fails after retries
+        AdmissionTimeoutError: If the LLM provider is saturated (not retried)
+        NoKeyAvailableError: If every pooled LLM key is rate limited (not retried)
     """
     if not STRUCTLLM_AVAILABLE:
         raise ProductRecognitionError("StructLLM library is not installed. Install with: pip install structllm")
@@ -132,26 +138,35 @@ async def recognize_product_with_metadata(
         user_prompt += f"\n\n以下是用户提供的额外产品信息,请结合图片使用:\n{raw_text.strip()}"
 
     try:
-        # Call LLM API with structured output
-        response = client.parse(
-            model=LLMConfig.model,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {
-                    "role": "user",
-                    "content": [
-                        {"type": "text", "text": user_prompt},
+        async def parse_with(api_key: str) -> Any:
+            # Another key of the LLM key pool may have been picked (see key_pool)
+            key_client = client if api_key == LLMConfig.api_key else create_llm_client(api_key)
+            if not key_client:
+                raise ProductRecognitionError("Failed to initialize LLM client for a pooled LLM_API_KEYS entry")
+            # Call LLM API with structured output; the SDK call blocks, so run it off the event loop
+            async with get_admission().admit("llm", api_key):
+                return await asyncio.to_thread(
+                    key_client.parse,
+                    model=LLMConfig.model,
+                    messages=[
+                        {"role": "system", "content": system_prompt},
                         {
-                            "type": "image_url",
-                            "image_url": {
-                                "url": f"data:{mime_type};base64,{image_base64}"
-                            }
+                            "role": "user",
+                            "content": [
+                                {"type": "text", "text": user_prompt},
+                                {
+                                    "type": "image_url",
+                                    "image_url": {
+                                        "url": f"data:{mime_type};base64,{image_base64}"
+                                    }
+                                }
+                            ]
                         }
-                    ]
-                }
-            ],
-            response_format=ProductRecognitionResult
-        )
+                    ],
+                    response_format=ProductRecognitionResult
+                )
+
+        response = await with_api_key(LLMConfig.api_key, parse_with)
 
         result = response.output_parsed
 
@@ -172,6 +187,8 @@ async def recognize_product_with_metadata(
 
         return result, metadata
 
+    except (AdmissionTimeoutError, NoKeyAvailableError):
+        raise
     except Exception as e:
         raise ProductRecognitionError(f"Product recognition failed: {str(e)}")
 
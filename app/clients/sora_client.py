@@ -15,10 +15,13 @@ class Sora2Client(BaseVideoClient):
     Endpoint conventions (HTTPS only):
     - Create generation: POST `{base_url}/v2/videos/generations`
     - Query status:     GET  `{base_url}/v2/videos/generations/{task_id}`
+    - Cancel:           DELETE `{base_url}/v2/videos/generations/{task_id}`
       - `task_id` is URL-encoded as a path segment (quote with safe="")
     """
 
     _GENERATIONS_PATH = "/v2/videos/generations"
+    supports_notify_hook = True
+    supports_cancel = True
 
     def _prepare_images(self, images: List[str]) -> List[str]:
         prepared: List[str] = []
@@ -180,6 +183,22 @@ class Sora2Client(BaseVideoClient):
         endpoint = f"{self._GENERATIONS_PATH}/{safe_task_id}"
         return await self._request("GET", endpoint)
 
+    async def cancel_task(self, task_id: str) -> bool:
+        # RESTful: cancel a generation task
+        # DELETE {base_url}/v2/videos/generations/{task_id}
+        if not task_id or not str(task_id).strip():
+            raise ValueError("task_id 不能为空")
+        safe_task_id = quote(str(task_id), safe="")
+        response = await self.client.delete(
+            self._build_url(f"{self._GENERATIONS_PATH}/{safe_task_id}"),
+            headers=self.headers,
+        )
+        if response.status_code in {404, 409}:
+            # Unknown or already finished upstream.
+            return False
+        response.raise_for_status()
+        return True
+
     def parse_status(self, response: Dict[str, Any]) -> TaskStatus:
         status_map = {
             "pending": TaskStatus.PENDING,
@@ -1,5 +1,5 @@
 from functools import lru_cache
-from typing import Optional
+from typing import Dict, List, Optional
 
 from pydantic_settings import BaseSettings
 
@@ -9,16 +9,29 @@ class Settings(BaseSettings):
 
     LLM_API_BASE_URL: str = "https://api.gpt-best.com"
     LLM_API_KEY: str = ""
+    LLM_API_KEYS: List[str] = []
     LLM_MODEL: str = "openai/gpt-4o-mini"
 
     IMAGE_GEN_API_BASE_URL: str = ""
     IMAGE_GEN_API_KEY: str = ""
+    IMAGE_GEN_API_KEYS: List[str] = []
 
     IMAGE_EDIT_API_BASE_URL: str = ""
     IMAGE_EDIT_API_KEY: str = ""
+    IMAGE_EDIT_API_KEYS: List[str] = []
+    # Failover targets for the image endpoints above, as JSON:
+    # [{"base_url": "https://backup.example.com", "api_key": "..."}] (api_key optional).
+    IMAGE_EDIT_API_ALTERNATES: List[Dict[str, str]] = []
 
     VIDEO_GEN_API_BASE_URL: str = ""
     VIDEO_GEN_API_KEY: str = ""
+    VIDEO_GEN_API_KEYS: List[str] = []
+
+    # Extra keys (*_API_KEYS, JSON lists) join *_API_KEY in a pool per provider: each
+    # call takes the least-loaded key ("least_loaded") or the next one ("round_robin"),
+    # and a key answered with 429/402 rests for its Retry-After or the cooldown below.
+    KEY_POOL_STRATEGY: str = "least_loaded"
+    KEY_POOL_COOLDOWN_SECONDS: float = 60.0
 
     UPLOAD_URL: Optional[str] = None
     UPLOAD_APIKEY: Optional[str] = None
@@ -42,6 +55,24 @@ class Settings(BaseSettings):
 
     STATIC_CACHE_CONTROL: Optional[str] = None
 
+    # Where uploaded files are stored: "local" (STORAGE_LOCAL_ROOT, served at /uploads) or
+    # "s3" (any S3-compatible endpoint; S3_PUBLIC_BASE_URL defaults to endpoint/bucket).
+    STORAGE_BACKEND: str = "local"
+    STORAGE_LOCAL_ROOT: str = "app/static/uploads"
+    STORAGE_IO_WORKERS: int = 8
+    S3_ENDPOINT_URL: Optional[str] = None
+    S3_BUCKET: Optional[str] = None
+    S3_REGION: str = "us-east-1"
+    S3_ACCESS_KEY_ID: Optional[str] = None
+    S3_SECRET_ACCESS_KEY: Optional[str] = None
+    S3_PUBLIC_BASE_URL: Optional[str] = None
+    # Generated images (b64_json) are written here instead of into the image record.
+    # Local only: with S3 they go to the upload bucket under media/.
+    MEDIA_LOCAL_ROOT: str = "media"
+    MEDIA_ENCRYPT_AT_REST: bool = True
+    # Lifetime of the signed media URLs in API responses (usable without a Bearer token).
+    MEDIA_URL_TTL_SECONDS: int = 3600
+
     STORAGE_MASTER_KEY: Optional[str] = None
     DEFAULT_STORAGE_QUOTA_BYTES: int = 1_073_741_824  # 1 GiB
 
@@ -54,14 +85,130 @@ class Settings(BaseSettings):
 
     POLLING_INTERVAL: int = 5
     POLLING_MAX_ATTEMPTS: int = 360
+    POLL_SCHEDULER_WORKERS: int = 32
+    POLL_MAX_QPS_PER_PROVIDER: float = 20.0
+    POLLING_ADAPTIVE: bool = True
+    POLLING_MIN_INTERVAL: float = 2.0
+    POLLING_MAX_INTERVAL: float = 60.0
+    POLLING_JITTER: float = 0.2
+
+    # Provider completion callbacks (notify_hook); both are needed to turn them on.
+    PUBLIC_BASE_URL: Optional[str] = None
+    VIDEO_WEBHOOK_SECRET: Optional[str] = None
+    # Callback bodies must be signed with the secret; when off, unsigned callbacks only trigger a status poll.
+    VIDEO_WEBHOOK_SIGNED: bool = True
+    VIDEO_WEBHOOK_SAFETY_POLL_INTERVAL: float = 300.0
+
+    # Cancelling remote jobs we stop tracking (local cancel, poll timeout, shutdown).
+    REMOTE_CANCEL_RETRY_INTERVAL: float = 30.0
+    REMOTE_CANCEL_MAX_ATTEMPTS: int = 5
 
     MAX_RETRIES: int = 3
     RETRY_BACKOFF_FACTOR: float = 2.0
 
     MAX_CONCURRENT_TASKS: int = 10
+    # Fair sharing of MAX_CONCURRENT_TASKS between users and interactive/batch lanes.
+    SCHEDULER_MAX_QUEUED_PER_USER: int = 50
+    SCHEDULER_INTERACTIVE_WEIGHT: float = 4.0
+    SCHEDULER_BATCH_WEIGHT: float = 1.0
+    SCHEDULER_DEFAULT_SERVICE_SECONDS: float = 120.0
+
+    TASK_STORE_ENABLED: bool = True
+    TASK_STORE_FLUSH_INTERVAL: float = 1.0
+    TASK_STORE_MAX_BATCH: int = 500
+
+    # Multi-worker mode: workers lease video_tasks rows instead of running what they receive.
+    JOB_QUEUE_ENABLED: bool = False
+    JOB_LEASE_SECONDS: float = 60.0
+    JOB_HEARTBEAT_INTERVAL: float = 15.0
+    JOB_QUEUE_POLL_INTERVAL: float = 1.0
+    JOB_MAX_ATTEMPTS: int = 3
+
+    TASK_RESULT_TTL_SECONDS: int = 24 * 3600
+    TASK_RESULT_MAX_FINISHED: int = 10_000
+    TASK_RESULT_SPILL_DIR: str = "task_results"
+    TASK_RESULT_SPILL_THRESHOLD_BYTES: int = 64 * 1024
+
+    # Duplicate generation requests: Idempotency-Key lifetime, and the window in which
+    # identical bodies without a key are coalesced (0, the default, disables content matching).
+    IDEMPOTENCY_KEY_TTL_SECONDS: float = 24 * 3600
+    IDEMPOTENCY_CONTENT_WINDOW_SECONDS: float = 0.0
+    IDEMPOTENCY_MAX_KEYS: int = 10_000
 
     REQUEST_TIMEOUT: int = 60
 
+    # Shared upstream connection pools (one per origin).
+    HTTP_MAX_CONNECTIONS: int = 200
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 50
+    HTTP_KEEPALIVE_EXPIRY: float = 60.0
+    HTTP_CLIENT_HTTP2: bool = False
+    # Pools kept for origins other than the configured upstreams (caller-supplied base URLs),
+    # least recently used first out.
+    HTTP_MAX_ORIGINS: int = 64
+
+    # Worker processes for Pillow work (resize/re-encode of uploads); 0 runs it in a
+    # thread. Jobs beyond workers + queue are rejected with 503.
+    IMAGE_EXECUTOR_WORKERS: int = 2
+    IMAGE_EXECUTOR_MAX_QUEUE: int = 16
+    IMAGE_EXECUTOR_JOB_TIMEOUT: float = 30.0
+
+    # Resized variants of /uploads images (`?w=320&fmt=webp`), rendered in the pool above
+    # and cached on disk. Requested widths/heights are rounded up to one of these sizes.
+    IMAGE_VARIANTS_ENABLED: bool = True
+    IMAGE_VARIANT_SIZES: List[int] = [64, 160, 320, 640, 1280, 1920]
+    IMAGE_VARIANT_QUALITY: int = 80
+    IMAGE_VARIANT_CACHE_DIR: str = "image_variants"
+    # The cache is pruned as it fills: variants unused for MAX_AGE go first, then the least
+    # recently used until MAX_BYTES remain (0 disables either limit). Pruned ones re-render.
+    IMAGE_VARIANT_CACHE_MAX_BYTES: int = 1_073_741_824
+    IMAGE_VARIANT_CACHE_MAX_AGE_SECONDS: int = 30 * 24 * 3600
+
+    # Images sent to vision models: longest side capped at LLM_IMAGE_MAX_DIMENSION (0 = no
+    # cap), then the highest JPEG quality in [MIN_QUALITY, MAX_QUALITY] that fits MAX_BYTES.
+    LLM_IMAGE_MAX_DIMENSION: int = 2048
+    LLM_IMAGE_MAX_BYTES: int = 1_048_576
+    LLM_IMAGE_MAX_QUALITY: int = 85
+    LLM_IMAGE_MIN_QUALITY: int = 40
+
+    # Admission control in front of each provider (gemini, image_edits, llm, and each
+    # video model): token bucket + in-flight bulkhead per provider and per API key.
+    # 0 disables a limit. ADMISSION_PROVIDER_LIMITS overrides per provider as JSON,
+    # e.g. {"sora2": {"rate": 2, "concurrency": 4, "queue_timeout": 60}}.
+    ADMISSION_RATE: float = 20.0
+    ADMISSION_BURST: int = 40
+    ADMISSION_CONCURRENCY: int = 32
+    ADMISSION_KEY_RATE: float = 5.0
+    ADMISSION_KEY_BURST: int = 10
+    ADMISSION_KEY_CONCURRENCY: int = 8
+    ADMISSION_QUEUE_TIMEOUT: float = 30.0
+    ADMISSION_PROVIDER_LIMITS: Dict[str, Dict[str, float]] = {}
+    # Per-key gates kept across all providers, least recently used idle ones first out.
+    ADMISSION_MAX_KEYS: int = 1024
+
+    # Circuit breaker per upstream host: opens when, over the window, the share of
+    # failed (timeout/connection/5xx) or slow calls crosses its threshold.
+    BREAKER_WINDOW_SECONDS: float = 60.0
+    BREAKER_MIN_REQUESTS: int = 10
+    BREAKER_ERROR_RATE: float = 0.5
+    BREAKER_SLOW_CALL_SECONDS: float = 55.0
+    BREAKER_SLOW_CALL_RATE: float = 0.8
+    BREAKER_OPEN_SECONDS: float = 30.0
+    BREAKER_HALF_OPEN_PROBES: int = 1
+    # Breakers kept for hosts other than the configured upstreams, least recently used first out.
+    BREAKER_MAX_HOSTS: int = 256
+
+    # Hedged image requests: when a call is slower than the HEDGE_PERCENTILE latency
+    # of recent calls (once HEDGE_MIN_SAMPLES are known), send a duplicate and take
+    # the first success. Each call earns HEDGE_BUDGET_RATIO of a hedge, so at most
+    # about that share of extra calls is made.
+    HEDGE_ENABLED: bool = False
+    HEDGE_PERCENTILE: float = 0.95
+    HEDGE_MIN_SAMPLES: int = 20
+    HEDGE_WINDOW_SIZE: int = 200
+    HEDGE_MIN_DELAY_SECONDS: float = 1.0
+    HEDGE_BUDGET_RATIO: float = 0.05
+    HEDGE_MAX_BUDGET: float = 5.0
+
     class Config:
         env_file = ".env"
 
@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import time
+import weakref
+from collections import OrderedDict
+from contextlib import AsyncExitStack, asynccontextmanager
+from dataclasses import dataclass, replace
+from typing import AsyncIterator, Dict, Mapping, Optional, Tuple
+
+from app.config import get_settings
+
+
+class AdmissionTimeoutError(Exception):
+    """A call waited longer than the provider's queue timeout for a rate token or slot."""
+
+    def __init__(self, provider: str, retry_after: float):
+        super().__init__(f"Provider {provider} is busy, retry later")
+        self.provider = provider
+        self.retry_after = retry_after
+
+
+@dataclass(frozen=True)
+class AdmissionLimits:
+    """Limits of one provider; 0 disables a rate limit or bulkhead."""
+
+    rate: float
+    burst: int
+    concurrency: int
+    key_rate: float
+    key_burst: int
+    key_concurrency: int
+    queue_timeout: float
+
+
+class TokenBucket:
+    """
+    Token bucket that hands out reservations in arrival order: a caller takes
+    the next token even if it is in the future and sleeps until then, so a
+    burst of waiters is spread evenly at `rate` instead of retrying in lockstep.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = float(rate)
+        self.burst = max(1, int(burst))
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(float(self.burst), self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self) -> float:
+        """Take the next token; returns the seconds until it may be used."""
+        wait = self.wait_estimate()
+        self._tokens -= 1.0
+        return wait
+
+    def wait_estimate(self) -> float:
+        self._refill(time.monotonic())
+        return max(0.0, (1.0 - self._tokens) / self.rate)
+
+
+class _Gate:
+    __slots__ = ("bucket", "bulkhead", "users")
+
+    def __init__(self, rate: float, burst: int, concurrency: int):
+        self.bucket = TokenBucket(rate, burst) if rate > 0 else None
+        self.bulkhead = asyncio.Semaphore(concurrency) if concurrency > 0 else None
+        # Calls holding or waiting for this gate; a gate in use is never evicted.
+        self.users = 0
+
+
+class AdmissionController:
+    """
+    Rate limits and concurrency bulkheads in front of upstream providers.
+
+    Every call passes two gates: one shared by the whole provider and one per
+    API key. Each gate is a token bucket (requests per second, with burst) and
+    a bulkhead (calls in flight). A call that cannot get through both within
+    the provider's queue timeout fails with AdmissionTimeoutError rather than
+    piling onto an upstream that is already answering 429.
+
+    Limits come from the ADMISSION_* settings, with per-provider overrides in
+    ADMISSION_PROVIDER_LIMITS (e.g. `{"sora2": {"rate": 2, "concurrency": 4}}`).
+    Provider gates are kept for good; per-key gates (keys may be caller-supplied)
+    share `max_keys` places, least recently used idle gates first out.
+    """
+
+    def __init__(
+        self,
+        overrides: Optional[Mapping[str, Mapping[str, float]]] = None,
+        *,
+        max_keys: Optional[int] = None,
+    ):
+        settings = get_settings()
+        self.defaults = AdmissionLimits(
+            rate=float(settings.ADMISSION_RATE),
+            burst=int(settings.ADMISSION_BURST),
+            concurrency=int(settings.ADMISSION_CONCURRENCY),
+            key_rate=float(settings.ADMISSION_KEY_RATE),
+            key_burst=int(settings.ADMISSION_KEY_BURST),
+            key_concurrency=int(settings.ADMISSION_KEY_CONCURRENCY),
+            queue_timeout=float(settings.ADMISSION_QUEUE_TIMEOUT),
+        )
+        self.overrides = dict(settings.ADMISSION_PROVIDER_LIMITS if overrides is None else overrides)
+        self.max_keys = int(max_keys if max_keys is not None else settings.ADMISSION_MAX_KEYS)
+        self._limits: Dict[str, AdmissionLimits] = {}
+        self._gates: Dict[str, _Gate] = {}
+        self._key_gates: "OrderedDict[Tuple[str, str], _Gate]" = OrderedDict()
+
+    def limits(self, provider: str) -> AdmissionLimits:
+        limits = self._limits.get(provider)
+        if limits is None:
+            override = self.overrides.get(provider) or {}
+            unknown = set(override) - set(AdmissionLimits.__dataclass_fields__)
+            if unknown:
+                raise ValueError(f"Unknown admission limits for {provider}: {sorted(unknown)}")
+            limits = self._limits[provider] = replace(
+                self.defaults,
+                **{name: type(getattr(self.defaults, name))(value) for name, value in override.items()},
+            )
+        return limits
+
+    def _gate(self, provider: str, key: Optional[str]) -> _Gate:
+        if key is None:
+            gate = self._gates.get(provider)
+            if gate is None:
+                limits = self.limits(provider)
+                gate = self._gates[provider] = _Gate(limits.rate, limits.burst, limits.concurrency)
+            return gate
+
+        gate = self._key_gates.get((provider, key))
+        if gate is None:
+            limits = self.limits(provider)
+            gate = self._key_gates[(provider, key)] = _Gate(limits.key_rate, limits.key_burst, limits.key_concurrency)
+            idle = [other for other, held in self._key_gates.items() if held.users == 0 and held is not gate]
+            for other in idle[: max(0, len(self._key_gates) - self.max_keys)]:
+                del self._key_gates[other]
+        self._key_gates.move_to_end((provider, key))
+        return gate
+
+    @staticmethod
+    def _leave(gate: _Gate) -> None:
+        gate.users -= 1
+
+    @staticmethod
+    def _retry_after(gates: Tuple[_Gate, ...]) -> float:
+        return max([1.0, *(gate.bucket.wait_estimate() for gate in gates if gate.bucket is not None)])
+
+    @asynccontextmanager
+    async def admit(self, provider: str, api_key: Optional[str] = None) -> AsyncIterator[None]:
+        """Hold a slot of `provider` (and of `api_key` on it) for the duration of one upstream call."""
+        limits = self.limits(provider)
+        gates: Tuple[_Gate, ...] = (self._gate(provider, None),)
+        if api_key:
+            # Keys are only used as dictionary keys; do not keep them around in clear.
+            gates += (self._gate(provider, hashlib.sha256(api_key.encode()).hexdigest()),)
+
+        deadline = time.monotonic() + limits.queue_timeout
+        async with AsyncExitStack() as stack:
+            for gate in gates:
+                gate.users += 1
+                stack.callback(self._leave, gate)
+            for gate in gates:
+                if gate.bulkhead is None:
+                    continue
+                try:
+                    await asyncio.wait_for(gate.bulkhead.acquire(), timeout=max(0.0, deadline - time.monotonic()))
+                except asyncio.TimeoutError:
+                    raise AdmissionTimeoutError(provider, self._retry_after(gates)) from None
+                stack.callback(gate.bulkhead.release)
+
+            buckets = [gate.bucket for gate in gates if gate.bucket is not None]
+            # Check every bucket before reserving any, so a refusal does not burn tokens.
+            if any(bucket.wait_estimate() > deadline - time.monotonic() for bucket in buckets):
+                raise AdmissionTimeoutError(provider, self._retry_after(gates))
+            delay = max([0.0, *(bucket.reserve() for bucket in buckets)])
+            if delay > 0:
+                await asyncio.sleep(delay)
+            yield
+
+
+# Semaphores belong to the event loop that first waits on them, so each loop
+# (one in production; one per test case) gets its own controller.
+_controllers: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AdmissionController]" = weakref.WeakKeyDictionary()
+
+
+def get_admission() -> AdmissionController:
+    loop = asyncio.get_running_loop()
+    controller = _controllers.get(loop)
+    if controller is None:
+        controller = _controllers[loop] = AdmissionController()
+    return controller
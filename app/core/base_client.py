@@ -8,18 +8,32 @@ import httpx
 from tenacity import AsyncRetrying, retry_if_exception_type, stop_after_attempt, wait_exponential
 
 from app.config import get_settings
+from app.core.circuit_breaker import get_breakers
+from app.core.http_clients import get_http_client
 from app.models.schemas import TaskStatus
 
 
 class BaseVideoClient(ABC):
-    def __init__(self, api_key: str, base_url: Optional[str] = None):
-        settings = get_settings()
-        self.api_key = api_key
-        self.base_url = self._normalize_base_url(base_url or settings.VIDEO_GEN_API_BASE_URL)
-        self.client = httpx.AsyncClient(
-            timeout=settings.REQUEST_TIMEOUT,
-            headers={"Authorization": f"Bearer {api_key}"},
-        )
+    # Whether `create_video` accepts a `notify_hook` completion callback URL.
+    supports_notify_hook = False
+    # Whether `cancel_task` can stop a remote job.
+    supports_cancel = False
+
+    def __init__(self, api_key: str, base_url: Optional[str] = None):
+        settings = get_settings()
+        self.api_key = api_key
+        self.base_url = self._normalize_base_url(base_url or settings.VIDEO_GEN_API_BASE_URL)
+        self.headers = {"Authorization": f"Bearer {api_key}"}
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Pooled client shared by every key talking to this provider (see http_clients)."""
+        return self._client if self._client is not None else get_http_client(self.base_url)
+
+    @client.setter
+    def client(self, value: httpx.AsyncClient) -> None:
+        self._client = value
 
     @staticmethod
     def _normalize_base_url(base_url: str) -> str:
@@ -74,9 +88,21 @@ class BaseVideoClient(ABC):
     def parse_status(self, response: Dict[str, Any]) -> TaskStatus:
         raise NotImplementedError
 
+    async def cancel_task(self, task_id: str) -> bool:
+        """
+        Stop a remote job. Returns False when there was nothing to cancel
+        (unsupported, unknown or already finished); raises on transport errors
+        so the caller can retry.
+        """
+        return False
+
     async def _request(self, method: str, endpoint: str, **kwargs) -> Dict[str, Any]:
         settings = get_settings()
         url = self._build_url(endpoint)
+        headers = {**self.headers, **kwargs.pop("headers", {})}
+        # Remote task ids are bound to the host that issued them, so video calls
+        # fail fast on an open circuit instead of failing over to another host.
+        breaker = get_breakers().get(url)
 
         retrying = AsyncRetrying(
             stop=stop_after_attempt(settings.MAX_RETRIES),
@@ -87,14 +113,16 @@ class BaseVideoClient(ABC):
 
         async for attempt in retrying:
             with attempt:
-                response = await self.client.request(method, url, **kwargs)
-                response.raise_for_status()
+                async with breaker.guard():
+                    response = await self.client.request(method, url, headers=headers, **kwargs)
+                    response.raise_for_status()
                 return response.json()
 
         raise RuntimeError("Unreachable")
 
     async def close(self) -> None:
-        await self.client.aclose()
+        # The pooled client outlives this object; it is closed at application shutdown.
+        return None
 
     async def __aenter__(self):
         return self
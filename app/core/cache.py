@@ -16,6 +16,13 @@ class _Entry(Generic[V]):
 
 
 class TTLCache(Generic[K, V]):
+    """
+    Entries share one TTL and are kept in insertion order, so the oldest, and
+    therefore the first to expire, are always at the front. Every get and set
+    drops the expired ones from there, so nothing outlives its TTL by more
+    than the next access.
+    """
+
     def __init__(self, *, ttl_seconds: float, max_items: int = 10_000):
         self._ttl = float(ttl_seconds)
         self._max = int(max_items)
@@ -25,29 +32,32 @@ class TTLCache(Generic[K, V]):
     def get(self, key: K) -> Optional[V]:
         now = time.monotonic()
         with self._lock:
+            self._evict_expired(now)
             entry = self._data.get(key)
-            if not entry:
-                return None
-            if entry.expires_at <= now:
-                self._data.pop(key, None)
-                return None
-            return entry.value
+            return entry.value if entry else None
 
     def set(self, key: K, value: V) -> None:
         now = time.monotonic()
         with self._lock:
+            self._evict_expired(now)
+            # Re-insert at the end so the order stays the expiry order.
+            self._data.pop(key, None)
             if len(self._data) >= self._max:
-                self._evict_expired(now)
-                if len(self._data) >= self._max:
-                    self._data.pop(next(iter(self._data)), None)
+                self._data.pop(next(iter(self._data)), None)
             self._data[key] = _Entry(value=value, expires_at=now + self._ttl)
 
     def delete(self, key: K) -> None:
         with self._lock:
             self._data.pop(key, None)
 
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+
     def _evict_expired(self, now: float) -> None:
-        expired = [k for k, v in self._data.items() if v.expires_at <= now]
-        for k in expired:
-            self._data.pop(k, None)
+        while self._data:
+            oldest = next(iter(self._data))
+            if self._data[oldest].expires_at > now:
+                return
+            del self._data[oldest]
 
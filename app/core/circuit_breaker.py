@@ -0,0 +1,340 @@
+from __future__ import annotations
+
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from enum import Enum
+from functools import lru_cache
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+)
+
+import httpx
+
+from app.config import get_settings
+from app.core.http_clients import configured_upstream_origins, url_origin
+
+T = TypeVar("T")
+
+
+class CircuitState(str, Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """The upstream host is failing; calls are rejected without waiting on it."""
+
+    def __init__(self, host: str, retry_after: float):
+        super().__init__(f"Upstream {host} is unavailable (circuit open), retry later")
+        self.host = host
+        self.retry_after = retry_after
+
+
+def is_upstream_failure(exc: BaseException) -> bool:
+    """Whether an error says something about the host's health (vs. about our request)."""
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response is not None and exc.response.status_code >= 500
+    return isinstance(exc, (httpx.TransportError, TimeoutError))
+
+
+@dataclass(frozen=True)
+class UpstreamEndpoint:
+    """A base URL and the key to use on it."""
+
+    base_url: str
+    api_key: str
+
+
+def upstream_endpoints(
+    base_url: str,
+    api_key: str,
+    *,
+    configured_base_url: Optional[str],
+    configured_api_key: Optional[str],
+    alternates: Sequence[Dict[str, str]],
+    normalize: Callable[[str], str] = lambda url: url.strip().rstrip("/"),
+) -> List[UpstreamEndpoint]:
+    """
+    The endpoint a client was built for, followed by the configured alternates
+    (`{"base_url": ..., "api_key": ...}`, key defaulting to the primary one).
+    Alternates only back our own configured endpoint, never a base URL or key
+    supplied by the caller.
+    """
+    primary = UpstreamEndpoint(base_url, api_key)
+    own = bool(configured_base_url) and normalize(configured_base_url) == base_url
+    if not own or (configured_api_key or "").strip() != api_key:
+        return [primary]
+    endpoints = [primary]
+    for entry in alternates:
+        endpoint = UpstreamEndpoint(normalize(str(entry["base_url"])), str(entry.get("api_key") or api_key))
+        if endpoint not in endpoints:
+            endpoints.append(endpoint)
+    return endpoints
+
+
+class CircuitBreaker:
+    """
+    Breaker for one upstream host over a sliding window of call outcomes.
+
+    Trips when, with at least `min_requests` calls in the window, the share of
+    failures (timeouts, connection errors, 5xx) or of calls slower than
+    `slow_call_seconds` reaches its threshold. While open every call is
+    rejected at once; after `open_seconds` up to `half_open_probes` calls go
+    through, and the first result decides whether it closes again.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        *,
+        window_seconds: Optional[float] = None,
+        min_requests: Optional[int] = None,
+        error_rate_threshold: Optional[float] = None,
+        slow_call_seconds: Optional[float] = None,
+        slow_call_rate_threshold: Optional[float] = None,
+        open_seconds: Optional[float] = None,
+        half_open_probes: Optional[int] = None,
+    ):
+        settings = get_settings()
+
+        def pick(value, default):
+            return default if value is None else value
+
+        self.host = host
+        self.window_seconds = float(pick(window_seconds, settings.BREAKER_WINDOW_SECONDS))
+        self.min_requests = int(pick(min_requests, settings.BREAKER_MIN_REQUESTS))
+        self.error_rate_threshold = float(pick(error_rate_threshold, settings.BREAKER_ERROR_RATE))
+        self.slow_call_seconds = float(pick(slow_call_seconds, settings.BREAKER_SLOW_CALL_SECONDS))
+        self.slow_call_rate_threshold = float(pick(slow_call_rate_threshold, settings.BREAKER_SLOW_CALL_RATE))
+        self.open_seconds = float(pick(open_seconds, settings.BREAKER_OPEN_SECONDS))
+        self.half_open_probes = max(1, int(pick(half_open_probes, settings.BREAKER_HALF_OPEN_PROBES)))
+
+        self._state = CircuitState.CLOSED
+        self._opened_at = 0.0
+        self._probes = 0
+        # (finished_at, failed, latency)
+        self._calls: Deque[Tuple[float, bool, float]] = deque()
+        self.total_calls = 0
+        self.total_failures = 0
+        self.rejected = 0
+        self.times_opened = 0
+        self.last_error: Optional[str] = None
+
+    @property
+    def state(self) -> CircuitState:
+        if self._state is CircuitState.OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+            self._state = CircuitState.HALF_OPEN
+            self._probes = 0
+        return self._state
+
+    def retry_after(self) -> float:
+        if self.state is not CircuitState.OPEN:
+            return 0.0
+        return max(0.0, self.open_seconds - (time.monotonic() - self._opened_at))
+
+    def _prune(self, now: float) -> None:
+        horizon = now - self.window_seconds
+        while self._calls and self._calls[0][0] < horizon:
+            self._calls.popleft()
+
+    def _rates(self) -> Tuple[int, float, float]:
+        self._prune(time.monotonic())
+        count = len(self._calls)
+        if not count:
+            return 0, 0.0, 0.0
+        failures = sum(1 for _, failed, _ in self._calls if failed)
+        slow = sum(1 for _, _, latency in self._calls if latency >= self.slow_call_seconds)
+        return count, failures / count, slow / count
+
+    def acquire(self) -> None:
+        """Admit one call or raise CircuitOpenError."""
+        state = self.state
+        if state is CircuitState.OPEN or (state is CircuitState.HALF_OPEN and self._probes >= self.half_open_probes):
+            self.rejected += 1
+            raise CircuitOpenError(self.host, max(1.0, self.retry_after()))
+        if state is CircuitState.HALF_OPEN:
+            self._probes += 1
+
+    def record(self, failed: bool, latency: float, error: Optional[BaseException] = None) -> None:
+        now = time.monotonic()
+        self.total_calls += 1
+        if failed:
+            self.total_failures += 1
+            self.last_error = f"{type(error).__name__}: {error}" if error is not None else None
+        slow = latency >= self.slow_call_seconds
+
+        if self._state is CircuitState.HALF_OPEN:
+            if failed or slow:
+                self._trip(now)
+            else:
+                self._state = CircuitState.CLOSED
+                self._calls.clear()
+                self._calls.append((now, failed, latency))
+            return
+
+        self._calls.append((now, failed, latency))
+        if self._state is CircuitState.CLOSED:
+            count, error_rate, slow_rate = self._rates()
+            if count >= self.min_requests and (
+                error_rate >= self.error_rate_threshold or slow_rate >= self.slow_call_rate_threshold
+            ):
+                self._trip(now)
+
+    def _trip(self, now: float) -> None:
+        self._state = CircuitState.OPEN
+        self._opened_at = now
+        self._probes = 0
+        self.times_opened += 1
+
+    def health(self) -> float:
+        """1.0 for a clean host, lower with errors and slow calls, 0.0 while open."""
+        state = self.state
+        if state is CircuitState.OPEN:
+            return 0.0
+        _, error_rate, slow_rate = self._rates()
+        score = (1.0 - error_rate) * (1.0 - 0.5 * slow_rate)
+        return score * (0.5 if state is CircuitState.HALF_OPEN else 1.0)
+
+    @asynccontextmanager
+    async def guard(self) -> AsyncIterator[None]:
+        """Wrap one upstream attempt: rejects while open and records the outcome."""
+        self.acquire()
+        started = time.monotonic()
+        try:
+            yield
+        except Exception as exc:
+            # A 4xx still proves the host is up; only upstream failures count against it.
+            self.record(is_upstream_failure(exc), time.monotonic() - started, exc)
+            raise
+        except BaseException:
+            # Cancelled by our side: says nothing about the host, so hand back a half-open probe.
+            if self._state is CircuitState.HALF_OPEN:
+                self._probes = max(0, self._probes - 1)
+            raise
+        else:
+            self.record(False, time.monotonic() - started)
+
+    def snapshot(self) -> Dict[str, Any]:
+        count, error_rate, slow_rate = self._rates()
+        latencies = sorted(latency for _, _, latency in self._calls)
+
+        def percentile(q: float) -> Optional[float]:
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(q * len(latencies)))], 3)
+
+        return {
+            "host": self.host,
+            "state": self.state.value,
+            "health": round(self.health(), 3),
+            "window_calls": count,
+            "error_rate": round(error_rate, 3),
+            "slow_call_rate": round(slow_rate, 3),
+            "latency_p50_seconds": percentile(0.5),
+            "latency_p95_seconds": percentile(0.95),
+            "total_calls": self.total_calls,
+            "total_failures": self.total_failures,
+            "rejected": self.rejected,
+            "times_opened": self.times_opened,
+            "retry_after_seconds": round(self.retry_after(), 1),
+            "last_error": self.last_error,
+        }
+
+
+class BreakerRegistry:
+    """
+    Circuit breakers keyed by upstream origin, plus health-ordered failover across endpoints.
+
+    Breakers of the configured upstreams are kept for good; those of other
+    hosts (caller-supplied base URLs) share `max_hosts` places, least recently
+    used first out.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_hosts: Optional[int] = None,
+        pinned_hosts: Optional[Iterable[str]] = None,
+        **breaker_options: Any,
+    ):
+        self._breaker_options = breaker_options
+        self.max_hosts = int(max_hosts if max_hosts is not None else get_settings().BREAKER_MAX_HOSTS)
+        self.pinned_hosts = set(configured_upstream_origins() if pinned_hosts is None else pinned_hosts)
+        self._breakers: "OrderedDict[str, CircuitBreaker]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._breakers)
+
+    def get(self, url: str) -> CircuitBreaker:
+        host = url_origin(url)
+        breaker = self._breakers.get(host)
+        if breaker is None:
+            breaker = self._breakers[host] = CircuitBreaker(host, **self._breaker_options)
+            unpinned = [other for other in self._breakers if other not in self.pinned_hosts]
+            for other in unpinned[: max(0, len(unpinned) - self.max_hosts)]:
+                del self._breakers[other]
+        self._breakers.move_to_end(host)
+        return breaker
+
+    def snapshot(self, *, pinned_only: bool = False) -> List[Dict[str, Any]]:
+        return [
+            breaker.snapshot()
+            for host, breaker in self._breakers.items()
+            if not pinned_only or host in self.pinned_hosts
+        ]
+
+    def route(self, endpoints: Sequence[UpstreamEndpoint]) -> List[UpstreamEndpoint]:
+        """Endpoints whose breaker is not open, healthiest first (configured order breaks ties)."""
+        ranked = [
+            (-round(self.get(endpoint.base_url).health(), 1), index, endpoint)
+            for index, endpoint in enumerate(endpoints)
+            if self.get(endpoint.base_url).state is not CircuitState.OPEN
+        ]
+        return [endpoint for _, _, endpoint in sorted(ranked, key=lambda item: item[:2])]
+
+    async def call(
+        self,
+        endpoints: Sequence[UpstreamEndpoint],
+        attempt: Callable[[UpstreamEndpoint], Awaitable[T]],
+    ) -> T:
+        """
+        Run `attempt` against the healthiest endpoint, moving on to the next one
+        when it fails for an upstream reason. Errors about the request itself
+        (4xx) are raised at once. Raises CircuitOpenError if every host is open.
+        """
+        last_error: Optional[BaseException] = None
+        for endpoint in self.route(endpoints):
+            try:
+                return await attempt(endpoint)
+            except CircuitOpenError as exc:
+                last_error = exc
+            except Exception as exc:
+                if not is_upstream_failure(exc):
+                    raise
+                last_error = exc
+        if last_error is not None:
+            raise last_error
+        breakers = [self.get(endpoint.base_url) for endpoint in endpoints]
+        raise CircuitOpenError(
+            ", ".join(breaker.host for breaker in breakers),
+            max(1.0, min(breaker.retry_after() for breaker in breakers)),
+        )
+
+
+@lru_cache()
+def get_breakers() -> BreakerRegistry:
+    return BreakerRegistry()
@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from app.config import get_settings
+from app.models.schemas import TaskPriority
+
+Flow = Tuple[TaskPriority, str]
+
+
+class QueueFullError(Exception):
+    """The user already has the maximum number of tasks waiting for a slot."""
+
+    def __init__(self, owner: str, retry_after: float):
+        super().__init__(f"Too many queued tasks for user {owner}")
+        self.owner = owner
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    __slots__ = ("start", "seq", "task_id", "flow", "future", "active")
+
+    def __init__(self, start: float, seq: int, task_id: str, flow: Flow, future: asyncio.Future):
+        self.start = start
+        self.seq = seq
+        self.task_id = task_id
+        self.flow = flow
+        self.future = future
+        self.active = True
+
+    def __lt__(self, other: _Waiter) -> bool:
+        return (self.start, self.seq) < (other.start, other.seq)
+
+
+class FairScheduler:
+    """
+    Concurrency slots shared by weighted fair queuing (start-time fair queuing).
+
+    Every (priority, owner) pair is a flow whose weight is the priority's lane
+    weight times the owner's weight. A waiting task is tagged with the virtual
+    time at which its flow may start again and slots go to the smallest tag, so
+    a user with 500 queued tasks gets the same share as a user with one, and an
+    interactive flow gets `interactive_weight / batch_weight` times the share of
+    a batch flow without starving batch work outright.
+    """
+
+    def __init__(
+        self,
+        capacity: Optional[int] = None,
+        *,
+        max_queued_per_user: Optional[int] = None,
+        interactive_weight: Optional[float] = None,
+        batch_weight: Optional[float] = None,
+        service_seconds: Optional[float] = None,
+    ):
+        settings = get_settings()
+        self.capacity = int(capacity if capacity is not None else settings.MAX_CONCURRENT_TASKS)
+        self.max_queued_per_user = int(
+            max_queued_per_user if max_queued_per_user is not None else settings.SCHEDULER_MAX_QUEUED_PER_USER
+        )
+        self.lane_weights: Dict[TaskPriority, float] = {
+            TaskPriority.INTERACTIVE: float(interactive_weight or settings.SCHEDULER_INTERACTIVE_WEIGHT),
+            TaskPriority.BATCH: float(batch_weight or settings.SCHEDULER_BATCH_WEIGHT),
+        }
+        self.user_weights: Dict[str, float] = {}
+        # EWMA of how long a slot is held, for wait estimates.
+        self.service_seconds = float(service_seconds or settings.SCHEDULER_DEFAULT_SERVICE_SECONDS)
+        self.running = 0
+        self._heap: List[_Waiter] = []
+        self._waiting: Dict[str, _Waiter] = {}
+        self._queued_per_owner: Dict[str, int] = {}
+        self._last_finish: Dict[Flow, float] = {}
+        self._virtual_time = 0.0
+        self._seq = itertools.count()
+
+    def set_user_weight(self, owner: str, weight: float) -> None:
+        if weight <= 0:
+            raise ValueError("weight must be positive")
+        self.user_weights[owner] = float(weight)
+
+    def queued(self, owner: Optional[str] = None) -> int:
+        if owner is None:
+            return len(self._waiting)
+        return self._queued_per_owner.get(owner, 0)
+
+    def flow_step(self, owner: Optional[str], priority: TaskPriority) -> float:
+        """How far one task advances its flow's virtual finish time."""
+        return 1.0 / (self.lane_weights[priority] * self.user_weights.get(owner or "", 1.0))
+
+    def check_admission(self, owner: Optional[str], queued: Optional[int] = None) -> None:
+        """
+        Raise QueueFullError if `owner` may not queue another task right now.
+        `queued` overrides this scheduler's own count, e.g. with the number of
+        the owner's tasks waiting in the shared job queue.
+        """
+        key = owner or ""
+        if queued is None:
+            queued = self.queued(key)
+        if queued >= self.max_queued_per_user:
+            # One of the user's queued tasks starts, on average, every service_seconds / capacity.
+            retry_after = max(1.0, self.service_seconds / max(1, self.capacity))
+            raise QueueFullError(key, retry_after)
+
+    def position(self, task_id: str) -> Optional[int]:
+        """1-based place in the dispatch order, or None if the task is not waiting."""
+        waiter = self._waiting.get(task_id)
+        if waiter is None:
+            return None
+        return 1 + sum(1 for other in self._waiting.values() if other < waiter)
+
+    def estimated_wait(self, task_id: str) -> Optional[float]:
+        position = self.position(task_id)
+        if position is None:
+            return None
+        return self.wait_for_position(position)
+
+    def wait_for_position(self, position: int) -> float:
+        rounds = math.ceil(position / max(1, self.capacity))
+        return round(rounds * self.service_seconds, 1)
+
+    @asynccontextmanager
+    async def slot(
+        self,
+        task_id: str,
+        owner: Optional[str],
+        priority: TaskPriority = TaskPriority.BATCH,
+    ) -> AsyncIterator[None]:
+        await self._acquire(task_id, owner or "", priority)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self._observe(time.monotonic() - started)
+            self._release()
+
+    async def _acquire(self, task_id: str, owner: str, priority: TaskPriority) -> None:
+        if self.running < self.capacity and not self._waiting:
+            self.running += 1
+            return
+
+        flow = (priority, owner)
+        start = max(self._virtual_time, self._last_finish.get(flow, 0.0))
+        self._last_finish[flow] = start + self.flow_step(owner, priority)
+        waiter = _Waiter(start, next(self._seq), task_id, flow, asyncio.get_running_loop().create_future())
+        heapq.heappush(self._heap, waiter)
+        self._waiting[task_id] = waiter
+        self._queued_per_owner[owner] = self._queued_per_owner.get(owner, 0) + 1
+
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.active:
+                self._forget(waiter)
+            elif not waiter.future.cancelled():
+                # Granted and cancelled in the same tick: hand the slot on.
+                self._release()
+            raise
+
+    def _release(self) -> None:
+        self.running -= 1
+        while self._heap and self.running < self.capacity:
+            waiter = heapq.heappop(self._heap)
+            if not waiter.active:
+                continue
+            self._forget(waiter)
+            if waiter.future.done():
+                # Cancelled but not yet resumed to clean up: skip it.
+                continue
+            self._virtual_time = max(self._virtual_time, waiter.start)
+            self.running += 1
+            waiter.future.set_result(None)
+        if not self._waiting:
+            # Idle flows carry no debt into the next busy period.
+            self._last_finish.clear()
+
+    def _forget(self, waiter: _Waiter) -> None:
+        waiter.active = False
+        self._waiting.pop(waiter.task_id, None)
+        owner = waiter.flow[1]
+        remaining = self._queued_per_owner.get(owner, 0) - 1
+        if remaining > 0:
+            self._queued_per_owner[owner] = remaining
+        else:
+            self._queued_per_owner.pop(owner, None)
+
+    def _observe(self, held: float, alpha: float = 0.2) -> None:
+        self.service_seconds += alpha * (held - self.service_seconds)
@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass
+from typing import AsyncIterator, Awaitable, Generic, Iterable, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class SlotResult(Generic[T]):
+    """Outcome of one call of a fan-out: its position and either a value or the error."""
+
+    index: int
+    value: Optional[T] = None
+    error: Optional[BaseException] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+async def as_completed_slots(calls: Iterable[Awaitable[T]]) -> AsyncIterator[SlotResult[T]]:
+    """
+    Run `calls` concurrently and yield each outcome as soon as it is known,
+    instead of waiting for the slowest one. A failing call does not cancel
+    its siblings; closing the iterator early cancels whatever is still running.
+    """
+    tasks = [asyncio.ensure_future(call) for call in calls]
+    positions = {task: index for index, task in enumerate(tasks)}
+    pending = set(tasks)
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in sorted(done, key=positions.__getitem__):
+                error = task.exception()
+                yield SlotResult(positions[task], None if error is not None else task.result(), error)
+    finally:
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, TypeVar
+
+from app.config import get_settings
+
+T = TypeVar("T")
+
+
+class HedgePolicy:
+    """
+    Request hedging for one kind of call (e.g. one provider endpoint).
+
+    If a call has not finished after the `percentile` latency of recent
+    successful calls, a duplicate is sent and whichever succeeds first wins;
+    the other is cancelled. Every call earns `budget_ratio` of a hedge (up to
+    `max_budget` saved up), so hedges stay at about that share of extra calls
+    even when the upstream slows down as a whole.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        percentile: Optional[float] = None,
+        min_samples: Optional[int] = None,
+        window_size: Optional[int] = None,
+        min_delay_seconds: Optional[float] = None,
+        budget_ratio: Optional[float] = None,
+        max_budget: Optional[float] = None,
+    ):
+        settings = get_settings()
+
+        def pick(value, default):
+            return default if value is None else value
+
+        self.name = name
+        self.percentile = float(pick(percentile, settings.HEDGE_PERCENTILE))
+        if not 0.0 < self.percentile < 1.0:
+            raise ValueError(f"Hedge percentile must be between 0 and 1, got {self.percentile}")
+        self.min_samples = max(1, int(pick(min_samples, settings.HEDGE_MIN_SAMPLES)))
+        self.min_delay_seconds = float(pick(min_delay_seconds, settings.HEDGE_MIN_DELAY_SECONDS))
+        self.budget_ratio = float(pick(budget_ratio, settings.HEDGE_BUDGET_RATIO))
+        self.max_budget = float(pick(max_budget, settings.HEDGE_MAX_BUDGET))
+
+        window_size = max(self.min_samples, int(pick(window_size, settings.HEDGE_WINDOW_SIZE)))
+        self._latencies: Deque[float] = deque(maxlen=window_size)
+        self._budget = 0.0
+        self.calls = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.budget_exhausted = 0
+
+    def delay(self) -> Optional[float]:
+        """Seconds to wait before hedging, or None while there are too few samples."""
+        if len(self._latencies) < self.min_samples:
+            return None
+        latencies = sorted(self._latencies)
+        cut = latencies[min(len(latencies) - 1, int(self.percentile * len(latencies)))]
+        return max(self.min_delay_seconds, cut)
+
+    def _spend(self) -> bool:
+        if self._budget < 1.0:
+            self.budget_exhausted += 1
+            return False
+        self._budget -= 1.0
+        return True
+
+    async def run(self, call: Callable[[], Awaitable[T]]) -> T:
+        """Run `call()`, hedging it with a second `call()` if it is slow and the budget allows."""
+        self.calls += 1
+        self._budget = min(self.max_budget, self._budget + self.budget_ratio)
+        delay = self.delay()
+
+        started = time.monotonic()
+        primary = asyncio.ensure_future(call())
+        tasks = [primary]
+        try:
+            if delay is not None:
+                await asyncio.wait({primary}, timeout=delay)
+            if not primary.done() and delay is not None and self._spend():
+                self.hedged += 1
+                tasks.append(asyncio.ensure_future(call()))
+
+            pending = set(tasks)
+            first_error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in sorted(done, key=lambda task: task is not primary):
+                    error = task.exception()
+                    if error is not None:
+                        first_error = first_error or error
+                        continue
+                    # How long the primary took, or at least had taken when a hedge won:
+                    # samples stay those of unhedged calls and the delay does not drift down.
+                    self._latencies.append(time.monotonic() - started)
+                    if task is not primary:
+                        self.hedge_wins += 1
+                    return task.result()
+            # Every attempt failed; report the first failure.
+            raise first_error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def snapshot(self) -> Dict[str, Any]:
+        delay = self.delay()
+        return {
+            "name": self.name,
+            "calls": self.calls,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "budget_exhausted": self.budget_exhausted,
+            "extra_call_ratio": round(self.hedged / self.calls, 4) if self.calls else 0.0,
+            "win_rate": round(self.hedge_wins / self.hedged, 3) if self.hedged else None,
+            "delay_seconds": round(delay, 3) if delay is not None else None,
+            "samples": len(self._latencies),
+        }
+
+
+class HedgeRegistry:
+    """Hedge policies by name, each learning its own latency distribution."""
+
+    def __init__(self, **policy_options: Any):
+        self._policy_options = policy_options
+        self._policies: Dict[str, HedgePolicy] = {}
+
+    def get(self, name: str) -> HedgePolicy:
+        policy = self._policies.get(name)
+        if policy is None:
+            policy = self._policies[name] = HedgePolicy(name, **self._policy_options)
+        return policy
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        return [policy.snapshot() for policy in self._policies.values()]
+
+
+@lru_cache()
+def get_hedges() -> HedgeRegistry:
+    return HedgeRegistry()
@@ -0,0 +1,199 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import ssl
+import weakref
+from collections import OrderedDict
+from dataclasses import dataclass
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+from typing import Any, Dict, Iterable, Mapping, Optional, Set, Tuple, Union
+from urllib.parse import urlsplit
+
+import httpx
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+def url_origin(url: str) -> str:
+    parts = urlsplit(url)
+    if not parts.scheme or not parts.netloc:
+        raise ValueError(f"Not an absolute URL: {url!r}")
+    return f"{parts.scheme.lower()}://{parts.netloc.lower()}"
+
+
+def configured_upstream_origins() -> Set[str]:
+    """Origins of the upstreams set in the configuration (not ones supplied by callers)."""
+    settings = get_settings()
+    urls = [
+        settings.LLM_API_BASE_URL,
+        settings.IMAGE_GEN_API_BASE_URL,
+        settings.IMAGE_EDIT_API_BASE_URL,
+        settings.VIDEO_GEN_API_BASE_URL,
+        *(str(entry.get("base_url") or "") for entry in settings.IMAGE_EDIT_API_ALTERNATES),
+    ]
+    origins = set()
+    for url in urls:
+        try:
+            origins.add(url_origin(str(url or "").strip()))
+        except ValueError:
+            continue
+    return origins
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+@dataclass(frozen=True)
+class PreparedRequest:
+    """
+    A request body serialized once, so fan-out copies, retries and failover
+    attempts all send the same bytes instead of re-encoding the payload.
+    """
+
+    path: str
+    content: bytes
+    content_type: str
+
+    @classmethod
+    def json(cls, path: str, payload: Any) -> "PreparedRequest":
+        body = json.dumps(payload, ensure_ascii=False, separators=(",", ":"), allow_nan=False)
+        return cls(path, body.encode("utf-8"), "application/json")
+
+    @classmethod
+    def multipart(
+        cls,
+        path: str,
+        data: Mapping[str, str],
+        files: Iterable[Tuple[str, Tuple[str, bytes, str]]],
+    ) -> "PreparedRequest":
+        # Let httpx pick the boundary and encode the form once; the result is replayable bytes.
+        request = httpx.Request("POST", "https://prepared.invalid", data=dict(data), files=list(files))
+        return cls(path, request.read(), request.headers["Content-Type"])
+
+    def headers(self, api_key: str) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {api_key}", "Content-Type": self.content_type}
+
+
+def _no_cookies() -> CookieJar:
+    # An empty allow-list makes the policy refuse to store or return any cookie.
+    return CookieJar(policy=DefaultCookiePolicy(allowed_domains=[]))
+
+
+class HttpClientRegistry:
+    """
+    One pooled `httpx.AsyncClient` per upstream origin (scheme://host:port).
+
+    Clients carry no credentials; callers pass auth headers per request, so
+    every API key talking to the same provider shares warm TCP/TLS
+    connections instead of handshaking on each call. For the same reason they
+    never keep cookies: a `Set-Cookie` answered to one caller must not be
+    sent on another caller's request.
+
+    Clients of the configured upstreams are kept for good. Other origins
+    (caller-supplied base URLs) share `max_origins` places, least recently
+    used first out; an evicted client is closed once requests still using it
+    have had `timeout` seconds to finish.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_connections: Optional[int] = None,
+        max_keepalive_connections: Optional[int] = None,
+        keepalive_expiry: Optional[float] = None,
+        http2: Optional[bool] = None,
+        timeout: Optional[float] = None,
+        verify: Union[bool, str, ssl.SSLContext] = True,
+        max_origins: Optional[int] = None,
+        pinned_origins: Optional[Iterable[str]] = None,
+    ):
+        settings = get_settings()
+        self.limits = httpx.Limits(
+            max_connections=int(max_connections or settings.HTTP_MAX_CONNECTIONS),
+            max_keepalive_connections=int(max_keepalive_connections or settings.HTTP_MAX_KEEPALIVE_CONNECTIONS),
+            keepalive_expiry=float(keepalive_expiry or settings.HTTP_KEEPALIVE_EXPIRY),
+        )
+        self.http2 = bool(settings.HTTP_CLIENT_HTTP2 if http2 is None else http2)
+        if self.http2 and not _http2_available():
+            logger.warning("HTTP/2 requested but the 'h2' package is not installed; using HTTP/1.1")
+            self.http2 = False
+        self.timeout = float(timeout or settings.REQUEST_TIMEOUT)
+        self.verify = verify
+        self.max_origins = int(max_origins if max_origins is not None else settings.HTTP_MAX_ORIGINS)
+        self.pinned_origins = set(configured_upstream_origins() if pinned_origins is None else pinned_origins)
+        self._clients: "OrderedDict[str, httpx.AsyncClient]" = OrderedDict()
+        self._closing: Set[asyncio.Task] = set()
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+    def get(self, url: str) -> httpx.AsyncClient:
+        """Shared client for the origin of `url`; do not close it."""
+        origin = url_origin(url)
+        client = self._clients.get(origin)
+        if client is None or client.is_closed:
+            client = self._clients[origin] = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=self.limits,
+                http2=self.http2,
+                verify=self.verify,
+                cookies=_no_cookies(),
+            )
+            self._evict()
+        self._clients.move_to_end(origin)
+        return client
+
+    def _evict(self) -> None:
+        unpinned = [origin for origin in self._clients if origin not in self.pinned_origins]
+        for origin in unpinned[: max(0, len(unpinned) - self.max_origins)]:
+            task = asyncio.get_running_loop().create_task(self._close_later(self._clients.pop(origin)))
+            self._closing.add(task)
+            task.add_done_callback(self._closing.discard)
+
+    async def _close_later(self, client: httpx.AsyncClient) -> None:
+        try:
+            await asyncio.sleep(self.timeout)
+        finally:
+            await client.aclose()
+
+    async def aclose(self) -> None:
+        clients, self._clients = self._clients, OrderedDict()
+        for client in clients.values():
+            await client.aclose()
+        closing, self._closing = self._closing, set()
+        for task in closing:
+            task.cancel()
+        if closing:
+            await asyncio.gather(*closing, return_exceptions=True)
+
+
+# Pooled connections belong to the event loop that opened them, so each loop
+# (one in production; one per test case) gets its own registry.
+_registries: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, HttpClientRegistry]" = weakref.WeakKeyDictionary()
+
+
+def get_http_clients() -> HttpClientRegistry:
+    loop = asyncio.get_running_loop()
+    registry = _registries.get(loop)
+    if registry is None:
+        registry = _registries[loop] = HttpClientRegistry()
+    return registry
+
+
+def get_http_client(url: str) -> httpx.AsyncClient:
+    return get_http_clients().get(url)
+
+
+async def close_http_clients() -> None:
+    registry = _registries.pop(asyncio.get_running_loop(), None)
+    if registry is not None:
+        await registry.aclose()
@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+from typing import Any, Awaitable, Callable, Generic, Optional, TypeVar
+
+from app.config import get_settings
+from app.core.cache import TTLCache
+
+T = TypeVar("T")
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+
+
+class IdempotencyConflictError(Exception):
+    """The idempotency key was already used for a different request."""
+
+
+def request_fingerprint(payload: Any) -> str:
+    """Stable digest of a JSON-like request (key order does not matter)."""
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def blob_digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class _Flight(Generic[T]):
+    __slots__ = ("fingerprint", "future")
+
+    def __init__(self, fingerprint: str, future: asyncio.Future):
+        self.fingerprint = fingerprint
+        self.future = future
+
+
+class SingleFlight(Generic[T]):
+    """
+    Runs one coroutine per key; concurrent and later callers (until the TTL
+    expires) share its result. Failures are not remembered, so a retry after
+    an error runs again. Finished results stay in memory for the whole TTL,
+    so callers should return something small (a task or record id), not the
+    generated payload itself.
+
+    The work runs as its own task, so the first caller going away (client
+    disconnect) does not cancel it for the others.
+    """
+
+    def __init__(self, *, ttl_seconds: float, max_items: int):
+        self._flights: TTLCache[str, _Flight[T]] = TTLCache(ttl_seconds=ttl_seconds, max_items=max_items)
+
+    async def do(
+        self,
+        key: str,
+        fingerprint: str,
+        factory: Callable[[], Awaitable[T]],
+        *,
+        reusable: Optional[Callable[[T], bool]] = None,
+    ) -> T:
+        flight = self._flights.get(key)
+        if flight is not None:
+            if flight.fingerprint != fingerprint:
+                raise IdempotencyConflictError(f"Idempotency key {key!r} was used for a different request")
+            stale = (
+                reusable is not None
+                and flight.future.done()
+                and not flight.future.cancelled()
+                and flight.future.exception() is None
+                and not reusable(flight.future.result())
+            )
+            if not stale:
+                return await asyncio.shield(flight.future)
+
+        future = asyncio.ensure_future(factory())
+        flight = _Flight(fingerprint, future)
+        self._flights.set(key, flight)
+        future.add_done_callback(lambda done: self._forget_failed(key, flight))
+        return await asyncio.shield(future)
+
+    def _forget_failed(self, key: str, flight: _Flight[T]) -> None:
+        if flight.future.cancelled() or flight.future.exception() is not None:
+            if self._flights.get(key) is flight:
+                self._flights.delete(key)
+
+
+class Idempotency(Generic[T]):
+    """
+    Coalesces duplicate submissions of the same user.
+
+    With an `Idempotency-Key` the key alone identifies the request (reusing it
+    with a different body is a conflict) and is remembered for
+    IDEMPOTENCY_KEY_TTL_SECONDS. Without one, identical bodies within
+    IDEMPOTENCY_CONTENT_WINDOW_SECONDS are treated as the same request, which
+    catches client retries that do not send a key. The window is 0 (off) by
+    default: a user who deliberately repeats a prompt expects new output.
+    """
+
+    def __init__(
+        self,
+        *,
+        key_ttl_seconds: Optional[float] = None,
+        content_window_seconds: Optional[float] = None,
+        max_keys: Optional[int] = None,
+    ):
+        settings = get_settings()
+        key_ttl = float(key_ttl_seconds if key_ttl_seconds is not None else settings.IDEMPOTENCY_KEY_TTL_SECONDS)
+        window = float(
+            content_window_seconds if content_window_seconds is not None else settings.IDEMPOTENCY_CONTENT_WINDOW_SECONDS
+        )
+        max_items = int(max_keys if max_keys is not None else settings.IDEMPOTENCY_MAX_KEYS)
+        self._keyed: SingleFlight[T] = SingleFlight(ttl_seconds=key_ttl, max_items=max_items)
+        self._content: Optional[SingleFlight[T]] = (
+            SingleFlight(ttl_seconds=window, max_items=max_items) if window > 0 else None
+        )
+
+    async def run(
+        self,
+        owner: Optional[str],
+        payload: Any,
+        factory: Callable[[], Awaitable[T]],
+        *,
+        idempotency_key: Optional[str] = None,
+        reusable: Optional[Callable[[T], bool]] = None,
+    ) -> T:
+        """
+        Run `factory` unless an equivalent request of `owner` is in flight or
+        recent. `reusable` can reject a finished content-matched result (e.g.
+        a failed task) so the duplicate starts fresh instead.
+        """
+        fingerprint = request_fingerprint(payload)
+        scope = str(owner or "")
+        if idempotency_key:
+            return await self._keyed.do(f"{scope}:{idempotency_key}", fingerprint, factory)
+        if self._content is None:
+            return await factory()
+        return await self._content.do(f"{scope}:{fingerprint}", fingerprint, factory, reusable=reusable)
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache, partial
+from typing import Any, Callable, Optional, TypeVar
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class ImageExecutorBusyError(Exception):
+    """Too many image jobs are queued or running; the caller should back off."""
+
+    def __init__(self, retry_after: float = 1.0, message: str = "Image processing is busy, retry later"):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class ImageWorkerLostError(ImageExecutorBusyError):
+    """
+    A worker process died mid-job (e.g. killed for memory). The pool is
+    replaced, so like a busy executor the caller may simply retry.
+    """
+
+    def __init__(self, retry_after: float = 1.0):
+        super().__init__(retry_after, "Image processing worker stopped unexpectedly, retry later")
+
+
+class ImageJobTimeoutError(TimeoutError):
+    """An image job did not finish within the per-job timeout."""
+
+
+class ImageExecutor:
+    """
+    Runs CPU-bound Pillow work (decode, resize, re-encode) in worker processes
+    so it neither blocks the event loop nor holds the GIL other requests need.
+
+    At most `max_workers + max_queue` jobs are accepted at a time; beyond that
+    `run` fails fast with ImageExecutorBusyError, and jobs lost with a crashed
+    worker fail with its subclass ImageWorkerLostError. A job still counts until its
+    worker is actually done with it, even after the caller gave up on it with
+    ImageJobTimeoutError. With `max_workers=0` jobs run in a thread instead
+    (for environments that cannot spawn processes).
+
+    Job functions and their arguments must be picklable (module-level functions).
+    """
+
+    def __init__(
+        self,
+        *,
+        max_workers: Optional[int] = None,
+        max_queue: Optional[int] = None,
+        job_timeout: Optional[float] = None,
+    ):
+        settings = get_settings()
+        self.max_workers = int(settings.IMAGE_EXECUTOR_WORKERS if max_workers is None else max_workers)
+        self.max_queue = int(settings.IMAGE_EXECUTOR_MAX_QUEUE if max_queue is None else max_queue)
+        self.job_timeout = float(settings.IMAGE_EXECUTOR_JOB_TIMEOUT if job_timeout is None else job_timeout)
+        self._slots = threading.BoundedSemaphore(max(1, self.max_workers) + max(0, self.max_queue))
+        self._pool: Optional[Executor] = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self) -> Executor:
+        with self._lock:
+            if self._pool is None:
+                if self.max_workers <= 0:
+                    self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="image-job")
+                else:
+                    # "spawn": forking a process that runs an event loop and other threads is unsafe.
+                    self._pool = ProcessPoolExecutor(
+                        max_workers=self.max_workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                    )
+            return self._pool
+
+    async def run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Run `fn(*args, **kwargs)` off the event loop and return its result."""
+        if not self._slots.acquire(blocking=False):
+            raise ImageExecutorBusyError()
+        try:
+            future = self._get_pool().submit(partial(fn, *args, **kwargs))
+        except BaseException as exc:
+            self._slots.release()
+            if isinstance(exc, BrokenProcessPool):
+                self._discard_pool()
+                raise ImageWorkerLostError() from exc
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+
+        try:
+            return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), timeout=self.job_timeout)
+        except asyncio.TimeoutError:
+            if not future.cancel():
+                logger.warning("Image job %s exceeded %.1fs and is still running", getattr(fn, "__name__", fn), self.job_timeout)
+            raise ImageJobTimeoutError(f"Image processing took longer than {self.job_timeout:g}s") from None
+        except BrokenProcessPool as exc:
+            # A worker died (e.g. killed for memory); start a fresh pool for the next job.
+            self._discard_pool()
+            raise ImageWorkerLostError() from exc
+
+    def _discard_pool(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self) -> None:
+        self._discard_pool()
+
+
+@lru_cache()
+def get_image_executor() -> ImageExecutor:
+    return ImageExecutor()
+
+
+def shutdown_image_executor() -> None:
+    if get_image_executor.cache_info().currsize:
+        get_image_executor().shutdown()
+        get_image_executor.cache_clear()
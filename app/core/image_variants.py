@@ -0,0 +1,216 @@
+"""
+Resized WebP/JPEG variants of uploaded images (thumbnails for list pages).
+
+A variant is identified by the SHA-256 of its source file plus the render
+parameters, so its bytes never change for a given key: the key doubles as a
+strong ETag and as the file name in the on-disk cache. Widths and heights are
+rounded up to the configured sizes to keep the number of variants bounded.
+"""
+from __future__ import annotations
+
+import hashlib
+import io
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Mapping, Optional, Sequence
+from uuid import uuid4
+
+from PIL import Image, ImageOps
+
+from app.config import get_settings
+
+# Bump when render_variant's output changes, so cached variants are not reused.
+RENDER_VERSION = 1
+
+VARIANT_FORMATS = {"webp": "image/webp", "jpeg": "image/jpeg"}
+SOURCE_SUFFIXES = {".jpg", ".jpeg", ".png", ".webp"}
+
+# Blob files are named after their content hash (see app.core.product_blobs).
+_CONTENT_ADDRESSED_RE = re.compile(r"(?:^|/)blobs/(?P<sha256>[0-9a-f]{64})\.[a-z]+$")
+
+# A served variant's mtime is refreshed at most this often, so pruning can evict the least recently used.
+_TOUCH_INTERVAL_SECONDS = 3600
+
+_DIGEST_CACHE_SIZE = 4096
+_digests: "OrderedDict[tuple[str, int, int], str]" = OrderedDict()
+_digests_lock = threading.Lock()
+
+
+class VariantParamsError(ValueError):
+    """Invalid `w` / `h` / `fmt` query parameters."""
+
+
+@dataclass(frozen=True)
+class VariantSpec:
+    width: Optional[int]
+    height: Optional[int]
+    fmt: str
+    quality: int
+
+    @property
+    def media_type(self) -> str:
+        return VARIANT_FORMATS[self.fmt]
+
+
+def _snap(value: str, name: str, sizes: Sequence[int]) -> int:
+    try:
+        requested = int(value)
+    except ValueError:
+        raise VariantParamsError(f"{name} must be an integer") from None
+    if requested <= 0:
+        raise VariantParamsError(f"{name} must be positive")
+    for size in sizes:
+        if size >= requested:
+            return size
+    return sizes[-1]
+
+
+def parse_variant_params(params: Mapping[str, str]) -> Optional[VariantSpec]:
+    """The variant asked for by `?w=&h=&fmt=`, or None when none of them is present."""
+    if not any(params.get(name) for name in ("w", "h", "fmt")):
+        return None
+
+    settings = get_settings()
+    sizes = sorted(set(int(size) for size in settings.IMAGE_VARIANT_SIZES))
+    width = _snap(params["w"], "w", sizes) if params.get("w") else None
+    height = _snap(params["h"], "h", sizes) if params.get("h") else None
+
+    fmt = (params.get("fmt") or "webp").lower()
+    if fmt == "jpg":
+        fmt = "jpeg"
+    if fmt not in VARIANT_FORMATS:
+        raise VariantParamsError(f"fmt must be one of: {', '.join(VARIANT_FORMATS)}")
+    return VariantSpec(width=width, height=height, fmt=fmt, quality=int(settings.IMAGE_VARIANT_QUALITY))
+
+
+def is_content_addressed(path: str) -> bool:
+    return _CONTENT_ADDRESSED_RE.search(path.replace(os.sep, "/")) is not None
+
+
+def source_digest(full_path: str, stat_result: os.stat_result) -> str:
+    """SHA-256 of the source file, hashed once per (path, size, mtime)."""
+    match = _CONTENT_ADDRESSED_RE.search(full_path.replace(os.sep, "/"))
+    if match is not None:
+        return match.group("sha256")
+
+    key = (full_path, stat_result.st_size, stat_result.st_mtime_ns)
+    with _digests_lock:
+        digest = _digests.get(key)
+        if digest is not None:
+            _digests.move_to_end(key)
+            return digest
+
+    sha = hashlib.sha256()
+    with open(full_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            sha.update(chunk)
+    digest = sha.hexdigest()
+
+    with _digests_lock:
+        _digests[key] = digest
+        while len(_digests) > _DIGEST_CACHE_SIZE:
+            _digests.popitem(last=False)
+    return digest
+
+
+def variant_key(digest: str, spec: VariantSpec) -> str:
+    params = f"{digest}:{spec.width or 0}x{spec.height or 0}:{spec.fmt}:q{spec.quality}:v{RENDER_VERSION}"
+    return hashlib.sha256(params.encode()).hexdigest()
+
+
+def variant_cache_path(key: str, spec: VariantSpec) -> Path:
+    ext = "jpg" if spec.fmt == "jpeg" else spec.fmt
+    return Path(get_settings().IMAGE_VARIANT_CACHE_DIR) / key[:2] / f"{key}.{ext}"
+
+
+def render_variant(source_path: str, width: Optional[int], height: Optional[int], fmt: str, quality: int) -> bytes:
+    """
+    Decode `source_path`, fit it within width x height (never upscaling) and
+    encode it as `fmt`. Runs in the image worker pool.
+    """
+    with Image.open(source_path) as img:
+        box = (width or img.width, height or img.height)
+        # JPEG can decode at 1/2, 1/4 or 1/8 scale, far cheaper than a full decode.
+        img.draft("RGB", box)
+        img = ImageOps.exif_transpose(img)
+        img.thumbnail(box, Image.Resampling.LANCZOS)
+
+        has_alpha = img.mode in {"RGBA", "LA"} or (img.mode == "P" and "transparency" in img.info)
+        if fmt == "webp" and has_alpha:
+            img = img.convert("RGBA")
+        elif has_alpha:
+            # JPEG has no alpha channel: flatten onto white.
+            rgba = img.convert("RGBA")
+            img = Image.new("RGB", rgba.size, (255, 255, 255))
+            img.paste(rgba, mask=rgba.split()[-1])
+        elif img.mode != "RGB":
+            img = img.convert("RGB")
+
+        out = io.BytesIO()
+        if fmt == "webp":
+            img.save(out, format="WEBP", quality=quality, method=4)
+        else:
+            img.save(out, format="JPEG", quality=quality, optimize=True, progressive=True)
+        return out.getvalue()
+
+
+def write_variant(path: Path, data: bytes) -> None:
+    """Store a rendered variant atomically (readers never see a partial file)."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{uuid4().hex}.tmp")
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+
+def use_cached_variant(path: Path) -> bool:
+    """Whether the variant is cached; marks it as recently used for `prune_variant_cache`."""
+    try:
+        mtime = path.stat().st_mtime
+    except FileNotFoundError:
+        return False
+    now = time.time()
+    if now - mtime > _TOUCH_INTERVAL_SECONDS:
+        try:
+            os.utime(path, (now, now))
+        except FileNotFoundError:
+            return False
+    return True
+
+
+def prune_variant_cache(cache_dir: str, *, max_bytes: int, max_age_seconds: float) -> int:
+    """
+    Delete cached variants unused for `max_age_seconds`, then the least
+    recently used ones until at most `max_bytes` remain (0 disables either
+    limit). Returns the number of bytes freed; deleted variants are simply
+    rendered again when asked for.
+    """
+    entries = []
+    for path in Path(cache_dir).glob("*/*"):
+        if path.name.startswith("."):
+            continue  # a write in progress
+        try:
+            stat_result = path.stat()
+        except FileNotFoundError:
+            continue
+        entries.append((stat_result.st_mtime, stat_result.st_size, path))
+    entries.sort()
+
+    total = sum(size for _, size, _ in entries)
+    cutoff = time.time() - max_age_seconds if max_age_seconds > 0 else None
+    freed = 0
+    for mtime, size, path in entries:
+        expired = cutoff is not None and mtime < cutoff
+        if not expired and (max_bytes <= 0 or total - freed <= max_bytes):
+            break
+        path.unlink(missing_ok=True)
+        freed += size
+    return freed
@@ -0,0 +1,289 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import socket
+from datetime import timedelta
+from typing import Any, Dict, Iterable, List, Optional, Set
+from uuid import uuid4
+
+from sqlalchemy import and_, case, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.config import get_settings
+from app.core.datetime_utils import utc_now
+from app.core.task_store import ACTIVE_STATUSES
+from app.models.database import TaskStatusDB, VideoTask
+
+logger = logging.getLogger(__name__)
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()[:40]}:{os.getpid()}:{uuid4().hex[:8]}"
+
+
+class JobQueue:
+    """
+    Hands out `video_tasks` rows to workers under time-limited leases.
+
+    A row is claimable while it is active (pending/processing) and either has
+    never been leased or its lease has expired, which is how work left behind
+    by a crashed or partitioned worker gets picked up again. Holders extend
+    their leases with `heartbeat`; the terminal status write (TaskStore)
+    clears the lease. Each lease that expires counts as a failed attempt, and
+    rows abandoned `max_attempts` times are failed instead of handed out
+    again. Leases given back with `release` (graceful shutdown) do not count.
+
+    Waiting rows are claimed in `queue_tag` order, which shares workers fairly
+    between owners the way FairScheduler shares one worker's slots (see
+    `next_tag`).
+
+    Postgres claims use `SELECT ... FOR UPDATE SKIP LOCKED` so concurrent
+    workers never block on (or double-claim) the same rows. Other databases
+    (SQLite in tests) fall back to a conditional UPDATE per candidate row.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        *,
+        worker_id: Optional[str] = None,
+        lease_seconds: Optional[float] = None,
+        heartbeat_interval: Optional[float] = None,
+        poll_interval: Optional[float] = None,
+        max_attempts: Optional[int] = None,
+    ):
+        settings = get_settings()
+        self._session_factory = session_factory
+        self.worker_id = worker_id or default_worker_id()
+        self.lease_seconds = float(lease_seconds or settings.JOB_LEASE_SECONDS)
+        self.heartbeat_interval = float(heartbeat_interval or settings.JOB_HEARTBEAT_INTERVAL)
+        self.poll_interval = float(poll_interval or settings.JOB_QUEUE_POLL_INTERVAL)
+        self.max_attempts = int(max_attempts or settings.JOB_MAX_ATTEMPTS)
+        self._wakeup = asyncio.Event()
+
+    def lease_deadline(self):
+        return utc_now() + timedelta(seconds=self.lease_seconds)
+
+    def wake(self) -> None:
+        """Make the next `wait` return immediately (new local work or a freed slot)."""
+        self._wakeup.set()
+
+    async def wait(self) -> None:
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+        except asyncio.TimeoutError:
+            pass
+        self._wakeup.clear()
+
+    @staticmethod
+    def _claimable(now):
+        return and_(
+            VideoTask.status.in_(ACTIVE_STATUSES),
+            or_(VideoTask.lease_expires_at.is_(None), VideoTask.lease_expires_at < now),
+        )
+
+    @staticmethod
+    def _waiting(owner_user_id: Optional[str] = None, *, any_owner: bool = True):
+        # Submitted but not picked up by any worker yet.
+        waiting = and_(VideoTask.status == TaskStatusDB.PENDING, VideoTask.lease_owner.is_(None))
+        if any_owner:
+            return waiting
+        if owner_user_id is None:
+            return and_(waiting, VideoTask.owner_user_id.is_(None))
+        return and_(waiting, VideoTask.owner_user_id == owner_user_id)
+
+    async def queued_count(self, owner_user_id: Optional[str]) -> int:
+        """How many tasks of `owner_user_id` are waiting for a worker, across all workers."""
+        async with self._session_factory() as db:
+            stmt = select(func.count()).select_from(VideoTask).where(self._waiting(owner_user_id, any_owner=False))
+            return int((await db.execute(stmt)).scalar() or 0)
+
+    async def next_tag(self, owner_user_id: Optional[str], step: float) -> float:
+        """
+        Claim-order tag for a new task of `owner_user_id` (start-time fair
+        queuing). The virtual clock is the smallest tag still waiting, and an
+        owner's tags advance by `step` per task already waiting. One owner's
+        backlog of 500 therefore delays another owner's first task by at most
+        one round, not 500 tasks.
+        """
+        async with self._session_factory() as db:
+            virtual_time = (
+                await db.execute(select(func.min(VideoTask.queue_tag)).where(self._waiting()))
+            ).scalar()
+            last = (
+                await db.execute(
+                    select(func.max(VideoTask.queue_tag)).where(self._waiting(owner_user_id, any_owner=False))
+                )
+            ).scalar()
+        start = float(virtual_time or 0.0)
+        return start if last is None else max(start, float(last) + step)
+
+    async def positions(self, rows: Iterable[VideoTask]) -> Dict[str, int]:
+        """1-based claim order of those `rows` that are still waiting for a worker."""
+        positions: Dict[str, int] = {}
+        waiting = [
+            row for row in rows
+            if row.status == TaskStatusDB.PENDING and row.lease_owner is None and row.queue_tag is not None
+        ]
+        if not waiting:
+            return positions
+        async with self._session_factory() as db:
+            for row in waiting:
+                ahead = or_(
+                    VideoTask.queue_tag < row.queue_tag,
+                    and_(VideoTask.queue_tag == row.queue_tag, VideoTask.created_at < row.created_at),
+                )
+                stmt = select(func.count()).select_from(VideoTask).where(self._waiting(), ahead)
+                positions[row.id] = 1 + int((await db.execute(stmt)).scalar() or 0)
+        return positions
+
+    async def claim(self, limit: int) -> List[VideoTask]:
+        """
+        Lease up to `limit` claimable rows to this worker: rows whose lease
+        expired (already running upstream) first, then by fair-share tag.
+        """
+        if limit <= 0:
+            return []
+        now = utc_now()
+        lease = {"lease_owner": self.worker_id, "lease_expires_at": self.lease_deadline()}
+        candidates_stmt = (
+            select(VideoTask)
+            .where(self._claimable(now))
+            .order_by(VideoTask.queue_tag.asc().nulls_first(), VideoTask.created_at)
+            .limit(limit)
+        )
+
+        # Only a lease that is still set has expired; released and never-leased rows have none.
+        attempts = VideoTask.attempts + case((VideoTask.lease_owner.is_(None), 0), else_=1)
+        claimed: List[VideoTask] = []
+        async with self._session_factory() as db:
+            async with db.begin():
+                if db.get_bind().dialect.name == "postgresql":
+                    rows = (await db.execute(candidates_stmt.with_for_update(skip_locked=True))).scalars().all()
+                    for row in rows:
+                        if await self._give_up_if_exhausted(db, row):
+                            continue
+                        await db.execute(
+                            update(VideoTask)
+                            .where(VideoTask.id == row.id)
+                            .values(attempts=attempts, **lease)
+                            .execution_options(synchronize_session=False)
+                        )
+                        claimed.append(row)
+                else:
+                    rows = (await db.execute(candidates_stmt)).scalars().all()
+                    for row in rows:
+                        if await self._give_up_if_exhausted(db, row):
+                            continue
+                        result = await db.execute(
+                            update(VideoTask)
+                            .where(VideoTask.id == row.id, self._claimable(now))
+                            .values(attempts=attempts, **lease)
+                            .execution_options(synchronize_session=False)
+                        )
+                        if result.rowcount == 1:
+                            claimed.append(row)
+        return claimed
+
+    async def _give_up_if_exhausted(self, db: AsyncSession, row: VideoTask) -> bool:
+        abandoned = int(row.attempts or 0) + (1 if row.lease_owner is not None else 0)
+        if abandoned < self.max_attempts:
+            return False
+        await db.execute(
+            update(VideoTask)
+            .where(VideoTask.id == row.id)
+            .values(
+                status=TaskStatusDB.FAILED,
+                error_message=f"Task was abandoned by its worker {abandoned} times",
+                lease_owner=None,
+                lease_expires_at=None,
+                completed_at=utc_now(),
+            )
+            .execution_options(synchronize_session=False)
+        )
+        logger.warning("Giving up on video task %s after %s lease expiries", row.id, abandoned)
+        return True
+
+    async def heartbeat(self, task_ids: Iterable[str]) -> Set[str]:
+        """Extend our leases; returns the ids we no longer hold (expired and re-claimed, or cancelled)."""
+        ids = set(task_ids)
+        if not ids:
+            return set()
+        held = and_(
+            VideoTask.id.in_(ids),
+            VideoTask.lease_owner == self.worker_id,
+            VideoTask.status.in_(ACTIVE_STATUSES),
+        )
+        async with self._session_factory() as db:
+            async with db.begin():
+                await db.execute(
+                    update(VideoTask)
+                    .where(held)
+                    .values(lease_expires_at=self.lease_deadline())
+                    .execution_options(synchronize_session=False)
+                )
+                kept = set((await db.execute(select(VideoTask.id).where(held))).scalars().all())
+        return ids - kept
+
+    async def post_callback(self, task_id: str, payload: Optional[Dict[str, Any]]) -> bool:
+        """
+        Leave a provider callback on the task's row for whichever worker holds
+        (or next claims) it; see `take_callbacks`. A None payload only asks for
+        an immediate status query and never replaces a pending payload. Returns
+        False when the task is unknown or already finished, and raises
+        ValueError when the payload names a different remote task.
+        """
+        async with self._session_factory() as db:
+            async with db.begin():
+                row = await db.get(VideoTask, task_id, with_for_update=True)
+                if row is None or row.status not in ACTIVE_STATUSES:
+                    return False
+                if payload is None:
+                    if row.pending_callback is None:
+                        row.pending_callback = json.dumps(None)
+                    return True
+                reported_id = payload.get("task_id")
+                if reported_id is not None and row.remote_task_id and str(reported_id) != row.remote_task_id:
+                    raise ValueError("Callback does not belong to this task")
+                row.pending_callback = json.dumps(payload)
+        return True
+
+    async def take_callbacks(self, task_ids: Iterable[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Remove and return the callbacks posted for those of `task_ids` we hold."""
+        ids = list(task_ids)
+        if not ids:
+            return {}
+        held = and_(
+            VideoTask.id.in_(ids),
+            VideoTask.lease_owner == self.worker_id,
+            VideoTask.pending_callback.is_not(None),
+        )
+        async with self._session_factory() as db:
+            async with db.begin():
+                rows = (await db.execute(select(VideoTask.id, VideoTask.pending_callback).where(held))).all()
+                for row in rows:
+                    # A newer callback posted meanwhile stays for the next round.
+                    await db.execute(
+                        update(VideoTask)
+                        .where(VideoTask.id == row.id, VideoTask.pending_callback == row.pending_callback)
+                        .values(pending_callback=None)
+                        .execution_options(synchronize_session=False)
+                    )
+        return {row.id: json.loads(row.pending_callback) for row in rows}
+
+    async def release(self, task_ids: Iterable[str]) -> None:
+        """Give leases back early (graceful shutdown) so other workers resume the tasks right away."""
+        ids = list(task_ids)
+        if not ids:
+            return
+        async with self._session_factory() as db:
+            async with db.begin():
+                await db.execute(
+                    update(VideoTask)
+                    .where(VideoTask.id.in_(ids), VideoTask.lease_owner == self.worker_id)
+                    .values(lease_owner=None, lease_expires_at=None)
+                    .execution_options(synchronize_session=False)
+                )
@@ -0,0 +1,251 @@
+from __future__ import annotations
+
+import hashlib
+import itertools
+import time
+from email.utils import parsedate_to_datetime
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, TypeVar
+
+from app.config import get_settings
+from app.core.datetime_utils import utc_now
+
+T = TypeVar("T")
+
+STRATEGIES = ("least_loaded", "round_robin")
+
+
+class NoKeyAvailableError(Exception):
+    """Every key of the pool is cooling down after a rate-limit or quota error."""
+
+    def __init__(self, provider: str, retry_after: float):
+        super().__init__(f"All {provider} API keys are rate limited, retry later")
+        self.provider = provider
+        self.retry_after = retry_after
+
+
+def _status_and_headers(exc: BaseException) -> tuple[Optional[int], Any]:
+    # httpx.HTTPStatusError and the OpenAI-style SDK errors both carry a response.
+    response = getattr(exc, "response", None)
+    status = getattr(response, "status_code", None) or getattr(exc, "status_code", None)
+    return status, getattr(response, "headers", None) or {}
+
+
+def _retry_after_seconds(headers: Any) -> Optional[float]:
+    value = headers.get("retry-after") if hasattr(headers, "get") else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - utc_now()).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+def key_cooldown(exc: BaseException, default: float) -> Optional[float]:
+    """
+    Seconds a key should rest after `exc`, or None if the error is not about
+    the key: 429 (rate limit) and 402 (quota) honour Retry-After.
+    """
+    status, headers = _status_and_headers(exc)
+    if status not in (402, 429):
+        return None
+    retry_after = _retry_after_seconds(headers)
+    return default if retry_after is None else retry_after
+
+
+def key_id(api_key: str) -> str:
+    """A stable identifier of a key that reveals nothing about it, safe to store."""
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:32]
+
+
+def mask_key(api_key: str) -> str:
+    return f"...{api_key[-4:]}" if len(api_key) > 8 else "..."
+
+
+class _KeyState:
+    __slots__ = ("key", "in_flight", "requests", "successes", "failures", "rate_limited", "cooling_until")
+
+    def __init__(self, key: str):
+        self.key = key
+        self.in_flight = 0
+        self.requests = 0
+        self.successes = 0
+        self.failures = 0
+        self.rate_limited = 0
+        self.cooling_until = 0.0
+
+
+class KeyPool:
+    """
+    Several API keys of one provider used as one.
+
+    Each call takes the least-loaded key (fewest calls in flight, round-robin
+    among equals) or simply the next one with `strategy="round_robin"`. A key
+    answered with 429 or 402 rests for its Retry-After (or `cooldown_seconds`)
+    and the call moves on to another key.
+    """
+
+    def __init__(
+        self,
+        provider: str,
+        keys: Iterable[str],
+        *,
+        strategy: Optional[str] = None,
+        cooldown_seconds: Optional[float] = None,
+    ):
+        settings = get_settings()
+        self.provider = provider
+        self._keys: Dict[str, _KeyState] = {}
+        for key in keys:
+            key = str(key or "").strip()
+            if key and key not in self._keys:
+                self._keys[key] = _KeyState(key)
+        if not self._keys:
+            raise ValueError(f"Key pool {provider} needs at least one key")
+        self.strategy = strategy or settings.KEY_POOL_STRATEGY
+        if self.strategy not in STRATEGIES:
+            raise ValueError(f"Unknown key pool strategy {self.strategy!r}; expected one of {STRATEGIES}")
+        self.cooldown_seconds = float(
+            cooldown_seconds if cooldown_seconds is not None else settings.KEY_POOL_COOLDOWN_SECONDS
+        )
+        self._turn = itertools.count()
+
+    def __contains__(self, api_key: str) -> bool:
+        return api_key in self._keys
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def _available(self, exclude: Iterable[str] = ()) -> List[_KeyState]:
+        now = time.monotonic()
+        excluded = set(exclude)
+        return [state for state in self._keys.values() if state.cooling_until <= now and state.key not in excluded]
+
+    def pick(self, exclude: Iterable[str] = ()) -> str:
+        """Choose a key for one call (does not count it as in flight)."""
+        excluded = set(exclude)
+        candidates = self._available(excluded)
+        if not candidates:
+            states = [state for state in self._keys.values() if state.key not in excluded] or list(self._keys.values())
+            retry_after = max(0.0, min(state.cooling_until for state in states) - time.monotonic())
+            raise NoKeyAvailableError(self.provider, retry_after)
+        offset = next(self._turn) % len(candidates)
+        rotated = candidates[offset:] + candidates[:offset]
+        if self.strategy == "round_robin":
+            return rotated[0].key
+        return min(rotated, key=lambda state: state.in_flight).key
+
+    def cool_down(self, api_key: str, seconds: Optional[float] = None) -> None:
+        state = self._keys[api_key]
+        state.rate_limited += 1
+        rest = self.cooldown_seconds if seconds is None else seconds
+        state.cooling_until = max(state.cooling_until, time.monotonic() + rest)
+
+    async def run(self, call: Callable[[str], Awaitable[T]]) -> T:
+        """Run `call(key)`, switching keys on rate-limit/quota errors until none is left."""
+        tried: List[str] = []
+        last_error: Optional[Exception] = None
+        while True:
+            try:
+                key = self.pick(exclude=tried)
+            except NoKeyAvailableError:
+                if last_error is not None:
+                    raise last_error
+                raise
+            state = self._keys[key]
+            state.requests += 1
+            state.in_flight += 1
+            try:
+                result = await call(key)
+            except Exception as exc:
+                state.failures += 1
+                cooldown = key_cooldown(exc, self.cooldown_seconds)
+                if cooldown is None:
+                    raise
+                self.cool_down(key, cooldown)
+                tried.append(key)
+                last_error = exc
+                continue
+            finally:
+                state.in_flight -= 1
+            state.successes += 1
+            return result
+
+    def snapshot(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            "provider": self.provider,
+            "strategy": self.strategy,
+            "keys": [
+                {
+                    "key": mask_key(state.key),
+                    "in_flight": state.in_flight,
+                    "requests": state.requests,
+                    "successes": state.successes,
+                    "failures": state.failures,
+                    "rate_limited": state.rate_limited,
+                    "cooling_down_seconds": round(max(0.0, state.cooling_until - now), 1),
+                }
+                for state in self._keys.values()
+            ],
+        }
+
+
+class KeyPoolRegistry:
+    """The configured pools (`<PROVIDER>_API_KEY` plus `<PROVIDER>_API_KEYS`)."""
+
+    def __init__(self, pools: Optional[Iterable[KeyPool]] = None):
+        if pools is None:
+            settings = get_settings()
+            configured = {
+                "image_gen": [settings.IMAGE_GEN_API_KEY, *settings.IMAGE_GEN_API_KEYS],
+                "image_edit": [settings.IMAGE_EDIT_API_KEY, *settings.IMAGE_EDIT_API_KEYS],
+                "video": [settings.VIDEO_GEN_API_KEY, *settings.VIDEO_GEN_API_KEYS],
+                "llm": [settings.LLM_API_KEY, *settings.LLM_API_KEYS],
+            }
+            pools = [KeyPool(name, keys) for name, keys in configured.items() if any(str(k or "").strip() for k in keys)]
+        self.pools: List[KeyPool] = list(pools)
+
+    def pool_for(self, api_key: Optional[str]) -> Optional[KeyPool]:
+        """The pool a server-owned key belongs to; None for caller-supplied keys."""
+        if not api_key:
+            return None
+        return next((pool for pool in self.pools if api_key in pool), None)
+
+    def pooled_key_id(self, api_key: Optional[str]) -> Optional[str]:
+        """`key_id` of a server-owned key, to find it again with `key_by_id`; None for other keys."""
+        return key_id(api_key) if self.pool_for(api_key) is not None else None
+
+    def key_by_id(self, identifier: Optional[str]) -> Optional[str]:
+        """The pooled key recorded as `identifier`; None if it is no longer configured."""
+        if not identifier:
+            return None
+        for pool in self.pools:
+            for api_key in pool._keys:
+                if key_id(api_key) == identifier:
+                    return api_key
+        return None
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        return [pool.snapshot() for pool in self.pools]
+
+
+@lru_cache()
+def get_key_pools() -> KeyPoolRegistry:
+    return KeyPoolRegistry()
+
+
+async def with_api_key(api_key: str, call: Callable[[str], Awaitable[T]]) -> T:
+    """
+    Run `call(key)` with `api_key`, or, if that is one of our pooled keys, with
+    whichever key of its pool is least loaded and not cooling down.
+    """
+    pool = get_key_pools().pool_for(api_key)
+    if pool is None or len(pool) < 2:
+        # A lone key has nothing to fail over to; leave its 429s to the caller as before.
+        return await call(api_key)
+    return await pool.run(call)
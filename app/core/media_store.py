@@ -0,0 +1,239 @@
+"""
+Generated images, stored as files rather than as base64 inside the encrypted
+image record.
+
+Providers return images as `b64_json`. Each one is decoded once and written to
+the media store. The record keeps only a small reference (`media_id`, content
+type, size), and `GET /api/v1/images/{image_id}/media/{media_id}` serves the
+bytes. With MEDIA_ENCRYPT_AT_REST the files are encrypted with the owner's
+key, the same way the record itself is.
+
+API responses give each reference a `url` signed for MEDIA_URL_TTL_SECONDS,
+so it works as an `<img src>` or download link, which cannot carry a Bearer
+token. Signed URLs are never stored: they are added when a response is built.
+
+With the local backend the files live under MEDIA_LOCAL_ROOT, outside the
+public /uploads mount, so the owner-checked endpoint is the only way to read
+them. With STORAGE_BACKEND=s3 they share the upload bucket under `media/`.
+"""
+from __future__ import annotations
+
+import asyncio
+import base64
+import binascii
+import hashlib
+import hmac
+import logging
+import time
+from dataclasses import asdict, dataclass
+from functools import lru_cache
+from typing import Any, AsyncIterator, Iterable, Optional
+from uuid import uuid4
+
+from app.config import get_settings
+from app.core.encryption import EncryptionError, decrypt_for_user, encrypt_for_user
+from app.core.storage_backend import LocalStorageBackend, StorageBackend, get_storage_backend
+
+logger = logging.getLogger(__name__)
+
+MEDIA_KEY_PREFIX = "media"
+
+_B64_FIELDS = ("b64_json", "b64Json")
+
+
+@dataclass(frozen=True)
+class StoredMedia:
+    media_id: str
+    content_type: str
+    size_bytes: int  # as stored, i.e. including encryption overhead
+    encrypted: bool
+
+
+@lru_cache()
+def get_media_backend() -> StorageBackend:
+    settings = get_settings()
+    if (settings.STORAGE_BACKEND or "local").lower() == "local":
+        return LocalStorageBackend(settings.MEDIA_LOCAL_ROOT, url_prefix="")
+    return get_storage_backend()
+
+
+def shutdown_media_backend() -> None:
+    if get_media_backend.cache_info().currsize:
+        backend = get_media_backend()
+        # With S3 this is the shared upload backend, closed by shutdown_storage_backend.
+        if isinstance(backend, LocalStorageBackend):
+            backend.close()
+        get_media_backend.cache_clear()
+
+
+def media_key(user_id: str, media_id: str, *, encrypted: bool) -> str:
+    return f"{MEDIA_KEY_PREFIX}/{user_id}/{media_id}{'.enc' if encrypted else ''}"
+
+
+def _signing_key() -> bytes:
+    master_key = get_settings().STORAGE_MASTER_KEY
+    if not master_key:
+        raise EncryptionError("STORAGE_MASTER_KEY is required to sign media URLs")
+    return hmac.new(master_key.encode("utf-8"), b"media-url", hashlib.sha256).digest()
+
+
+def _signature(image_id: str, media_id: str, expires: int) -> str:
+    message = f"{image_id}:{media_id}:{expires}".encode("utf-8")
+    return hmac.new(_signing_key(), message, hashlib.sha256).hexdigest()
+
+
+def media_url(image_id: str, media_id: str, *, now: Optional[float] = None) -> str:
+    """
+    A link to the media that needs no Authorization header, valid for one to
+    two MEDIA_URL_TTL_SECONDS. Expiry is rounded to the TTL so the same image
+    gets the same URL for a while and browsers can cache it.
+    """
+    ttl = max(1, int(get_settings().MEDIA_URL_TTL_SECONDS))
+    expires = (int(time.time() if now is None else now) // ttl + 2) * ttl
+    signature = _signature(image_id, media_id, expires)
+    return f"/api/v1/images/{image_id}/media/{media_id}?expires={expires}&sig={signature}"
+
+
+def verify_media_signature(image_id: str, media_id: str, expires: int, signature: str) -> bool:
+    if expires < time.time():
+        return False
+    return hmac.compare_digest(_signature(image_id, media_id, expires), str(signature))
+
+
+def with_media_urls(image_id: str, response: Any) -> Any:
+    """A copy of a stored response whose media references carry a signed `url`."""
+    data = response.get("data") if isinstance(response, dict) else None
+    if not isinstance(data, list) or not any(_is_media_entry(item) for item in data):
+        return response
+    items = [{**item, "url": media_url(image_id, item["media_id"])} if _is_media_entry(item) else item for item in data]
+    return {**response, "data": items}
+
+
+def sniff_content_type(data: bytes) -> str:
+    if data.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if data.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    if data.startswith((b"GIF87a", b"GIF89a")):
+        return "image/gif"
+    return "application/octet-stream"
+
+
+def _decode_b64(item: dict[str, Any]) -> Optional[bytes]:
+    for field in _B64_FIELDS:
+        value = item.get(field)
+        if isinstance(value, str) and value:
+            if value.startswith("data:") and "," in value:
+                value = value.split(",", 1)[1]
+            try:
+                return base64.b64decode(value, validate=True)
+            except (binascii.Error, ValueError):
+                return None
+    return None
+
+
+async def put_media(user_id: str, data: bytes, *, encrypt: bool) -> StoredMedia:
+    media_id = uuid4().hex
+    content_type = sniff_content_type(data)
+    payload = await asyncio.to_thread(encrypt_for_user, user_id=user_id, plaintext=data) if encrypt else data
+    await get_media_backend().put(
+        media_key(user_id, media_id, encrypted=encrypt),
+        payload,
+        content_type="application/octet-stream" if encrypt else content_type,
+        overwrite=False,
+    )
+    return StoredMedia(media_id=media_id, content_type=content_type, size_bytes=len(payload), encrypted=encrypt)
+
+
+async def externalize_images(user_id: str, response: dict[str, Any]) -> tuple[dict[str, Any], list[StoredMedia]]:
+    """
+    A copy of `response` with every `data[].b64_json` written to the media
+    store and replaced by a reference. Items that are not valid base64 are
+    kept as they are. If any write fails, the ones that succeeded are removed
+    and the error is raised.
+    """
+    data = response.get("data")
+    if not isinstance(data, list):
+        return response, []
+
+    decoded = {
+        index: blob
+        for index, item in enumerate(data)
+        if isinstance(item, dict) and (blob := _decode_b64(item)) is not None
+    }
+    if not decoded:
+        return response, []
+
+    encrypt = bool(get_settings().MEDIA_ENCRYPT_AT_REST)
+    results = await asyncio.gather(
+        *(put_media(user_id, blob, encrypt=encrypt) for blob in decoded.values()),
+        return_exceptions=True,
+    )
+    stored = [result for result in results if isinstance(result, StoredMedia)]
+    failure = next((result for result in results if isinstance(result, BaseException)), None)
+    if failure is not None:
+        await delete_media(user_id, (asdict(media) for media in stored))
+        raise failure
+
+    by_index = dict(zip(decoded, stored))
+    items: list[Any] = []
+    for index, item in enumerate(data):
+        media = by_index.get(index)
+        if media is None:
+            items.append(item)
+            continue
+        reference = {key: value for key, value in item.items() if key not in _B64_FIELDS}
+        reference.update(
+            media_id=media.media_id,
+            content_type=media.content_type,
+            size_bytes=media.size_bytes,
+            encrypted=media.encrypted,
+        )
+        items.append(reference)
+    return {**response, "data": items}, stored
+
+
+def _is_media_entry(item: Any) -> bool:
+    return isinstance(item, dict) and isinstance(item.get("media_id"), str)
+
+
+def media_entries(response: Any) -> list[dict[str, Any]]:
+    """The media references in a stored response."""
+    data = response.get("data") if isinstance(response, dict) else None
+    if not isinstance(data, list):
+        return []
+    return [item for item in data if _is_media_entry(item)]
+
+
+async def read_media(user_id: str, entry: dict[str, Any]) -> bytes:
+    """The full, decrypted bytes of a media entry; raises FileNotFoundError if missing."""
+    encrypted = bool(entry.get("encrypted"))
+    blob = await get_media_backend().get(media_key(user_id, entry["media_id"], encrypted=encrypted))
+    if not encrypted:
+        return blob
+    return await asyncio.to_thread(decrypt_for_user, user_id=user_id, blob=blob)
+
+
+async def stream_media(user_id: str, entry: dict[str, Any]) -> Optional[AsyncIterator[bytes]]:
+    """
+    Chunks of an unencrypted media entry, or None if it is missing. Encrypted
+    entries must be read whole with read_media: the MAC is checked before
+    anything is decrypted.
+    """
+    backend = get_media_backend()
+    key = media_key(user_id, entry["media_id"], encrypted=False)
+    if not await backend.exists(key):
+        return None
+    return backend.iter_chunks(key)
+
+
+async def delete_media(user_id: str, entries: Iterable[dict[str, Any]]) -> None:
+    """Remove media files, best effort: failures are logged, not raised."""
+    backend = get_media_backend()
+    keys = [media_key(user_id, entry["media_id"], encrypted=bool(entry.get("encrypted"))) for entry in entries]
+    results = await asyncio.gather(*(backend.delete(key) for key in keys), return_exceptions=True)
+    for key, result in zip(keys, results):
+        if isinstance(result, BaseException):
+            logger.warning("Failed to delete media %s: %s", key, result)
@@ -0,0 +1,360 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app.config import get_settings
+from app.core.base_client import BaseVideoClient
+from app.core.circuit_breaker import CircuitOpenError
+from app.core.polling import invoke_callback
+from app.core.polling_policy import PolicyKey, PollingPolicy
+from app.models.schemas import ProgressCallback, TaskStatus
+
+logger = logging.getLogger(__name__)
+
+PollCallback = Callable[[ProgressCallback], Awaitable[None] | None]
+
+
+class _PollEntry:
+    __slots__ = (
+        "provider",
+        "client",
+        "remote_task_id",
+        "callback",
+        "future",
+        "policy_key",
+        "started_at",
+        "deadline",
+        "resumed",
+        "webhook",
+        "progress",
+        "error_retries",
+        "due_seq",
+    )
+
+    def __init__(
+        self,
+        provider: str,
+        client: BaseVideoClient,
+        remote_task_id: str,
+        callback: Optional[PollCallback],
+        future: asyncio.Future,
+        policy_key: Optional[PolicyKey],
+        started_at: float,
+        deadline: float,
+        resumed: bool,
+        webhook: bool,
+    ):
+        self.provider = provider
+        self.client = client
+        self.remote_task_id = remote_task_id
+        self.callback = callback
+        self.future = future
+        self.policy_key = policy_key
+        self.started_at = started_at
+        self.deadline = deadline
+        self.resumed = resumed
+        self.webhook = webhook
+        self.progress = 0
+        self.error_retries = 0
+        self.due_seq = -1
+
+
+@dataclass(order=True)
+class _DuePoll:
+    due_at: float
+    seq: int
+    entry: _PollEntry = field(compare=False)
+
+
+class _ProviderQueue:
+    __slots__ = ("heap", "min_spacing", "next_allowed_at")
+
+    def __init__(self, max_qps: float):
+        self.heap: List[_DuePoll] = []
+        self.min_spacing = 1.0 / max_qps if max_qps > 0 else 0.0
+        self.next_allowed_at = 0.0
+
+    def ready_at(self) -> float:
+        return max(self.heap[0].due_at, self.next_allowed_at)
+
+
+class PollScheduler:
+    """
+    Drives `query_task` for every watched remote task from one place.
+
+    Due polls sit in a time-ordered heap per provider. A single dispatcher pops
+    whatever is due (spacing polls so no provider exceeds `max_qps_per_provider`)
+    and hands it to a fixed pool of workers, which call the provider and resolve
+    the watcher's future or reschedule the poll.
+
+    Polls watched with a `policy_key` are spaced by the PollingPolicy (ETA
+    based); the rest every `poll_interval`. Tasks whose provider reports back
+    through a webhook (see `deliver`) are only polled every `safety_interval`
+    in case a callback gets lost. Either way a task gives up after
+    POLLING_INTERVAL * POLLING_MAX_ATTEMPTS seconds.
+    """
+
+    def __init__(
+        self,
+        *,
+        workers: Optional[int] = None,
+        max_qps_per_provider: Optional[float] = None,
+        poll_interval: Optional[float] = None,
+        policy: Optional[PollingPolicy] = None,
+        safety_interval: Optional[float] = None,
+    ):
+        settings = get_settings()
+        self._workers = max(1, int(workers or settings.POLL_SCHEDULER_WORKERS))
+        self._max_qps = float(
+            max_qps_per_provider if max_qps_per_provider is not None else settings.POLL_MAX_QPS_PER_PROVIDER
+        )
+        self._poll_interval = float(poll_interval if poll_interval is not None else settings.POLLING_INTERVAL)
+        self._timeout = self._poll_interval * settings.POLLING_MAX_ATTEMPTS
+        self._safety_interval = float(
+            safety_interval if safety_interval is not None else settings.VIDEO_WEBHOOK_SAFETY_POLL_INTERVAL
+        )
+        if policy is None and settings.POLLING_ADAPTIVE:
+            policy = PollingPolicy()
+        self.policy = policy
+        self._providers: Dict[str, _ProviderQueue] = {}
+        self._entries: Dict[Tuple[str, str], _PollEntry] = {}
+        self._seq = itertools.count()
+        self._queue: Optional[asyncio.Queue[_PollEntry]] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._runners: List[asyncio.Task] = []
+
+    @property
+    def watched(self) -> int:
+        return len(self._entries)
+
+    def watch(
+        self,
+        provider: str,
+        client: BaseVideoClient,
+        remote_task_id: str,
+        callback: Optional[PollCallback] = None,
+        *,
+        policy_key: Optional[PolicyKey] = None,
+        elapsed: float = 0.0,
+        webhook: bool = False,
+    ) -> asyncio.Future:
+        """
+        Start polling `remote_task_id`; the returned future resolves with the final response.
+
+        `elapsed` is how long ago the remote task was submitted (non-zero when
+        resuming after a restart). Only tasks watched from submission feed
+        completion times back into the policy. `webhook` means the provider
+        was given a callback URL, so polling drops to the safety-net interval.
+        """
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        started_at = time.monotonic() - max(0.0, elapsed)
+        entry = _PollEntry(
+            provider,
+            client,
+            remote_task_id,
+            callback,
+            future,
+            policy_key if self.policy is not None else None,
+            started_at,
+            started_at + self._timeout,
+            resumed=elapsed > 0,
+            webhook=webhook,
+        )
+        key = (provider, remote_task_id)
+        self._entries[key] = entry
+        future.add_done_callback(lambda _: self._forget(key, entry))
+        # Fresh policy- or webhook-driven watches skip the pointless immediate poll;
+        # everything else checks right away.
+        fresh = not entry.resumed and (entry.policy_key is not None or entry.webhook)
+        self._schedule(entry, delay=self._next_delay(entry) if fresh else 0.0)
+        return future
+
+    async def deliver(self, provider: str, remote_task_id: str, response: Dict[str, Any]) -> bool:
+        """
+        Feed a status payload pushed by the provider (same shape as `query_task`).
+
+        Returns False when nothing is watching that remote task.
+        """
+        entry = self._entries.get((provider, remote_task_id))
+        if entry is None or entry.future.done():
+            return False
+        status, progress = self._parse(entry, response)
+        await self._handle_response(entry, response, status, progress, reschedule=False)
+        return True
+
+    def poll_now(self, provider: str, remote_task_id: str) -> bool:
+        """
+        Move the next status query of a watched remote task forward to now, e.g.
+        on a callback whose body cannot be trusted. Returns False when nothing
+        is watching that remote task.
+        """
+        entry = self._entries.get((provider, remote_task_id))
+        if entry is None or entry.future.done():
+            return False
+        self._schedule(entry, delay=0.0)
+        return True
+
+    async def stop(self) -> None:
+        runners, self._runners = self._runners, []
+        for runner in runners:
+            runner.cancel()
+        if runners:
+            await asyncio.gather(*runners, return_exceptions=True)
+        for queue in self._providers.values():
+            for due in queue.heap:
+                if not due.entry.future.done():
+                    due.entry.future.cancel()
+        self._providers.clear()
+        self._entries.clear()
+        self._queue = None
+        self._wakeup = None
+
+    def _ensure_started(self) -> None:
+        if self._runners:
+            return
+        self._queue = asyncio.Queue(maxsize=self._workers * 2)
+        self._wakeup = asyncio.Event()
+        self._runners.append(asyncio.create_task(self._dispatch_loop()))
+        for _ in range(self._workers):
+            self._runners.append(asyncio.create_task(self._worker_loop()))
+
+    def _forget(self, key: Tuple[str, str], entry: _PollEntry) -> None:
+        if self._entries.get(key) is entry:
+            del self._entries[key]
+
+    def _next_delay(self, entry: _PollEntry) -> float:
+        if entry.webhook:
+            return self._safety_interval
+        if entry.policy_key is None or self.policy is None:
+            return self._poll_interval
+        elapsed = time.monotonic() - entry.started_at
+        return self.policy.next_delay(entry.policy_key, elapsed, entry.progress)
+
+    def _schedule(self, entry: _PollEntry, delay: float) -> None:
+        queue = self._providers.get(entry.provider)
+        if queue is None:
+            queue = self._providers[entry.provider] = _ProviderQueue(self._max_qps)
+        # Only the latest schedule of an entry counts; earlier ones are skipped when due.
+        entry.due_seq = next(self._seq)
+        heapq.heappush(queue.heap, _DuePoll(time.monotonic() + delay, entry.due_seq, entry))
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _dispatch_loop(self) -> None:
+        assert self._queue is not None and self._wakeup is not None
+        while True:
+            # Clear before scanning so a poll scheduled while we dispatch is never missed.
+            self._wakeup.clear()
+            now = time.monotonic()
+            next_ready: Optional[float] = None
+
+            for queue in self._providers.values():
+                while queue.heap and queue.ready_at() <= now:
+                    due = heapq.heappop(queue.heap)
+                    entry = due.entry
+                    if entry.future.done() or due.seq != entry.due_seq:
+                        continue
+                    queue.next_allowed_at = max(now, queue.next_allowed_at) + queue.min_spacing
+                    await self._queue.put(entry)
+                    now = time.monotonic()
+                if queue.heap:
+                    ready = queue.ready_at()
+                    next_ready = ready if next_ready is None else min(next_ready, ready)
+
+            timeout = None if next_ready is None else max(0.0, next_ready - time.monotonic())
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _worker_loop(self) -> None:
+        assert self._queue is not None
+        while True:
+            entry = await self._queue.get()
+            try:
+                await self._poll_once(entry)
+            except Exception:
+                logger.exception("Unexpected error while polling %s task %s", entry.provider, entry.remote_task_id)
+            finally:
+                self._queue.task_done()
+
+    async def _poll_once(self, entry: _PollEntry) -> None:
+        if entry.future.done():
+            return
+
+        settings = get_settings()
+        try:
+            response = await entry.client.query_task(entry.remote_task_id)
+            status, progress = self._parse(entry, response)
+        except CircuitOpenError as exc:
+            # The provider is down, not the task: wait it out without spending retries.
+            self._schedule(entry, delay=max(self._poll_interval, exc.retry_after))
+            return
+        except Exception as exc:
+            entry.error_retries += 1
+            if entry.error_retries > settings.MAX_RETRIES:
+                self._settle(entry, exc=exc)
+            else:
+                self._schedule(entry, delay=self._poll_interval)
+            return
+
+        await self._handle_response(entry, response, status, progress, reschedule=True)
+
+    @staticmethod
+    def _parse(entry: _PollEntry, response: Dict[str, Any]) -> Tuple[TaskStatus, int]:
+        return entry.client.parse_status(response), int(response.get("progress", 0) or 0)
+
+    async def _handle_response(
+        self,
+        entry: _PollEntry,
+        response: Dict[str, Any],
+        status: TaskStatus,
+        progress: int,
+        *,
+        reschedule: bool,
+    ) -> None:
+        if entry.callback:
+            await invoke_callback(
+                entry.callback,
+                ProgressCallback(
+                    task_id=entry.remote_task_id,
+                    progress=progress,
+                    status=status,
+                    message=str(response.get("message", "") or ""),
+                ),
+            )
+
+        entry.progress = progress
+        if status == TaskStatus.COMPLETED:
+            if entry.policy_key is not None and self.policy is not None and not entry.resumed:
+                self.policy.observe(entry.policy_key, time.monotonic() - entry.started_at)
+            self._settle(entry, result=response)
+        elif status == TaskStatus.FAILED:
+            self._settle(entry, exc=RuntimeError(str(response.get("error") or "Task failed")))
+        elif status == TaskStatus.CANCELLED:
+            self._settle(entry, exc=RuntimeError("Task was cancelled"))
+        elif reschedule:
+            now = time.monotonic()
+            if now >= entry.deadline:
+                self._settle(
+                    entry,
+                    exc=TimeoutError(f"Task {entry.remote_task_id} polling timeout after {self._timeout:.0f}s"),
+                )
+            else:
+                self._schedule(entry, delay=min(self._next_delay(entry), entry.deadline - now))
+
+    @staticmethod
+    def _settle(entry: _PollEntry, *, result: Any = None, exc: Optional[BaseException] = None) -> None:
+        if entry.future.done():
+            return
+        if exc is not None:
+            entry.future.set_exception(exc)
+        else:
+            entry.future.set_result(result)
@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import random
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from app.config import get_settings
+
+# Starting guesses (seconds from submission to completion) until real samples arrive.
+DEFAULT_ETA_SECONDS: Dict[str, float] = {
+    "sora2": 180.0,
+    "veo": 120.0,
+    "seedance": 90.0,
+    "newmodel": 120.0,
+}
+FALLBACK_ETA_SECONDS = 120.0
+
+# Share of the predicted remaining time to wait before the next poll.
+REMAINING_FRACTION = 0.5
+# Share of the time a task has run past its expected duration to wait once it is overdue.
+OVERRUN_FRACTION = 0.25
+
+
+@dataclass(frozen=True)
+class PolicyKey:
+    model: str
+    duration: Optional[int] = None
+    resolution: Optional[str] = None
+
+
+class _Ewma:
+    __slots__ = ("value", "samples")
+
+    def __init__(self, value: float):
+        self.value = value
+        self.samples = 1
+
+    def update(self, sample: float, alpha: float) -> None:
+        self.value += alpha * (sample - self.value)
+        self.samples += 1
+
+
+class PollingPolicy:
+    """
+    Picks the delay before the next status query of a remote task.
+
+    Completion times of finished tasks are tracked as an EWMA per
+    (model, duration, resolution), falling back to the per-model average and
+    then to DEFAULT_ETA_SECONDS. The expected completion time is blended with
+    the one implied by the provider's reported progress, and the next poll is
+    scheduled at a fraction of the predicted remaining time: rarely while the
+    task is young, every `min_interval` once it is due. A task that runs past
+    its expected duration is polled less often again, in proportion to the
+    overrun, up to `max_interval`, so stuck or queued-upstream jobs do not
+    burn status calls. Jitter keeps tasks submitted together from polling in
+    lockstep.
+    """
+
+    def __init__(
+        self,
+        *,
+        min_interval: Optional[float] = None,
+        max_interval: Optional[float] = None,
+        jitter: Optional[float] = None,
+        alpha: float = 0.2,
+        rng: Optional[random.Random] = None,
+    ):
+        settings = get_settings()
+        self.min_interval = float(min_interval if min_interval is not None else settings.POLLING_MIN_INTERVAL)
+        self.max_interval = float(max_interval if max_interval is not None else settings.POLLING_MAX_INTERVAL)
+        self.jitter = float(jitter if jitter is not None else settings.POLLING_JITTER)
+        self.alpha = alpha
+        self._rng = rng or random.Random()
+        self._by_key: Dict[PolicyKey, _Ewma] = {}
+        self._by_model: Dict[str, _Ewma] = {}
+
+    def expected_duration(self, key: PolicyKey) -> float:
+        stats = self._by_key.get(key) or self._by_model.get(key.model)
+        if stats is not None:
+            return stats.value
+        return DEFAULT_ETA_SECONDS.get(key.model, FALLBACK_ETA_SECONDS)
+
+    def predict_eta(self, key: PolicyKey, elapsed: float, progress: Optional[int] = None) -> float:
+        """Predicted total seconds from submission to completion."""
+        expected = self.expected_duration(key)
+        if progress and 0 < progress < 100 and elapsed > 0:
+            # Early progress numbers are noisy; trust them more as they grow.
+            weight = progress / 100.0
+            expected = (1.0 - weight) * expected + weight * (elapsed * 100.0 / progress)
+        return expected
+
+    def next_delay(self, key: PolicyKey, elapsed: float, progress: Optional[int] = None) -> float:
+        remaining = self.predict_eta(key, elapsed, progress) - elapsed
+        overrun = elapsed - self.expected_duration(key)
+        delay = min(
+            self.max_interval,
+            max(self.min_interval, remaining * REMAINING_FRACTION, overrun * OVERRUN_FRACTION),
+        )
+        if self.jitter > 0:
+            delay *= self._rng.uniform(1.0 - self.jitter, 1.0 + self.jitter)
+        return delay
+
+    def observe(self, key: PolicyKey, elapsed: float) -> None:
+        """Record how long a finished task took, measured from submission."""
+        if elapsed <= 0:
+            return
+        for table, name in ((self._by_key, key), (self._by_model, key.model)):
+            stats = table.get(name)
+            if stats is None:
+                table[name] = _Ewma(elapsed)
+            else:
+                stats.update(elapsed, self.alpha)
+
+    def snapshot(self) -> Dict[Tuple[str, Optional[int], Optional[str]], Dict[str, float]]:
+        return {
+            (key.model, key.duration, key.resolution): {"eta_seconds": round(stats.value, 1), "samples": stats.samples}
+            for key, stats in self._by_key.items()
+        }
@@ -0,0 +1,170 @@
+"""
+Content-addressed storage for product images.
+
+Each distinct image a user uploads is stored once, under the storage key
+`products/{user_id}/blobs/{sha256}.{ext}`, and counted in
+`product_image_blobs`. Uploading the same bytes again (for example the same
+photo on a variant product) only bumps the reference count; deleting an image
+drops it, and the file goes away with the last reference.
+
+Files are written outside the database transaction, so callers follow two
+rules: after a rollback only blobs they created (`deduplicated=False`) may be
+removed, and a freed blob's file is unlinked only after the commit that
+deleted its row.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import re
+from dataclasses import dataclass
+from typing import Optional, Sequence
+
+from sqlalchemy import delete, insert, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.product_storage import (
+    ProductStorageError,
+    delete_product_image,
+    product_image_key_for_url,
+    save_product_blob,
+)
+from app.models.database import ProductImageBlob
+
+_BLOB_KEY_RE = re.compile(r"^products/(?P<user_id>[^/]+)/blobs/(?P<sha256>[0-9a-f]{64})\.(?:jpg|png)$")
+
+
+@dataclass(frozen=True)
+class ProductBlobRef:
+    sha256: str
+    image_url: str
+    size_bytes: int
+    # True when the user already stored these bytes: nothing new on disk, nothing new to charge.
+    deduplicated: bool
+
+
+def blob_extension(image_format: str) -> str:
+    fmt = (image_format or "").lower().lstrip(".")
+    if fmt in {"jpg", "jpeg"}:
+        return "jpg"
+    if fmt == "png":
+        return "png"
+    raise ProductStorageError(f"Unsupported image format: {image_format}")
+
+
+def parse_blob_image_url(image_url: str) -> Optional[tuple[str, str]]:
+    """Return `(user_id, sha256)` for a blob URL, None for any other image URL."""
+    key = product_image_key_for_url(image_url)
+    match = _BLOB_KEY_RE.match(key) if key is not None else None
+    if match is None:
+        return None
+    return match.group("user_id"), match.group("sha256")
+
+
+def _blob_key(user_id: str, sha256: str):
+    return (ProductImageBlob.user_id == user_id) & (ProductImageBlob.sha256 == sha256)
+
+
+async def _take_reference(db: AsyncSession, user_id: str, sha256: str, ext: str, size_bytes: int):
+    """
+    Insert the blob row with one reference, or add a reference to the existing
+    row, atomically; returns the row's (ext, size_bytes, ref_count).
+    """
+    values = dict(user_id=user_id, sha256=sha256, ext=ext, size_bytes=size_bytes, ref_count=1)
+    columns = (ProductImageBlob.ext, ProductImageBlob.size_bytes, ProductImageBlob.ref_count)
+    dialect_insert = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}.get(db.get_bind().dialect.name)
+    if dialect_insert is not None:
+        # INSERT ... ON CONFLICT DO UPDATE: concurrent first uploads of the same bytes cannot collide.
+        stmt = dialect_insert(ProductImageBlob).values(**values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[ProductImageBlob.user_id, ProductImageBlob.sha256],
+            set_={"ref_count": ProductImageBlob.ref_count + 1},
+        )
+        return (await db.execute(stmt.returning(*columns))).one()
+
+    bump = (
+        update(ProductImageBlob)
+        .where(_blob_key(user_id, sha256))
+        .values(ref_count=ProductImageBlob.ref_count + 1)
+        .returning(*columns)
+    )
+    while True:
+        row = (await db.execute(bump)).first()
+        if row is not None:
+            return row
+        try:
+            async with db.begin_nested():
+                await db.execute(insert(ProductImageBlob).values(**values))
+        except IntegrityError:
+            # Another transaction inserted it first; count ours on its row.
+            continue
+        return ext, size_bytes, 1
+
+
+async def acquire_product_blobs(
+    db: AsyncSession,
+    user_id: str,
+    images: Sequence[tuple[bytes, str]],
+) -> list[ProductBlobRef]:
+    """
+    Take a reference on the blob holding each `(image_data, image_format)`,
+    storing the ones that are new.
+
+    Reference counts are updated one by one in the caller's transaction
+    (nothing is committed here); the files are then written in parallel.
+    """
+    acquired: list[tuple[str, int, bool]] = []
+    writes = []
+    for image_data, image_format in images:
+        ext = blob_extension(image_format)
+        sha256 = hashlib.sha256(image_data).hexdigest()
+
+        ext, _, ref_count = await _take_reference(db, user_id, sha256, ext, len(image_data))
+        acquired.append((sha256, len(image_data), ref_count > 1))
+        # Existing blobs are written too when their file went missing (e.g. unlinked by a
+        # release that raced this upload); a present file is never rewritten.
+        writes.append(save_product_blob(user_id, sha256, image_data, ext))
+
+    results = await asyncio.gather(*writes, return_exceptions=True)
+    errors = [result for result in results if isinstance(result, BaseException)]
+    if errors:
+        # The caller rolls back; remove the new blobs that did get written.
+        for (_, _, deduplicated), result in zip(acquired, results):
+            if not deduplicated and isinstance(result, str):
+                try:
+                    await delete_product_image(result)
+                except ProductStorageError:
+                    pass
+        raise errors[0]
+
+    return [
+        ProductBlobRef(sha256=sha256, image_url=url, size_bytes=size_bytes, deduplicated=deduplicated)
+        for (sha256, size_bytes, deduplicated), url in zip(acquired, results)
+    ]
+
+
+async def acquire_product_blob(db: AsyncSession, user_id: str, image_data: bytes, image_format: str) -> ProductBlobRef:
+    """Single-image acquire_product_blobs."""
+    return (await acquire_product_blobs(db, user_id, [(image_data, image_format)]))[0]
+
+
+async def release_product_blob(db: AsyncSession, user_id: str, sha256: str) -> Optional[int]:
+    """
+    Drop one reference on a blob and return how many remain (None if the blob is unknown).
+
+    At zero the blob row is deleted in the caller's transaction; the caller
+    unlinks the file after commit.
+    """
+    remaining = (
+        await db.execute(
+            update(ProductImageBlob)
+            .where(_blob_key(user_id, sha256) & (ProductImageBlob.ref_count > 0))
+            .values(ref_count=ProductImageBlob.ref_count - 1)
+            .returning(ProductImageBlob.ref_count)
+        )
+    ).scalar_one_or_none()
+    if remaining == 0:
+        await db.execute(delete(ProductImageBlob).where(_blob_key(user_id, sha256) & (ProductImageBlob.ref_count == 0)))
+    return remaining
@@ -1,10 +1,11 @@
-import os
 import base64
 import io
-from pathlib import Path
-from typing import Tuple, Optional, Dict, Any
-from PIL import Image
-from uuid import uuid4
+import time
+from typing import Tuple, Optional, Dict, Any, Union
+from PIL import Image, ImageOps
+
+from app.config import get_settings
+from app.core.storage_backend import get_storage_backend
 
 
 class ProductStorageError(Exception):
@@ -12,18 +13,137 @@ class ProductStorageError(Exception):
     pass
 
 
-def get_products_upload_dir() -> Path:
-    """Get the base directory for product uploads"""
-    base_dir = Path("app/static/uploads/products")
-    base_dir.mkdir(parents=True, exist_ok=True)
-    return base_dir
+# EXIF tag holding the camera orientation (1 = upright).
+_EXIF_ORIENTATION = 0x0112
+
+
+class ImageProbe:
+    """
+    An uploaded image, parsed once.
 
+    Format, dimensions, mode and EXIF orientation come from the file header
+    when the probe is created; pixels are only decoded the first time
+    `pixels()` is called and then reused. Pass the probe (not the bytes)
+    through validation, LLM preparation and storage so an upload is never
+    parsed twice.
 
-def get_user_products_dir(user_id: str) -> Path:
-    """Get the directory for a specific user's product uploads"""
-    user_dir = get_products_upload_dir() / user_id
-    user_dir.mkdir(parents=True, exist_ok=True)
-    return user_dir
+    Pickles as the raw bytes plus header facts, so it can be handed to the
+    image worker pool, which decodes it there.
+
+    Raises:
+        ProductStorageError: If the bytes are not a recognizable image
+    """
+
+    def __init__(self, data: bytes):
+        self.data = data
+        image = self._open()
+        self.format = image.format.lower() if image.format else 'jpg'
+        self.width, self.height = image.size
+        self.mode = image.mode
+        try:
+            self.orientation = int(image.getexif().get(_EXIF_ORIENTATION, 1))
+        except Exception:
+            self.orientation = 1
+
+    def _open(self) -> Image.Image:
+        try:
+            self._image = Image.open(io.BytesIO(self.data))
+        except Exception as e:
+            raise ProductStorageError(f"Failed to detect image format: {str(e)}")
+        self._decoded = False
+        return self._image
+
+    @property
+    def size_bytes(self) -> int:
+        return len(self.data)
+
+    def pixels(self, draft_size: Optional[Tuple[int, int]] = None) -> Image.Image:
+        """
+        The decoded image (decoded on first use only).
+
+        `draft_size` lets JPEGs decode at 1/2, 1/4 or 1/8 scale when only a copy
+        at least that large is needed; it has no effect once pixels are decoded.
+        """
+        image = self._image if self._image is not None else self._open()
+        if not self._decoded:
+            if draft_size is not None and image.format == "JPEG":
+                image.draft("RGB", draft_size)
+            image.load()
+            self._decoded = True
+        return image
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = dict(self.__dict__)
+        state["_image"] = None
+        state["_decoded"] = False
+        return state
+
+
+def _as_probe(image: Union[bytes, ImageProbe]) -> ImageProbe:
+    return image if isinstance(image, ImageProbe) else ImageProbe(image)
+
+
+def _flatten_to_rgb(img: Image.Image) -> Image.Image:
+    """Convert to RGB for JPEG, compositing any transparency onto white."""
+    if img.mode in ('RGBA', 'LA', 'P'):
+        background = Image.new('RGB', img.size, (255, 255, 255))
+        if img.mode == 'P':
+            img = img.convert('RGBA')
+        background.paste(img, mask=img.split()[-1] if img.mode in ('RGBA', 'LA') else None)
+        return background
+    if img.mode != 'RGB':
+        return img.convert('RGB')
+    return img
+
+
+def _encode_jpeg(img: Image.Image, quality: int) -> bytes:
+    output = io.BytesIO()
+    img.save(output, format='JPEG', quality=quality, optimize=True)
+    return output.getvalue()
+
+
+def encode_jpeg_within(
+    img: Image.Image,
+    max_size_bytes: int,
+    max_quality: int = 85,
+    min_quality: int = 40,
+) -> Tuple[bytes, int, int]:
+    """
+    Encode an RGB image as the highest-quality JPEG that fits `max_size_bytes`.
+
+    Binary-searches quality between min_quality and max_quality (size grows
+    with quality), so it takes about log2(max - min) encodes instead of
+    stepping down one quality at a time. If even min_quality is too large,
+    that encode is returned.
+
+    Returns:
+        Tuple of (jpeg_bytes, quality, encode_attempts)
+    """
+    max_quality = max(1, min(95, int(max_quality)))
+    min_quality = max(1, min(max_quality, int(min_quality)))
+
+    data = _encode_jpeg(img, max_quality)
+    attempts = 1
+    if len(data) <= max_size_bytes:
+        return data, max_quality, attempts
+
+    best: Optional[Tuple[bytes, int]] = None
+    low, high = min_quality, max_quality - 1
+    while low <= high:
+        mid = (low + high) // 2
+        candidate = _encode_jpeg(img, mid)
+        attempts += 1
+        if len(candidate) <= max_size_bytes:
+            best, low = (candidate, mid), mid + 1
+        else:
+            high = mid - 1
+
+    if best is None:
+        if min_quality < max_quality:
+            # The search always tries min_quality last when nothing fits.
+            return candidate, min_quality, attempts
+        return data, max_quality, attempts
+    return best[0], best[1], attempts
 
 
 def compress_image_if_needed(
@@ -37,7 +157,8 @@ def compress_image_if_needed(
     Args:
         image_data: Original image bytes
         max_size_bytes: Maximum allowed size in bytes (default: 5MB)
-        quality: JPEG quality for compression (default: 85)
+        quality: Highest JPEG quality to use (default: 85); lower qualities
+            are searched until the image fits
 
     Returns:
         Tuple of (compressed_image_bytes, was_compressed)
@@ -49,28 +170,8 @@ def compress_image_if_needed(
         return image_data, False
 
     try:
-        # Open image
-        img = Image.open(io.BytesIO(image_data))
-
-        # Convert to RGB if necessary (for PNG with alpha channel)
-        if img.mode in ('RGBA', 'LA', 'P'):
-            background = Image.new('RGB', img.size, (255, 255, 255))
-            if img.mode == 'P':
-                img = img.convert('RGBA')
-            background.paste(img, mask=img.split()[-1] if img.mode in ('RGBA', 'LA') else None)
-            img = background
-
-        # Compress to JPEG
-        output = io.BytesIO()
-        img.save(output, format='JPEG', quality=quality, optimize=True)
-        compressed_data = output.getvalue()
-
-        # If still too large, reduce quality further
-        if len(compressed_data) > max_size_bytes and quality > 50:
-            output = io.BytesIO()
-            img.save(output, format='JPEG', quality=50, optimize=True)
-            compressed_data = output.getvalue()
-
+        img = _flatten_to_rgb(Image.open(io.BytesIO(image_data)))
+        compressed_data, _, _ = encode_jpeg_within(img, max_size_bytes, max_quality=quality)
         return compressed_data, True
 
     except Exception as e:
@@ -78,65 +179,87 @@ def compress_image_if_needed(
 
 
 def prepare_image_for_llm(
-    image_data: bytes,
-    max_size_bytes: int = 5 * 1024 * 1024,
-    quality: int = 85,
+    image: Union[bytes, ImageProbe],
+    max_size_bytes: Optional[int] = None,
+    quality: Optional[int] = None,
+    max_dimension: Optional[int] = None,
+    min_quality: Optional[int] = None,
 ) -> Tuple[bytes, Dict[str, Any]]:
     """
-    Prepare image bytes for LLM vision models.
+    Prepare an image for LLM vision models.
 
+    - Caps the longest side at max_dimension (vision models downsample
+      larger images anyway), honouring EXIF orientation.
     - Converts non-JPEG images to JPEG for compatibility.
-    - Compresses images larger than max_size_bytes.
+    - Picks the highest JPEG quality (at most `quality`) that fits max_size_bytes.
+
+    Limits default to the LLM_IMAGE_* settings.
+
+    Args:
+        image: Image bytes, or the ImageProbe already made for validation
 
     Returns:
         Tuple of (processed_image_bytes, preprocessing_metadata)
     """
-    original_size_bytes = len(image_data)
-    original_format = get_image_format(image_data)
+    settings = get_settings()
+    max_size_bytes = int(settings.LLM_IMAGE_MAX_BYTES if max_size_bytes is None else max_size_bytes)
+    quality = int(settings.LLM_IMAGE_MAX_QUALITY if quality is None else quality)
+    max_dimension = int(settings.LLM_IMAGE_MAX_DIMENSION if max_dimension is None else max_dimension)
+    min_quality = int(settings.LLM_IMAGE_MIN_QUALITY if min_quality is None else min_quality)
+
+    probe = _as_probe(image)
+    image_data = probe.data
+    original_size_bytes = probe.size_bytes
+    original_format = probe.format
 
     preprocessing: Dict[str, Any] = {
         "original_format": original_format,
         "original_size_bytes": original_size_bytes,
+        "original_width": probe.width,
+        "original_height": probe.height,
         "processed_format": original_format,
         "processed_size_bytes": original_size_bytes,
+        "processed_width": probe.width,
+        "processed_height": probe.height,
         "was_converted": False,
         "was_compressed": False,
-        "quality": quality,
+        "was_resized": False,
+        "quality": None,
+        "encode_attempts": 0,
+        "encode_ms": 0.0,
         "max_size_bytes": max_size_bytes,
+        "max_dimension": max_dimension,
     }
 
     needs_jpeg = original_format not in {"jpg", "jpeg"}
     needs_compress = original_size_bytes > max_size_bytes
+    needs_resize = max_dimension > 0 and max(probe.width, probe.height) > max_dimension
 
-    if not needs_jpeg and not needs_compress:
+    if not needs_jpeg and not needs_compress and not needs_resize:
         return image_data, preprocessing
 
     try:
-        img = Image.open(io.BytesIO(image_data))
-
-        if img.mode in ("RGBA", "LA", "P"):
-            background = Image.new("RGB", img.size, (255, 255, 255))
-            if img.mode == "P":
-                img = img.convert("RGBA")
-            background.paste(img, mask=img.split()[-1] if img.mode in ("RGBA", "LA") else None)
-            img = background
-        elif img.mode != "RGB":
-            img = img.convert("RGB")
-
-        output = io.BytesIO()
-        img.save(output, format="JPEG", quality=quality, optimize=True)
-        processed_data = output.getvalue()
-
-        # If still too large, reduce quality further.
-        if len(processed_data) > max_size_bytes and quality > 50:
-            output = io.BytesIO()
-            img.save(output, format="JPEG", quality=50, optimize=True)
-            processed_data = output.getvalue()
+        started = time.perf_counter()
+        box = (max_dimension, max_dimension) if needs_resize else None
+        # Re-encoding drops the EXIF orientation tag, so rotate the pixels upright.
+        img = ImageOps.exif_transpose(probe.pixels(draft_size=box))
+        if box is not None:
+            img.thumbnail(box, Image.Resampling.LANCZOS)
+        img = _flatten_to_rgb(img)
+
+        processed_data, used_quality, attempts = encode_jpeg_within(
+            img, max_size_bytes, max_quality=quality, min_quality=min_quality
+        )
 
         preprocessing["processed_format"] = "jpeg"
         preprocessing["processed_size_bytes"] = len(processed_data)
+        preprocessing["processed_width"], preprocessing["processed_height"] = img.size
         preprocessing["was_converted"] = needs_jpeg
         preprocessing["was_compressed"] = needs_compress
+        preprocessing["was_resized"] = needs_resize
+        preprocessing["quality"] = used_quality
+        preprocessing["encode_attempts"] = attempts
+        preprocessing["encode_ms"] = round((time.perf_counter() - started) * 1000, 1)
 
         return processed_data, preprocessing
 
@@ -144,7 +267,15 @@ def prepare_image_for_llm(
         raise ProductStorageError(f"Failed to prepare image for LLM: {str(e)}")
 
 
-def save_product_image(
+_CONTENT_TYPES = {"jpg": "image/jpeg", "jpeg": "image/jpeg", "png": "image/png"}
+
+
+def product_image_key(user_id: str, filename: str) -> str:
+    """Storage key of a product image file (see app.core.storage_backend)."""
+    return f"products/{user_id}/{filename}"
+
+
+async def save_product_image(
     user_id: str,
     product_id: str,
     image_data: bytes,
@@ -152,7 +283,7 @@ def save_product_image(
     image_id: Optional[str] = None,
 ) -> Tuple[str, int]:
     """
-    Save a product image to the file system.
+    Save a product image to the storage backend (atomically).
 
     Args:
         user_id: User ID who owns the product
@@ -162,70 +293,77 @@ def save_product_image(
         image_id: Optional image UUID (used for additional images)
 
     Returns:
-        Tuple of (relative_url, file_size_bytes)
+        Tuple of (image_url, file_size_bytes)
 
     Raises:
         ProductStorageError: If save operation fails
     """
+    # Normalize and validate format
+    fmt = (original_format or "").lower().lstrip(".")
+    if fmt not in _CONTENT_TYPES:
+        raise ProductStorageError(f"Failed to save product image: Unsupported image format: {original_format}")
+
+    filename_stem = product_id if not image_id else f"{product_id}-{image_id}"
+    key = product_image_key(user_id, f"{filename_stem}.{fmt}")
+    backend = get_storage_backend()
     try:
-        # Ensure user directory exists
-        user_dir = get_user_products_dir(user_id)
-
-        # Normalize and validate format
-        fmt = (original_format or "").lower().lstrip(".")
-        if fmt in {"jpg", "jpeg", "png"}:
-            ext = fmt
-        else:
-            raise ProductStorageError(f"Unsupported image format: {original_format}")
+        await backend.put(key, image_data, content_type=_CONTENT_TYPES[fmt])
+    except Exception as e:
+        raise ProductStorageError(f"Failed to save product image: {str(e)}")
+    return backend.url_for(key), len(image_data)
 
-        # Generate filename
-        filename_stem = product_id if not image_id else f"{product_id}-{image_id}"
-        filename = f"{filename_stem}.{ext}"
-        file_path = user_dir / filename
 
-        # Save image
-        with open(file_path, 'wb') as f:
-            f.write(image_data)
+async def save_product_blob(user_id: str, sha256: str, image_data: bytes, ext: str) -> str:
+    """
+    Store a content-addressed product image at `products/{user_id}/blobs/{sha256}.{ext}`.
 
-        # Generate relative URL
-        relative_url = f"/uploads/products/{user_id}/{filename}"
+    Written only when missing (concurrent uploads of the same bytes write it
+    once), and atomically, so a half-written file is never visible.
 
-        return relative_url, len(image_data)
+    Returns:
+        URL of the blob
 
+    Raises:
+        ProductStorageError: If save operation fails
+    """
+    if ext not in {"jpg", "png"}:
+        raise ProductStorageError(f"Unsupported image format: {ext}")
+    key = product_image_key(user_id, f"blobs/{sha256}.{ext}")
+    backend = get_storage_backend()
+    try:
+        await backend.put(key, image_data, content_type=_CONTENT_TYPES[ext], overwrite=False)
     except Exception as e:
         raise ProductStorageError(f"Failed to save product image: {str(e)}")
+    return backend.url_for(key)
+
 
+def product_image_key_for_url(image_url: str) -> Optional[str]:
+    """Storage key behind a product image URL, or None if it is not one."""
+    key = get_storage_backend().key_for_url(image_url)
+    if key is None or not key.startswith("products/"):
+        return None
+    return key
 
-def delete_product_image(image_url: str) -> bool:
+
+async def delete_product_image(image_url: str) -> bool:
     """
-    Delete a product image from the file system.
+    Delete a product image from the storage backend.
 
     Args:
-        image_url: Relative image URL (e.g., /uploads/products/{user_id}/{product_id}.jpg)
+        image_url: Image URL (e.g., /uploads/products/{user_id}/{product_id}.jpg)
 
     Returns:
-        True if deleted successfully, False if file doesn't exist
+        True if deleted successfully, False if the file doesn't exist or the
+        URL is not a product image
 
     Raises:
         ProductStorageError: If delete operation fails
     """
+    key = product_image_key_for_url(image_url)
+    if key is None:
+        return False
     try:
-        # Convert URL to file path
-        if image_url.startswith('/static/uploads/products/') or image_url.startswith('/uploads/products/'):
-            relative_path = image_url
-            if image_url.startswith("/static/"):
-                relative_path = image_url[len("/static/"):]
-            relative_path = relative_path.lstrip("/")
-            file_path = Path("app/static") / relative_path
-
-            if file_path.exists():
-                file_path.unlink()
-                return True
-            else:
-                return False
-        else:
-            return False
-
+        return await get_storage_backend().delete(key)
     except Exception as e:
         raise ProductStorageError(f"Failed to delete product image: {str(e)}")
 
@@ -275,8 +413,4 @@ def get_image_format(image_data: bytes) -> str:
     Raises:
         ProductStorageError: If format detection fails
     """
-    try:
-        img = Image.open(io.BytesIO(image_data))
-        return img.format.lower() if img.format else 'jpg'
-    except Exception as e:
-        raise ProductStorageError(f"Failed to detect image format: {str(e)}")
+    return ImageProbe(image_data).format
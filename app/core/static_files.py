@@ -1,11 +1,42 @@
 from __future__ import annotations
 
-from starlette.datastructures import Headers
+import asyncio
+import logging
+import math
+import stat
+from pathlib import Path
+
+import anyio
+from PIL import Image
+from starlette.datastructures import Headers, QueryParams
+from starlette.exceptions import HTTPException
 from starlette.responses import FileResponse, Response
 from starlette.staticfiles import NotModifiedResponse, StaticFiles
 from starlette.types import Scope
 
 from app.config import get_settings
+from app.core.image_executor import ImageExecutorBusyError, ImageJobTimeoutError, get_image_executor
+from app.core.image_variants import (
+    SOURCE_SUFFIXES,
+    VariantParamsError,
+    VariantSpec,
+    is_content_addressed,
+    parse_variant_params,
+    prune_variant_cache,
+    render_variant,
+    source_digest,
+    variant_cache_path,
+    use_cached_variant,
+    variant_key,
+    write_variant,
+)
+
+logger = logging.getLogger(__name__)
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# The variant cache is pruned once per this many renders (and after the first one).
+PRUNE_EVERY_RENDERS = 100
 
 
 class CacheControlStaticFiles(StaticFiles):
@@ -22,7 +53,7 @@ class CacheControlStaticFiles(StaticFiles):
             return settings.STATIC_CACHE_CONTROL
 
         if settings.ENV.lower() in {"prod", "production"}:
-            return "public, max-age=31536000, immutable"
+            return IMMUTABLE_CACHE_CONTROL
 
         return "no-store"
 
@@ -42,3 +73,107 @@ class CacheControlStaticFiles(StaticFiles):
             return NotModifiedResponse(response.headers)
         return response
 
+
+class ImageVariantStaticFiles(CacheControlStaticFiles):
+    """
+    Static files that also serve resized copies of images, e.g.
+    `/uploads/products/u/blobs/<sha>.png?w=320&fmt=webp`.
+
+    Variants are rendered in the image worker pool once per source content and
+    parameters, cached on disk, and served with a strong ETag. Sources whose
+    path is content-addressed never change, so their variants are immutable;
+    others are revalidated against the ETag. The cache is kept within
+    IMAGE_VARIANT_CACHE_MAX_BYTES / _MAX_AGE_SECONDS by pruning it as
+    renders add to it.
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._rendering: dict[str, asyncio.Future] = {}
+        self._renders_until_prune = 1
+        self._pruning: asyncio.Future | None = None
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        try:
+            spec = parse_variant_params(QueryParams(scope.get("query_string", b"")))
+        except VariantParamsError as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
+        if spec is None or not get_settings().IMAGE_VARIANTS_ENABLED:
+            return await super().get_response(path, scope)
+
+        if scope["method"] not in ("GET", "HEAD"):
+            raise HTTPException(status_code=405, headers={"Allow": "GET, HEAD"})
+        if Path(path).suffix.lower() not in SOURCE_SUFFIXES:
+            raise HTTPException(status_code=400, detail="Variants are only available for images")
+
+        try:
+            full_path, stat_result = await anyio.to_thread.run_sync(self.lookup_path, path)
+        except (OSError, ValueError):
+            raise HTTPException(status_code=404)
+        if not stat_result or not stat.S_ISREG(stat_result.st_mode):
+            raise HTTPException(status_code=404)
+
+        key = variant_key(await anyio.to_thread.run_sync(source_digest, full_path, stat_result), spec)
+        headers = {
+            "ETag": f'"{key}"',
+            "Cache-Control": IMMUTABLE_CACHE_CONTROL if is_content_addressed(path) else "public, no-cache",
+        }
+        if self.is_not_modified(Headers(headers), Headers(scope=scope)):
+            return NotModifiedResponse(Headers(headers))
+
+        cache_path = variant_cache_path(key, spec)
+        if not await anyio.to_thread.run_sync(use_cached_variant, cache_path):
+            await self._render(key, full_path, spec, cache_path)
+
+        response = FileResponse(cache_path, media_type=spec.media_type)
+        response.headers.update(headers)
+        return response
+
+    async def _render(self, key: str, full_path: str, spec: VariantSpec, cache_path: Path) -> None:
+        # One render per variant, however many requests ask for it at once; a client
+        # that disconnects does not cancel the render the others are waiting on.
+        task = self._rendering.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._render_to_cache(full_path, spec, cache_path))
+            self._rendering[key] = task
+            task.add_done_callback(lambda done: self._render_done(key, done))
+        await asyncio.shield(task)
+
+    def _render_done(self, key: str, task: asyncio.Future) -> None:
+        self._rendering.pop(key, None)
+        if not task.cancelled():
+            task.exception()
+
+    async def _render_to_cache(self, full_path: str, spec: VariantSpec, cache_path: Path) -> None:
+        try:
+            data = await get_image_executor().run(render_variant, full_path, spec.width, spec.height, spec.fmt, spec.quality)
+        except (ImageExecutorBusyError, ImageJobTimeoutError) as exc:
+            raise HTTPException(
+                status_code=503,
+                detail=str(exc),
+                headers={"Retry-After": str(math.ceil(getattr(exc, "retry_after", 1.0)))},
+            )
+        except (OSError, SyntaxError, ValueError, Image.DecompressionBombError):
+            # Pillow reports undecodable files as OSError (UnidentifiedImageError) or SyntaxError.
+            raise HTTPException(status_code=422, detail="Source file is not a valid image")
+        await anyio.to_thread.run_sync(write_variant, cache_path, data)
+        self._renders_until_prune -= 1
+        if self._renders_until_prune <= 0 and (self._pruning is None or self._pruning.done()):
+            self._renders_until_prune = PRUNE_EVERY_RENDERS
+            self._pruning = asyncio.ensure_future(self._prune())
+
+    async def _prune(self) -> None:
+        settings = get_settings()
+        try:
+            freed = await anyio.to_thread.run_sync(
+                lambda: prune_variant_cache(
+                    settings.IMAGE_VARIANT_CACHE_DIR,
+                    max_bytes=int(settings.IMAGE_VARIANT_CACHE_MAX_BYTES),
+                    max_age_seconds=float(settings.IMAGE_VARIANT_CACHE_MAX_AGE_SECONDS),
+                )
+            )
+        except OSError:
+            logger.exception("Failed to prune the image variant cache")
+            return
+        if freed:
+            logger.info("Pruned %d bytes from the image variant cache", freed)
@@ -0,0 +1,410 @@
+"""
+Where uploaded files live: the local filesystem (served from /uploads) or an
+S3-compatible bucket, behind one async interface.
+
+Keys are relative paths such as `products/{user_id}/{file}`. Every write is
+atomic: readers see either the old object or the complete new one.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import hmac
+import os
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from functools import lru_cache, partial
+from pathlib import Path, PurePosixPath
+from typing import Any, AsyncIterator, Callable, Dict, Mapping, Optional, TypeVar
+from urllib.parse import quote, unquote, urlsplit
+from uuid import uuid4
+
+import httpx
+
+from app.config import get_settings
+from app.core.http_clients import get_http_client
+
+T = TypeVar("T")
+
+CHUNK_SIZE = 64 * 1024
+
+_EMPTY_SHA256 = hashlib.sha256(b"").hexdigest()
+
+
+class StorageBackendError(Exception):
+    """A storage operation failed (I/O error or unexpected response from the store)."""
+
+
+def normalize_key(key: str) -> str:
+    """Validate an object key; rejects absolute paths and `..` segments."""
+    value = str(key or "").replace("\\", "/")
+    parts = PurePosixPath(value).parts
+    if not value or value.startswith("/") or any(part in {"", ".", ".."} for part in parts):
+        raise ValueError(f"Invalid storage key: {key!r}")
+    return "/".join(parts)
+
+
+class StorageBackend(ABC):
+    @abstractmethod
+    async def put(self, key: str, data: bytes, *, content_type: Optional[str] = None, overwrite: bool = True) -> bool:
+        """Store `data` atomically. With `overwrite=False` an existing object is kept and False returned."""
+
+    @abstractmethod
+    async def get(self, key: str) -> bytes:
+        """Object contents; raises FileNotFoundError if missing."""
+
+    async def iter_chunks(self, key: str, chunk_size: int = CHUNK_SIZE) -> AsyncIterator[bytes]:
+        """Object contents in chunks, for streaming responses; raises FileNotFoundError if missing."""
+        data = await self.get(key)
+        for start in range(0, len(data), chunk_size):
+            yield data[start:start + chunk_size]
+
+    @abstractmethod
+    async def exists(self, key: str) -> bool: ...
+
+    @abstractmethod
+    async def delete(self, key: str) -> bool:
+        """Remove an object; False if it did not exist."""
+
+    @abstractmethod
+    def url_for(self, key: str) -> str:
+        """URL clients fetch the object from."""
+
+    @abstractmethod
+    def key_for_url(self, url: str) -> Optional[str]:
+        """Inverse of url_for; None for URLs this backend does not serve."""
+
+    def close(self) -> None:
+        pass
+
+
+class LocalStorageBackend(StorageBackend):
+    """
+    Files under `root`, served at `url_prefix` by the static mount.
+
+    Blocking filesystem calls run on a small dedicated thread pool so they
+    never stall the event loop. Directories this process created are
+    remembered, so steady-state writes skip the mkdir syscalls.
+    """
+
+    def __init__(self, root: str, *, url_prefix: str = "/uploads", max_workers: Optional[int] = None):
+        settings = get_settings()
+        self.root = Path(root)
+        self.url_prefix = url_prefix.rstrip("/")
+        self._executor = ThreadPoolExecutor(
+            max_workers=int(settings.STORAGE_IO_WORKERS if max_workers is None else max_workers),
+            thread_name_prefix="storage-io",
+        )
+        self._dirs: set[str] = set()
+        self._dirs_lock = threading.Lock()
+
+    def _path(self, key: str) -> Path:
+        return self.root / normalize_key(key)
+
+    async def _run(self, fn: Callable[..., T], *args: Any) -> T:
+        return await asyncio.get_running_loop().run_in_executor(self._executor, partial(fn, *args))
+
+    def _ensure_dir(self, directory: Path) -> None:
+        name = str(directory)
+        if name in self._dirs:
+            return
+        directory.mkdir(parents=True, exist_ok=True)
+        with self._dirs_lock:
+            self._dirs.add(name)
+
+    def _write_tmp(self, path: Path, data: bytes) -> Path:
+        self._ensure_dir(path.parent)
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{uuid4().hex}.tmp")
+        try:
+            tmp_path.write_bytes(data)
+        except FileNotFoundError:
+            # The directory was removed behind our back; forget it and create it again.
+            with self._dirs_lock:
+                self._dirs.discard(str(path.parent))
+            self._ensure_dir(path.parent)
+            tmp_path.write_bytes(data)
+        return tmp_path
+
+    def _put(self, path: Path, data: bytes, overwrite: bool) -> bool:
+        tmp_path = self._write_tmp(path, data)
+        try:
+            if overwrite:
+                os.replace(tmp_path, path)
+                return True
+            try:
+                # link() fails if the target exists, unlike rename(): an atomic "create if absent".
+                os.link(tmp_path, path)
+            except FileExistsError:
+                return False
+            return True
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+    @staticmethod
+    def _delete(path: Path) -> bool:
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            return False
+        return True
+
+    async def put(self, key: str, data: bytes, *, content_type: Optional[str] = None, overwrite: bool = True) -> bool:
+        path = self._path(key)
+        try:
+            return await self._run(self._put, path, data, overwrite)
+        except OSError as exc:
+            raise StorageBackendError(f"Failed to write {key}: {exc}") from exc
+
+    async def get(self, key: str) -> bytes:
+        return await self._run(self._path(key).read_bytes)
+
+    async def iter_chunks(self, key: str, chunk_size: int = CHUNK_SIZE) -> AsyncIterator[bytes]:
+        f = await self._run(open, self._path(key), "rb")
+        try:
+            while True:
+                chunk = await self._run(f.read, chunk_size)
+                if not chunk:
+                    return
+                yield chunk
+        finally:
+            await self._run(f.close)
+
+    async def exists(self, key: str) -> bool:
+        return await self._run(self._path(key).is_file)
+
+    async def delete(self, key: str) -> bool:
+        path = self._path(key)
+        try:
+            return await self._run(self._delete, path)
+        except OSError as exc:
+            raise StorageBackendError(f"Failed to delete {key}: {exc}") from exc
+
+    def url_for(self, key: str) -> str:
+        return f"{self.url_prefix}/{normalize_key(key)}"
+
+    def key_for_url(self, url: str) -> Optional[str]:
+        value = str(url or "").strip()
+        if value.startswith("/static/"):
+            value = value[len("/static"):]
+        prefix = f"{self.url_prefix}/"
+        if not value.startswith(prefix):
+            return None
+        try:
+            return normalize_key(value[len(prefix):])
+        except ValueError:
+            return None
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False)
+
+
+def _hmac(key: bytes, msg: str) -> bytes:
+    return hmac.new(key, msg.encode("utf-8"), hashlib.sha256).digest()
+
+
+def sign_v4(
+    method: str,
+    url: str,
+    headers: Mapping[str, str],
+    payload_sha256: str,
+    *,
+    access_key_id: str,
+    secret_access_key: str,
+    region: str,
+    service: str = "s3",
+    now: Optional[datetime] = None,
+) -> Dict[str, str]:
+    """
+    AWS Signature Version 4 for a request without query parameters.
+
+    Returns `headers` plus host, x-amz-date, x-amz-content-sha256 and
+    Authorization; every header passed in is signed.
+    """
+    now = (now or datetime.now(timezone.utc)).astimezone(timezone.utc)
+    amz_date = now.strftime("%Y%m%dT%H%M%SZ")
+    datestamp = now.strftime("%Y%m%d")
+    parts = urlsplit(url)
+
+    signed = {name.lower(): str(value).strip() for name, value in headers.items()}
+    signed["host"] = parts.netloc
+    signed["x-amz-date"] = amz_date
+    signed["x-amz-content-sha256"] = payload_sha256
+    names = sorted(signed)
+    canonical_headers = "".join(f"{name}:{signed[name]}\n" for name in names)
+    signed_headers = ";".join(names)
+
+    canonical_request = "\n".join(
+        [method.upper(), parts.path or "/", parts.query, canonical_headers, signed_headers, payload_sha256]
+    )
+    scope = f"{datestamp}/{region}/{service}/aws4_request"
+    string_to_sign = "\n".join(
+        ["AWS4-HMAC-SHA256", amz_date, scope, hashlib.sha256(canonical_request.encode("utf-8")).hexdigest()]
+    )
+    key = _hmac(_hmac(_hmac(_hmac(f"AWS4{secret_access_key}".encode("utf-8"), datestamp), region), service), "aws4_request")
+    signature = hmac.new(key, string_to_sign.encode("utf-8"), hashlib.sha256).hexdigest()
+
+    result = dict(headers)
+    result["x-amz-date"] = amz_date
+    result["x-amz-content-sha256"] = payload_sha256
+    result["Authorization"] = (
+        f"AWS4-HMAC-SHA256 Credential={access_key_id}/{scope}, SignedHeaders={signed_headers}, Signature={signature}"
+    )
+    return result
+
+
+class S3StorageBackend(StorageBackend):
+    """
+    Objects in an S3-compatible bucket (AWS S3, MinIO, R2, ...), addressed
+    path-style as `{endpoint_url}/{bucket}/{key}` and signed with SigV4.
+
+    Uses the shared pooled HTTP clients. Single PUTs are atomic on S3;
+    `overwrite=False` maps to a conditional `If-None-Match: *` write.
+    """
+
+    def __init__(
+        self,
+        *,
+        endpoint_url: str,
+        bucket: str,
+        access_key_id: str,
+        secret_access_key: str,
+        region: str = "us-east-1",
+        public_base_url: Optional[str] = None,
+    ):
+        self.endpoint_url = endpoint_url.rstrip("/")
+        self.bucket = bucket
+        self.access_key_id = access_key_id
+        self.secret_access_key = secret_access_key
+        self.region = region
+        self.public_base_url = (public_base_url or f"{self.endpoint_url}/{bucket}").rstrip("/")
+
+    def _object_url(self, key: str) -> str:
+        return f"{self.endpoint_url}/{self.bucket}/{quote(normalize_key(key), safe='/-_.~')}"
+
+    def _signed(
+        self,
+        method: str,
+        key: str,
+        content: bytes = b"",
+        headers: Optional[Mapping[str, str]] = None,
+    ) -> tuple[str, Dict[str, str]]:
+        url = self._object_url(key)
+        payload_sha256 = hashlib.sha256(content).hexdigest() if content else _EMPTY_SHA256
+        signed = sign_v4(
+            method,
+            url,
+            dict(headers or {}),
+            payload_sha256,
+            access_key_id=self.access_key_id,
+            secret_access_key=self.secret_access_key,
+            region=self.region,
+        )
+        return url, signed
+
+    async def _request(
+        self,
+        method: str,
+        key: str,
+        content: bytes = b"",
+        headers: Optional[Mapping[str, str]] = None,
+    ) -> httpx.Response:
+        url, signed = self._signed(method, key, content, headers)
+        try:
+            return await get_http_client(url).request(method, url, content=content or None, headers=signed)
+        except httpx.HTTPError as exc:
+            raise StorageBackendError(f"{method} {key} failed: {exc}") from exc
+
+    @staticmethod
+    def _error(method: str, key: str, response: httpx.Response) -> StorageBackendError:
+        return StorageBackendError(f"{method} {key} failed with HTTP {response.status_code}: {response.text[:200]}")
+
+    async def put(self, key: str, data: bytes, *, content_type: Optional[str] = None, overwrite: bool = True) -> bool:
+        headers = {"Content-Type": content_type or "application/octet-stream"}
+        if not overwrite:
+            headers["If-None-Match"] = "*"
+        response = await self._request("PUT", key, data, headers)
+        if response.status_code == 412 and not overwrite:
+            return False
+        if response.status_code >= 300:
+            raise self._error("PUT", key, response)
+        return True
+
+    async def get(self, key: str) -> bytes:
+        response = await self._request("GET", key)
+        if response.status_code == 404:
+            raise FileNotFoundError(key)
+        if response.status_code >= 300:
+            raise self._error("GET", key, response)
+        return response.content
+
+    async def iter_chunks(self, key: str, chunk_size: int = CHUNK_SIZE) -> AsyncIterator[bytes]:
+        url, signed = self._signed("GET", key)
+        try:
+            async with get_http_client(url).stream("GET", url, headers=signed) as response:
+                if response.status_code == 404:
+                    raise FileNotFoundError(key)
+                if response.status_code >= 300:
+                    await response.aread()
+                    raise self._error("GET", key, response)
+                async for chunk in response.aiter_bytes(chunk_size):
+                    yield chunk
+        except httpx.HTTPError as exc:
+            raise StorageBackendError(f"GET {key} failed: {exc}") from exc
+
+    async def exists(self, key: str) -> bool:
+        response = await self._request("HEAD", key)
+        if response.status_code == 404:
+            return False
+        if response.status_code >= 300:
+            raise self._error("HEAD", key, response)
+        return True
+
+    async def delete(self, key: str) -> bool:
+        # S3 answers DELETE with 204 whether or not the object existed.
+        if not await self.exists(key):
+            return False
+        response = await self._request("DELETE", key)
+        if response.status_code >= 300 and response.status_code != 404:
+            raise self._error("DELETE", key, response)
+        return True
+
+    def url_for(self, key: str) -> str:
+        return f"{self.public_base_url}/{quote(normalize_key(key), safe='/-_.~')}"
+
+    def key_for_url(self, url: str) -> Optional[str]:
+        value = str(url or "").strip()
+        prefix = f"{self.public_base_url}/"
+        if not value.startswith(prefix):
+            return None
+        try:
+            return normalize_key(unquote(value[len(prefix):]))
+        except ValueError:
+            return None
+
+
+@lru_cache()
+def get_storage_backend() -> StorageBackend:
+    settings = get_settings()
+    kind = (settings.STORAGE_BACKEND or "local").lower()
+    if kind == "s3":
+        if not settings.S3_ENDPOINT_URL or not settings.S3_BUCKET:
+            raise StorageBackendError("STORAGE_BACKEND=s3 requires S3_ENDPOINT_URL and S3_BUCKET")
+        return S3StorageBackend(
+            endpoint_url=settings.S3_ENDPOINT_URL,
+            bucket=settings.S3_BUCKET,
+            access_key_id=settings.S3_ACCESS_KEY_ID or "",
+            secret_access_key=settings.S3_SECRET_ACCESS_KEY or "",
+            region=settings.S3_REGION,
+            public_base_url=settings.S3_PUBLIC_BASE_URL,
+        )
+    if kind != "local":
+        raise StorageBackendError(f"Unknown STORAGE_BACKEND: {settings.STORAGE_BACKEND}")
+    return LocalStorageBackend(settings.STORAGE_LOCAL_ROOT)
+
+
+def shutdown_storage_backend() -> None:
+    if get_storage_backend.cache_info().currsize:
+        get_storage_backend().close()
+        get_storage_backend.cache_clear()
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+
+from app.models.schemas import TaskResponse
+
+
+def task_fingerprint(task: TaskResponse) -> tuple:
+    """The fields a client sees change; two responses with equal fingerprints are the same update."""
+    return (task.status, task.progress, task.message, task.error, task.video_url, task.updated_at)
+
+
+@dataclass(frozen=True)
+class TaskEvent:
+    task_id: str
+    # "progress" (same status, new progress/message), "status" (status transition) or "final" (terminal status)
+    kind: str
+    task: TaskResponse
+
+
+class TaskSubscription:
+    """Events for a fixed set of task ids, buffered until read. Use as a context manager."""
+
+    def __init__(self, bus: TaskEventBus, task_ids: Iterable[str], maxsize: int):
+        self.task_ids = frozenset(task_ids)
+        self._bus = bus
+        self._queue: asyncio.Queue[TaskEvent] = asyncio.Queue(maxsize=maxsize)
+        self._seen: Dict[str, tuple] = {}
+
+    def seed(self, task: TaskResponse) -> None:
+        """Record state the reader already has, so an identical event is not delivered again."""
+        self._seen[task.task_id] = task_fingerprint(task)
+
+    def _push(self, event: TaskEvent) -> None:
+        if self._queue.full():
+            # Slow reader: drop the oldest event; later events carry the newer state anyway.
+            self._queue.get_nowait()
+        self._queue.put_nowait(event)
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[TaskEvent]:
+        """Next event, or None if `timeout` seconds pass first."""
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        while True:
+            remaining = None if deadline is None else max(0.0, deadline - loop.time())
+            try:
+                event = await asyncio.wait_for(self._queue.get(), timeout=remaining)
+            except asyncio.TimeoutError:
+                return None
+            fingerprint = task_fingerprint(event.task)
+            if self._seen.get(event.task_id) == fingerprint:
+                continue
+            self._seen[event.task_id] = fingerprint
+            return event
+
+    def close(self) -> None:
+        self._bus._unsubscribe(self)
+
+    def __enter__(self) -> TaskSubscription:
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+
+class TaskEventBus:
+    """
+    In-process fan-out of task state changes.
+
+    TaskManager publishes once per change; every subscriber watching that task
+    gets the event, so any number of SSE/long-poll clients share the one
+    upstream poll.
+    """
+
+    def __init__(self, queue_size: int = 100):
+        self._queue_size = queue_size
+        self._subscribers: Dict[str, List[TaskSubscription]] = {}
+
+    def subscribe(self, task_ids: Iterable[str]) -> TaskSubscription:
+        subscription = TaskSubscription(self, task_ids, self._queue_size)
+        for task_id in subscription.task_ids:
+            self._subscribers.setdefault(task_id, []).append(subscription)
+        return subscription
+
+    def has_subscribers(self, task_id: str) -> bool:
+        return task_id in self._subscribers
+
+    def subscribed_task_ids(self) -> List[str]:
+        return list(self._subscribers)
+
+    def publish(self, event: TaskEvent) -> None:
+        for subscription in self._subscribers.get(event.task_id, ()):
+            subscription._push(event)
+
+    def _unsubscribe(self, subscription: TaskSubscription) -> None:
+        for task_id in subscription.task_ids:
+            subscribers = self._subscribers.get(task_id)
+            if not subscribers:
+                continue
+            try:
+                subscribers.remove(subscription)
+            except ValueError:
+                pass
+            if not subscribers:
+                del self._subscribers[task_id]
@@ -1,8 +1,9 @@
 from __future__ import annotations
 
 import asyncio
+import logging
 from datetime import datetime
-from typing import Callable, Dict, Optional
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
 from uuid import uuid4
 
 from app.clients.new_model_client import NewModelClient
@@ -10,19 +11,75 @@ from app.clients.seedance_client import SeedanceClient
 from app.clients.sora_client import Sora2Client
 from app.clients.veo_client import VeoClient
 from app.config import get_settings
+from app.core.admission import get_admission
 from app.core.base_client import BaseVideoClient
-from app.core.polling import TaskPoller
-from app.models.schemas import ModelType, ProgressCallback, TaskResponse, TaskStatus, VideoGenerationRequest
+from app.core.datetime_utils import as_utc, utc_now
+from app.core.fair_scheduler import FairScheduler
+from app.core.idempotency import Idempotency, blob_digest
+from app.core.job_queue import JobQueue
+from app.core.key_pool import get_key_pools, with_api_key
+from app.core.poll_scheduler import PollScheduler
+from app.core.polling import invoke_callback
+from app.core.polling_policy import PolicyKey
+from app.core.task_events import TaskEvent, TaskEventBus, task_fingerprint
+from app.core.task_registry import TaskRegistry
+from app.core.task_store import TERMINAL_STATUSES, TaskStore, row_to_request, row_to_response
+from app.core.webhooks import get_callback_url
+from app.models.database import TaskStatusDB, VideoTask
+from app.models.schemas import ModelType, ProgressCallback, TaskPriority, TaskResponse, TaskStatus, VideoGenerationRequest
+
+logger = logging.getLogger(__name__)
+
+
+def _age_seconds(created_at: datetime) -> float:
+    now = utc_now() if created_at.tzinfo else datetime.now()
+    return max(0.0, (now - (as_utc(created_at) if created_at.tzinfo else created_at)).total_seconds())
 
 
 class TaskManager:
     def __init__(self, api_key: str):
         settings = get_settings()
         self.api_key = api_key
+        self.max_concurrent_tasks = settings.MAX_CONCURRENT_TASKS
         self.tasks: Dict[str, asyncio.Task] = {}
-        self.results: Dict[str, TaskResponse] = {}
-        self.task_owners: Dict[str, str] = {}
-        self.semaphore = asyncio.Semaphore(settings.MAX_CONCURRENT_TASKS)
+        self.registry = TaskRegistry()
+        self.scheduler = FairScheduler(settings.MAX_CONCURRENT_TASKS)
+        self.store: Optional[TaskStore] = None
+        self.queue: Optional[JobQueue] = None
+        self.poll_scheduler = PollScheduler()
+        self._poll_clients: Dict[Tuple[ModelType, str], BaseVideoClient] = {}
+        # task id -> (model, remote task id, client) while the remote job is being watched.
+        self._remote_tasks: Dict[str, Tuple[ModelType, str, BaseVideoClient]] = {}
+        # Remote jobs we stopped tracking but could not cancel yet: (model, remote id) -> (client, attempts).
+        self._orphans: Dict[Tuple[ModelType, str], Tuple[BaseVideoClient, int]] = {}
+        self._reconciler: Optional[asyncio.Task] = None
+        self.remote_cancel_retry_interval = settings.REMOTE_CANCEL_RETRY_INTERVAL
+        self.remote_cancel_max_attempts = settings.REMOTE_CANCEL_MAX_ATTEMPTS
+        self.events = TaskEventBus()
+        self.idempotency: Idempotency[str] = Idempotency()
+        # JobQueue mode: rows leased to this worker, and background loops.
+        self._leased: Set[str] = set()
+        self._queue_runners: List[asyncio.Task] = []
+        self._followed: Dict[str, tuple] = {}
+
+    def attach_store(self, store: TaskStore) -> None:
+        self.store = store
+
+    def attach_queue(self, queue: JobQueue) -> None:
+        """
+        Switch to multi-worker mode: new tasks go to the shared queue and this
+        worker runs whatever it leases from it. Requires an attached store
+        created with `lease_owner=queue.worker_id`.
+        """
+        if self.store is None:
+            raise RuntimeError("JobQueue mode needs a TaskStore")
+        self.queue = queue
+        self._queue_runners = [
+            asyncio.create_task(self._claim_loop()),
+            asyncio.create_task(self._heartbeat_loop()),
+            asyncio.create_task(self._follow_loop()),
+            asyncio.create_task(self._callback_loop()),
+        ]
 
     def _get_client(self, model: ModelType, api_key: Optional[str] = None) -> BaseVideoClient:
         client_map = {
@@ -36,28 +93,94 @@ class TaskManager:
             raise ValueError(f"Unsupported model: {model}")
         return client_class(api_key or self.api_key)
 
+    def _get_poll_client(self, model: ModelType, api_key: Optional[str] = None) -> BaseVideoClient:
+        # Status queries for the same provider/key share one client (and its connection pool).
+        key = (model, api_key or self.api_key)
+        client = self._poll_clients.get(key)
+        if client is None:
+            client = self._poll_clients[key] = self._get_client(model, api_key)
+        return client
+
     async def create_task(
         self,
         request: VideoGenerationRequest,
         callback: Optional[Callable[[ProgressCallback], None]] = None,
         api_key: Optional[str] = None,
         owner_user_id: Optional[str] = None,
+        priority: TaskPriority = TaskPriority.BATCH,
+        idempotency_key: Optional[str] = None,
     ) -> str:
-        task_id = str(uuid4())
-        if owner_user_id:
-            self.task_owners[task_id] = str(owner_user_id)
+        """
+        Start a task and return its id. A duplicate of a request that is in flight
+        (same `idempotency_key`, or same content shortly after) gets the existing
+        task id instead of a second upstream generation.
 
-        now = datetime.now()
-        self.results[task_id] = TaskResponse(
-            task_id=task_id,
-            status=TaskStatus.PENDING,
-            progress=0,
-            created_at=now,
-            updated_at=now,
+        Raises QueueFullError when the owner already has too many tasks waiting
+        for a slot, and IdempotencyConflictError when `idempotency_key` was used
+        for a different request.
+        """
+        if callback is not None:
+            # In-process callbacks belong to one caller and cannot be shared.
+            return await self._create_task(request, callback, api_key, owner_user_id, priority)
+
+        payload = {
+            "request": request.model_dump(mode="json"),
+            "api_key": blob_digest(api_key.encode()) if api_key else None,
+        }
+        return await self.idempotency.run(
+            owner_user_id,
+            payload,
+            lambda: self._create_task(request, None, api_key, owner_user_id, priority),
+            idempotency_key=idempotency_key,
+            reusable=self._reusable_task,
         )
 
-        async_task = asyncio.create_task(self._execute_task(task_id, request, callback, api_key))
+    def _reusable_task(self, task_id: str) -> bool:
+        record = self.registry.get(task_id)
+        return record is None or record.status not in (TaskStatus.FAILED, TaskStatus.CANCELLED)
+
+    async def _create_task(
+        self,
+        request: VideoGenerationRequest,
+        callback: Optional[Callable[[ProgressCallback], None]],
+        api_key: Optional[str],
+        owner_user_id: Optional[str],
+        priority: TaskPriority,
+    ) -> str:
+        task_id = str(uuid4())
+        now = datetime.now()
+
+        if self.queue is not None and not (api_key or callback):
+            # Any worker may run it; ours is nudged so an idle slot here picks it up at once.
+            # The per-owner limit and fair order apply to the shared queue, not just this worker.
+            self.scheduler.check_admission(owner_user_id, queued=await self.queue.queued_count(owner_user_id))
+            queue_tag = await self.queue.next_tag(owner_user_id, self.scheduler.flow_step(owner_user_id, priority))
+            await self.store.insert(
+                task_id, request, owner_user_id=owner_user_id, created_at=now, queue_tag=queue_tag
+            )
+            self.queue.wake()
+            return task_id
+
+        self.scheduler.check_admission(owner_user_id)
+        self.registry.add(task_id, owner=owner_user_id, created_at=now)
+        self._evict_finished()
+
+        if self.store:
+            # A per-request API key or in-process callback cannot travel through the
+            # queue, so such tasks are leased to this worker right away.
+            lease_expires_at = self.queue.lease_deadline() if self.queue is not None else None
+            await self.store.insert(
+                task_id,
+                request,
+                owner_user_id=owner_user_id,
+                created_at=now,
+                lease_expires_at=lease_expires_at,
+            )
+
+        async_task = asyncio.create_task(self._execute_task(task_id, request, callback, api_key, priority))
         self.tasks[task_id] = async_task
+        if self.queue is not None:
+            self._track_lease(task_id, async_task)
 
         return task_id
 
@@ -67,49 +190,337 @@ class TaskManager:
         request: VideoGenerationRequest,
         callback: Optional[Callable[[ProgressCallback], None]],
         api_key: Optional[str] = None,
+        priority: TaskPriority = TaskPriority.BATCH,
     ) -> None:
-        async with self.semaphore:
-            client: Optional[BaseVideoClient] = None
+        async with self.scheduler.slot(task_id, self.owner_of(task_id), priority):
             try:
                 self._update_task_status(task_id, TaskStatus.PROCESSING, progress=0)
 
-                client = self._get_client(request.model, api_key)
+                remote_task_id, webhook, api_key = await self._submit_remote_task(task_id, request, api_key)
 
-                extra_params = dict(request.extra_params or {})
-                if request.model == ModelType.SORA2:
-                    remote_task_id = await client.create_video(
-                        prompt=request.prompt,
-                        image=request.image,
-                        duration=request.duration,
-                        aspect_ratio=request.aspect_ratio,
-                        **extra_params,
-                    )
-                else:
-                    remote_task_id = await client.create_video(
-                        prompt=request.prompt,
-                        image=request.image,
-                        duration=request.duration,
-                        aspect_ratio=request.aspect_ratio,
-                        resolution=request.resolution,
-                        **extra_params,
+                if self.store:
+                    # The key itself is never stored; whoever resumes the task looks it up again.
+                    await self.store.record_remote_task_id(
+                        task_id, remote_task_id, api_key_id=get_key_pools().pooled_key_id(api_key)
                     )
 
-                poller = TaskPoller(client, remote_task_id, callback)
-                result = await poller.poll_until_complete()
+                await self._poll_remote_task(
+                    task_id,
+                    request.model,
+                    remote_task_id,
+                    callback,
+                    api_key,
+                    policy_key=self._policy_key(request),
+                    webhook=webhook,
+                )
+            except Exception as e:
+                self._update_task_status(task_id, TaskStatus.FAILED, error=str(e))
+                raise
+
+    async def _submit_remote_task(
+        self,
+        task_id: str,
+        request: VideoGenerationRequest,
+        api_key: Optional[str],
+    ) -> Tuple[str, bool, Optional[str]]:
+        """
+        Create the upstream generation; returns its id, whether it will call our
+        webhook, and the key it was created with (a pooled key may have been
+        swapped for another key of its pool; the task is then polled with that one).
+        """
+
+        async def submit(key: str) -> Tuple[str, bool, Optional[str]]:
+            async with self._get_client(request.model, key) as client:
+                extra_params = dict(request.extra_params or {})
+                callback_url = self._callback_url(task_id, request, client)
+                if callback_url:
+                    extra_params["notify_hook"] = callback_url
+                # Status polls are paced by the PollScheduler; admission covers submissions.
+                async with get_admission().admit(request.model.value, key):
+                    remote_task_id = await self._create_remote_video(client, request, extra_params)
+                return remote_task_id, callback_url is not None, (None if key == self.api_key else key)
+
+        return await with_api_key(api_key or self.api_key, submit)
+
+    @staticmethod
+    async def _create_remote_video(
+        client: BaseVideoClient,
+        request: VideoGenerationRequest,
+        extra_params: Dict[str, Any],
+    ) -> str:
+        if request.model == ModelType.SORA2:
+            return await client.create_video(
+                prompt=request.prompt,
+                image=request.image,
+                duration=request.duration,
+                aspect_ratio=request.aspect_ratio,
+                **extra_params,
+            )
+        return await client.create_video(
+            prompt=request.prompt,
+            image=request.image,
+            duration=request.duration,
+            aspect_ratio=request.aspect_ratio,
+            resolution=request.resolution,
+            **extra_params,
+        )
 
-                self._update_task_status(
+    @staticmethod
+    def _callback_url(task_id: str, request: VideoGenerationRequest, client: BaseVideoClient) -> Optional[str]:
+        # A caller-supplied notify_hook wins; their endpoint gets the callbacks, we keep polling.
+        if not getattr(client, "supports_notify_hook", False) or "notify_hook" in (request.extra_params or {}):
+            return None
+        return get_callback_url(task_id)
+
+    @staticmethod
+    def _policy_key(request: VideoGenerationRequest) -> PolicyKey:
+        return PolicyKey(request.model.value, request.duration, request.resolution)
+
+    async def _resume_task(
+        self,
+        task_id: str,
+        request: VideoGenerationRequest,
+        remote_task_id: str,
+        elapsed: float = 0.0,
+        api_key: Optional[str] = None,
+    ) -> None:
+        # Already generating upstream: get back to watching it ahead of queued batch work.
+        async with self.scheduler.slot(task_id, self.owner_of(task_id), TaskPriority.INTERACTIVE):
+            try:
+                client = self._get_poll_client(request.model, api_key)
+                await self._poll_remote_task(
                     task_id,
-                    TaskStatus.COMPLETED,
-                    progress=100,
-                    video_url=result.get("video_url"),
-                    video_base64=result.get("video_base64"),
+                    request.model,
+                    remote_task_id,
+                    None,
+                    api_key,
+                    policy_key=self._policy_key(request),
+                    elapsed=elapsed,
+                    webhook=self._callback_url(task_id, request, client) is not None,
                 )
             except Exception as e:
                 self._update_task_status(task_id, TaskStatus.FAILED, error=str(e))
                 raise
-            finally:
-                if client:
-                    await client.close()
+
+    async def _poll_remote_task(
+        self,
+        task_id: str,
+        model: ModelType,
+        remote_task_id: str,
+        callback: Optional[Callable[[ProgressCallback], None]],
+        api_key: Optional[str] = None,
+        *,
+        policy_key: Optional[PolicyKey] = None,
+        elapsed: float = 0.0,
+        webhook: bool = False,
+    ) -> None:
+        async def on_progress(data: ProgressCallback) -> None:
+            if data.status in {TaskStatus.PENDING, TaskStatus.PROCESSING}:
+                self._update_task_status(task_id, TaskStatus.PROCESSING, progress=data.progress, message=data.message)
+            if callback:
+                await invoke_callback(callback, data)
+
+        client = self._get_poll_client(model, api_key)
+        self._remote_tasks[task_id] = (model, remote_task_id, client)
+        try:
+            result = await self.poll_scheduler.watch(
+                model.value,
+                client,
+                remote_task_id,
+                on_progress,
+                policy_key=policy_key,
+                elapsed=elapsed,
+                webhook=webhook,
+            )
+        except TimeoutError:
+            # We give up on it, so the provider should too.
+            self._cancel_remote(model, remote_task_id, client)
+            raise
+        finally:
+            self._remote_tasks.pop(task_id, None)
+
+        video_base64 = result.get("video_base64")
+        if video_base64:
+            await self.registry.attach_video_base64(task_id, video_base64)
+        self._update_task_status(
+            task_id,
+            TaskStatus.COMPLETED,
+            progress=100,
+            video_url=result.get("video_url"),
+            video_base64=video_base64,
+        )
+
+    async def restore_tasks(self) -> int:
+        """Reload non-terminal tasks from the store and resume them."""
+        if not self.store:
+            return 0
+
+        restored = 0
+        for row in await self.store.load_active():
+            if self._adopt_row(row) is not None:
+                restored += 1
+
+        if restored:
+            logger.info("Restored %d in-flight video tasks", restored)
+        return restored
+
+    def _adopt_row(self, row: VideoTask) -> Optional[asyncio.Task]:
+        """Start (or resume) a stored task locally; returns None if it was already here or cannot run."""
+        if row.id in self.registry:
+            return None
+
+        created_at = row.created_at or datetime.now()
+        self.registry.add(
+            row.id,
+            owner=row.owner_user_id,
+            status=TaskStatus(row.status.value),
+            progress=int(row.progress or 0),
+            created_at=created_at,
+            updated_at=row.updated_at or created_at,
+        )
+
+        try:
+            request = row_to_request(row)
+        except Exception as exc:
+            self._update_task_status(row.id, TaskStatus.FAILED, error=f"Unable to restore task: {exc}")
+            return None
+
+        if row.remote_task_id:
+            # created_at is the best record we have of when the upstream clock started.
+            # A job created with another key of a pool must be polled with that key.
+            api_key = get_key_pools().key_by_id(row.api_key_id)
+            if row.api_key_id and api_key is None:
+                logger.warning("Key of video task %s is no longer configured, polling with the default key", row.id)
+            coro = self._resume_task(row.id, request, str(row.remote_task_id), _age_seconds(created_at), api_key)
+        elif row.status == TaskStatusDB.PENDING:
+            # Never submitted upstream (still queued), safe to run again.
+            coro = self._execute_task(row.id, request, None)
+        else:
+            # Submission may have reached the provider without us learning the remote id;
+            # re-submitting could pay for the same generation twice.
+            self._update_task_status(
+                row.id,
+                TaskStatus.FAILED,
+                error="Task was interrupted before the upstream task id was recorded",
+            )
+            return None
+
+        task = self.tasks[row.id] = asyncio.create_task(coro)
+        return task
+
+    def _track_lease(self, task_id: str, task: asyncio.Task) -> None:
+        self._leased.add(task_id)
+
+        def _done(done: asyncio.Task) -> None:
+            if not done.cancelled():
+                # Failures are recorded on the task; nobody else awaits claimed work.
+                done.exception()
+            self._leased.discard(task_id)
+            if self.queue is not None:
+                self.queue.wake()
+
+        task.add_done_callback(_done)
+
+    async def _claim_loop(self) -> None:
+        assert self.queue is not None
+        while True:
+            free = self.max_concurrent_tasks - len(self._leased)
+            if free > 0:
+                try:
+                    rows = await self.queue.claim(free)
+                except Exception:
+                    logger.exception("Failed to claim video tasks")
+                    rows = []
+                for row in rows:
+                    task = self._adopt_row(row)
+                    if task is not None:
+                        self._track_lease(row.id, task)
+            await self.queue.wait()
+
+    async def _heartbeat_loop(self) -> None:
+        assert self.queue is not None
+        while True:
+            await asyncio.sleep(self.queue.heartbeat_interval)
+            try:
+                lost = await self.queue.heartbeat(self._leased)
+            except Exception:
+                logger.exception("Failed to renew video task leases")
+                continue
+            for task_id in lost:
+                # Cancelled elsewhere, or our lease expired and another worker took over:
+                # stop local work and let the database be the source of truth.
+                task = self.tasks.pop(task_id, None)
+                if task is not None and not task.done():
+                    logger.warning("Lost lease on video task %s, stopping local work", task_id)
+                    task.cancel()
+                self._leased.discard(task_id)
+                self.registry.discard(task_id)
+            if lost:
+                await self._cancel_remote_of_cancelled(lost)
+
+    async def _cancel_remote_of_cancelled(self, task_ids: Set[str]) -> None:
+        """Stop the remote jobs of tasks cancelled through another worker (not merely re-leased)."""
+        watched = {tid: self._remote_tasks.get(tid) for tid in task_ids}
+        watched = {tid: remote for tid, remote in watched.items() if remote is not None}
+        if not watched:
+            return
+        try:
+            rows = await self.store.load_many(list(watched))
+        except Exception:
+            logger.exception("Failed to look up lost video tasks")
+            return
+        for row in rows:
+            if row.status == TaskStatusDB.CANCELLED:
+                self._cancel_remote(*watched[row.id])
+
+    async def _callback_loop(self) -> None:
+        """Apply provider callbacks that other workers received for tasks we are watching."""
+        assert self.queue is not None
+        while True:
+            await asyncio.sleep(self.queue.poll_interval)
+            watched = [task_id for task_id in self._leased if task_id in self._remote_tasks]
+            if not watched:
+                continue
+            try:
+                callbacks = await self.queue.take_callbacks(watched)
+            except Exception:
+                logger.exception("Failed to fetch forwarded video callbacks")
+                continue
+            for task_id, payload in callbacks.items():
+                try:
+                    await self.handle_webhook(task_id, payload)
+                except ValueError as exc:
+                    logger.warning("Ignoring forwarded callback for video task %s: %s", task_id, exc)
+
+    async def _follow_loop(self) -> None:
+        """Publish changes of tasks that run on other workers to local SSE / long-poll subscribers."""
+        assert self.queue is not None and self.store is not None
+        while True:
+            await asyncio.sleep(self.queue.poll_interval)
+            remote_ids = [tid for tid in self.events.subscribed_task_ids() if tid not in self.registry]
+            for task_id in set(self._followed) - set(remote_ids):
+                del self._followed[task_id]
+            if not remote_ids:
+                continue
+            try:
+                rows = await self.store.load_many(remote_ids)
+            except Exception:
+                logger.exception("Failed to refresh remote video tasks")
+                continue
+            for row in rows:
+                task = row_to_response(row)
+                fingerprint = task_fingerprint(task)
+                previous = self._followed.get(row.id)
+                if previous == fingerprint:
+                    continue
+                self._followed[row.id] = fingerprint
+                if task.status in TERMINAL_STATUSES:
+                    kind = "final"
+                elif previous is None or previous[0] != task.status:
+                    kind = "status"
+                else:
+                    kind = "progress"
+                self.events.publish(TaskEvent(row.id, kind, task))
 
     def _update_task_status(
         self,
@@ -121,34 +532,223 @@ class TaskManager:
         error: Optional[str] = None,
         message: Optional[str] = None,
     ) -> None:
-        task = self.results.get(task_id)
-        if not task:
+        # `video_base64` only goes to the store here; the in-memory copy is attached
+        # (or spilled to disk) beforehand via `registry.attach_video_base64`.
+        record = self.registry.get(task_id)
+        if not record:
             return
 
-        task.status = status
-        if progress is not None:
-            task.progress = progress
-        if video_url is not None:
-            task.video_url = video_url
-        if video_base64 is not None:
-            task.video_base64 = video_base64
-        if error is not None:
-            task.error = error
-        if message is not None:
-            task.message = message
-        task.updated_at = datetime.now()
+        previous_status = record.status
+        self.registry.update(task_id, status, progress=progress, video_url=video_url, error=error, message=message)
+
+        if self.events.has_subscribers(task_id):
+            if status in TERMINAL_STATUSES:
+                kind = "final"
+            elif status != previous_status:
+                kind = "status"
+            else:
+                kind = "progress"
+            self.events.publish(TaskEvent(task_id, kind, record.to_response()))
+
+        if self.store:
+            self.store.enqueue_update(
+                task_id,
+                status=status,
+                progress=progress,
+                video_url=video_url,
+                video_base64=video_base64,
+                error=error,
+            )
+
+        if status in TERMINAL_STATUSES:
+            self._evict_finished()
+
+    async def handle_webhook(self, task_id: str, payload: Optional[Dict[str, Any]]) -> bool:
+        """
+        Apply a provider callback for `task_id` as if it were a poll result.
+        A None payload (a callback whose body is not signed) is not trusted and
+        only makes the task's next status query happen right away.
+
+        Returns False when the task is unknown or already finished. In JobQueue
+        mode a callback for a task this worker is not watching is left on the
+        task's row for the lease holder to apply (see `_callback_loop`).
+        """
+        watched = self._remote_tasks.get(task_id)
+        if watched is None:
+            if self.queue is not None:
+                return await self.queue.post_callback(task_id, payload)
+            return False
+        model, remote_task_id, _ = watched
+        if payload is None:
+            return self.poll_scheduler.poll_now(model.value, remote_task_id)
+        reported_id = payload.get("task_id")
+        if reported_id is not None and str(reported_id) != remote_task_id:
+            raise ValueError("Callback does not belong to this task")
+        return await self.poll_scheduler.deliver(model.value, remote_task_id, payload)
+
+    def owner_of(self, task_id: str) -> Optional[str]:
+        return self.registry.owner_of(task_id)
 
     async def get_task_status(self, task_id: str) -> Optional[TaskResponse]:
-        return self.results.get(task_id)
+        tasks = await self.get_tasks([task_id])
+        return tasks.get(task_id)
+
+    async def get_tasks(self, task_ids: Iterable[str], owner_user_id: Optional[str] = None) -> Dict[str, TaskResponse]:
+        """
+        Tasks by id (optionally only those owned by `owner_user_id`), in request order.
+
+        Tasks not held in memory here (evicted, or run by another worker) are read from the store.
+        """
+        task_ids = list(task_ids)
+        found: Dict[str, TaskResponse] = {}
+        missing: List[str] = []
+        for task_id in dict.fromkeys(task_ids):
+            record = self.registry.get(task_id)
+            if record is None:
+                missing.append(task_id)
+            elif owner_user_id is None or record.owner == owner_user_id:
+                task = record.to_response(await self.registry.load_video_base64(record))
+                task.queue_position = self.scheduler.position(task_id)
+                if task.queue_position is not None:
+                    task.estimated_wait_seconds = self.scheduler.estimated_wait(task_id)
+                found[task_id] = task
+
+        if missing and self.store:
+            rows = [
+                row for row in await self.store.load_many(missing)
+                if owner_user_id is None or row.owner_user_id == owner_user_id
+            ]
+            positions = await self.queue.positions(rows) if self.queue is not None else {}
+            for row in rows:
+                task = row_to_response(row)
+                task.queue_position = positions.get(row.id)
+                if task.queue_position is not None:
+                    task.estimated_wait_seconds = self.scheduler.wait_for_position(task.queue_position)
+                found[row.id] = task
+        return {task_id: found[task_id] for task_id in task_ids if task_id in found}
+
+    async def wait_for_task(self, task_id: str) -> Optional[TaskResponse]:
+        """Block until the task is terminal and return it (it may run on another worker)."""
+        local = self.tasks.get(task_id)
+        if local is not None:
+            await asyncio.gather(local, return_exceptions=True)
+            return await self.get_task_status(task_id)
+
+        with self.events.subscribe([task_id]) as subscription:
+            while True:
+                task = await self.get_task_status(task_id)
+                if task is None or task.status in TERMINAL_STATUSES:
+                    return task
+                # Events are a shortcut; re-reading on timeout covers anything they miss.
+                await subscription.get(timeout=self.queue.poll_interval if self.queue else 1.0)
+
+    async def get_task_owner(self, task_id: str) -> Optional[str]:
+        owner = self.owner_of(task_id)
+        if owner is None and task_id not in self.registry and self.store:
+            rows = await self.store.load_many([task_id])
+            owner = rows[0].owner_user_id if rows else None
+        return owner
+
+    async def list_task_ids(self, owner_user_id: str) -> List[str]:
+        task_ids = [record.task_id for record in self.registry.for_owner(owner_user_id)]
+        if self.queue is not None:
+            # Other workers' tasks only exist in the shared table.
+            stored = [row.id for row in await self.store.list_for_owner(owner_user_id)]
+            local = set(task_ids)
+            task_ids = [tid for tid in stored if tid not in local] + task_ids
+        return task_ids
+
+    async def list_tasks(self, owner_user_id: str) -> List[TaskResponse]:
+        tasks = await self.get_tasks(await self.list_task_ids(owner_user_id), owner_user_id)
+        return list(tasks.values())
+
+    def _evict_finished(self) -> None:
+        for task_id in self.registry.evict():
+            self.tasks.pop(task_id, None)
 
     async def cancel_task(self, task_id: str) -> bool:
         task = self.tasks.get(task_id)
         if task and not task.done():
+            remote = self._remote_tasks.get(task_id)
             task.cancel()
             self._update_task_status(task_id, TaskStatus.CANCELLED)
+            if remote is not None:
+                self._cancel_remote(*remote)
             return True
+        if self.queue is not None and task_id not in self.registry:
+            # Queued or running on another worker; the holder stops at its next heartbeat.
+            return await self.store.cancel(task_id)
         return False
 
+    def _cancel_remote(self, model: ModelType, remote_task_id: str, client: BaseVideoClient) -> None:
+        """Cancel a remote job in the background; failures are retried by the reconciliation sweep."""
+        if not getattr(client, "supports_cancel", False):
+            return
+        self._orphans.setdefault((model, remote_task_id), (client, 0))
+        if self._reconciler is None or self._reconciler.done():
+            self._reconciler = asyncio.create_task(self._reconcile_loop())
+
+    async def _reconcile_loop(self) -> None:
+        while self._orphans:
+            await self._reconcile_orphans()
+            if self._orphans:
+                await asyncio.sleep(self.remote_cancel_retry_interval)
+
+    async def _reconcile_orphans(self) -> None:
+        for key, (client, attempts) in list(self._orphans.items()):
+            model, remote_task_id = key
+            try:
+                cancelled = await client.cancel_task(remote_task_id)
+            except Exception as exc:
+                attempts += 1
+                if attempts >= self.remote_cancel_max_attempts:
+                    logger.error("Giving up cancelling remote %s task %s: %s", model.value, remote_task_id, exc)
+                    self._orphans.pop(key, None)
+                else:
+                    self._orphans[key] = (client, attempts)
+                continue
+            self._orphans.pop(key, None)
+            if cancelled:
+                logger.info("Cancelled remote %s task %s", model.value, remote_task_id)
+
+    async def shutdown(self) -> None:
+        """Stop local workers without recording a terminal state, so restarts resume them."""
+        runners, self._queue_runners = self._queue_runners, []
+        for runner in runners:
+            runner.cancel()
+        if runners:
+            await asyncio.gather(*runners, return_exceptions=True)
+
+        if self.store is None:
+            # Nothing will resume these after a restart; don't leave them running upstream.
+            for remote in list(self._remote_tasks.values()):
+                self._cancel_remote(*remote)
+
+        leased = list(self._leased)
+        pending = [task for task in self.tasks.values() if not task.done()]
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+        if self.queue is not None and leased:
+            try:
+                # Write the last progress first: those writes only land while we still hold the lease.
+                await self.store.flush()
+                await self.queue.release(leased)
+            except Exception:
+                logger.exception("Failed to release video task leases")
+        if self._reconciler is not None:
+            self._reconciler.cancel()
+            await asyncio.gather(self._reconciler, return_exceptions=True)
+            self._reconciler = None
+        if self._orphans:
+            # One last attempt while the clients are still open.
+            await self._reconcile_orphans()
+        await self.poll_scheduler.stop()
+        clients, self._poll_clients = self._poll_clients, {}
+        for client in clients.values():
+            await client.close()
+
     async def wait_all(self) -> None:
         if self.tasks:
             await asyncio.gather(*self.tasks.values(), return_exceptions=True)
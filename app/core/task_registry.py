@@ -0,0 +1,251 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from app.config import get_settings
+from app.core.task_store import TERMINAL_STATUSES
+from app.models.schemas import TaskResponse, TaskStatus
+
+logger = logging.getLogger(__name__)
+
+
+class TaskRecord:
+    """In-memory state of one video task; a TaskResponse is only built when someone asks for it."""
+
+    __slots__ = (
+        "task_id",
+        "owner",
+        "status",
+        "progress",
+        "message",
+        "video_url",
+        "video_base64",
+        "video_base64_path",
+        "error",
+        "created_at",
+        "updated_at",
+    )
+
+    def __init__(
+        self,
+        task_id: str,
+        owner: Optional[str],
+        status: TaskStatus,
+        progress: int,
+        created_at: datetime,
+        updated_at: datetime,
+    ):
+        self.task_id = task_id
+        self.owner = owner
+        self.status = status
+        self.progress = progress
+        self.message: Optional[str] = None
+        self.video_url: Optional[str] = None
+        self.video_base64: Optional[str] = None
+        self.video_base64_path: Optional[str] = None
+        self.error: Optional[str] = None
+        self.created_at = created_at
+        self.updated_at = updated_at
+
+    @property
+    def terminal(self) -> bool:
+        return self.status in TERMINAL_STATUSES
+
+    def to_response(self, video_base64: Optional[str] = None) -> TaskResponse:
+        return TaskResponse(
+            task_id=self.task_id,
+            status=self.status,
+            progress=self.progress,
+            message=self.message,
+            video_url=self.video_url,
+            video_base64=video_base64 if video_base64 is not None else self.video_base64,
+            error=self.error,
+            created_at=self.created_at,
+            updated_at=self.updated_at,
+        )
+
+
+class TaskRegistry:
+    """
+    Task records with a per-owner index and bounded retention.
+
+    Finished tasks are kept in LRU order (reads refresh them) and evicted once
+    unread for `ttl_seconds` or when more than `max_finished` are held.
+    `video_base64` payloads above `spill_threshold` bytes live in `spill_dir`
+    instead of memory.
+    """
+
+    def __init__(
+        self,
+        *,
+        ttl_seconds: Optional[float] = None,
+        max_finished: Optional[int] = None,
+        spill_dir: Optional[str] = None,
+        spill_threshold: Optional[int] = None,
+    ):
+        settings = get_settings()
+        self.ttl_seconds = float(ttl_seconds if ttl_seconds is not None else settings.TASK_RESULT_TTL_SECONDS)
+        self.max_finished = int(max_finished if max_finished is not None else settings.TASK_RESULT_MAX_FINISHED)
+        self.spill_dir = Path(spill_dir or settings.TASK_RESULT_SPILL_DIR)
+        self.spill_threshold = int(
+            spill_threshold if spill_threshold is not None else settings.TASK_RESULT_SPILL_THRESHOLD_BYTES
+        )
+        self._records: Dict[str, TaskRecord] = {}
+        self._by_owner: Dict[str, Dict[str, None]] = {}
+        # Finished task id -> last access (monotonic), least recently used first.
+        self._finished: OrderedDict[str, float] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __contains__(self, task_id: str) -> bool:
+        return task_id in self._records
+
+    def __iter__(self) -> Iterator[TaskRecord]:
+        return iter(list(self._records.values()))
+
+    def add(
+        self,
+        task_id: str,
+        *,
+        owner: Optional[str],
+        status: TaskStatus = TaskStatus.PENDING,
+        progress: int = 0,
+        created_at: Optional[datetime] = None,
+        updated_at: Optional[datetime] = None,
+    ) -> TaskRecord:
+        now = datetime.now()
+        record = TaskRecord(
+            task_id,
+            str(owner) if owner else None,
+            status,
+            progress,
+            created_at or now,
+            updated_at or created_at or now,
+        )
+        self._records[task_id] = record
+        if record.owner:
+            self._by_owner.setdefault(record.owner, {})[task_id] = None
+        if record.terminal:
+            self._mark_finished(task_id)
+        return record
+
+    def get(self, task_id: str) -> Optional[TaskRecord]:
+        record = self._records.get(task_id)
+        if record is not None and task_id in self._finished:
+            self._finished[task_id] = time.monotonic()
+            self._finished.move_to_end(task_id)
+        return record
+
+    def owner_of(self, task_id: str) -> Optional[str]:
+        record = self._records.get(task_id)
+        return record.owner if record else None
+
+    def for_owner(self, owner: str) -> List[TaskRecord]:
+        return [self._records[tid] for tid in self._by_owner.get(str(owner), ())]
+
+    def update(
+        self,
+        task_id: str,
+        status: TaskStatus,
+        *,
+        progress: Optional[int] = None,
+        video_url: Optional[str] = None,
+        error: Optional[str] = None,
+        message: Optional[str] = None,
+    ) -> Optional[TaskRecord]:
+        record = self._records.get(task_id)
+        if record is None:
+            return None
+        record.status = status
+        if progress is not None:
+            record.progress = progress
+        if video_url is not None:
+            record.video_url = video_url
+        if error is not None:
+            record.error = error
+        if message is not None:
+            record.message = message
+        record.updated_at = datetime.now()
+        if record.terminal:
+            self._mark_finished(task_id)
+        return record
+
+    async def attach_video_base64(self, task_id: str, data: str) -> None:
+        """Keep small payloads inline; write large ones to the spill directory."""
+        record = self._records.get(task_id)
+        if record is None:
+            return
+        if len(data) <= self.spill_threshold:
+            record.video_base64 = data
+            return
+        path = self.spill_dir / f"{task_id}.b64"
+        try:
+            await asyncio.to_thread(self._write_spill, path, data)
+        except OSError:
+            logger.exception("Failed to spill video payload of task %s, keeping it in memory", task_id)
+            record.video_base64 = data
+            return
+        record.video_base64 = None
+        record.video_base64_path = str(path)
+
+    async def load_video_base64(self, record: TaskRecord) -> Optional[str]:
+        if record.video_base64 is not None or not record.video_base64_path:
+            return record.video_base64
+        try:
+            return await asyncio.to_thread(Path(record.video_base64_path).read_text, "ascii")
+        except OSError:
+            logger.warning("Spilled video payload of task %s is gone", record.task_id)
+            return None
+
+    def evict(self) -> List[str]:
+        """Drop expired / excess finished tasks; returns the evicted ids."""
+        evicted: List[str] = []
+        expire_before = time.monotonic() - self.ttl_seconds
+        while self._finished:
+            task_id, last_access = next(iter(self._finished.items()))
+            if len(self._finished) <= self.max_finished and last_access >= expire_before:
+                break
+            self._finished.popitem(last=False)
+            self._remove(task_id)
+            evicted.append(task_id)
+        return evicted
+
+    def discard(self, task_id: str) -> None:
+        """Forget a task regardless of its state (e.g. another worker now owns it)."""
+        self._finished.pop(task_id, None)
+        self._remove(task_id)
+
+    def _mark_finished(self, task_id: str) -> None:
+        self._finished[task_id] = time.monotonic()
+        self._finished.move_to_end(task_id)
+
+    def _remove(self, task_id: str) -> None:
+        record = self._records.pop(task_id, None)
+        if record is None:
+            return
+        if record.owner:
+            owned = self._by_owner.get(record.owner)
+            if owned is not None:
+                owned.pop(task_id, None)
+                if not owned:
+                    del self._by_owner[record.owner]
+        if record.video_base64_path:
+            try:
+                os.unlink(record.video_base64_path)
+            except OSError:
+                pass
+
+    @staticmethod
+    def _write_spill(path: Path, data: str) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(data, "ascii")
+        os.replace(tmp, path)
@@ -0,0 +1,241 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.config import get_settings
+from app.core.datetime_utils import utc_now
+from app.models.database import TaskStatusDB, VideoTask
+from app.models.schemas import TaskResponse, TaskStatus, VideoGenerationRequest
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = (TaskStatusDB.PENDING, TaskStatusDB.PROCESSING)
+TERMINAL_STATUSES = {TaskStatus.COMPLETED, TaskStatus.FAILED, TaskStatus.CANCELLED}
+
+
+def request_to_row_fields(request: VideoGenerationRequest) -> Dict[str, Any]:
+    params = request.model_dump(mode="json", exclude={"prompt", "image"})
+    return {
+        "model": request.model.value,
+        "prompt": request.prompt,
+        "input_image_base64": request.image,
+        "params": json.dumps(params, ensure_ascii=False, separators=(",", ":")),
+    }
+
+
+def row_to_request(row: VideoTask) -> VideoGenerationRequest:
+    params: Dict[str, Any] = json.loads(row.params) if row.params else {}
+    params.setdefault("model", row.model)
+    return VideoGenerationRequest(prompt=row.prompt, image=row.input_image_base64, **params)
+
+
+def row_to_response(row: VideoTask) -> TaskResponse:
+    created_at = row.created_at or utc_now()
+    return TaskResponse(
+        task_id=row.id,
+        status=TaskStatus(row.status.value),
+        progress=int(row.progress or 0),
+        video_url=row.video_url,
+        video_base64=row.video_base64,
+        error=row.error_message,
+        created_at=created_at,
+        updated_at=row.updated_at or created_at,
+    )
+
+
+class TaskStore:
+    """
+    Persists TaskManager state into the `video_tasks` table.
+
+    Task creation and the upstream task id are written immediately (losing either
+    would mean re-paying for a generation). Progress/status updates are coalesced
+    per task in memory and flushed in one transaction every `flush_interval`
+    seconds by a background loop.
+
+    With `lease_owner` set (JobQueue mode) writes only land on rows this worker
+    still holds the lease for, and the terminal write releases the lease.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        *,
+        flush_interval: Optional[float] = None,
+        max_batch: Optional[int] = None,
+        lease_owner: Optional[str] = None,
+    ):
+        settings = get_settings()
+        self._session_factory = session_factory
+        self.lease_owner = lease_owner
+        self._flush_interval = float(flush_interval or settings.TASK_STORE_FLUSH_INTERVAL)
+        self._max_batch = int(max_batch or settings.TASK_STORE_MAX_BATCH)
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._wakeup = asyncio.Event()
+        self._stop = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._loop_task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        if self._loop_task is None:
+            self._stop.clear()
+            self._loop_task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self) -> None:
+        self._stop.set()
+        self._wakeup.set()
+        if self._loop_task is not None:
+            await self._loop_task
+            self._loop_task = None
+        await self.flush()
+
+    async def insert(
+        self,
+        task_id: str,
+        request: VideoGenerationRequest,
+        *,
+        owner_user_id: Optional[str],
+        created_at: datetime,
+        lease_expires_at: Optional[datetime] = None,
+        queue_tag: Optional[float] = None,
+    ) -> None:
+        """
+        Insert a pending task; with `lease_expires_at` it is leased to this
+        worker straight away, otherwise `queue_tag` orders it for claiming.
+        """
+        leased = lease_expires_at is not None and self.lease_owner is not None
+        row = VideoTask(
+            id=task_id,
+            owner_user_id=owner_user_id,
+            status=TaskStatusDB.PENDING,
+            progress=0,
+            created_at=created_at,
+            lease_owner=self.lease_owner if leased else None,
+            lease_expires_at=lease_expires_at if leased else None,
+            attempts=0,
+            queue_tag=None if leased else queue_tag,
+            **request_to_row_fields(request),
+        )
+        async with self._session_factory() as db:
+            async with db.begin():
+                db.add(row)
+
+    async def record_remote_task_id(
+        self, task_id: str, remote_task_id: str, *, api_key_id: Optional[str] = None
+    ) -> None:
+        """Record the upstream job, and which pooled key (`key_pool.key_id`) it belongs to."""
+        async with self._session_factory() as db:
+            async with db.begin():
+                await db.execute(
+                    self._held(update(VideoTask).where(VideoTask.id == task_id)).values(
+                        remote_task_id=remote_task_id, api_key_id=api_key_id, status=TaskStatusDB.PROCESSING
+                    )
+                )
+
+    def enqueue_update(
+        self,
+        task_id: str,
+        *,
+        status: TaskStatus,
+        progress: Optional[int] = None,
+        video_url: Optional[str] = None,
+        video_base64: Optional[str] = None,
+        error: Optional[str] = None,
+    ) -> None:
+        fields = self._pending.setdefault(task_id, {})
+        fields["status"] = TaskStatusDB(status.value)
+        if progress is not None:
+            fields["progress"] = progress
+        if video_url is not None:
+            fields["video_url"] = video_url
+        if video_base64 is not None:
+            fields["video_base64"] = video_base64
+        if error is not None:
+            fields["error_message"] = error
+        if status in TERMINAL_STATUSES:
+            fields["completed_at"] = utc_now()
+            if self.lease_owner:
+                fields["lease_owner"] = None
+                fields["lease_expires_at"] = None
+            self._wakeup.set()
+        elif len(self._pending) >= self._max_batch:
+            self._wakeup.set()
+
+    async def flush(self) -> None:
+        async with self._flush_lock:
+            if not self._pending:
+                return
+            batch, self._pending = self._pending, {}
+            try:
+                async with self._session_factory() as db:
+                    async with db.begin():
+                        for task_id, fields in batch.items():
+                            await db.execute(
+                                self._held(update(VideoTask).where(VideoTask.id == task_id)).values(**fields)
+                            )
+            except Exception:
+                logger.exception("Failed to flush %d task updates", len(batch))
+                # Keep the newest value per field when re-queueing a failed batch.
+                for task_id, fields in batch.items():
+                    merged = dict(fields)
+                    merged.update(self._pending.get(task_id, {}))
+                    self._pending[task_id] = merged
+
+    async def load_active(self) -> List[VideoTask]:
+        async with self._session_factory() as db:
+            stmt = select(VideoTask).where(VideoTask.status.in_(ACTIVE_STATUSES)).order_by(VideoTask.created_at)
+            return list((await db.execute(stmt)).scalars().all())
+
+    async def load_many(self, task_ids: Iterable[str]) -> List[VideoTask]:
+        ids = list(task_ids)
+        if not ids:
+            return []
+        async with self._session_factory() as db:
+            return list((await db.execute(select(VideoTask).where(VideoTask.id.in_(ids)))).scalars().all())
+
+    async def list_for_owner(self, owner_user_id: str, limit: int = 500) -> List[VideoTask]:
+        async with self._session_factory() as db:
+            stmt = (
+                select(VideoTask)
+                .where(VideoTask.owner_user_id == owner_user_id)
+                .order_by(VideoTask.created_at.desc())
+                .limit(limit)
+            )
+            return list(reversed((await db.execute(stmt)).scalars().all()))
+
+    async def cancel(self, task_id: str) -> bool:
+        """Cancel an active task run by any worker; its holder notices on the next heartbeat."""
+        async with self._session_factory() as db:
+            async with db.begin():
+                result = await db.execute(
+                    update(VideoTask)
+                    .where(VideoTask.id == task_id, VideoTask.status.in_(ACTIVE_STATUSES))
+                    .values(
+                        status=TaskStatusDB.CANCELLED,
+                        lease_owner=None,
+                        lease_expires_at=None,
+                        completed_at=utc_now(),
+                    )
+                    .execution_options(synchronize_session=False)
+                )
+        return result.rowcount == 1
+
+    def _held(self, stmt):
+        if self.lease_owner:
+            return stmt.where(VideoTask.lease_owner == self.lease_owner)
+        return stmt
+
+    async def _flush_loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self._flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
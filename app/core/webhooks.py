@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import hashlib
+import hmac
+from typing import Optional
+from urllib.parse import quote, urlencode
+
+from app.config import get_settings
+
+SIGNATURE_HEADER = "X-Webhook-Signature"
+CALLBACK_PATH = "/api/v1/webhooks/video"
+
+
+def callback_token(task_id: str, secret: str) -> str:
+    """Per-task token embedded in the callback URL; proves the URL was issued by us."""
+    return hmac.new(secret.encode(), f"video-task:{task_id}".encode(), hashlib.sha256).hexdigest()
+
+
+def verify_callback_token(task_id: str, token: Optional[str], secret: str) -> bool:
+    if not token:
+        return False
+    return hmac.compare_digest(callback_token(task_id, secret), token)
+
+
+def sign_payload(body: bytes, secret: str) -> str:
+    return "sha256=" + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+def verify_payload_signature(body: bytes, signature: Optional[str], secret: str) -> bool:
+    """Check a `sha256=<hex>` (or bare hex) HMAC of the raw request body."""
+    if not signature:
+        return False
+    value = signature.strip()
+    if value.lower().startswith("sha256="):
+        value = value[len("sha256=") :]
+    expected = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, value.lower())
+
+
+def build_callback_url(task_id: str, *, base_url: str, secret: str) -> str:
+    query = urlencode({"token": callback_token(task_id, secret)})
+    return f"{base_url.rstrip('/')}{CALLBACK_PATH}/{quote(task_id, safe='')}?{query}"
+
+
+def get_callback_url(task_id: str) -> Optional[str]:
+    """Callback URL for `task_id`, or None when webhooks are not configured."""
+    settings = get_settings()
+    if not settings.PUBLIC_BASE_URL or not settings.VIDEO_WEBHOOK_SECRET:
+        return None
+    return build_callback_url(task_id, base_url=settings.PUBLIC_BASE_URL, secret=settings.VIDEO_WEBHOOK_SECRET)
@@ -1,11 +1,39 @@
 from __future__ import annotations
 
+from typing import Optional, Sequence
+
+from sqlalchemy import Table, inspect, text
+from sqlalchemy.engine import Connection
 from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.schema import CreateColumn
 
 from app.models.database import Base
 
 
-async def init_db(engine: AsyncEngine) -> None:
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+def _add_missing_columns(conn: Connection, tables: Sequence[Table]) -> None:
+    """
+    Bring tables created by an older version up to date: create_all never
+    alters an existing table, so add the columns and indexes it lacks.
+    """
+    inspector = inspect(conn)
+    preparer = conn.dialect.identifier_preparer
+    for table in tables:
+        if not inspector.has_table(table.name, schema=table.schema):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name, schema=table.schema)}
+        for column in table.columns:
+            if column.name not in existing:
+                ddl = CreateColumn(column).compile(dialect=conn.dialect)
+                conn.execute(text(f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN {ddl}"))
+        indexes = {index["name"] for index in inspector.get_indexes(table.name, schema=table.schema)}
+        for index in table.indexes:
+            if index.name not in indexes:
+                index.create(conn)
 
+
+async def init_db(engine: AsyncEngine, tables: Optional[Sequence[Table]] = None) -> None:
+    if tables is None:
+        tables = Base.metadata.sorted_tables
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all, tables=tables)
+        await conn.run_sync(_add_missing_columns, tables)
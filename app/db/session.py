@@ -70,6 +70,17 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
         yield session
 
 
+async def get_optional_db() -> AsyncGenerator[AsyncSession | None, None]:
+    """Like get_db, but yields None instead of failing when no database is configured."""
+    try:
+        session_factory = get_session_factory()
+    except RuntimeError:
+        yield None
+        return
+    async with session_factory() as session:
+        yield session
+
+
 async def dispose_engine() -> None:
     global _engine, _async_session_factory
     if _engine is not None:
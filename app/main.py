@@ -3,17 +3,57 @@ from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import FileResponse, StreamingResponse
+from starlette.background import BackgroundTask
 import httpx
 
-from app.api.v1 import auth, image_proxy, images, product_recognition, storage, tasks, uploads, video
+from app.api.v1 import auth, image_proxy, images, product_recognition, storage, tasks, uploads, upstreams, video, webhooks
 from app.api.openai import videos as openai_videos
 from app.config import get_settings
-from app.core.static_files import CacheControlStaticFiles
+from app.core.http_clients import close_http_clients, get_http_client
+from app.core.image_executor import shutdown_image_executor
+from app.core.job_queue import JobQueue
+from app.core.media_store import shutdown_media_backend
+from app.core.storage_backend import shutdown_storage_backend
+from app.core.static_files import CacheControlStaticFiles, ImageVariantStaticFiles
+from app.core.task_store import TaskStore
+from app.db.init import init_db
+from app.db.session import dispose_engine, get_session_factory, init_engine
+from app.models.database import ProductImageBlob, VideoTask
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    yield
+    settings = get_settings()
+    task_manager = video.get_task_manager()
+    task_store: TaskStore | None = None
+
+    engine = init_engine() if settings.TASK_STORE_ENABLED else None
+    if engine is not None:
+        await init_db(engine, tables=[VideoTask.__table__, ProductImageBlob.__table__])
+        if settings.JOB_QUEUE_ENABLED:
+            # Shared queue: unfinished tasks of any worker are picked up through expired leases.
+            queue = JobQueue(get_session_factory())
+            task_store = TaskStore(get_session_factory(), lease_owner=queue.worker_id)
+            await task_store.start()
+            task_manager.attach_store(task_store)
+            task_manager.attach_queue(queue)
+        else:
+            task_store = TaskStore(get_session_factory())
+            await task_store.start()
+            task_manager.attach_store(task_store)
+            await task_manager.restore_tasks()
+
+    try:
+        yield
+    finally:
+        await task_manager.shutdown()
+        await close_http_clients()
+        shutdown_image_executor()
+        shutdown_media_backend()
+        shutdown_storage_backend()
+        if task_store is not None:
+            await task_store.stop()
+            await dispose_engine()
 
 
 app = FastAPI(
@@ -39,6 +79,8 @@ app.include_router(uploads.router, prefix="/api/v1", tags=["Uploads"])
 app.include_router(images.router, prefix="/api/v1", tags=["User Images"])
 app.include_router(auth.router, prefix="/api/v1", tags=["Auth"])
 app.include_router(storage.router, prefix="/api/v1", tags=["Storage"])
+app.include_router(webhooks.router, prefix="/api/v1", tags=["Webhooks"])
+app.include_router(upstreams.router, prefix="/api/v1", tags=["Upstreams"])
 app.include_router(openai_videos.router, prefix="/v1", tags=["模型接口/sora2/官方格式"])
 
 
@@ -54,36 +96,37 @@ async def supabase_proxy(path: str, request: Request):
     headers.pop("host", None)
     headers.pop("content-length", None)
     
-    async with httpx.AsyncClient() as client:
-        try:
-            body = await request.body()
-            
-            proxy_req = client.build_request(
-                request.method,
-                target_url,
-                headers=headers,
-                content=body,
-                params=request.query_params,
-            )
-            
-            response = await client.send(proxy_req, stream=True)
-            
-            return StreamingResponse(
-                response.aiter_raw(),
-                status_code=response.status_code,
-                headers=dict(response.headers),
-                background=None
-            )
-        except httpx.RequestError as exc:
-            return Response(
-                content=f"Proxy error: {exc}",
-                status_code=502
-            )
+    client = get_http_client(target_url)
+    try:
+        body = await request.body()
+        
+        proxy_req = client.build_request(
+            request.method,
+            target_url,
+            headers=headers,
+            content=body,
+            params=request.query_params,
+        )
+        
+        response = await client.send(proxy_req, stream=True)
+        
+        # The pooled connection goes back once the body has been relayed.
+        return StreamingResponse(
+            response.aiter_raw(),
+            status_code=response.status_code,
+            headers=dict(response.headers),
+            background=BackgroundTask(response.aclose),
+        )
+    except httpx.RequestError as exc:
+        return Response(
+            content=f"Proxy error: {exc}",
+            status_code=502
+        )
 
 
 # Mount static files
 app.mount("/static", CacheControlStaticFiles(directory="app/static"), name="static")
-app.mount("/uploads", CacheControlStaticFiles(directory="app/static/uploads", check_dir=False), name="uploads")
+app.mount("/uploads", ImageVariantStaticFiles(directory=get_settings().STORAGE_LOCAL_ROOT, check_dir=False), name="uploads")
 
 
 @app.get("/")
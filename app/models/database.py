@@ -34,10 +34,23 @@ class VideoTask(Base):
     __tablename__ = "video_tasks"
 
     id = Column(String(36), primary_key=True)
+    owner_user_id = Column(String(36), nullable=True, index=True)
     model = Column(String(50), nullable=False)
     prompt = Column(Text, nullable=False)
-    status = Column(SQLEnum(TaskStatusDB), default=TaskStatusDB.PENDING)
+    status = Column(SQLEnum(TaskStatusDB), default=TaskStatusDB.PENDING, index=True)
     progress = Column(Integer, default=0)
+    remote_task_id = Column(String(200), nullable=True)
+    # key_pool.key_id of the pooled API key the remote job was created with (never the key itself).
+    api_key_id = Column(String(64), nullable=True)
+
+    # Job queue lease (multi-worker mode): which worker runs the task and until when.
+    lease_owner = Column(String(64), nullable=True, index=True)
+    lease_expires_at = Column(DateTime(timezone=True), nullable=True)
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    # Fair-share claim order across owners (start tag, see JobQueue.next_tag); NULL when never queued.
+    queue_tag = Column(Float, nullable=True, index=True)
+    # Latest provider callback received by a worker that does not hold the lease (JSON), for the holder to apply.
+    pending_callback = Column(Text, nullable=True)
 
     input_image_base64 = Column(Text, nullable=True)
     params = Column(Text, nullable=True)
@@ -253,6 +266,28 @@ class ProductImage(Base):
     image_url = Column(String(1000), nullable=False)
     image_size_bytes = Column(Integer, nullable=False, default=0)
     is_primary = Column(Boolean, nullable=False, default=False)
+    # Set when the file lives in the content-addressed blob store (see ProductImageBlob).
+    blob_sha256 = Column(String(64), nullable=True, index=True)
 
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+
+class ProductImageBlob(Base):
+    """One stored copy of an image's bytes, shared by every ProductImage of the same user with that content."""
+
+    __tablename__ = "product_image_blobs"
+    __table_args__ = (
+        CheckConstraint("size_bytes >= 0", name="ck_product_image_blobs_size_bytes"),
+        CheckConstraint("ref_count >= 0", name="ck_product_image_blobs_ref_count"),
+    )
+
+    user_id = Column(String(36), primary_key=True)
+    sha256 = Column(String(64), primary_key=True)
+
+    ext = Column(String(8), nullable=False)
+    size_bytes = Column(Integer, nullable=False, default=0)
+    ref_count = Column(Integer, nullable=False, default=0)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
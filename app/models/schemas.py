@@ -16,6 +16,11 @@ class TaskStatus(str, Enum):
     CANCELLED = "cancelled"
 
 
+class TaskPriority(str, Enum):
+    INTERACTIVE = "interactive"
+    BATCH = "batch"
+
+
 class ModelType(str, Enum):
     SORA2 = "sora2"
     VEO = "veo"
@@ -45,6 +50,20 @@ class TaskResponse(BaseModel):
     error: Optional[str] = None
     created_at: datetime
     updated_at: datetime
+    # Only set while the task waits for a free slot on this worker.
+    queue_position: Optional[int] = None
+    estimated_wait_seconds: Optional[float] = None
+
+
+class TaskStatusBatchRequest(BaseModel):
+    task_ids: List[str] = Field(min_length=1, max_length=200)
+
+
+class TaskStatusBatchResponse(BaseModel):
+    tasks: List[TaskResponse]
+    not_found: List[str] = Field(default_factory=list)
+    # False when a long-poll (`wait`) expired without any of the tasks changing.
+    changed: bool = True
 
 
 class ProgressCallback(BaseModel):
@@ -150,3 +150,47 @@ drop policy if exists product_images_delete_own on public.product_images;
 create policy product_images_delete_own on public.product_images
   for delete using (auth.uid() = user_id);
 
+
+alter table public.product_images add column if not exists blob_sha256 text;
+
+create index if not exists product_images_blob_sha256_idx on public.product_images (blob_sha256);
+
+-- Content-addressed product image files, one per (user, sha256); maintained by the backend.
+create table if not exists public.product_image_blobs (
+  user_id uuid not null,
+  sha256 text not null,
+  ext text not null,
+  size_bytes integer not null default 0 check (size_bytes >= 0),
+  ref_count integer not null default 0 check (ref_count >= 0),
+  created_at timestamptz not null default now(),
+  updated_at timestamptz,
+  primary key (user_id, sha256)
+);
+
+alter table public.product_image_blobs enable row level security;
+
+drop policy if exists product_image_blobs_select_own on public.product_image_blobs;
+create policy product_image_blobs_select_own on public.product_image_blobs
+  for select using (auth.uid() = user_id);
+
+-- Video task queue columns. The backend creates video_tasks on startup and adds
+-- missing columns itself; these statements upgrade a table created by an older
+-- version ahead of a deploy.
+alter table if exists public.video_tasks add column if not exists owner_user_id varchar(36);
+alter table if exists public.video_tasks add column if not exists remote_task_id varchar(200);
+alter table if exists public.video_tasks add column if not exists api_key_id varchar(64);
+alter table if exists public.video_tasks add column if not exists lease_owner varchar(64);
+alter table if exists public.video_tasks add column if not exists lease_expires_at timestamptz;
+alter table if exists public.video_tasks add column if not exists attempts integer not null default 0;
+alter table if exists public.video_tasks add column if not exists queue_tag double precision;
+alter table if exists public.video_tasks add column if not exists pending_callback text;
+
+do $$
+begin
+  if to_regclass('public.video_tasks') is not null then
+    create index if not exists ix_video_tasks_owner_user_id on public.video_tasks (owner_user_id);
+    create index if not exists ix_video_tasks_status on public.video_tasks (status);
+    create index if not exists ix_video_tasks_lease_owner on public.video_tasks (lease_owner);
+    create index if not exists ix_video_tasks_queue_tag on public.video_tasks (queue_tag);
+  end if;
+end $$;
@@ -0,0 +1,156 @@
+"""
+Benchmark: a new httpx.AsyncClient per upstream call vs the pooled HttpClientRegistry.
+
+Starts a local HTTPS stand-in for a provider (asyncio server, throwaway
+self-signed certificate made with the `openssl` CLI) and issues `--requests`
+small JSON GETs with `--concurrency` in flight, either opening a fresh client
+(TCP + TLS handshake) per call, as the provider clients used to, or through the
+shared per-origin client.
+
+Reports p50/p99/max latency and how many TLS connections the server accepted.
+
+    python scripts/bench_http_clients.py --requests 2000 --concurrency 20
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import ssl
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+
+def _make_certificate(directory: Path) -> tuple[Path, Path]:
+    cert, key = directory / "cert.pem", directory / "key.pem"
+    subprocess.run(
+        [
+            "openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+            "-subj", "/CN=localhost", "-addext", "subjectAltName=DNS:localhost,IP:127.0.0.1",
+            "-keyout", str(key), "-out", str(cert),
+        ],
+        check=True,
+        capture_output=True,
+    )
+    return cert, key
+
+
+class StandIn:
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.connections = 0
+        self.requests = 0
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        body = json.dumps({"status": "processing", "progress": 42}).encode()
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                while True:
+                    header = await reader.readline()
+                    if header in (b"\r\n", b"\n", b""):
+                        break
+                self.requests += 1
+                if self.delay:
+                    await asyncio.sleep(self.delay)
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                    + f"Content-Length: {len(body)}\r\n\r\n".encode()
+                    + body
+                )
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, ssl.SSLError):
+            pass
+        finally:
+            writer.close()
+
+
+async def _measure(call, requests: int, concurrency: int) -> list[float]:
+    latencies: list[float] = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one() -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            await call()
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    await asyncio.gather(*(one() for _ in range(requests)))
+    return latencies
+
+
+def _summary(mode: str, latencies: list[float], stand_in: StandIn) -> dict:
+    cuts = statistics.quantiles(latencies, n=100)
+    return {
+        "mode": mode,
+        "requests": len(latencies),
+        "p50_ms": round(cuts[49], 2),
+        "p99_ms": round(cuts[98], 2),
+        "max_ms": round(max(latencies), 2),
+        "tls_connections": stand_in.connections,
+    }
+
+
+async def _bench(requests: int, concurrency: int, delay: float) -> list[dict]:
+    import httpx
+
+    from app.core.http_clients import HttpClientRegistry
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        cert, key = _make_certificate(Path(tmp))
+        server_ctx = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        server_ctx.load_cert_chain(cert, key)
+        client_ctx = ssl.create_default_context(cafile=str(cert))
+
+        for mode in ("per-request", "pooled"):
+            stand_in = StandIn(delay)
+            server = await asyncio.start_server(stand_in.handle, "127.0.0.1", 0, ssl=server_ctx, backlog=4096)
+            url = f"https://127.0.0.1:{server.sockets[0].getsockname()[1]}/v1/video/veo/tasks/t"
+            headers = {"Authorization": "Bearer bench-key"}
+
+            if mode == "per-request":
+
+                async def call() -> None:
+                    async with httpx.AsyncClient(verify=client_ctx, headers=headers) as client:
+                        (await client.get(url)).raise_for_status()
+
+                latencies = await _measure(call, requests, concurrency)
+            else:
+                registry = HttpClientRegistry(verify=client_ctx)
+
+                async def call() -> None:
+                    (await registry.get(url).get(url, headers=headers)).raise_for_status()
+
+                latencies = await _measure(call, requests, concurrency)
+                await registry.aclose()
+
+            server.close()
+            await server.wait_closed()
+            results.append(_summary(mode, latencies, stand_in))
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--server-delay-ms", type=float, default=0.0, help="simulated upstream processing time")
+    args = parser.parse_args()
+
+    for result in asyncio.run(_bench(args.requests, args.concurrency, args.server_delay_ms / 1000)):
+        print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
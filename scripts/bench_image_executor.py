@@ -0,0 +1,109 @@
+"""
+Benchmark: event-loop latency while 12 MP uploads are processed inline vs in the image worker pool.
+
+Generates a 4000x3000 PNG and runs `--uploads` concurrent jobs (`--job llm`:
+prepare_image_for_llm, i.e. PNG -> JPEG re-encode; `--job reference`: the
+Sora `input_reference` LANCZOS fit to 1792x1024 plus PNG encode). Meanwhile
+a probe coroutine sleeps 10 ms in a loop and records how late it wakes up,
+which is the delay every other request on the event loop would see.
+
+    python scripts/bench_image_executor.py --uploads 8 --workers 2
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import io
+import json
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+PROBE_INTERVAL = 0.01
+
+
+def _make_upload(width: int = 4000, height: int = 3000) -> bytes:
+    from PIL import Image
+
+    # Fractal detail so encoders have real work to do (flat images compress trivially).
+    gray = Image.effect_mandelbrot((width, height), (-2.0, -1.2, 1.0, 1.2), 64)
+    image = Image.merge("RGB", (gray, gray.rotate(180), Image.effect_noise((width, height), 40)))
+    out = io.BytesIO()
+    image.save(out, format="PNG", compress_level=1)
+    return out.getvalue()
+
+
+async def _probe(stop: asyncio.Event, lags: list[float]) -> None:
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(PROBE_INTERVAL)
+        lags.append((time.perf_counter() - started - PROBE_INTERVAL) * 1000)
+
+
+async def _bench(mode: str, job: str, upload: bytes, uploads: int, workers: int) -> dict:
+    from app.api.openai.videos import _prepare_reference_image
+    from app.core.image_executor import ImageExecutor
+    from app.core.product_storage import prepare_image_for_llm
+
+    if job == "llm":
+        fn, kwargs = prepare_image_for_llm, {}
+    else:
+        fn, kwargs = _prepare_reference_image, {"target_w": 1792, "target_h": 1024}
+
+    executor = ImageExecutor(max_workers=workers, max_queue=uploads, job_timeout=600)
+    if mode == "pool":
+        # Start the workers (and their imports) before measuring.
+        await asyncio.gather(*(executor.run(fn, upload, **kwargs) for _ in range(workers)))
+
+    async def handle() -> None:
+        if mode == "pool":
+            await executor.run(fn, upload, **kwargs)
+        else:
+            await asyncio.sleep(0)
+            fn(upload, **kwargs)
+
+    stop, lags = asyncio.Event(), []
+    probe = asyncio.create_task(_probe(stop, lags))
+    await asyncio.sleep(0.05)
+    started = time.perf_counter()
+    await asyncio.gather(*(handle() for _ in range(uploads)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await probe
+    executor.shutdown()
+
+    lags.sort()
+
+    def percentile(q: float) -> float:
+        return round(lags[min(len(lags) - 1, int(q * len(lags)))], 1)
+
+    return {
+        "mode": mode,
+        "job": job,
+        "uploads": uploads,
+        "wall_seconds": round(elapsed, 2),
+        "loop_lag_p50_ms": percentile(0.5),
+        "loop_lag_p99_ms": percentile(0.99),
+        "loop_lag_max_ms": round(lags[-1], 1),
+        "probe_wakeups": len(lags),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--uploads", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--job", choices=("llm", "reference"), default="llm")
+    args = parser.parse_args()
+
+    upload = _make_upload()
+    print(json.dumps({"upload_bytes": len(upload), "megapixels": 12.0}))
+    for mode in ("inline", "pool"):
+        print(json.dumps(asyncio.run(_bench(mode, args.job, upload, args.uploads, args.workers))))
+
+
+if __name__ == "__main__":
+    main()
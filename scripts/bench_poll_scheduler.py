@@ -0,0 +1,200 @@
+"""
+Benchmark: per-task polling loops vs the shared PollScheduler.
+
+Starts a local fake video provider (plain HTTP on 127.0.0.1) that completes each
+remote task after `--polls` status queries, then watches `--tasks` remote tasks
+either the legacy way (one polling coroutine and client per task, as video
+tasks were watched before the PollScheduler) or through a single PollScheduler.
+
+Reports Python heap usage (tracemalloc), max RSS, and the number of TCP
+connections the provider saw.
+
+    python scripts/bench_poll_scheduler.py --tasks 10000 --mode both
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+
+class FakeProvider:
+    def __init__(self, polls_needed: int):
+        self.polls_needed = polls_needed
+        self.counts: dict[str, int] = {}
+        self.open_connections = 0
+        self.peak_connections = 0
+        self.total_connections = 0
+        self.requests = 0
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.open_connections += 1
+        self.total_connections += 1
+        self.peak_connections = max(self.peak_connections, self.open_connections)
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                while True:
+                    header = await reader.readline()
+                    if header in (b"\r\n", b"\n", b""):
+                        break
+                self.requests += 1
+                task_id = request_line.split()[1].decode().rsplit("/", 1)[-1]
+                count = self.counts[task_id] = self.counts.get(task_id, 0) + 1
+                if count >= self.polls_needed:
+                    payload = {"status": "completed", "progress": 100, "video_url": f"https://cdn.local/{task_id}.mp4"}
+                else:
+                    payload = {"status": "processing", "progress": int(100 * count / self.polls_needed)}
+                body = json.dumps(payload).encode()
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                    + f"Content-Length: {len(body)}\r\n\r\n".encode()
+                    + body
+                )
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.open_connections -= 1
+            writer.close()
+
+
+def _make_client_class():
+    from app.clients.veo_client import VeoClient
+
+    class LocalVeoClient(VeoClient):
+        # The fake provider speaks plain HTTP; production clients require HTTPS.
+        @staticmethod
+        def _normalize_base_url(base_url: str) -> str:
+            return base_url.rstrip("/")
+
+    return LocalVeoClient
+
+
+async def _poll_until_complete(client, task_id: str) -> dict:
+    """The legacy per-task loop: query, sleep POLLING_INTERVAL, repeat."""
+    from app.config import get_settings
+    from app.models.schemas import TaskStatus
+
+    settings = get_settings()
+    attempts = error_retries = 0
+    while attempts < settings.POLLING_MAX_ATTEMPTS:
+        try:
+            response = await client.query_task(task_id)
+            status = client.parse_status(response)
+            if status == TaskStatus.COMPLETED:
+                return response
+            if status in (TaskStatus.FAILED, TaskStatus.CANCELLED):
+                raise RuntimeError(str(response.get("error") or f"Task {status.value}"))
+            attempts += 1
+        except Exception:
+            error_retries += 1
+            if error_retries > settings.MAX_RETRIES:
+                raise
+        await asyncio.sleep(settings.POLLING_INTERVAL)
+    raise TimeoutError(f"Task {task_id} polling timeout after {settings.POLLING_MAX_ATTEMPTS} attempts")
+
+
+async def _run_legacy(client_class, base_url: str, tasks: int) -> None:
+    import httpx
+
+    from app.config import get_settings
+
+    settings = get_settings()
+
+    async def one(i: int) -> None:
+        client = client_class("bench-key", base_url=base_url)
+        # Video clients used to open their own connection pool; the shared
+        # per-origin pool would hide exactly the cost being measured.
+        client.client = httpx.AsyncClient(timeout=settings.REQUEST_TIMEOUT)
+        try:
+            await _poll_until_complete(client, f"task-{i}")
+        finally:
+            await client.client.aclose()
+            await client.close()
+
+    await asyncio.gather(*(one(i) for i in range(tasks)))
+
+
+async def _run_scheduler(client_class, base_url: str, tasks: int) -> None:
+    from app.core.poll_scheduler import PollScheduler
+
+    client = client_class("bench-key", base_url=base_url)
+    scheduler = PollScheduler()
+    try:
+        await asyncio.gather(*(scheduler.watch("veo", client, f"task-{i}") for i in range(tasks)))
+    finally:
+        await scheduler.stop()
+        await client.close()
+
+
+async def _bench(mode: str, tasks: int, polls: int) -> dict:
+    provider = FakeProvider(polls)
+    server = await asyncio.start_server(provider.handle, "127.0.0.1", 0, backlog=4096)
+    port = server.sockets[0].getsockname()[1]
+    base_url = f"http://127.0.0.1:{port}"
+    client_class = _make_client_class()
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    if mode == "legacy":
+        await _run_legacy(client_class, base_url, tasks)
+    else:
+        await _run_scheduler(client_class, base_url, tasks)
+    elapsed = time.perf_counter() - started
+    _, peak_heap = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    server.close()
+    await server.wait_closed()
+    return {
+        "mode": mode,
+        "tasks": tasks,
+        "elapsed_s": round(elapsed, 2),
+        "peak_heap_mb": round(peak_heap / 1024 / 1024, 1),
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "peak_connections": provider.peak_connections,
+        "total_connections": provider.total_connections,
+        "status_requests": provider.requests,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=10_000)
+    parser.add_argument("--polls", type=int, default=3, help="status queries until a task completes")
+    parser.add_argument("--interval", type=int, default=1, help="POLLING_INTERVAL in seconds")
+    parser.add_argument("--mode", choices=["legacy", "scheduler", "both"], default="both")
+    args = parser.parse_args()
+
+    if args.mode == "both":
+        # Separate processes so RSS numbers do not bleed into each other.
+        for mode in ("legacy", "scheduler"):
+            cmd = [sys.executable, __file__, "--tasks", str(args.tasks), "--polls", str(args.polls)]
+            cmd += ["--interval", str(args.interval), "--mode", mode]
+            subprocess.run(cmd, check=False)
+        return
+
+    os.environ["POLLING_INTERVAL"] = str(args.interval)
+    os.environ.setdefault("POLL_MAX_QPS_PER_PROVIDER", "0")
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+    result = asyncio.run(_bench(args.mode, args.tasks, args.polls))
+    print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
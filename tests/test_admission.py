@@ -0,0 +1,101 @@
+import asyncio
+import time
+import unittest
+
+
+class TestAdmissionController(unittest.IsolatedAsyncioTestCase):
+    def _controller(self, **limits):
+        from app.core.admission import AdmissionController
+
+        defaults = {
+            "rate": 0,
+            "burst": 1,
+            "concurrency": 0,
+            "key_rate": 0,
+            "key_burst": 1,
+            "key_concurrency": 0,
+            "queue_timeout": 0.2,
+        }
+        return AdmissionController(overrides={"p": {**defaults, **limits}})
+
+    async def test_key_bulkhead_times_out_without_blocking_other_keys(self) -> None:
+        from app.core.admission import AdmissionTimeoutError
+
+        controller = self._controller(key_concurrency=1, queue_timeout=0.05)
+        release = asyncio.Event()
+
+        async def hold() -> None:
+            async with controller.admit("p", "key-a"):
+                await release.wait()
+
+        holder = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        with self.assertRaises(AdmissionTimeoutError) as caught:
+            async with controller.admit("p", "key-a"):
+                pass
+        self.assertEqual(caught.exception.provider, "p")
+        self.assertGreaterEqual(caught.exception.retry_after, 1.0)
+
+        async with controller.admit("p", "key-b"):
+            pass
+        release.set()
+        await holder
+        async with controller.admit("p", "key-a"):
+            pass
+
+    async def test_rate_limit_spaces_calls_and_refuses_beyond_timeout(self) -> None:
+        from app.core.admission import AdmissionTimeoutError
+
+        controller = self._controller(rate=50, burst=1, queue_timeout=0.1)
+        started = time.monotonic()
+        for _ in range(3):
+            async with controller.admit("p"):
+                pass
+        self.assertGreaterEqual(time.monotonic() - started, 0.035)
+
+        # Reserve tokens far enough ahead that the next caller cannot make it in time.
+        bucket = controller._gate("p", None).bucket
+        for _ in range(10):
+            bucket.reserve()
+        with self.assertRaises(AdmissionTimeoutError):
+            async with controller.admit("p"):
+                pass
+
+    async def test_idle_key_gates_are_evicted_but_busy_ones_kept(self) -> None:
+        from app.core.admission import AdmissionController, AdmissionTimeoutError
+
+        limits = {"key_concurrency": 1, "queue_timeout": 0.05}
+        controller = AdmissionController(overrides={"p": limits}, max_keys=2)
+        release = asyncio.Event()
+
+        async def hold() -> None:
+            async with controller.admit("p", "busy"):
+                await release.wait()
+
+        holder = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        for i in range(10):
+            async with controller.admit("p", f"caller-{i}"):
+                pass
+
+        self.assertEqual(len(controller._key_gates), 2)
+        # The busy key's gate survived the churn and still enforces its bulkhead.
+        with self.assertRaises(AdmissionTimeoutError):
+            async with controller.admit("p", "busy"):
+                pass
+        release.set()
+        await holder
+
+    async def test_provider_overrides(self) -> None:
+        from app.core.admission import AdmissionController
+
+        controller = AdmissionController(overrides={"sora2": {"rate": 2, "concurrency": 4}})
+        self.assertEqual(controller.limits("sora2").rate, 2.0)
+        self.assertEqual(controller.limits("sora2").concurrency, 4)
+        self.assertEqual(controller.limits("veo"), controller.defaults)
+        with self.assertRaises(ValueError):
+            AdmissionController(overrides={"veo": {"qps": 1}}).limits("veo")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,140 @@
+import asyncio
+import unittest
+from unittest import mock
+
+
+def _status_error(code: int):
+    import httpx
+
+    request = httpx.Request("POST", "https://api.example.com/x")
+    return httpx.HTTPStatusError("error", request=request, response=httpx.Response(code, request=request))
+
+
+class TestCircuitBreaker(unittest.IsolatedAsyncioTestCase):
+    async def test_trips_rejects_and_recovers_through_half_open(self) -> None:
+        from app.core.circuit_breaker import CircuitBreaker, CircuitOpenError, CircuitState
+
+        breaker = CircuitBreaker(
+            "https://api.example.com",
+            window_seconds=60,
+            min_requests=4,
+            error_rate_threshold=0.5,
+            slow_call_seconds=10,
+            slow_call_rate_threshold=1.0,
+            open_seconds=0.05,
+            half_open_probes=1,
+        )
+        for code in (200, 400, 502, 503):
+            try:
+                async with breaker.guard():
+                    if code >= 400:
+                        raise _status_error(code)
+            except Exception:
+                pass
+        self.assertEqual(breaker.state, CircuitState.OPEN)
+        self.assertEqual(breaker.health(), 0.0)
+        with self.assertRaises(CircuitOpenError):
+            async with breaker.guard():
+                pass
+
+        await asyncio.sleep(0.06)
+        self.assertEqual(breaker.state, CircuitState.HALF_OPEN)
+        async with breaker.guard():
+            # Only one probe at a time while half-open.
+            with self.assertRaises(CircuitOpenError):
+                breaker.acquire()
+        self.assertEqual(breaker.state, CircuitState.CLOSED)
+        snapshot = breaker.snapshot()
+        self.assertEqual(snapshot["times_opened"], 1)
+        self.assertEqual(snapshot["total_failures"], 2)
+        self.assertEqual(snapshot["rejected"], 2)
+
+    async def test_failover_skips_failing_host_but_not_client_errors(self) -> None:
+        from app.core.circuit_breaker import BreakerRegistry, UpstreamEndpoint
+
+        registry = BreakerRegistry(min_requests=1, error_rate_threshold=0.5, open_seconds=60)
+        primary = UpstreamEndpoint("https://primary.example.com", "k1")
+        backup = UpstreamEndpoint("https://backup.example.com", "k2")
+        calls = []
+
+        async def attempt(endpoint):
+            calls.append(endpoint.base_url)
+            async with registry.get(endpoint.base_url).guard():
+                if endpoint is primary:
+                    raise _status_error(503)
+            return endpoint.api_key
+
+        self.assertEqual(await registry.call([primary, backup], attempt), "k2")
+        # The primary's circuit is now open, so it is not even tried.
+        self.assertEqual(await registry.call([primary, backup], attempt), "k2")
+        self.assertEqual(calls, [primary.base_url, backup.base_url, backup.base_url])
+
+        async def bad_request(endpoint):
+            raise _status_error(400)
+
+        with self.assertRaises(Exception) as caught:
+            await registry.call([backup, primary], bad_request)
+        self.assertEqual(caught.exception.response.status_code, 400)
+
+    async def test_breakers_of_caller_supplied_hosts_are_bounded_and_not_reported(self) -> None:
+        from app.core.circuit_breaker import BreakerRegistry
+
+        configured = "https://api.provider.example.com"
+        registry = BreakerRegistry(max_hosts=2, pinned_hosts={configured}, min_requests=1, open_seconds=60)
+        own = registry.get(f"{configured}/v1/images")
+        with self.assertRaises(Exception):
+            async with own.guard():
+                raise _status_error(503)
+        for index in range(50):
+            registry.get(f"https://user-{index}.example.net/v1")
+
+        self.assertEqual(len(registry), 3)
+        self.assertIs(registry.get(configured), own)
+        self.assertEqual(own.snapshot()["state"], "open")
+        self.assertEqual([entry["host"] for entry in registry.snapshot(pinned_only=True)], [configured])
+        self.assertEqual(
+            [entry["host"] for entry in registry.snapshot()],
+            ["https://user-48.example.net", "https://user-49.example.net", configured],
+        )
+
+
+class TestImageClientFailover(unittest.IsolatedAsyncioTestCase):
+    async def test_alternates_only_back_the_configured_endpoint(self) -> None:
+        import httpx
+
+        from app.clients.image_edits_client import ImageEditsClient
+        from app.config import get_settings
+        from app.core.circuit_breaker import BreakerRegistry
+
+        seen = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            seen.append((request.url.host, request.headers["authorization"]))
+            if request.url.host == "primary.example.com":
+                return httpx.Response(502, json={})
+            return httpx.Response(200, json={"data": [{"url": "https://cdn.example.com/1.png"}]})
+
+        pooled = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        settings = get_settings()
+        with mock.patch.object(settings, "IMAGE_EDIT_API_BASE_URL", "https://primary.example.com/"), \
+                mock.patch.object(settings, "IMAGE_EDIT_API_KEY", "own-key"), \
+                mock.patch.object(
+                    settings, "IMAGE_EDIT_API_ALTERNATES", [{"base_url": "https://backup.example.com"}]
+                ), \
+                mock.patch("app.clients.image_edits_client.get_http_client", return_value=pooled), \
+                mock.patch("app.clients.image_edits_client.get_breakers", return_value=BreakerRegistry()):
+            client = ImageEditsClient(api_key="own-key")
+            result = await client.images_generations(model="m", prompt="a cat")
+            self.assertEqual(result["data"][0]["url"], "https://cdn.example.com/1.png")
+            self.assertEqual(
+                seen,
+                [("primary.example.com", "Bearer own-key"), ("backup.example.com", "Bearer own-key")],
+            )
+
+            caller_supplied = ImageEditsClient(api_key="user-key", base_url="https://primary.example.com")
+            self.assertEqual(len(caller_supplied.endpoints), 1)
+        await pooled.aclose()
+
+
+if __name__ == "__main__":
+    unittest.main()
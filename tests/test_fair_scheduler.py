@@ -0,0 +1,144 @@
+import asyncio
+import unittest
+
+
+class TestFairScheduler(unittest.IsolatedAsyncioTestCase):
+    def _scheduler(self, capacity: int = 1, **kwargs):
+        from app.core.fair_scheduler import FairScheduler
+
+        kwargs.setdefault("max_queued_per_user", 1000)
+        return FairScheduler(capacity, service_seconds=10, **kwargs)
+
+    async def _run(self, scheduler, jobs, order):
+        """Queue `jobs` ((task_id, owner, priority)) behind a blocker and record the dispatch order."""
+        gate = asyncio.Event()
+
+        async def blocker():
+            async with scheduler.slot("blocker", "nobody"):
+                await gate.wait()
+
+        async def job(task_id, owner, priority):
+            async with scheduler.slot(task_id, owner, priority):
+                order.append(task_id)
+
+        blocking = asyncio.create_task(blocker())
+        await asyncio.sleep(0)
+        tasks = []
+        for task_id, owner, priority in jobs:
+            tasks.append(asyncio.create_task(job(task_id, owner, priority)))
+            await asyncio.sleep(0)
+        gate.set()
+        await asyncio.gather(blocking, *tasks)
+
+    async def test_heavy_user_does_not_starve_others(self) -> None:
+        from app.models.schemas import TaskPriority
+
+        scheduler = self._scheduler()
+        jobs = [(f"a{i}", "alice", TaskPriority.BATCH) for i in range(20)]
+        jobs += [("b0", "bob", TaskPriority.BATCH), ("b1", "bob", TaskPriority.BATCH)]
+        order = []
+        await self._run(scheduler, jobs, order)
+
+        # Bob queued last but alternates with Alice instead of waiting for all 20 of hers.
+        self.assertLessEqual(order.index("b0"), 2)
+        self.assertLessEqual(order.index("b1"), 4)
+
+    async def test_interactive_lane_gets_larger_share(self) -> None:
+        from app.models.schemas import TaskPriority
+
+        scheduler = self._scheduler(interactive_weight=4, batch_weight=1)
+        jobs = [(f"batch{i}", "alice", TaskPriority.BATCH) for i in range(10)]
+        jobs += [(f"sync{i}", "alice", TaskPriority.INTERACTIVE) for i in range(4)]
+        order = []
+        await self._run(scheduler, jobs, order)
+
+        first_six = order[:6]
+        self.assertEqual(sum(task_id.startswith("sync") for task_id in first_six), 4)
+
+    async def test_position_wait_and_admission(self) -> None:
+        from app.core.fair_scheduler import QueueFullError
+
+        scheduler = self._scheduler(capacity=1, max_queued_per_user=2)
+        gate = asyncio.Event()
+
+        async def job(task_id):
+            async with scheduler.slot(task_id, "alice"):
+                await gate.wait()
+
+        tasks = [asyncio.create_task(job(f"t{i}")) for i in range(3)]
+        await asyncio.sleep(0)
+
+        self.assertIsNone(scheduler.position("t0"))
+        self.assertEqual(scheduler.position("t2"), 2)
+        self.assertEqual(scheduler.estimated_wait("t2"), 20.0)
+        with self.assertRaises(QueueFullError) as ctx:
+            scheduler.check_admission("alice")
+        self.assertGreaterEqual(ctx.exception.retry_after, 1)
+        scheduler.check_admission("bob")
+
+        # Cancelling a waiter frees its place in line.
+        tasks[1].cancel()
+        await asyncio.sleep(0)
+        self.assertEqual(scheduler.position("t2"), 1)
+        scheduler.check_admission("alice")
+
+        gate.set()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.assertEqual(scheduler.running, 0)
+        self.assertEqual(scheduler.queued(), 0)
+
+
+    async def test_waiter_cancelled_during_release_passes_slot_on(self) -> None:
+        scheduler = self._scheduler(capacity=1)
+        gate = asyncio.Event()
+        order = []
+
+        async def job(task_id):
+            async with scheduler.slot(task_id, "alice"):
+                order.append(task_id)
+                await gate.wait()
+
+        tasks = [asyncio.create_task(job(f"t{i}")) for i in range(3)]
+        await asyncio.sleep(0)
+
+        # t1 is cancelled in the same step as t0 releases, before it can clean up.
+        gate.set()
+        tasks[1].cancel()
+        results = await asyncio.wait_for(asyncio.gather(*tasks, return_exceptions=True), timeout=5)
+
+        self.assertIsNone(results[0])
+        self.assertIsInstance(results[1], asyncio.CancelledError)
+        self.assertIsNone(results[2])
+        self.assertEqual(order, ["t0", "t2"])
+        self.assertEqual(scheduler.running, 0)
+        self.assertEqual(scheduler.queued(), 0)
+
+
+class TestQueueFullResponse(unittest.IsolatedAsyncioTestCase):
+    async def test_generate_returns_429_with_retry_after(self) -> None:
+        import httpx
+        from fastapi import FastAPI
+
+        from app.api.deps import AuthContext, get_current_user
+        from app.api.v1 import video
+        from app.core.fair_scheduler import QueueFullError
+
+        class _FullManager:
+            async def create_task(self, *args, **kwargs):
+                raise QueueFullError("user-1", retry_after=12.3)
+
+        app = FastAPI()
+        app.include_router(video.router, prefix="/api/v1")
+        app.dependency_overrides[video.get_task_manager] = lambda: _FullManager()
+        app.dependency_overrides[get_current_user] = lambda: AuthContext(user_id="user-1", claims={})
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.post("/api/v1/video/generate", json={"model": "veo", "prompt": "a cat"})
+
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response.headers["retry-after"], "13")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,304 @@
+import asyncio
+import base64
+import io
+import json
+import tempfile
+import unittest
+from datetime import datetime, timezone
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+
+def _png() -> bytes:
+    from PIL import Image
+
+    out = io.BytesIO()
+    Image.new("RGB", (64, 48), "teal").save(out, format="PNG")
+    return out.getvalue()
+
+
+class _FakeSession:
+    def __init__(self):
+        self.added = []
+        self.deleted = []
+
+    def add(self, obj):
+        self.added.append(obj)
+
+    async def get(self, model, key):
+        return next((obj for obj in self.added if getattr(obj, "id", None) == key and obj not in self.deleted), None)
+
+    async def delete(self, obj):
+        self.deleted.append(obj)
+
+    async def commit(self):
+        for obj in self.added:
+            if hasattr(obj, "prompt") and getattr(obj, "created_at", None) is None:
+                obj.created_at = datetime.now(timezone.utc)
+
+    async def rollback(self):
+        pass
+
+    async def refresh(self, obj):
+        pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+
+class _RequestSession:
+    """The request's own session, which a shared flight must not write through."""
+
+    def __init__(self, store: _FakeSession):
+        self.store = store
+
+    async def get(self, model, key):
+        return await self.store.get(model, key)
+
+    def add(self, obj):
+        raise AssertionError("flight wrote through the request session")
+
+    async def commit(self):
+        raise AssertionError("flight wrote through the request session")
+
+
+class TestGeneratedMedia(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        from app.config import get_settings
+        from app.core.media_store import get_media_backend
+        from app.core.storage_backend import LocalStorageBackend
+
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.root = Path(self._tmpdir.name)
+        self.backend = LocalStorageBackend(str(self.root), url_prefix="", max_workers=2)
+        patches = [
+            mock.patch.object(get_settings(), "STORAGE_MASTER_KEY", "test-master-key"),
+            mock.patch("app.core.media_store.get_media_backend", return_value=self.backend),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        get_media_backend.cache_clear()
+
+    async def asyncTearDown(self) -> None:
+        self.backend.close()
+        self._tmpdir.cleanup()
+
+    async def _store(self, db, user, images):
+        from app.api.v1.images import _store_image_record
+
+        response = {"created": 1, "data": [{"b64_json": base64.b64encode(data).decode(), "revised_prompt": "p"} for data in images]}
+        return await _store_image_record(
+            db,
+            user,
+            title=None,
+            model="gemini",
+            prompt="a fox",
+            record_status="completed",
+            request_dict={"model": "gemini"},
+            response_dict=response,
+        )
+
+    async def test_record_keeps_references_and_media_is_served(self) -> None:
+        from urllib.parse import parse_qs, urlsplit
+
+        from app.api.v1.images import delete_image, get_image, get_image_media
+        from app.core.encryption import decrypt_for_user
+
+        png = _png()
+        user = SimpleNamespace(id="user-1", is_admin=False, storage_used_bytes=0, storage_quota_bytes=10**9)
+        db = _FakeSession()
+
+        record, response = await self._store(db, user, [png, png])
+
+        stored = json.loads(decrypt_for_user(user_id="user-1", blob=record.response_encrypted))
+        self.assertNotIn("b64_json", json.dumps(stored))
+        self.assertLess(len(record.response_encrypted), 2048)
+        first = stored["data"][0]
+        self.assertEqual((first["content_type"], first["revised_prompt"], first["encrypted"]), ("image/png", "p", True))
+        # Signed URLs expire, so they are only ever added to responses, never stored.
+        self.assertNotIn("url", first)
+        self.assertIsNone(record.image_url)
+        self.assertEqual(user.storage_used_bytes, record.size_bytes)
+        self.assertGreater(record.size_bytes, 2 * len(png))
+
+        url = response["data"][0]["url"]
+        self.assertTrue(url.startswith(f"/api/v1/images/{record.id}/media/{first['media_id']}?"))
+        query = {name: values[0] for name, values in parse_qs(urlsplit(url).query).items()}
+
+        # Encrypted at rest: nothing on disk is the PNG.
+        files = sorted(self.root.rglob("*.enc"))
+        self.assertEqual(len(files), 2)
+        self.assertFalse(any(png in path.read_bytes() for path in files))
+
+        detail = await get_image(record.id, user=user, db=db)
+        self.assertEqual(detail.response["data"][0]["media_id"], first["media_id"])
+        self.assertIn("sig=", detail.response["data"][0]["url"])
+
+        served = await get_image_media(
+            record.id, first["media_id"], int(query["expires"]), query["sig"], user=None, db=db, if_none_match=None
+        )
+        self.assertEqual((served.body, served.media_type), (png, "image/png"))
+        self.assertIn("immutable", served.headers["cache-control"])
+        revalidated = await get_image_media(
+            record.id, first["media_id"], user=user, db=db, if_none_match=served.headers["etag"]
+        )
+        self.assertEqual(revalidated.status_code, 304)
+
+        with self.assertRaises(Exception) as ctx:
+            await get_image_media(record.id, "not-a-media-id", user=user, db=db, if_none_match=None)
+        self.assertEqual(ctx.exception.status_code, 404)
+        stranger = SimpleNamespace(id="user-2", is_admin=False)
+        with self.assertRaises(Exception) as ctx:
+            await get_image_media(record.id, first["media_id"], user=stranger, db=db, if_none_match=None)
+        self.assertEqual(ctx.exception.status_code, 404)
+
+        db.added.append(user)
+        await delete_image(record.id, user=user, db=db)
+        self.assertEqual(list(self.root.rglob("*.enc")), [])
+        self.assertEqual(user.storage_used_bytes, 0)
+
+    async def test_signed_url_works_without_authorization_header(self) -> None:
+        import httpx
+        from fastapi import FastAPI
+
+        from app.api.v1 import images
+        from app.config import get_settings
+        from app.core.media_store import media_url
+        from app.db.session import get_db
+
+        png = _png()
+        user = SimpleNamespace(id="user-1", is_admin=False, storage_used_bytes=0, storage_quota_bytes=10**9)
+        db = _FakeSession()
+        record, response = await self._store(db, user, [png])
+        media_id = response["data"][0]["media_id"]
+
+        app = FastAPI()
+        app.include_router(images.router, prefix="/api/v1")
+
+        async def override_db():
+            yield db
+
+        app.dependency_overrides[get_db] = override_db
+        with mock.patch.object(get_settings(), "SUPABASE_JWT_SECRET", "jwt-secret"):
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+                ok = await client.get(response["data"][0]["url"])
+                unsigned = await client.get(f"/api/v1/images/{record.id}/media/{media_id}")
+                tampered = await client.get(response["data"][0]["url"].replace(record.id, "other-image"))
+                expired = await client.get(media_url(record.id, media_id, now=0))
+
+        self.assertEqual((ok.status_code, ok.content), (200, png))
+        self.assertEqual(unsigned.status_code, 401)
+        self.assertEqual(tampered.status_code, 403)
+        self.assertEqual(expired.status_code, 403)
+
+    async def test_retry_with_idempotency_key_returns_the_stored_record(self) -> None:
+        from fastapi import HTTPException
+
+        from app.api.v1 import images
+        from app.core.idempotency import Idempotency
+
+        png = _png()
+        user = SimpleNamespace(id="user-1", is_admin=False, storage_used_bytes=0, storage_quota_bytes=10**9)
+        db = _FakeSession()
+        db.added.append(user)
+        calls = 0
+
+        async def call_provider():
+            nonlocal calls
+            calls += 1
+            return {"data": [{"b64_json": base64.b64encode(png).decode()}]}
+
+        async def submit(title=None):
+            return await images._generate_and_store(
+                _RequestSession(db),
+                SimpleNamespace(id=user.id),
+                call_provider,
+                flight_payload={"endpoint": "generations", "prompt": "a fox"},
+                api_key="key",
+                idempotency_key="retry-1",
+                title=title,
+                model="gemini",
+                prompt="a fox",
+                request_dict={"model": "gemini"},
+            )
+
+        idempotency = Idempotency(key_ttl_seconds=60, content_window_seconds=0, max_keys=100)
+        with mock.patch.object(images, "_get_image_idempotency", return_value=idempotency), mock.patch.object(
+            images, "get_session_factory", return_value=lambda: db
+        ):
+            first, second = await asyncio.gather(submit(), submit())
+            third = await submit()
+            with self.assertRaises(HTTPException) as ctx:
+                await submit(title="different")
+
+        self.assertEqual(calls, 1)
+        self.assertEqual(first.id, second.id)
+        self.assertEqual(first.id, third.id)
+        self.assertEqual(len([obj for obj in db.added if hasattr(obj, "prompt")]), 1)
+        self.assertGreater(user.storage_used_bytes, 0)
+        self.assertIn("sig=", third.response["data"][0]["url"])
+        self.assertEqual(ctx.exception.status_code, 422)
+        # Only the record id is remembered, not the provider response.
+        flight = next(iter(idempotency._keyed._flights._data.values())).value
+        self.assertEqual(flight.future.result(), first.id)
+
+    async def test_unencrypted_media_is_streamed(self) -> None:
+        from app.api.v1.images import get_image_media
+        from app.config import get_settings
+
+        png = _png()
+        user = SimpleNamespace(id="user-1", is_admin=False, storage_used_bytes=0, storage_quota_bytes=10**9)
+        db = _FakeSession()
+        with mock.patch.object(get_settings(), "MEDIA_ENCRYPT_AT_REST", False):
+            record, response = await self._store(db, user, [png])
+        media_id = response["data"][0]["media_id"]
+        self.assertEqual((self.root / "media" / "user-1" / media_id).read_bytes(), png)
+
+        served = await get_image_media(record.id, media_id, user=user, db=db, if_none_match=None)
+        body = b"".join([chunk async for chunk in served.body_iterator])
+        self.assertEqual(body, png)
+
+    async def test_media_is_removed_when_quota_is_exceeded(self) -> None:
+        from fastapi import HTTPException
+
+        user = SimpleNamespace(id="user-1", is_admin=False, storage_used_bytes=0, storage_quota_bytes=100)
+        with self.assertRaises(HTTPException) as ctx:
+            await self._store(_FakeSession(), user, [_png()])
+
+        self.assertEqual(ctx.exception.status_code, 413)
+        self.assertEqual([path for path in self.root.rglob("*") if path.is_file()], [])
+        self.assertEqual(user.storage_used_bytes, 0)
+
+    async def test_failed_write_rolls_back_the_others(self) -> None:
+        from app.core.media_store import externalize_images
+        from app.core.storage_backend import StorageBackendError
+
+        real_put = self.backend.put
+        calls = 0
+
+        async def flaky_put(key, data, **kwargs):
+            nonlocal calls
+            calls += 1
+            if calls == 2:
+                await asyncio.sleep(0.01)
+                raise StorageBackendError("disk full")
+            return await real_put(key, data, **kwargs)
+
+        encoded = base64.b64encode(_png()).decode()
+        response = {"data": [{"b64_json": encoded}, {"b64_json": encoded}, {"url": "https://cdn/x.png"}]}
+        with mock.patch.object(self.backend, "put", side_effect=flaky_put):
+            with self.assertRaises(StorageBackendError):
+                await externalize_images("user-1", response)
+
+        self.assertEqual([path for path in self.root.rglob("*") if path.is_file()], [])
+        # The provider response itself is never modified.
+        self.assertEqual(response["data"][0], {"b64_json": encoded})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,132 @@
+import asyncio
+import unittest
+from unittest import mock
+
+
+def _policy(**overrides):
+    from app.core.hedging import HedgePolicy
+
+    options = dict(percentile=0.9, min_samples=5, min_delay_seconds=0.0, budget_ratio=1.0, max_budget=10.0)
+    options.update(overrides)
+    return HedgePolicy("test", **options)
+
+
+def _warm_up(policy, latency: float) -> None:
+    for _ in range(100):
+        policy._latencies.append(latency)
+
+
+class TestHedgePolicy(unittest.IsolatedAsyncioTestCase):
+    async def test_no_hedge_until_enough_samples(self) -> None:
+        policy = _policy()
+        calls = []
+
+        async def call():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "ok"
+
+        self.assertIsNone(policy.delay())
+        self.assertEqual(await policy.run(call), "ok")
+        self.assertEqual((len(calls), policy.hedged), (1, 0))
+
+    async def test_slow_primary_is_hedged_and_loses(self) -> None:
+        policy = _policy()
+        _warm_up(policy, 0.01)
+        cancelled = asyncio.Event()
+        delays = iter([5.0, 0.0])
+
+        async def call():
+            delay = next(delays)
+            try:
+                await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+            return delay
+
+        self.assertEqual(await policy.run(call), 0.0)
+        await asyncio.sleep(0)
+        self.assertTrue(cancelled.is_set())
+        snapshot = policy.snapshot()
+        self.assertEqual((snapshot["hedged"], snapshot["hedge_wins"]), (1, 1))
+        self.assertEqual(snapshot["win_rate"], 1.0)
+
+    async def test_failed_primary_falls_back_to_hedge(self) -> None:
+        policy = _policy()
+        _warm_up(policy, 0.01)
+        attempts = iter(["fail", "ok"])
+
+        async def call():
+            outcome = next(attempts)
+            if outcome == "fail":
+                await asyncio.sleep(0.05)
+                raise RuntimeError("primary failed")
+            await asyncio.sleep(0.1)
+            return outcome
+
+        self.assertEqual(await policy.run(call), "ok")
+
+    async def test_both_failing_raises_first_error(self) -> None:
+        policy = _policy()
+        _warm_up(policy, 0.01)
+        errors = iter([RuntimeError("first"), RuntimeError("second")])
+
+        async def call():
+            error = next(errors)
+            await asyncio.sleep(0.05)
+            raise error
+
+        with self.assertRaisesRegex(RuntimeError, "first"):
+            await policy.run(call)
+
+    async def test_budget_caps_extra_calls(self) -> None:
+        policy = _policy(budget_ratio=0.25, max_budget=1.0)
+        _warm_up(policy, 0.001)
+        starts = []
+
+        async def call():
+            starts.append(1)
+            await asyncio.sleep(0.02)
+            return "ok"
+
+        for _ in range(8):
+            await policy.run(call)
+
+        # 8 calls earn 2 hedges at 25%; every other slow call goes unhedged.
+        self.assertEqual(policy.hedged, 2)
+        self.assertEqual(len(starts), 10)
+        self.assertEqual(policy.budget_exhausted, 6)
+        self.assertEqual(policy.snapshot()["extra_call_ratio"], 0.25)
+
+    async def test_image_client_hedges_only_when_enabled(self) -> None:
+        import httpx
+
+        from app.clients.image_edits_client import ImageEditsClient
+        from app.core.circuit_breaker import BreakerRegistry
+        from app.core.hedging import HedgeRegistry
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(200, json={"data": [{"url": "https://cdn/a.png"}]})
+
+        pooled = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        hedges = HedgeRegistry(min_samples=1)
+        with mock.patch("app.clients.image_edits_client.get_http_client", return_value=pooled), \
+                mock.patch("app.clients.image_edits_client.get_breakers", return_value=BreakerRegistry()), \
+                mock.patch("app.clients.image_edits_client.get_hedges", return_value=hedges):
+            prepared = ImageEditsClient.prepare_images_generations(model="m", prompt="a cat")
+            await ImageEditsClient(api_key="k", base_url="https://api.example.com").send(prepared)
+            self.assertEqual(hedges.snapshot(), [])
+
+            hedged = ImageEditsClient(api_key="k", base_url="https://api.example.com", hedge=True)
+            result = await hedged.send(prepared)
+
+        self.assertEqual(result["data"][0]["url"], "https://cdn/a.png")
+        snapshot = hedges.snapshot()
+        self.assertEqual(snapshot[0]["name"], "image_edits:/v1/images/generations")
+        self.assertEqual(snapshot[0]["calls"], 1)
+        await pooled.aclose()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+import unittest
+
+
+class TestHttpClientRegistry(unittest.IsolatedAsyncioTestCase):
+    async def test_one_client_per_origin(self) -> None:
+        from app.core.http_clients import HttpClientRegistry
+
+        registry = HttpClientRegistry(max_connections=10, max_keepalive_connections=5, keepalive_expiry=5)
+        client = registry.get("https://api.example.com/v1/video/tasks/1")
+        self.assertIs(registry.get("https://API.example.com/v2/videos/generations"), client)
+        self.assertIsNot(registry.get("https://api.example.com:8443/v1"), client)
+        self.assertIsNot(registry.get("http://api.example.com/v1"), client)
+        with self.assertRaises(ValueError):
+            registry.get("/relative/path")
+
+        await registry.aclose()
+        self.assertTrue(client.is_closed)
+        reopened = registry.get("https://api.example.com/v1")
+        self.assertIsNot(reopened, client)
+        self.assertFalse(reopened.is_closed)
+        await registry.aclose()
+
+    async def test_cookies_are_not_shared_between_callers(self) -> None:
+        import httpx
+
+        from app.core.http_clients import HttpClientRegistry
+
+        seen = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            seen.append(request.headers.get("cookie"))
+            return httpx.Response(200, headers={"Set-Cookie": "sb-session=USER_A_SECRET; Path=/"})
+
+        registry = HttpClientRegistry()
+        client = registry.get("https://project.supabase.co/auth/v1/token")
+        client._transport = httpx.MockTransport(handler)
+
+        await client.get("https://project.supabase.co/auth/v1/token", headers={"Authorization": "Bearer user-a"})
+        await client.get("https://project.supabase.co/auth/v1/user", headers={"Authorization": "Bearer user-b"})
+
+        self.assertEqual(seen, [None, None])
+        self.assertEqual(len(client.cookies.jar), 0)
+        await registry.aclose()
+
+    async def test_clients_of_caller_supplied_origins_are_bounded(self) -> None:
+        import asyncio
+
+        from app.core.http_clients import HttpClientRegistry
+
+        configured = "https://api.provider.example.com"
+        registry = HttpClientRegistry(timeout=0.01, max_origins=1, pinned_origins={configured})
+        own = registry.get(f"{configured}/v1")
+        first = registry.get("https://user-1.example.net/v1")
+        second = registry.get("https://user-2.example.net/v1")
+
+        self.assertEqual(len(registry), 2)
+        self.assertIs(registry.get(configured), own)
+        # The evicted client is closed only after in-flight requests had time to finish.
+        self.assertFalse(first.is_closed)
+        await asyncio.sleep(0.05)
+        self.assertTrue(first.is_closed)
+        self.assertFalse(second.is_closed)
+        await registry.aclose()
+
+    async def test_loop_registry_is_closed_at_shutdown(self) -> None:
+        from app.core.http_clients import close_http_clients, get_http_client, get_http_clients
+
+        registry = get_http_clients()
+        self.assertIs(get_http_clients(), registry)
+        client = get_http_client("https://api.example.com/v1")
+        await close_http_clients()
+        self.assertTrue(client.is_closed)
+        self.assertIsNot(get_http_clients(), registry)
+        await close_http_clients()
+
+
+class TestPooledProviderClients(unittest.IsolatedAsyncioTestCase):
+    async def test_keys_share_a_client_and_send_auth_per_request(self) -> None:
+        import httpx
+
+        from app.clients.sora_client import Sora2Client
+        from app.core.http_clients import close_http_clients
+
+        first = Sora2Client(api_key="key-a", base_url="https://api.example.com")
+        second = Sora2Client(api_key="key-b", base_url="https://api.example.com")
+        self.assertIs(first.client, second.client)
+        self.assertNotIn("authorization", first.client.headers)
+
+        seen = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            seen.append((request.headers["authorization"], request.headers.get("x-trace")))
+            return httpx.Response(200, json={"ok": True})
+
+        mock_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        first.client = mock_client
+        second.client = mock_client
+        async with first, second:
+            await first._request("GET", "/v1/video/tasks/1", headers={"X-Trace": "t1"})
+            await second._request("GET", "/v1/video/tasks/2")
+        self.assertFalse(mock_client.is_closed)
+        self.assertEqual(seen, [("Bearer key-a", "t1"), ("Bearer key-b", None)])
+        await mock_client.aclose()
+        await close_http_clients()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,159 @@
+import asyncio
+import unittest
+
+
+class TestIdempotency(unittest.IsolatedAsyncioTestCase):
+    async def test_concurrent_duplicates_share_one_call(self) -> None:
+        from app.core.idempotency import Idempotency
+
+        idempotency = Idempotency(key_ttl_seconds=60, content_window_seconds=60, max_keys=100)
+        calls = 0
+        release = asyncio.Event()
+
+        async def generate():
+            nonlocal calls
+            calls += 1
+            await release.wait()
+            return {"image": calls}
+
+        payload = {"model": "m", "prompt": "a cat", "params": {"b": 1, "a": 2}}
+        reordered = {"params": {"a": 2, "b": 1}, "prompt": "a cat", "model": "m"}
+        first = asyncio.create_task(idempotency.run("alice", payload, generate))
+        second = asyncio.create_task(idempotency.run("alice", reordered, generate))
+        other_user = asyncio.create_task(idempotency.run("bob", payload, generate))
+        await asyncio.sleep(0)
+        release.set()
+
+        results = await asyncio.gather(first, second, other_user)
+        self.assertEqual(calls, 2)
+        self.assertIs(results[0], results[1])
+        self.assertIsNot(results[0], results[2])
+
+    async def test_explicit_key_conflict_and_failure_retry(self) -> None:
+        from app.core.idempotency import Idempotency, IdempotencyConflictError
+
+        idempotency = Idempotency(key_ttl_seconds=60, content_window_seconds=0, max_keys=100)
+        attempts = 0
+
+        async def flaky():
+            nonlocal attempts
+            attempts += 1
+            if attempts == 1:
+                raise RuntimeError("upstream down")
+            return "ok"
+
+        with self.assertRaises(RuntimeError):
+            await idempotency.run("alice", {"prompt": "x"}, flaky, idempotency_key="k1")
+        # The failure is not remembered: a retry with the same key runs again.
+        self.assertEqual(await idempotency.run("alice", {"prompt": "x"}, flaky, idempotency_key="k1"), "ok")
+        self.assertEqual(await idempotency.run("alice", {"prompt": "x"}, flaky, idempotency_key="k1"), "ok")
+        self.assertEqual(attempts, 2)
+
+        with self.assertRaises(IdempotencyConflictError):
+            await idempotency.run("alice", {"prompt": "y"}, flaky, idempotency_key="k1")
+
+        # Without a key and with content matching off, every call runs.
+        await idempotency.run("alice", {"prompt": "x"}, flaky)
+        self.assertEqual(attempts, 3)
+
+
+class TestTTLCache(unittest.TestCase):
+    def test_expired_entries_are_dropped_on_every_access(self) -> None:
+        from unittest import mock
+
+        from app.core.cache import TTLCache
+
+        now = [100.0]
+        with mock.patch("app.core.cache.time.monotonic", side_effect=lambda: now[0]):
+            cache: TTLCache[str, bytes] = TTLCache(ttl_seconds=10, max_items=10_000)
+            for i in range(5):
+                cache.set(f"k{i}", b"x" * 1024)
+            now[0] += 5
+            cache.set("k0", b"refreshed")
+            now[0] += 6
+
+            # Far below max_items, the expired entries still go on the next lookup of any key.
+            self.assertIsNone(cache.get("unrelated"))
+            self.assertEqual(len(cache), 1)
+            self.assertEqual(cache.get("k0"), b"refreshed")
+
+            now[0] += 10
+            cache.set("new", b"y")
+            self.assertEqual(len(cache), 1)
+
+
+class _CountingVideoClient:
+    def __init__(self):
+        self.created = 0
+        self.release = asyncio.Event()
+
+    async def create_video(self, **kwargs) -> str:
+        self.created += 1
+        return f"remote-{self.created}"
+
+    async def query_task(self, task_id: str):
+        await self.release.wait()
+        return {"status": "failed", "error": "boom"}
+
+    def parse_status(self, response):
+        from app.models.schemas import TaskStatus
+
+        return TaskStatus(response["status"])
+
+    async def close(self) -> None:
+        return None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+
+class TestTaskManagerIdempotency(unittest.IsolatedAsyncioTestCase):
+    async def test_duplicate_requests_attach_to_in_flight_task(self) -> None:
+        from unittest import mock
+
+        from app.config import get_settings
+        from app.core.task_manager import TaskManager
+        from app.models.schemas import ModelType, TaskStatus, VideoGenerationRequest
+
+        client = _CountingVideoClient()
+        # Content matching is opt-in.
+        with mock.patch.object(get_settings(), "IDEMPOTENCY_CONTENT_WINDOW_SECONDS", 10.0):
+            manager = TaskManager(api_key="test-key")
+        manager._get_client = lambda model, api_key=None: client  # type: ignore[method-assign]
+        manager.poll_scheduler.policy = None
+        request = VideoGenerationRequest(model=ModelType.VEO, prompt="a cat")
+
+        first, second = await asyncio.gather(
+            manager.create_task(request, owner_user_id="user-1"),
+            manager.create_task(request.model_copy(), owner_user_id="user-1"),
+        )
+        keyed = await manager.create_task(
+            VideoGenerationRequest(model=ModelType.VEO, prompt="a dog"),
+            owner_user_id="user-1",
+            idempotency_key="retry-1",
+        )
+        keyed_again = await manager.create_task(
+            VideoGenerationRequest(model=ModelType.VEO, prompt="a dog"),
+            owner_user_id="user-1",
+            idempotency_key="retry-1",
+        )
+        self.assertEqual(first, second)
+        self.assertEqual(keyed, keyed_again)
+        self.assertEqual(len(manager.tasks), 2)
+
+        # A failed task is not handed out again for a content match.
+        client.release.set()
+        await manager.wait_all()
+        self.assertEqual((await manager.get_task_status(first)).status, TaskStatus.FAILED)
+        retried = await manager.create_task(request, owner_user_id="user-1")
+        self.assertNotEqual(retried, first)
+        client.release.set()
+        await manager.wait_all()
+        await manager.shutdown()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+import asyncio
+import io
+import threading
+import time
+import unittest
+
+
+def _png(width: int = 64, height: int = 48) -> bytes:
+    from PIL import Image
+
+    out = io.BytesIO()
+    Image.new("RGBA", (width, height), (200, 10, 10, 128)).save(out, format="PNG")
+    return out.getvalue()
+
+
+class TestImageExecutor(unittest.IsolatedAsyncioTestCase):
+    async def test_runs_jobs_in_worker_processes(self) -> None:
+        from app.core.image_executor import ImageExecutor
+        from app.core.product_storage import ProductStorageError, prepare_image_for_llm
+
+        executor = ImageExecutor(max_workers=1, max_queue=2, job_timeout=60)
+        try:
+            data, preprocessing = await executor.run(prepare_image_for_llm, _png())
+            self.assertTrue(data.startswith(b"\xff\xd8"))
+            self.assertEqual((preprocessing["original_format"], preprocessing["processed_format"]), ("png", "jpeg"))
+
+            # Errors raised in the worker reach the caller unchanged.
+            with self.assertRaises(ProductStorageError):
+                await executor.run(prepare_image_for_llm, b"not an image")
+        finally:
+            executor.shutdown()
+
+    async def test_crashed_worker_is_reported_as_busy_and_replaced(self) -> None:
+        import os
+
+        from app.api.deps import image_processing_unavailable_error
+        from app.core.image_executor import ImageExecutor, ImageExecutorBusyError, ImageWorkerLostError
+        from app.core.product_storage import prepare_image_for_llm
+
+        executor = ImageExecutor(max_workers=1, max_queue=1, job_timeout=60)
+        try:
+            with self.assertRaises(ImageWorkerLostError) as ctx:
+                await executor.run(os._exit, 1)
+            self.assertIsInstance(ctx.exception, ImageExecutorBusyError)
+            error = image_processing_unavailable_error(ctx.exception)
+            self.assertEqual((error.status_code, error.headers["Retry-After"]), (503, "1"))
+
+            data, _ = await executor.run(prepare_image_for_llm, _png())
+            self.assertTrue(data.startswith(b"\xff\xd8"))
+        finally:
+            executor.shutdown()
+
+    async def test_rejects_jobs_beyond_the_queue(self) -> None:
+        from app.core.image_executor import ImageExecutor, ImageExecutorBusyError
+
+        executor = ImageExecutor(max_workers=0, max_queue=1, job_timeout=5)
+        release = threading.Event()
+        try:
+            running = [asyncio.ensure_future(executor.run(release.wait, 5)) for _ in range(2)]
+            await asyncio.sleep(0.01)
+            with self.assertRaises(ImageExecutorBusyError):
+                await executor.run(time.sleep, 0)
+
+            release.set()
+            await asyncio.gather(*running)
+            self.assertIsNone(await executor.run(time.sleep, 0))
+        finally:
+            release.set()
+            executor.shutdown()
+
+    async def test_timed_out_job_keeps_its_slot_until_done(self) -> None:
+        from app.core.image_executor import ImageExecutor, ImageExecutorBusyError, ImageJobTimeoutError
+
+        executor = ImageExecutor(max_workers=0, max_queue=0, job_timeout=0.05)
+        release = threading.Event()
+        try:
+            with self.assertRaises(ImageJobTimeoutError):
+                await executor.run(release.wait, 5)
+            with self.assertRaises(ImageExecutorBusyError):
+                await executor.run(time.sleep, 0)
+
+            release.set()
+            await asyncio.sleep(0.05)
+            self.assertIsNone(await executor.run(time.sleep, 0))
+        finally:
+            release.set()
+            executor.shutdown()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+import io
+import pickle
+import unittest
+from unittest import mock
+
+
+def _encode(image, fmt: str, **params) -> bytes:
+    out = io.BytesIO()
+    image.save(out, format=fmt, **params)
+    return out.getvalue()
+
+
+class TestImageProbe(unittest.TestCase):
+    def test_header_facts_without_decoding(self) -> None:
+        from PIL import Image, ImageFile
+
+        from app.core.product_storage import ImageProbe
+
+        exif = Image.Exif()
+        exif[0x0112] = 6
+        data = _encode(Image.new("RGB", (120, 80), "blue"), "JPEG", exif=exif)
+
+        with mock.patch.object(ImageFile.ImageFile, "load", autospec=True, side_effect=ImageFile.ImageFile.load) as load:
+            probe = ImageProbe(data)
+            self.assertEqual((probe.format, probe.width, probe.height, probe.mode), ("jpeg", 120, 80, "RGB"))
+            self.assertEqual(probe.orientation, 6)
+            self.assertEqual(probe.size_bytes, len(data))
+            self.assertEqual(load.call_count, 0)
+
+            probe.pixels()
+            probe.pixels()
+        self.assertEqual(load.call_count, 1)
+
+    def test_invalid_bytes(self) -> None:
+        from app.core.product_storage import ImageProbe, ProductStorageError, get_image_format
+
+        with self.assertRaises(ProductStorageError):
+            ImageProbe(b"not an image")
+        with self.assertRaises(ProductStorageError):
+            get_image_format(b"not an image")
+
+    def test_prepare_for_llm_opens_the_upload_once(self) -> None:
+        from PIL import Image
+
+        from app.core import product_storage
+        from app.core.product_storage import ImageProbe, prepare_image_for_llm
+
+        data = _encode(Image.new("RGBA", (64, 48), (10, 200, 10, 128)), "PNG")
+        with mock.patch.object(product_storage.Image, "open", wraps=Image.open) as opened:
+            probe = ImageProbe(data)
+            processed, preprocessing = prepare_image_for_llm(probe)
+
+        self.assertEqual(opened.call_count, 1)
+        self.assertTrue(processed.startswith(b"\xff\xd8"))
+        self.assertEqual(preprocessing["original_format"], "png")
+        self.assertEqual((preprocessing["original_width"], preprocessing["original_height"]), (64, 48))
+        self.assertTrue(preprocessing["was_converted"])
+
+    def test_pickles_as_bytes_and_header_facts(self) -> None:
+        from PIL import Image
+
+        from app.core.product_storage import ImageProbe
+
+        probe = ImageProbe(_encode(Image.new("L", (10, 20)), "PNG"))
+        probe.pixels()
+        copy = pickle.loads(pickle.dumps(probe))
+
+        self.assertEqual((copy.format, copy.width, copy.height, copy.mode), ("png", 10, 20, "L"))
+        self.assertEqual(copy.pixels().size, (10, 20))
+
+
+if __name__ == "__main__":
+    unittest.main()
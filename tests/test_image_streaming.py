@@ -0,0 +1,184 @@
+import asyncio
+import json
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+
+def _events(chunks):
+    events = []
+    for chunk in chunks:
+        head, data = chunk.decode().strip().split("\n", 1)
+        events.append((head.removeprefix("event: "), json.loads(data.removeprefix("data: "))))
+    return events
+
+
+class _FakeSession:
+    def __init__(self):
+        self.added = []
+
+    def add(self, obj):
+        self.added.append(obj)
+
+    async def commit(self):
+        from datetime import datetime, timezone
+
+        for obj in self.added:
+            if getattr(obj, "created_at", None) is None and hasattr(obj, "prompt"):
+                obj.id = obj.id or "img-1"
+                obj.created_at = datetime.now(timezone.utc)
+
+    async def rollback(self):
+        pass
+
+    async def refresh(self, obj):
+        pass
+
+
+class TestAsCompletedSlots(unittest.IsolatedAsyncioTestCase):
+    async def test_yields_in_completion_order_and_isolates_failures(self) -> None:
+        from app.core.fan_out import as_completed_slots
+
+        async def call(delay, value=None, error=None):
+            await asyncio.sleep(delay)
+            if error:
+                raise error
+            return value
+
+        calls = [call(0.05, "slow"), call(0.0, error=RuntimeError("boom")), call(0.01, "fast")]
+        slots = [slot async for slot in as_completed_slots(calls)]
+
+        self.assertEqual([slot.index for slot in slots], [1, 2, 0])
+        self.assertFalse(slots[0].ok)
+        self.assertEqual(str(slots[0].error), "boom")
+        self.assertEqual([slot.value for slot in slots[1:]], ["fast", "slow"])
+
+    async def test_closing_early_cancels_the_rest(self) -> None:
+        from app.core.fan_out import as_completed_slots
+
+        cancelled = asyncio.Event()
+
+        async def hang():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        async def quick():
+            return 1
+
+        slots = as_completed_slots([quick(), hang()])
+        first = await slots.__anext__()
+        await slots.aclose()
+
+        self.assertEqual(first.value, 1)
+        self.assertTrue(cancelled.is_set())
+
+
+class TestImageStreaming(unittest.IsolatedAsyncioTestCase):
+    async def test_proxy_stream_reports_each_slot(self) -> None:
+        import httpx
+
+        from app.api.v1.image_proxy import _stream_images
+        from app.core.circuit_breaker import CircuitOpenError
+
+        async def ok(url, delay):
+            await asyncio.sleep(delay)
+            return {"data": [{"url": url}]}
+
+        async def rejected():
+            response = httpx.Response(400, text="bad prompt", request=httpx.Request("POST", "https://x/v1"))
+            raise httpx.HTTPStatusError("bad", request=response.request, response=response)
+
+        async def open_circuit():
+            raise CircuitOpenError("https://x", 12.5)
+
+        async def empty():
+            return {"data": []}
+
+        calls = [ok("https://cdn/a.png", 0.02), rejected(), ok("https://cdn/b.png", 0.0), open_circuit(), empty()]
+        events = _events([chunk async for chunk in _stream_images(calls)])
+
+        self.assertEqual(events[-1][0], "end")
+        self.assertEqual(events[-1][1]["succeeded"], [0, 2])
+        failed = {failure["index"]: failure for failure in events[-1][1]["failed"]}
+        self.assertEqual(failed[1]["status_code"], 502)
+        self.assertEqual(failed[1]["detail"], "bad prompt")
+        self.assertEqual((failed[3]["status_code"], failed[3]["retry_after"]), (503, 13))
+        self.assertIn("did not contain any image data", failed[4]["detail"])
+
+        images = [data for kind, data in events if kind == "image"]
+        # The fast slot is delivered before the slow one.
+        self.assertEqual([image["index"] for image in images], [2, 0])
+        self.assertEqual(images[0]["data"], {"url": "https://cdn/b.png"})
+
+    async def test_store_keeps_partial_results(self) -> None:
+        from app.api.v1 import images
+
+        async def ok(url):
+            return {"data": [{"url": url}]}
+
+        async def failing():
+            raise RuntimeError("upstream exploded")
+
+        user = SimpleNamespace(id="user-1", storage_used_bytes=0, storage_quota_bytes=10**9)
+        db = _FakeSession()
+        stored = {}
+
+        def encrypt(*, user_id, plaintext):
+            stored.setdefault(user_id, []).append(json.loads(plaintext))
+            return plaintext
+
+        with mock.patch.object(images, "encrypt_for_user", side_effect=encrypt):
+            chunks = [
+                chunk
+                async for chunk in images._stream_and_store_images(
+                    db,
+                    user,
+                    [ok("https://cdn/a.png"), failing(), ok("https://cdn/c.png")],
+                    title=None,
+                    model="m",
+                    prompt="a cat",
+                    request_dict={"model": "m", "n": 3},
+                )
+            ]
+        events = _events(chunks)
+
+        kind, summary = events[-1]
+        self.assertEqual(kind, "end")
+        self.assertEqual(summary["succeeded"], [0, 2])
+        self.assertEqual([failure["index"] for failure in summary["failed"]], [1])
+        self.assertEqual(summary["image"]["status"], "partial")
+        self.assertEqual(summary["image"]["image_url"], "https://cdn/a.png")
+
+        record = db.added[0]
+        self.assertEqual(record.status, "partial")
+        self.assertEqual(user.storage_used_bytes, record.size_bytes)
+        response = stored["user-1"][1]
+        self.assertEqual(response["data"], [{"url": "https://cdn/a.png"}, {"url": "https://cdn/c.png"}])
+        self.assertEqual(response["errors"][0]["detail"], "upstream exploded")
+
+    async def test_store_skipped_when_every_slot_fails(self) -> None:
+        from app.api.v1 import images
+
+        async def failing():
+            raise RuntimeError("down")
+
+        db = _FakeSession()
+        user = SimpleNamespace(id="user-1", storage_used_bytes=0, storage_quota_bytes=10**9)
+        chunks = [
+            chunk
+            async for chunk in images._stream_and_store_images(
+                db, user, [failing(), failing()], title=None, model="m", prompt="p", request_dict={}
+            )
+        ]
+        kind, summary = _events(chunks)[-1]
+
+        self.assertEqual((kind, summary["succeeded"], summary["image"]), ("end", [], None))
+        self.assertEqual(len(summary["failed"]), 2)
+        self.assertEqual(db.added, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
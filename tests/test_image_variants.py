@@ -0,0 +1,136 @@
+import io
+import os
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+
+def _jpeg(width: int = 1200, height: int = 800) -> bytes:
+    from PIL import Image
+
+    out = io.BytesIO()
+    Image.new("RGB", (width, height), "orange").save(out, format="JPEG", quality=95)
+    return out.getvalue()
+
+
+class TestImageVariants(unittest.TestCase):
+    def setUp(self) -> None:
+        from fastapi import FastAPI
+        from fastapi.testclient import TestClient
+
+        from app.config import get_settings
+        from app.core.image_executor import ImageExecutor
+        from app.core.static_files import ImageVariantStaticFiles
+
+        self._tmpdir = tempfile.TemporaryDirectory()
+        root = Path(self._tmpdir.name)
+        self.uploads = root / "uploads"
+        (self.uploads / "products" / "u1" / "blobs").mkdir(parents=True)
+        self.source = _jpeg()
+        (self.uploads / "products" / "u1" / "p1.jpg").write_bytes(self.source)
+        self.blob_name = "a" * 64 + ".jpg"
+        (self.uploads / "products" / "u1" / "blobs" / self.blob_name).write_bytes(self.source)
+
+        self.cache_dir = root / "variants"
+        patches = [
+            mock.patch.object(get_settings(), "IMAGE_VARIANT_CACHE_DIR", str(self.cache_dir)),
+            mock.patch("app.core.static_files.get_image_executor", return_value=ImageExecutor(max_workers=0)),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+        app = FastAPI()
+        app.mount("/uploads", ImageVariantStaticFiles(directory=str(self.uploads)), name="uploads")
+        self.client = TestClient(app)
+
+    def tearDown(self) -> None:
+        self.client.close()
+        self._tmpdir.cleanup()
+
+    def test_renders_caches_and_revalidates(self) -> None:
+        from PIL import Image
+
+        from app.core.image_variants import render_variant
+
+        url = "/uploads/products/u1/p1.jpg?w=300&fmt=webp"
+        with mock.patch("app.core.static_files.render_variant", wraps=render_variant) as render:
+            first = self.client.get(url)
+            second = self.client.get(url)
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.headers["content-type"], "image/webp")
+        self.assertLess(len(first.content), len(self.source))
+        # 300 is rounded up to the configured 320.
+        self.assertEqual(Image.open(io.BytesIO(first.content)).size, (320, 213))
+        self.assertEqual(first.headers["cache-control"], "public, no-cache")
+        self.assertEqual(first.headers["etag"], second.headers["etag"])
+        self.assertFalse(first.headers["etag"].startswith("W/"))
+        self.assertEqual(render.call_count, 1)
+
+        not_modified = self.client.get(url, headers={"If-None-Match": first.headers["etag"]})
+        self.assertEqual(not_modified.status_code, 304)
+
+        # Replacing the source changes the ETag.
+        (self.uploads / "products" / "u1" / "p1.jpg").write_bytes(_jpeg(600, 600))
+        os.utime(self.uploads / "products" / "u1" / "p1.jpg", ns=(1, 1))
+        self.assertNotEqual(self.client.get(url).headers["etag"], first.headers["etag"])
+
+    def test_content_addressed_sources_are_immutable(self) -> None:
+        response = self.client.get(f"/uploads/products/u1/blobs/{self.blob_name}?w=64&fmt=jpeg")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["content-type"], "image/jpeg")
+        self.assertEqual(response.headers["cache-control"], "public, max-age=31536000, immutable")
+
+    def test_rendering_prunes_stale_variants(self) -> None:
+        stale = self.cache_dir / "ab" / ("ab" * 32 + ".webp")
+        stale.parent.mkdir(parents=True)
+        stale.write_bytes(b"old")
+        os.utime(stale, (1, 1))
+
+        self.assertEqual(self.client.get("/uploads/products/u1/p1.jpg?w=64").status_code, 200)
+        for _ in range(100):
+            if not stale.exists():
+                break
+            time.sleep(0.01)
+
+        self.assertFalse(stale.exists())
+        self.assertEqual(len(list(self.cache_dir.glob("*/*"))), 1)
+
+    def test_prune_drops_expired_then_least_recently_used(self) -> None:
+        from app.core.image_variants import prune_variant_cache, use_cached_variant
+
+        now = time.time()
+        files = {}
+        for name, age in (("expired", 90_000), ("old", 3_000), ("used", 5_000), ("new", 10)):
+            path = self.cache_dir / name[:2] / f"{name}.webp"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(b"x" * 100)
+            os.utime(path, (now - age, now - age))
+            files[name] = path
+        # Serving a variant counts as using it.
+        self.assertTrue(use_cached_variant(files["used"]))
+        self.assertFalse(use_cached_variant(self.cache_dir / "no" / "missing.webp"))
+
+        freed = prune_variant_cache(str(self.cache_dir), max_bytes=200, max_age_seconds=86_400)
+
+        self.assertEqual(freed, 200)
+        self.assertEqual({name for name, path in files.items() if path.exists()}, {"used", "new"})
+
+    def test_plain_requests_and_bad_params(self) -> None:
+        original = self.client.get("/uploads/products/u1/p1.jpg")
+        self.assertEqual(original.content, self.source)
+
+        self.assertEqual(self.client.get("/uploads/products/u1/p1.jpg?w=abc").status_code, 400)
+        self.assertEqual(self.client.get("/uploads/products/u1/p1.jpg?fmt=gif").status_code, 400)
+        self.assertEqual(self.client.get("/uploads/products/u1/missing.jpg?w=64").status_code, 404)
+
+        (self.uploads / "products" / "u1" / "broken.jpg").write_bytes(b"not an image")
+        self.assertEqual(self.client.get("/uploads/products/u1/broken.jpg?w=64").status_code, 422)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,297 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+
+class TestJobQueue(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+        from app.db.init import init_db
+        from app.models.database import VideoTask
+
+        self._tmpdir = tempfile.TemporaryDirectory()
+        db_path = os.path.join(self._tmpdir.name, "tasks.db")
+        self.engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+        await init_db(self.engine, tables=[VideoTask.__table__])
+        self.session_factory = async_sessionmaker(bind=self.engine, expire_on_commit=False)
+
+    async def asyncTearDown(self) -> None:
+        await self.engine.dispose()
+        self._tmpdir.cleanup()
+
+    def _queue(self, worker_id: str, **kwargs):
+        from app.core.job_queue import JobQueue
+
+        kwargs.setdefault("lease_seconds", 60)
+        return JobQueue(self.session_factory, worker_id=worker_id, **kwargs)
+
+    async def _insert(self, count: int, owner: str = "user-1", queue=None):
+        from app.core.task_store import TaskStore
+        from app.models.schemas import ModelType, VideoGenerationRequest
+
+        store = TaskStore(self.session_factory)
+        ids = [f"{owner}-task-{i}" for i in range(count)]
+        for i, task_id in enumerate(ids):
+            await store.insert(
+                task_id,
+                VideoGenerationRequest(model=ModelType.VEO, prompt=f"prompt {i}"),
+                owner_user_id=owner,
+                created_at=datetime.now() + timedelta(seconds=i),
+                queue_tag=await queue.next_tag(owner, 1.0) if queue is not None else None,
+            )
+        return ids
+
+    async def _row(self, task_id: str):
+        from app.models.database import VideoTask
+
+        async with self.session_factory() as db:
+            return await db.get(VideoTask, task_id)
+
+    async def test_workers_claim_disjoint_rows(self) -> None:
+        ids = await self._insert(5)
+        first, second = self._queue("worker-a"), self._queue("worker-b")
+
+        ids_a, ids_b = set(), set()
+        # Racing claimers may both pick the same candidates; losers get the rest next round.
+        for _ in range(3):
+            claimed_a, claimed_b = await asyncio.gather(first.claim(3), second.claim(3))
+            ids_a.update(row.id for row in claimed_a)
+            ids_b.update(row.id for row in claimed_b)
+
+        self.assertFalse(ids_a & ids_b)
+        self.assertEqual(ids_a | ids_b, set(ids))
+        self.assertEqual(await first.claim(3), [])
+        self.assertEqual((await self._row(sorted(ids_a)[0])).lease_owner, "worker-a")
+
+    async def test_expired_lease_is_reclaimed(self) -> None:
+        (task_id,) = await self._insert(1)
+        crashed = self._queue("worker-a", lease_seconds=0.05)
+        survivor = self._queue("worker-b")
+
+        self.assertEqual([row.id for row in await crashed.claim(1)], [task_id])
+        self.assertEqual(await survivor.claim(1), [])
+        await asyncio.sleep(0.1)
+
+        self.assertEqual([row.id for row in await survivor.claim(1)], [task_id])
+        row = await self._row(task_id)
+        self.assertEqual(row.lease_owner, "worker-b")
+        self.assertEqual(row.attempts, 1)
+        # The crashed worker learns it no longer holds the task.
+        self.assertEqual(await crashed.heartbeat([task_id]), {task_id})
+
+    async def test_gives_up_after_max_attempts(self) -> None:
+        from app.models.database import TaskStatusDB
+
+        (task_id,) = await self._insert(1)
+        queue = self._queue("worker-a", lease_seconds=0.01, max_attempts=2)
+
+        for _ in range(2):
+            self.assertEqual(len(await queue.claim(1)), 1)
+            await asyncio.sleep(0.03)
+        self.assertEqual(await queue.claim(1), [])
+
+        row = await self._row(task_id)
+        self.assertEqual(row.status, TaskStatusDB.FAILED)
+        self.assertIsNone(row.lease_owner)
+
+    async def test_claims_are_shared_fairly_between_owners(self) -> None:
+        queue = self._queue("worker-a")
+        backlog = await self._insert(5, owner="user-1", queue=queue)
+        (late,) = await self._insert(1, owner="user-2", queue=queue)
+
+        self.assertEqual(await queue.queued_count("user-1"), 5)
+        rows = await self._queue("observer").positions([await self._row(late), await self._row(backlog[4])])
+        self.assertEqual(rows, {late: 2, backlog[4]: 6})
+
+        claimed = [row.id for row in await queue.claim(2)]
+        self.assertEqual(sorted(claimed), sorted([backlog[0], late]))
+        self.assertEqual(await queue.queued_count("user-2"), 0)
+
+    async def test_released_leases_are_not_failed_attempts(self) -> None:
+        (task_id,) = await self._insert(1)
+        queue = self._queue("worker-a", max_attempts=2)
+
+        # Rolling restarts hand the task back gracefully each time.
+        for _ in range(4):
+            self.assertEqual([row.id for row in await queue.claim(1)], [task_id])
+            await queue.release([task_id])
+
+        self.assertEqual((await self._row(task_id)).attempts, 0)
+
+    async def test_unsigned_callback_wake_up_keeps_a_pending_payload(self) -> None:
+        (woken, signed) = await self._insert(2)
+        queue = self._queue("worker-a")
+        await queue.claim(2)
+        payload = {"status": "completed", "progress": 100}
+
+        self.assertTrue(await queue.post_callback(woken, None))
+        self.assertTrue(await queue.post_callback(signed, payload))
+        self.assertTrue(await queue.post_callback(signed, None))
+
+        self.assertEqual(await queue.take_callbacks([woken, signed]), {woken: None, signed: payload})
+
+    async def test_heartbeat_reports_cancelled_task(self) -> None:
+        from app.core.task_store import TaskStore
+
+        task_ids = await self._insert(2)
+        queue = self._queue("worker-a")
+        await queue.claim(2)
+
+        self.assertTrue(await TaskStore(self.session_factory).cancel(task_ids[0]))
+        self.assertEqual(await queue.heartbeat(task_ids), {task_ids[0]})
+
+        await queue.release(task_ids)
+        self.assertIsNone((await self._row(task_ids[1])).lease_owner)
+
+
+class TestTaskManagerWithQueue(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+        from app.db.init import init_db
+        from app.models.database import VideoTask
+
+        self._tmpdir = tempfile.TemporaryDirectory()
+        db_path = os.path.join(self._tmpdir.name, "tasks.db")
+        self.engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+        await init_db(self.engine, tables=[VideoTask.__table__])
+        self.session_factory = async_sessionmaker(bind=self.engine, expire_on_commit=False)
+
+    async def asyncTearDown(self) -> None:
+        await self.engine.dispose()
+        self._tmpdir.cleanup()
+
+    async def _worker(self, worker_id: str, client):
+        from app.core.job_queue import JobQueue
+        from app.core.task_manager import TaskManager
+        from app.core.task_store import TaskStore
+
+        queue = JobQueue(self.session_factory, worker_id=worker_id, poll_interval=0.02, heartbeat_interval=0.05)
+        store = TaskStore(self.session_factory, flush_interval=0.01, lease_owner=worker_id)
+        await store.start()
+        manager = TaskManager(api_key="test-key")
+        manager._get_client = lambda model, api_key=None: client  # type: ignore[method-assign]
+        manager.poll_scheduler.policy = None
+        manager.attach_store(store)
+        manager.attach_queue(queue)
+        self.addAsyncCleanup(store.stop)
+        self.addAsyncCleanup(manager.shutdown)
+        return manager
+
+    async def test_task_created_on_one_worker_runs_and_is_readable_everywhere(self) -> None:
+        from tests.test_task_store import _FakeVideoClient
+
+        from app.models.schemas import ModelType, TaskStatus, VideoGenerationRequest
+
+        client = _FakeVideoClient(block=False)
+        api_worker = await self._worker("api", client)
+        # The API worker has no free slots, so another worker must pick the task up.
+        api_worker.max_concurrent_tasks = 0
+        runner = await self._worker("runner", client)
+
+        task_id = await api_worker.create_task(
+            VideoGenerationRequest(model=ModelType.VEO, prompt="a cat"),
+            owner_user_id="user-1",
+        )
+        result = await asyncio.wait_for(api_worker.wait_for_task(task_id), timeout=10)
+
+        self.assertEqual(result.status, TaskStatus.COMPLETED)
+        self.assertEqual(result.video_url, "https://cdn.example.com/v.mp4")
+        self.assertIn(task_id, runner.registry)
+        self.assertNotIn(task_id, api_worker.registry)
+        self.assertEqual(await api_worker.get_task_owner(task_id), "user-1")
+        self.assertEqual([task.task_id for task in await api_worker.list_tasks("user-1")], [task_id])
+
+    async def test_sync_endpoint_reports_a_task_that_failed_elsewhere_as_an_error(self) -> None:
+        from types import SimpleNamespace
+        from unittest import mock
+
+        from fastapi import HTTPException
+        from tests.test_task_store import _FakeVideoClient
+
+        from app.api.v1.video import generate_video_sync
+        from app.models.schemas import ModelType, VideoGenerationRequest
+
+        client = _FakeVideoClient(block=False)
+        client.create_video = mock.AsyncMock(side_effect=RuntimeError("upstream rejected the prompt"))
+        api_worker = await self._worker("api", client)
+        api_worker.max_concurrent_tasks = 0
+        await self._worker("runner", client)
+
+        with self.assertRaises(HTTPException) as ctx:
+            await asyncio.wait_for(
+                generate_video_sync(
+                    VideoGenerationRequest(model=ModelType.VEO, prompt="a cat"),
+                    task_manager=api_worker,
+                    x_api_key=None,
+                    idempotency_key=None,
+                    auth=SimpleNamespace(user_id="user-1"),
+                ),
+                timeout=10,
+            )
+
+        self.assertEqual(ctx.exception.status_code, 500)
+        self.assertEqual(ctx.exception.detail, "upstream rejected the prompt")
+
+    async def test_callback_received_by_another_worker_reaches_the_lease_holder(self) -> None:
+        from tests.test_task_store import _FakeVideoClient
+
+        from app.models.schemas import ModelType, TaskStatus, VideoGenerationRequest
+
+        class _NeverDoneClient(_FakeVideoClient):
+            async def query_task(self, task_id):
+                self.queried.append(task_id)
+                return {"status": "processing", "progress": 10}
+
+        client = _NeverDoneClient(block=False)
+        api_worker = await self._worker("api", client)
+        api_worker.max_concurrent_tasks = 0
+        runner = await self._worker("runner", client)
+
+        task_id = await api_worker.create_task(
+            VideoGenerationRequest(model=ModelType.VEO, prompt="a cat"),
+            owner_user_id="user-1",
+        )
+        while task_id not in runner._remote_tasks:
+            await asyncio.sleep(0.01)
+
+        with self.assertRaises(ValueError):
+            await api_worker.handle_webhook(task_id, {"task_id": "remote-2", "status": "completed"})
+        accepted = await api_worker.handle_webhook(
+            task_id,
+            {"task_id": "remote-1", "status": "completed", "progress": 100, "video_url": "https://cdn/v.mp4"},
+        )
+        result = await asyncio.wait_for(api_worker.wait_for_task(task_id), timeout=10)
+
+        self.assertTrue(accepted)
+        self.assertEqual((result.status, result.video_url), (TaskStatus.COMPLETED, "https://cdn/v.mp4"))
+        # Late duplicates are acknowledged but not accepted.
+        self.assertFalse(await api_worker.handle_webhook(task_id, {"status": "completed"}))
+
+    async def test_queued_limit_applies_to_the_shared_queue(self) -> None:
+        from tests.test_task_store import _FakeVideoClient
+
+        from app.core.fair_scheduler import QueueFullError
+        from app.models.schemas import ModelType, VideoGenerationRequest
+
+        api_worker = await self._worker("api", _FakeVideoClient(block=False))
+        api_worker.max_concurrent_tasks = 0
+        api_worker.scheduler.max_queued_per_user = 2
+        request = VideoGenerationRequest(model=ModelType.VEO, prompt="a cat")
+
+        first = await api_worker.create_task(request, owner_user_id="user-1")
+        second = await api_worker.create_task(request, owner_user_id="user-1")
+        with self.assertRaises(QueueFullError):
+            await api_worker.create_task(request, owner_user_id="user-1")
+        other = await api_worker.create_task(request, owner_user_id="user-2")
+
+        tasks = await api_worker.get_tasks([first, second, other])
+        self.assertEqual([tasks[task_id].queue_position for task_id in (first, other, second)], [1, 2, 3])
+        self.assertIsNotNone(tasks[second].estimated_wait_seconds)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+import asyncio
+import unittest
+from unittest import mock
+
+
+def _status_error(code: int, headers=None):
+    import httpx
+
+    request = httpx.Request("POST", "https://api.example.com/x")
+    response = httpx.Response(code, request=request, headers=headers or {})
+    return httpx.HTTPStatusError("error", request=request, response=response)
+
+
+class TestKeyPool(unittest.IsolatedAsyncioTestCase):
+    async def test_least_loaded_selection_and_rate_limit_failover(self) -> None:
+        from app.core.key_pool import KeyPool
+
+        pool = KeyPool("image_edit", ["sk-first-0001", "sk-second-0002", "sk-first-0001"], strategy="least_loaded", cooldown_seconds=60)
+        self.assertEqual(len(pool), 2)
+        release = asyncio.Event()
+        seen = []
+
+        async def slow(key):
+            seen.append(key)
+            await release.wait()
+            return key
+
+        first = asyncio.create_task(pool.run(slow))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(pool.run(slow))
+        await asyncio.sleep(0)
+        self.assertEqual(sorted(seen), ["sk-first-0001", "sk-second-0002"])
+        release.set()
+        await asyncio.gather(first, second)
+
+        async def limited(key):
+            if key == "sk-first-0001":
+                raise _status_error(429, {"Retry-After": "5"})
+            return key
+
+        for _ in range(3):
+            self.assertEqual(await pool.run(limited), "sk-second-0002")
+        keys = {entry["key"]: entry for entry in pool.snapshot()["keys"]}
+        self.assertEqual(len(keys), 2)
+        rested = [entry for entry in keys.values() if entry["rate_limited"]]
+        self.assertEqual(len(rested), 1)
+        self.assertTrue(0 < rested[0]["cooling_down_seconds"] <= 5)
+
+    async def test_exhausted_pool_and_unrelated_errors(self) -> None:
+        from app.core.key_pool import KeyPool, NoKeyAvailableError
+
+        pool = KeyPool("video", ["sk-first-0001", "sk-second-0002"], strategy="round_robin", cooldown_seconds=30)
+        calls = []
+
+        async def quota(key):
+            calls.append(key)
+            raise _status_error(402)
+
+        with self.assertRaises(Exception) as caught:
+            await pool.run(quota)
+        self.assertEqual(caught.exception.response.status_code, 402)
+        self.assertEqual(sorted(calls), ["sk-first-0001", "sk-second-0002"])
+        with self.assertRaises(NoKeyAvailableError) as busy:
+            await pool.run(quota)
+        self.assertGreater(busy.exception.retry_after, 25)
+
+        other = KeyPool("video", ["sk-first-0001", "sk-second-0002"], cooldown_seconds=30)
+
+        async def bad_request(key):
+            raise _status_error(400)
+
+        with self.assertRaises(Exception):
+            await other.run(bad_request)
+        self.assertEqual(sum(entry["rate_limited"] for entry in other.snapshot()["keys"]), 0)
+
+
+class TestPooledImageClient(unittest.IsolatedAsyncioTestCase):
+    async def test_configured_key_is_swapped_for_pool_members(self) -> None:
+        import httpx
+
+        from app.clients.image_edits_client import ImageEditsClient
+        from app.core.circuit_breaker import BreakerRegistry
+        from app.core.key_pool import KeyPool, KeyPoolRegistry
+
+        used = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            key = request.headers["authorization"].removeprefix("Bearer ")
+            used.append(key)
+            if key == "own-key":
+                return httpx.Response(429, headers={"Retry-After": "30"}, json={})
+            return httpx.Response(200, json={"data": [{"url": f"https://cdn.example.com/{key}.png"}]})
+
+        pooled = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        registry = KeyPoolRegistry([KeyPool("image_edit", ["own-key", "spare-key"], strategy="round_robin")])
+        with mock.patch("app.core.key_pool.get_key_pools", return_value=registry), \
+                mock.patch("app.clients.image_edits_client.get_http_client", return_value=pooled), \
+                mock.patch("app.clients.image_edits_client.get_breakers", return_value=BreakerRegistry()):
+            client = ImageEditsClient(api_key="own-key", base_url="https://api.example.com")
+            for _ in range(2):
+                result = await client.images_generations(model="m", prompt="a cat")
+                self.assertEqual(result["data"][0]["url"], "https://cdn.example.com/spare-key.png")
+            # A caller's own key is used as is.
+            outsider = ImageEditsClient(api_key="user-key", base_url="https://api.example.com")
+            await outsider.images_generations(model="m", prompt="a cat")
+        self.assertEqual(used.count("own-key"), 1)
+        self.assertEqual(used[-1], "user-key")
+        await pooled.aclose()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+import io
+import unittest
+
+
+def _noisy(width: int, height: int):
+    from PIL import Image
+
+    # Noise barely compresses, so JPEG size depends strongly on quality.
+    return Image.merge("RGB", [Image.effect_noise((width, height), 60) for _ in range(3)])
+
+
+def _encode(image, fmt: str, **params) -> bytes:
+    out = io.BytesIO()
+    image.save(out, format=fmt, **params)
+    return out.getvalue()
+
+
+class TestEncodeJpegWithin(unittest.TestCase):
+    def test_picks_highest_quality_that_fits(self) -> None:
+        from app.core.product_storage import _encode_jpeg, encode_jpeg_within
+
+        img = _noisy(400, 300)
+        budget = len(_encode_jpeg(img, 60))
+
+        data, quality, attempts = encode_jpeg_within(img, budget, max_quality=85, min_quality=30)
+
+        self.assertLessEqual(len(data), budget)
+        self.assertGreaterEqual(quality, 60)
+        self.assertGreater(len(_encode_jpeg(img, quality + 1)), budget)
+        self.assertLessEqual(attempts, 8)
+
+    def test_returns_max_quality_when_it_fits_and_min_when_nothing_does(self) -> None:
+        from app.core.product_storage import encode_jpeg_within
+
+        img = _noisy(64, 64)
+        self.assertEqual(encode_jpeg_within(img, 10_000_000, max_quality=85)[1:], (85, 1))
+        self.assertEqual(encode_jpeg_within(img, 10, max_quality=85, min_quality=40)[1], 40)
+
+
+class TestPrepareImageForLlm(unittest.TestCase):
+    def test_caps_dimensions_and_fits_budget(self) -> None:
+        from PIL import Image
+
+        from app.core.product_storage import prepare_image_for_llm
+
+        exif = Image.Exif()
+        exif[0x0112] = 6  # stored sideways: displays as 300 wide, 800 tall
+        data = _encode(_noisy(800, 300), "JPEG", quality=95, exif=exif)
+
+        processed, preprocessing = prepare_image_for_llm(data, max_size_bytes=40_000, max_dimension=400)
+
+        self.assertLessEqual(len(processed), 40_000)
+        self.assertEqual(Image.open(io.BytesIO(processed)).size, (150, 400))
+        self.assertEqual((preprocessing["processed_width"], preprocessing["processed_height"]), (150, 400))
+        self.assertTrue(preprocessing["was_resized"])
+        self.assertFalse(preprocessing["was_converted"])
+        self.assertIsInstance(preprocessing["quality"], int)
+        self.assertGreater(preprocessing["encode_attempts"], 0)
+        self.assertGreaterEqual(preprocessing["encode_ms"], 0.0)
+
+    def test_small_jpeg_is_passed_through(self) -> None:
+        from app.core.product_storage import prepare_image_for_llm
+
+        data = _encode(_noisy(100, 80), "JPEG", quality=80)
+        processed, preprocessing = prepare_image_for_llm(data, max_size_bytes=len(data), max_dimension=400)
+
+        self.assertIs(processed, data)
+        self.assertIsNone(preprocessing["quality"])
+        self.assertFalse(preprocessing["was_resized"])
+
+
+if __name__ == "__main__":
+    unittest.main()
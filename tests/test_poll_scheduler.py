@@ -0,0 +1,72 @@
+import asyncio
+import time
+import unittest
+from typing import Any, Dict
+
+
+class _CountingClient:
+    """Fake provider: each remote task completes on its `polls_needed`-th query."""
+
+    def __init__(self, polls_needed: int = 2):
+        self.polls_needed = polls_needed
+        self.calls: Dict[str, int] = {}
+
+    async def query_task(self, task_id: str) -> Dict[str, Any]:
+        count = self.calls[task_id] = self.calls.get(task_id, 0) + 1
+        if count >= self.polls_needed:
+            return {"status": "completed", "progress": 100, "video_url": f"https://cdn.example.com/{task_id}.mp4"}
+        return {"status": "processing", "progress": 50}
+
+    def parse_status(self, response: Dict[str, Any]):
+        from app.models.schemas import TaskStatus
+
+        return TaskStatus(response["status"])
+
+
+class TestPollScheduler(unittest.IsolatedAsyncioTestCase):
+    async def test_resolves_all_watched_tasks(self) -> None:
+        from app.core.poll_scheduler import PollScheduler
+
+        client = _CountingClient(polls_needed=3)
+        scheduler = PollScheduler(workers=4, max_qps_per_provider=0, poll_interval=0.01)
+        futures = [scheduler.watch("veo", client, f"remote-{i}") for i in range(100)]
+        results = await asyncio.gather(*futures)
+        await scheduler.stop()
+
+        self.assertEqual(len(results), 100)
+        self.assertTrue(all(r["status"] == "completed" for r in results))
+        self.assertTrue(all(count == 3 for count in client.calls.values()))
+
+    async def test_caps_queries_per_provider(self) -> None:
+        from app.core.poll_scheduler import PollScheduler
+
+        client = _CountingClient(polls_needed=1)
+        scheduler = PollScheduler(workers=8, max_qps_per_provider=50, poll_interval=0.01)
+        started = time.monotonic()
+        await asyncio.gather(*(scheduler.watch("sora2", client, f"remote-{i}") for i in range(11)))
+        elapsed = time.monotonic() - started
+        await scheduler.stop()
+
+        # 11 polls at 50 QPS need at least 10 gaps of 20ms.
+        self.assertGreaterEqual(elapsed, 0.19)
+
+    async def test_cancelled_watch_stops_polling(self) -> None:
+        from app.core.poll_scheduler import PollScheduler
+
+        client = _CountingClient(polls_needed=1_000)
+        scheduler = PollScheduler(workers=2, max_qps_per_provider=0, poll_interval=0.01)
+        future = scheduler.watch("veo", client, "remote-x")
+        await asyncio.sleep(0.05)
+        future.cancel()
+        await asyncio.sleep(0.02)
+        calls_after_cancel = client.calls["remote-x"]
+        await asyncio.sleep(0.05)
+        watched = scheduler.watched
+        await scheduler.stop()
+
+        self.assertEqual(client.calls["remote-x"], calls_after_cancel)
+        self.assertEqual(watched, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
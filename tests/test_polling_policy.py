@@ -0,0 +1,147 @@
+import asyncio
+import random
+import unittest
+
+
+def _simulate(policy, key, actual_seconds: float, reports_progress: bool = True):
+    """Poll a fake task that finishes after `actual_seconds`; return (polls, seconds seen late)."""
+    elapsed = policy.next_delay(key, 0.0)
+    polls = 0
+    while True:
+        polls += 1
+        if elapsed >= actual_seconds:
+            return polls, elapsed - actual_seconds
+        progress = int(100 * elapsed / actual_seconds) if reports_progress else None
+        elapsed += policy.next_delay(key, elapsed, progress)
+
+
+class TestPollingPolicy(unittest.TestCase):
+    def _policy(self, **kwargs):
+        from app.core.polling_policy import PollingPolicy
+
+        kwargs.setdefault("min_interval", 2.0)
+        kwargs.setdefault("max_interval", 60.0)
+        kwargs.setdefault("jitter", 0.0)
+        return PollingPolicy(**kwargs)
+
+    def test_learns_completion_time_per_key(self) -> None:
+        from app.core.polling_policy import DEFAULT_ETA_SECONDS, PolicyKey
+
+        policy = self._policy()
+        short = PolicyKey("veo", 5, "720p")
+        long = PolicyKey("veo", 20, "1080p")
+        self.assertEqual(policy.expected_duration(short), DEFAULT_ETA_SECONDS["veo"])
+
+        for _ in range(20):
+            policy.observe(short, 40.0)
+            policy.observe(long, 300.0)
+
+        self.assertAlmostEqual(policy.expected_duration(short), 40.0, delta=1.0)
+        self.assertAlmostEqual(policy.expected_duration(long), 300.0, delta=1.0)
+        # Unseen combinations fall back to the per-model average.
+        unseen = policy.expected_duration(PolicyKey("veo", 10, "1080p"))
+        self.assertTrue(40.0 < unseen < 300.0)
+
+    def test_polls_rarely_early_and_often_near_completion(self) -> None:
+        from app.core.polling_policy import PolicyKey
+
+        policy = self._policy()
+        key = PolicyKey("sora2", 10, "1080p")
+        for _ in range(10):
+            policy.observe(key, 200.0)
+
+        early = policy.next_delay(key, 10.0, 5)
+        late = policy.next_delay(key, 190.0, 95)
+        overdue = policy.next_delay(key, 260.0, 99)
+        self.assertGreater(early, 30.0)
+        self.assertLess(late, 10.0)
+        self.assertEqual(overdue, 15.0)
+
+    def test_backs_off_once_overdue(self) -> None:
+        from app.core.polling_policy import PolicyKey
+
+        policy = self._policy()
+        key = PolicyKey("veo", 10, "1080p")
+        for _ in range(10):
+            policy.observe(key, 100.0)
+
+        # Stuck at 99% well past the usual 100s: each poll waits longer, up to max_interval.
+        delays = [policy.next_delay(key, elapsed, 99) for elapsed in (101.0, 120.0, 200.0, 400.0, 2000.0)]
+        self.assertEqual(delays[0], 2.0)
+        self.assertEqual(delays, sorted(delays))
+        self.assertEqual(delays[2], 25.0)
+        self.assertEqual(delays[-1], 60.0)
+
+    def test_progress_pulls_eta_towards_observed_rate(self) -> None:
+        from app.core.polling_policy import PolicyKey
+
+        policy = self._policy()
+        key = PolicyKey("seedance", 10, "1080p")
+        for _ in range(10):
+            policy.observe(key, 100.0)
+
+        # Half done after 100s: the task is running twice as slow as usual.
+        self.assertGreater(policy.predict_eta(key, 100.0, 50), 140.0)
+
+    def test_jitter_spreads_identical_tasks(self) -> None:
+        from app.core.polling_policy import PolicyKey
+
+        policy = self._policy(jitter=0.2, rng=random.Random(7))
+        key = PolicyKey("veo", 10, "1080p")
+        delays = {round(policy.next_delay(key, 0.0), 3) for _ in range(50)}
+        self.assertGreater(len(delays), 40)
+        self.assertTrue(all(48.0 <= d <= 72.0 for d in delays))
+
+    def test_cuts_status_calls_by_an_order_of_magnitude(self) -> None:
+        from app.core.polling_policy import PolicyKey
+
+        policy = self._policy()
+        key = PolicyKey("sora2", 10, "1080p")
+        actual = 240.0
+        for _ in range(10):
+            policy.observe(key, actual)
+
+        polls, late_by = _simulate(policy, key, actual)
+        fixed_polls = int(actual // 2.0) + 1  # fixed interval at the adaptive floor, same worst-case latency
+
+        self.assertLessEqual(polls * 10, fixed_polls)
+        self.assertLessEqual(late_by, 2.0)
+
+
+class _ProgressClient:
+    def __init__(self, polls_needed: int):
+        self.polls_needed = polls_needed
+        self.calls = 0
+
+    async def query_task(self, task_id: str):
+        self.calls += 1
+        if self.calls >= self.polls_needed:
+            return {"status": "completed", "progress": 100}
+        return {"status": "processing", "progress": int(100 * self.calls / self.polls_needed)}
+
+    def parse_status(self, response):
+        from app.models.schemas import TaskStatus
+
+        return TaskStatus(response["status"])
+
+
+class TestSchedulerUsesPolicy(unittest.IsolatedAsyncioTestCase):
+    async def test_completion_feeds_policy(self) -> None:
+        from app.core.poll_scheduler import PollScheduler
+        from app.core.polling_policy import PolicyKey, PollingPolicy
+
+        policy = PollingPolicy(min_interval=0.01, max_interval=0.02, jitter=0.0)
+        scheduler = PollScheduler(workers=2, max_qps_per_provider=0, poll_interval=5.0, policy=policy)
+        key = PolicyKey("veo", 10, "1080p")
+        client = _ProgressClient(polls_needed=3)
+
+        result = await asyncio.wait_for(scheduler.watch("veo", client, "remote-1", policy_key=key), timeout=2.0)
+        await scheduler.stop()
+
+        self.assertEqual(result["status"], "completed")
+        self.assertEqual(client.calls, 3)
+        self.assertLess(policy.expected_duration(key), 1.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
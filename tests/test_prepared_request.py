@@ -0,0 +1,60 @@
+import asyncio
+import unittest
+from unittest import mock
+
+
+class TestPreparedRequest(unittest.IsolatedAsyncioTestCase):
+    async def test_fan_out_reuses_one_encoded_body(self) -> None:
+        import base64
+
+        import httpx
+
+        from app.clients import gemini_image_client
+        from app.clients.gemini_image_client import GeminiImageClient
+        from app.core.circuit_breaker import BreakerRegistry
+
+        bodies = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            bodies.append((request.url.path, request.headers["content-type"], request.content))
+            return httpx.Response(
+                200,
+                json={"candidates": [{"content": {"parts": [{"inlineData": {"mimeType": "image/png", "data": "aGk="}}]}}]},
+            )
+
+        pooled = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        images = [("a.png", b"a" * 1024, "image/png"), ("b.png", b"b" * 1024, "image/png")]
+        with mock.patch.object(gemini_image_client.base64, "b64encode", wraps=base64.b64encode) as encode, \
+                mock.patch("app.clients.gemini_image_client.get_http_client", return_value=pooled), \
+                mock.patch("app.clients.gemini_image_client.get_breakers", return_value=BreakerRegistry()):
+            client = GeminiImageClient(api_key="k", base_url="https://api.example.com")
+            prepared = client.prepare_generate_image(model="gemini-2.5-flash-image", prompt="a cat", images=images)
+            results = await asyncio.gather(*(client.send(prepared) for _ in range(4)))
+
+        self.assertEqual(encode.call_count, len(images))
+        self.assertEqual(len(results), 4)
+        self.assertEqual({body for _, _, body in bodies}, {prepared.content})
+        self.assertEqual(bodies[0][0], "/v1beta/models/gemini-2.5-flash-image:generateContent")
+        self.assertEqual(bodies[0][1], "application/json")
+        await pooled.aclose()
+
+    async def test_multipart_body_is_replayable(self) -> None:
+        from app.clients.image_edits_client import ImageEditsClient
+
+        prepared = ImageEditsClient.prepare_images_edits(
+            model="m",
+            prompt="a cat",
+            aspect_ratio="1:1",
+            images=[("a.png", b"\x89PNG-bytes", "image/png")],
+        )
+        self.assertEqual(prepared.path, "/v1/images/edits")
+        self.assertTrue(prepared.content_type.startswith("multipart/form-data; boundary="))
+        boundary = prepared.content_type.split("boundary=", 1)[1].encode()
+        self.assertIn(boundary, prepared.content)
+        self.assertIn(b"\x89PNG-bytes", prepared.content)
+        self.assertIn(b'name="aspect_ratio"', prepared.content)
+        self.assertEqual(prepared.headers("k")["Authorization"], "Bearer k")
+
+
+if __name__ == "__main__":
+    unittest.main()
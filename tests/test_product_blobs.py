@@ -0,0 +1,143 @@
+import io
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+
+
+def _png(color: str) -> bytes:
+    from PIL import Image
+
+    out = io.BytesIO()
+    Image.new("RGB", (16, 16), color).save(out, format="PNG")
+    return out.getvalue()
+
+
+def _upload(data: bytes, filename: str = "photo.png"):
+    from starlette.datastructures import UploadFile
+
+    return UploadFile(file=io.BytesIO(data), filename=filename)
+
+
+class TestProductBlobs(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+        from app.db.init import init_db
+        from app.models.database import ProductImageBlob
+
+        # Product files live under the relative path app/static/uploads/products.
+        self._cwd = os.getcwd()
+        self._tmpdir = tempfile.TemporaryDirectory()
+        os.chdir(self._tmpdir.name)
+        self.engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(self._tmpdir.name, 'blobs.db')}")
+        await init_db(self.engine, tables=[ProductImageBlob.__table__])
+        self.session_factory = async_sessionmaker(bind=self.engine, expire_on_commit=False)
+
+    async def asyncTearDown(self) -> None:
+        await self.engine.dispose()
+        os.chdir(self._cwd)
+        self._tmpdir.cleanup()
+
+    async def _ref_count(self, user_id: str, sha256: str):
+        from app.models.database import ProductImageBlob
+
+        async with self.session_factory() as db:
+            blob = await db.get(ProductImageBlob, (user_id, sha256))
+            return None if blob is None else blob.ref_count
+
+    async def test_same_bytes_are_stored_once_and_freed_with_the_last_ref(self) -> None:
+        from app.core.product_blobs import acquire_product_blob, parse_blob_image_url, release_product_blob
+
+        data = _png("red")
+        async with self.session_factory() as db:
+            first = await acquire_product_blob(db, "u1", data, "png")
+            second = await acquire_product_blob(db, "u1", data, "png")
+            other_user = await acquire_product_blob(db, "u2", data, "png")
+            await db.commit()
+
+        self.assertEqual(first.image_url, second.image_url)
+        self.assertEqual((first.deduplicated, second.deduplicated, other_user.deduplicated), (False, True, False))
+        self.assertEqual(parse_blob_image_url(first.image_url), ("u1", first.sha256))
+        self.assertEqual(len(list(Path("app/static/uploads/products/u1/blobs").iterdir())), 1)
+        self.assertEqual(await self._ref_count("u1", first.sha256), 2)
+
+        async with self.session_factory() as db:
+            self.assertEqual(await release_product_blob(db, "u1", first.sha256), 1)
+            self.assertEqual(await release_product_blob(db, "u1", first.sha256), 0)
+            self.assertIsNone(await release_product_blob(db, "u1", first.sha256))
+            await db.commit()
+
+        self.assertIsNone(await self._ref_count("u1", first.sha256))
+        self.assertEqual(await self._ref_count("u2", first.sha256), 1)
+
+    async def test_concurrent_first_uploads_of_the_same_bytes_share_one_row(self) -> None:
+        import asyncio
+
+        from app.core.product_blobs import acquire_product_blob
+
+        data = _png("green")
+
+        async def upload():
+            async with self.session_factory() as db:
+                ref = await acquire_product_blob(db, "u1", data, "png")
+                await db.commit()
+                return ref
+
+        refs = await asyncio.gather(upload(), upload(), upload())
+
+        self.assertEqual(sorted(ref.deduplicated for ref in refs), [False, True, True])
+        self.assertEqual(await self._ref_count("u1", refs[0].sha256), 3)
+
+    async def test_rollback_keeps_counts_unchanged(self) -> None:
+        from app.core.product_blobs import acquire_product_blob
+
+        async with self.session_factory() as db:
+            ref = await acquire_product_blob(db, "u1", _png("blue"), "png")
+            await db.commit()
+        async with self.session_factory() as db:
+            await acquire_product_blob(db, "u1", _png("blue"), "png")
+            await db.rollback()
+
+        self.assertEqual(await self._ref_count("u1", ref.sha256), 1)
+
+    async def test_upload_route_dedupes_and_delete_drops_one_ref(self) -> None:
+        from app.api.v1.uploads import ProductImageDeleteRequest, delete_product_image_upload, upload_product_images
+
+        auth = SimpleNamespace(user_id="u1")
+        data = _png("green")
+        async with self.session_factory() as db:
+            response = await upload_product_images(
+                product_id="p1", primary_index=0, images=[_upload(data), _upload(data)], auth=auth, db=db
+            )
+
+        first, second = response.images
+        self.assertEqual(first.image_url, second.image_url)
+        self.assertEqual((first.deduplicated, second.deduplicated), (False, True))
+        self.assertTrue(first.image_url.startswith("/uploads/products/u1/blobs/"))
+        path = Path("app/static") / first.image_url.lstrip("/")
+
+        async with self.session_factory() as db:
+            deleted = await delete_product_image_upload(ProductImageDeleteRequest(image_url=first.image_url), auth=auth, db=db)
+        self.assertTrue(deleted.deleted)
+        self.assertTrue(path.exists())
+
+        async with self.session_factory() as db:
+            await delete_product_image_upload(ProductImageDeleteRequest(image_url=first.image_url), auth=auth, db=db)
+        self.assertFalse(path.exists())
+        self.assertIsNone(await self._ref_count("u1", first.content_sha256))
+
+    async def test_upload_without_database_keeps_per_product_files(self) -> None:
+        from app.api.v1.uploads import upload_product_images
+
+        response = await upload_product_images(
+            product_id="p1", primary_index=0, images=[_upload(_png("red"))], auth=SimpleNamespace(user_id="u1"), db=None
+        )
+
+        self.assertEqual(response.images[0].image_url, "/uploads/products/u1/p1.png")
+        self.assertIsNone(response.images[0].content_sha256)
+
+
+if __name__ == "__main__":
+    unittest.main()
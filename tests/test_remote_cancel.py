@@ -0,0 +1,138 @@
+import asyncio
+import unittest
+from typing import Any, Dict, List
+from unittest import mock
+
+
+class _CancellableClient:
+    supports_cancel = True
+
+    def __init__(self, *, cancel_failures: int = 0):
+        self.cancelled: List[str] = []
+        self.cancel_calls = 0
+        self.cancel_failures = cancel_failures
+
+    async def create_video(self, **kwargs) -> str:
+        return "remote-1"
+
+    async def query_task(self, task_id: str) -> Dict[str, Any]:
+        return {"status": "processing", "progress": 10}
+
+    def parse_status(self, response: Dict[str, Any]):
+        from app.models.schemas import TaskStatus
+
+        return TaskStatus(response["status"])
+
+    async def cancel_task(self, task_id: str) -> bool:
+        self.cancel_calls += 1
+        if self.cancel_calls <= self.cancel_failures:
+            raise ConnectionError("provider unreachable")
+        self.cancelled.append(task_id)
+        return True
+
+    async def close(self) -> None:
+        return None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+
+class TestRemoteCancel(unittest.IsolatedAsyncioTestCase):
+    def _manager(self, client):
+        from app.core.task_manager import TaskManager
+
+        manager = TaskManager(api_key="test-key")
+        manager._get_client = lambda model, api_key=None: client  # type: ignore[method-assign]
+        manager.poll_scheduler.policy = None
+        manager.remote_cancel_retry_interval = 0.01
+        return manager
+
+    async def _start(self, manager, client) -> str:
+        from app.models.schemas import ModelType, VideoGenerationRequest
+
+        task_id = await manager.create_task(VideoGenerationRequest(model=ModelType.SORA2, prompt="a cat"))
+
+        async def watched():
+            while task_id not in manager._remote_tasks:
+                await asyncio.sleep(0.01)
+
+        await asyncio.wait_for(watched(), timeout=5)
+        return task_id
+
+    async def _wait_for_cancel(self, client) -> None:
+        while not client.cancelled:
+            await asyncio.sleep(0.01)
+
+    async def test_local_cancel_cancels_remote_job(self) -> None:
+        client = _CancellableClient()
+        manager = self._manager(client)
+        task_id = await self._start(manager, client)
+
+        self.assertTrue(await manager.cancel_task(task_id))
+        await asyncio.wait_for(self._wait_for_cancel(client), timeout=5)
+        self.assertEqual(client.cancelled, ["remote-1"])
+        await manager.shutdown()
+
+    async def test_failed_cancel_is_retried_by_sweep(self) -> None:
+        client = _CancellableClient(cancel_failures=2)
+        manager = self._manager(client)
+        task_id = await self._start(manager, client)
+
+        await manager.cancel_task(task_id)
+        await asyncio.wait_for(self._wait_for_cancel(client), timeout=5)
+        self.assertEqual(client.cancel_calls, 3)
+        self.assertEqual(manager._orphans, {})
+        await manager.shutdown()
+
+    async def test_poll_timeout_cancels_remote_job(self) -> None:
+        from app.config import get_settings
+        from app.core.poll_scheduler import PollScheduler
+        from app.models.schemas import TaskStatus
+
+        client = _CancellableClient()
+        manager = self._manager(client)
+        with mock.patch.object(get_settings(), "POLLING_MAX_ATTEMPTS", 3):
+            manager.poll_scheduler = PollScheduler(poll_interval=0.01)
+        manager.poll_scheduler.policy = None
+        task_id = await self._start(manager, client)
+
+        await manager.wait_all()
+        await asyncio.wait_for(self._wait_for_cancel(client), timeout=5)
+        self.assertEqual((await manager.get_task_status(task_id)).status, TaskStatus.FAILED)
+        await manager.shutdown()
+
+    async def test_shutdown_without_store_cancels_remote_jobs(self) -> None:
+        client = _CancellableClient()
+        manager = self._manager(client)
+        await self._start(manager, client)
+
+        await manager.shutdown()
+        self.assertEqual(client.cancelled, ["remote-1"])
+
+
+class TestSoraCancel(unittest.IsolatedAsyncioTestCase):
+    async def test_cancel_maps_missing_task_to_false(self) -> None:
+        import httpx
+
+        from app.clients.sora_client import Sora2Client
+
+        seen = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            seen.append((request.method, request.url.raw_path.decode()))
+            return httpx.Response(404 if request.url.path.endswith("gone") else 200, json={})
+
+        client = Sora2Client(api_key="k", base_url="https://api.example.com")
+        client.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        async with client:
+            self.assertTrue(await client.cancel_task("task/1"))
+            self.assertFalse(await client.cancel_task("gone"))
+        await client.client.aclose()
+        self.assertEqual(seen[0], ("DELETE", "/v2/videos/generations/task%2F1"))
+
+
+if __name__ == "__main__":
+    unittest.main()
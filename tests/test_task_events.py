@@ -0,0 +1,142 @@
+import asyncio
+import json
+import unittest
+from datetime import datetime
+from typing import List, Tuple
+
+
+def _parse_sse(body: str) -> List[Tuple[str, dict]]:
+    events = []
+    for block in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines() if not line.startswith(":"))
+        if fields:
+            events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+class TestTaskEventBus(unittest.IsolatedAsyncioTestCase):
+    async def test_fans_out_and_drops_oldest_when_full(self) -> None:
+        from app.core.task_events import TaskEvent, TaskEventBus
+        from app.models.schemas import TaskResponse, TaskStatus
+
+        bus = TaskEventBus(queue_size=2)
+        now = datetime.now()
+        with bus.subscribe(["a"]) as first, bus.subscribe(["a", "b"]) as second:
+            for progress in (10, 20, 30):
+                task = TaskResponse(task_id="a", status=TaskStatus.PROCESSING, progress=progress, created_at=now, updated_at=now)
+                bus.publish(TaskEvent("a", "progress", task))
+
+            self.assertEqual([(await first.get()).task.progress for _ in range(2)], [20, 30])
+            self.assertEqual([(await second.get()).task.progress for _ in range(2)], [20, 30])
+            self.assertIsNone(await first.get(timeout=0.01))
+
+        self.assertFalse(bus.has_subscribers("a"))
+        self.assertFalse(bus.has_subscribers("b"))
+
+
+class TestTaskEventStream(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        from fastapi import FastAPI
+
+        from app.api.deps import AuthContext, get_current_user
+        from app.api.v1 import tasks
+        from app.api.v1.video import get_task_manager
+        from app.core.task_manager import TaskManager
+
+        self.manager = TaskManager(api_key="test-key")
+        for task_id, owner in (("t1", "user-1"), ("t2", "user-1"), ("other", "user-2")):
+            self.manager.registry.add(task_id, owner=owner)
+
+        self.app = FastAPI()
+        self.app.include_router(tasks.router, prefix="/api/v1")
+        self.app.dependency_overrides[get_task_manager] = lambda: self.manager
+        self.app.dependency_overrides[get_current_user] = lambda: AuthContext(user_id="user-1", claims={})
+
+    async def test_streams_progress_until_all_tasks_finish(self) -> None:
+        import httpx
+
+        from app.models.schemas import TaskStatus
+
+        transport = httpx.ASGITransport(app=self.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            request = asyncio.create_task(client.get("/api/v1/tasks/events", params={"task_id": ["t1", "t2"]}))
+            while not self.manager.events.has_subscribers("t2"):
+                await asyncio.sleep(0.01)
+
+            self.manager._update_task_status("t1", TaskStatus.PROCESSING, progress=0)
+            self.manager._update_task_status("t1", TaskStatus.PROCESSING, progress=50)
+            self.manager._update_task_status("t1", TaskStatus.COMPLETED, progress=100, video_url="https://cdn/v.mp4")
+            self.manager._update_task_status("t2", TaskStatus.FAILED, error="boom")
+            response = await asyncio.wait_for(request, timeout=2.0)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.headers["content-type"].startswith("text/event-stream"))
+        events = [(kind, data.get("task_id"), data.get("progress")) for kind, data in _parse_sse(response.text)]
+        self.assertEqual(
+            events,
+            [
+                ("snapshot", "t1", 0),
+                ("snapshot", "t2", 0),
+                ("status", "t1", 0),
+                ("progress", "t1", 50),
+                ("final", "t1", 100),
+                ("final", "t2", 0),
+                ("end", None, None),
+            ],
+        )
+        self.assertFalse(self.manager.events.has_subscribers("t1"))
+
+    async def test_bulk_status_reports_owned_tasks_only(self) -> None:
+        import httpx
+
+        transport = httpx.ASGITransport(app=self.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            response = await client.post("/api/v1/tasks/status", json={"task_ids": ["t1", "other", "t2", "nope"]})
+
+        self.assertEqual(response.status_code, 200)
+        payload = response.json()
+        self.assertEqual([task["task_id"] for task in payload["tasks"]], ["t1", "t2"])
+        self.assertEqual(payload["not_found"], ["other", "nope"])
+
+    async def test_long_poll_returns_on_first_change(self) -> None:
+        import httpx
+
+        from app.models.schemas import TaskStatus
+
+        transport = httpx.ASGITransport(app=self.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            request = asyncio.create_task(
+                client.post("/api/v1/tasks/status", params={"wait": 30}, json={"task_ids": ["t1", "t2"]})
+            )
+            while not self.manager.events.has_subscribers("t1"):
+                await asyncio.sleep(0.01)
+            self.manager._update_task_status("t2", TaskStatus.PROCESSING, progress=25)
+            response = await asyncio.wait_for(request, timeout=2.0)
+
+        payload = response.json()
+        self.assertTrue(payload["changed"])
+        self.assertEqual([task["status"] for task in payload["tasks"]], ["pending", "processing"])
+        self.assertFalse(self.manager.events.has_subscribers("t1"))
+
+    async def test_long_poll_times_out_without_changes(self) -> None:
+        import httpx
+
+        transport = httpx.ASGITransport(app=self.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            response = await client.post("/api/v1/tasks/status", params={"wait": 0.05}, json={"task_ids": ["t1"]})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.json()["changed"])
+
+    async def test_rejects_tasks_of_other_users(self) -> None:
+        import httpx
+
+        transport = httpx.ASGITransport(app=self.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            response = await client.get("/api/v1/tasks/other/events")
+
+        self.assertEqual(response.status_code, 404)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+import os
+import tempfile
+import unittest
+
+
+class TestTaskRegistry(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self._tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self) -> None:
+        self._tmpdir.cleanup()
+
+    def _registry(self, **kwargs):
+        from app.core.task_registry import TaskRegistry
+
+        kwargs.setdefault("ttl_seconds", 3600)
+        kwargs.setdefault("max_finished", 100)
+        kwargs.setdefault("spill_dir", self._tmpdir.name)
+        kwargs.setdefault("spill_threshold", 16)
+        return TaskRegistry(**kwargs)
+
+    def test_lists_only_the_owners_tasks(self) -> None:
+        registry = self._registry()
+        registry.add("a1", owner="alice")
+        registry.add("b1", owner="bob")
+        registry.add("a2", owner="alice")
+
+        self.assertEqual([r.task_id for r in registry.for_owner("alice")], ["a1", "a2"])
+        self.assertEqual(registry.owner_of("b1"), "bob")
+        self.assertEqual(registry.for_owner("carol"), [])
+
+    def test_evicts_least_recently_read_finished_tasks(self) -> None:
+        from app.models.schemas import TaskStatus
+
+        registry = self._registry(max_finished=2)
+        for task_id in ("t1", "t2", "t3"):
+            registry.add(task_id, owner="alice")
+        registry.add("running", owner="alice", status=TaskStatus.PROCESSING)
+        for task_id in ("t1", "t2", "t3"):
+            registry.update(task_id, TaskStatus.COMPLETED, progress=100)
+        registry.get("t1")  # refreshes t1, so t2 is now the least recently used
+
+        self.assertEqual(registry.evict(), ["t2"])
+        self.assertNotIn("t2", registry)
+        self.assertEqual([r.task_id for r in registry.for_owner("alice")], ["t1", "t3", "running"])
+
+    def test_ttl_never_evicts_unfinished_tasks(self) -> None:
+        from app.models.schemas import TaskStatus
+
+        registry = self._registry(ttl_seconds=0)
+        registry.add("done", owner="alice")
+        registry.add("running", owner="alice", status=TaskStatus.PROCESSING)
+        registry.update("done", TaskStatus.FAILED, error="boom")
+
+        self.assertEqual(registry.evict(), ["done"])
+        self.assertEqual(len(registry), 1)
+        self.assertEqual(registry.for_owner("alice")[0].task_id, "running")
+
+    async def test_large_video_payloads_spill_to_disk(self) -> None:
+        from app.models.schemas import TaskStatus
+
+        registry = self._registry(ttl_seconds=0)
+        registry.add("small", owner="alice")
+        registry.add("large", owner="alice")
+        await registry.attach_video_base64("small", "QUJD")
+        await registry.attach_video_base64("large", "A" * 1024)
+
+        small, large = registry.get("small"), registry.get("large")
+        self.assertEqual(small.video_base64, "QUJD")
+        self.assertIsNone(large.video_base64)
+        self.assertTrue(os.path.exists(large.video_base64_path))
+        self.assertEqual(await registry.load_video_base64(large), "A" * 1024)
+        self.assertEqual(large.to_response(await registry.load_video_base64(large)).video_base64, "A" * 1024)
+
+        registry.update("large", TaskStatus.COMPLETED)
+        registry.evict()
+        self.assertFalse(os.path.exists(large.video_base64_path))
+
+
+class TestTaskManagerRetention(unittest.IsolatedAsyncioTestCase):
+    async def test_finished_tasks_are_dropped_from_the_manager(self) -> None:
+        from app.core.task_manager import TaskManager
+        from app.core.task_registry import TaskRegistry
+        from app.models.schemas import TaskStatus
+
+        manager = TaskManager(api_key="test-key")
+        manager.registry = TaskRegistry(ttl_seconds=3600, max_finished=1)
+        for task_id in ("t1", "t2"):
+            manager.registry.add(task_id, owner="alice")
+            manager.tasks[task_id] = None  # type: ignore[assignment]
+
+        manager._update_task_status("t1", TaskStatus.COMPLETED, progress=100)
+        manager._update_task_status("t2", TaskStatus.COMPLETED, progress=100)
+
+        self.assertIsNone(await manager.get_task_status("t1"))
+        self.assertNotIn("t1", manager.tasks)
+        self.assertEqual([t.task_id for t in await manager.list_tasks("alice")], ["t2"])
+
+
+if __name__ == "__main__":
+    unittest.main()
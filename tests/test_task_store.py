@@ -0,0 +1,209 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from typing import Any, Dict
+
+
+class _FakeVideoClient:
+    def __init__(self, *, block: bool):
+        self.block = block
+        self.created = 0
+        self.queried: list[str] = []
+        self._never = asyncio.Event()
+
+    async def create_video(self, **kwargs) -> str:
+        self.created += 1
+        return "remote-1"
+
+    async def query_task(self, task_id: str) -> Dict[str, Any]:
+        self.queried.append(task_id)
+        if self.block:
+            await self._never.wait()
+        return {"status": "completed", "progress": 100, "video_url": "https://cdn.example.com/v.mp4"}
+
+    def parse_status(self, response: Dict[str, Any]):
+        from app.models.schemas import TaskStatus
+
+        return TaskStatus(response["status"])
+
+    async def close(self) -> None:
+        return None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+
+class TestTaskStoreRestore(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+        from app.db.init import init_db
+        from app.models.database import VideoTask
+
+        self._tmpdir = tempfile.TemporaryDirectory()
+        db_path = os.path.join(self._tmpdir.name, "tasks.db")
+        self.engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+        await init_db(self.engine, tables=[VideoTask.__table__])
+        self.session_factory = async_sessionmaker(bind=self.engine, expire_on_commit=False)
+
+    async def asyncTearDown(self) -> None:
+        await self.engine.dispose()
+        self._tmpdir.cleanup()
+
+    def _manager(self, client: _FakeVideoClient):
+        from app.core.task_manager import TaskManager
+        from app.core.task_store import TaskStore
+
+        manager = TaskManager(api_key="test-key")
+        manager._get_client = lambda model, api_key=None: client  # type: ignore[method-assign]
+        store = TaskStore(self.session_factory, flush_interval=0.01)
+        manager.attach_store(store)
+        return manager, store
+
+    async def test_restart_resumes_polling_remote_task(self) -> None:
+        from app.models.database import TaskStatusDB, VideoTask
+        from app.models.schemas import ModelType, TaskStatus, VideoGenerationRequest
+
+        first_client = _FakeVideoClient(block=True)
+        manager, store = self._manager(first_client)
+        await store.start()
+        task_id = await manager.create_task(
+            VideoGenerationRequest(model=ModelType.VEO, prompt="a cat"),
+            owner_user_id="user-1",
+        )
+        # The remote id is recorded before the task is handed to the poll scheduler.
+        while not manager.poll_scheduler.watched:
+            await asyncio.sleep(0.01)
+
+        # Simulate a pod restart: local workers stop, but the row stays non-terminal.
+        await manager.shutdown()
+        await store.stop()
+
+        second_client = _FakeVideoClient(block=False)
+        restarted, restarted_store = self._manager(second_client)
+        await restarted_store.start()
+        self.assertEqual(await restarted.restore_tasks(), 1)
+        await restarted.wait_all()
+        await restarted.shutdown()
+        await restarted_store.stop()
+
+        self.assertEqual(second_client.created, 0)
+        self.assertEqual(second_client.queried, ["remote-1"])
+        self.assertEqual(restarted.owner_of(task_id), "user-1")
+        result = await restarted.get_task_status(task_id)
+        self.assertEqual(result.status, TaskStatus.COMPLETED)
+
+        async with self.session_factory() as db:
+            row = await db.get(VideoTask, task_id)
+        self.assertEqual(row.status, TaskStatusDB.COMPLETED)
+        self.assertEqual(row.video_url, "https://cdn.example.com/v.mp4")
+
+    async def test_resumed_task_is_polled_with_the_pooled_key_that_created_it(self) -> None:
+        from unittest import mock
+
+        from app.core.key_pool import KeyPool, KeyPoolRegistry, key_id
+        from app.models.database import VideoTask
+        from app.models.schemas import ModelType, VideoGenerationRequest
+
+        class _RateLimited(Exception):
+            status_code = 429
+
+        used_keys = []
+
+        def client_for(block):
+            def get_client(model, api_key=None):
+                used_keys.append(api_key)
+                client = _FakeVideoClient(block=block)
+                if api_key == "test-key":
+                    client.create_video = mock.AsyncMock(side_effect=_RateLimited())
+                return client
+
+            return get_client
+
+        pools = KeyPoolRegistry([KeyPool("video", ["test-key", "key-b"])])
+        with mock.patch("app.core.task_manager.get_key_pools", return_value=pools), mock.patch(
+            "app.core.key_pool.get_key_pools", return_value=pools
+        ):
+            manager, store = self._manager(_FakeVideoClient(block=True))
+            manager._get_client = client_for(block=True)  # type: ignore[method-assign]
+            await store.start()
+            task_id = await manager.create_task(VideoGenerationRequest(model=ModelType.VEO, prompt="a cat"))
+            while not manager.poll_scheduler.watched:
+                await asyncio.sleep(0.01)
+            await manager.shutdown()
+            await store.stop()
+
+            async with self.session_factory() as db:
+                row = await db.get(VideoTask, task_id)
+            self.assertEqual(row.api_key_id, key_id("key-b"))
+
+            used_keys.clear()
+            restarted, restarted_store = self._manager(_FakeVideoClient(block=False))
+            restarted._get_client = client_for(block=False)  # type: ignore[method-assign]
+            await restarted_store.start()
+            self.assertEqual(await restarted.restore_tasks(), 1)
+            await restarted.wait_all()
+            await restarted.shutdown()
+            await restarted_store.stop()
+
+        self.assertEqual(used_keys, ["key-b"])
+
+
+class TestInitDb(unittest.IsolatedAsyncioTestCase):
+    async def test_upgrades_a_video_tasks_table_from_before_the_queue(self) -> None:
+        from datetime import datetime
+
+        from sqlalchemy import inspect, text
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+        from app.core.job_queue import JobQueue
+        from app.core.task_store import TaskStore
+        from app.db.init import init_db
+        from app.models.database import VideoTask
+        from app.models.schemas import ModelType, VideoGenerationRequest
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(tmpdir, 'tasks.db')}")
+            async with engine.begin() as conn:
+                await conn.execute(
+                    text(
+                        "CREATE TABLE video_tasks (id VARCHAR(36) PRIMARY KEY, model VARCHAR(50) NOT NULL, "
+                        "prompt TEXT NOT NULL, status VARCHAR(10), progress INTEGER, input_image_base64 TEXT, "
+                        "params TEXT, video_url VARCHAR(500), video_base64 TEXT, error_message TEXT, "
+                        "retry_count INTEGER, created_at DATETIME, updated_at DATETIME, completed_at DATETIME)"
+                    )
+                )
+                await conn.execute(
+                    text("INSERT INTO video_tasks (id, model, prompt, status) VALUES ('old', 'veo', 'p', 'PENDING')")
+                )
+
+            await init_db(engine, tables=[VideoTask.__table__])
+            await init_db(engine, tables=[VideoTask.__table__])
+            async with engine.connect() as conn:
+                columns, indexes = await conn.run_sync(
+                    lambda sync: (
+                        {column["name"] for column in inspect(sync).get_columns("video_tasks")},
+                        {index["name"] for index in inspect(sync).get_indexes("video_tasks")},
+                    )
+                )
+            self.assertEqual(columns, {column.name for column in VideoTask.__table__.columns})
+            self.assertEqual(indexes, {index.name for index in VideoTask.__table__.indexes})
+
+            session_factory = async_sessionmaker(bind=engine, expire_on_commit=False)
+            await TaskStore(session_factory).insert(
+                "new",
+                VideoGenerationRequest(model=ModelType.VEO, prompt="p"),
+                owner_user_id="user-1",
+                created_at=datetime.now(),
+            )
+            claimed = await JobQueue(session_factory, worker_id="worker-a").claim(2)
+            self.assertEqual(sorted(row.id for row in claimed), ["new", "old"])
+            await engine.dispose()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,215 @@
+import asyncio
+import json
+import unittest
+from typing import Any, Dict, List, Optional
+from unittest import mock
+
+SECRET = "webhook-secret"
+BASE_URL = "http://testserver"
+
+
+class _FakeCallbackProvider:
+    """Fake upstream that never finishes on polls but posts progress/completion to `notify_hook`."""
+
+    supports_notify_hook = True
+
+    def __init__(self, app, *, sign: bool = True):
+        self.app = app
+        self.sign = sign
+        self.notify_hooks: List[Optional[str]] = []
+        self.queried = 0
+        self.deliveries: List[int] = []
+        self._senders: List[asyncio.Task] = []
+
+    async def create_video(self, **kwargs) -> str:
+        hook = kwargs.get("notify_hook")
+        self.notify_hooks.append(hook)
+        if hook and hook.startswith(BASE_URL):
+            self._senders.append(asyncio.create_task(self._send_callbacks(hook)))
+        return "remote-1"
+
+    async def _send_callbacks(self, hook: str) -> None:
+        import httpx
+
+        from app.core.webhooks import SIGNATURE_HEADER, sign_payload
+
+        transport = httpx.ASGITransport(app=self.app)
+        async with httpx.AsyncClient(transport=transport, base_url=BASE_URL) as client:
+            for payload in (
+                {"task_id": "remote-1", "status": "processing", "progress": 40},
+                {"task_id": "remote-1", "status": "completed", "progress": 100, "video_url": "https://cdn/v.mp4"},
+            ):
+                await asyncio.sleep(0.02)
+                body = json.dumps(payload).encode()
+                headers = {"Content-Type": "application/json"}
+                if self.sign:
+                    headers[SIGNATURE_HEADER] = sign_payload(body, SECRET)
+                response = await client.post(hook, content=body, headers=headers)
+                self.deliveries.append(response.status_code)
+
+    async def query_task(self, task_id: str) -> Dict[str, Any]:
+        self.queried += 1
+        return {"status": "processing", "progress": 10}
+
+    def parse_status(self, response: Dict[str, Any]):
+        from app.models.schemas import TaskStatus
+
+        return TaskStatus(response["status"])
+
+    async def close(self) -> None:
+        for sender in self._senders:
+            await sender
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        return None
+
+
+class _UnsignedCallbackProvider(_FakeCallbackProvider):
+    """Posts unsigned callbacks; status queries report completion once a callback was sent."""
+
+    def __init__(self, app):
+        super().__init__(app, sign=False)
+
+    async def query_task(self, task_id: str) -> Dict[str, Any]:
+        self.queried += 1
+        if self.deliveries:
+            return {"status": "completed", "progress": 100, "video_url": "https://cdn/polled.mp4"}
+        return {"status": "processing", "progress": 10}
+
+
+class TestVideoWebhooks(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        from fastapi import FastAPI
+
+        from app.api.v1 import webhooks
+        from app.api.v1.video import get_task_manager
+        from app.config import get_settings
+        from app.core.poll_scheduler import PollScheduler
+        from app.core.task_manager import TaskManager
+
+        settings = get_settings()
+        self._patches = [
+            mock.patch.object(settings, "PUBLIC_BASE_URL", BASE_URL),
+            mock.patch.object(settings, "VIDEO_WEBHOOK_SECRET", SECRET),
+        ]
+        for patch in self._patches:
+            patch.start()
+
+        self.app = FastAPI()
+        self.app.include_router(webhooks.router, prefix="/api/v1")
+        self.manager = TaskManager(api_key="test-key")
+        # Safety-net polling far beyond the test's lifetime: only callbacks can finish the task.
+        self.manager.poll_scheduler = PollScheduler(
+            workers=2, max_qps_per_provider=0, poll_interval=0.01, safety_interval=60
+        )
+        self.manager.poll_scheduler.policy = None
+        self.app.dependency_overrides[get_task_manager] = lambda: self.manager
+
+    async def asyncTearDown(self) -> None:
+        await self.manager.shutdown()
+        for patch in self._patches:
+            patch.stop()
+
+    def _use_provider(self, provider: _FakeCallbackProvider) -> None:
+        self.manager._get_client = lambda model, api_key=None: provider  # type: ignore[method-assign]
+
+    async def test_callbacks_complete_task_without_polling(self) -> None:
+        from app.models.schemas import ModelType, TaskStatus, VideoGenerationRequest
+
+        provider = _FakeCallbackProvider(self.app)
+        self._use_provider(provider)
+        progress: List[int] = []
+
+        task_id = await self.manager.create_task(
+            VideoGenerationRequest(model=ModelType.SORA2, prompt="a cat"),
+            callback=lambda data: progress.append(data.progress),
+        )
+        await asyncio.wait_for(self.manager.tasks[task_id], timeout=2.0)
+        await provider.close()
+
+        result = await self.manager.get_task_status(task_id)
+        self.assertEqual(result.status, TaskStatus.COMPLETED)
+        self.assertEqual(result.video_url, "https://cdn/v.mp4")
+        self.assertEqual(provider.queried, 0)
+        self.assertEqual(progress, [40, 100])
+        self.assertEqual(provider.deliveries, [200, 200])
+        self.assertIn(f"/api/v1/webhooks/video/{task_id}?token=", provider.notify_hooks[0])
+
+    async def test_unsigned_callbacks_are_rejected(self) -> None:
+        from app.models.schemas import ModelType, VideoGenerationRequest
+
+        provider = _FakeCallbackProvider(self.app, sign=False)
+        self._use_provider(provider)
+
+        task_id = await self.manager.create_task(VideoGenerationRequest(model=ModelType.SORA2, prompt="a cat"))
+        while len(provider.deliveries) < 2:
+            await asyncio.sleep(0.01)
+        await provider.close()
+
+        self.assertEqual(provider.deliveries, [401, 401])
+        self.assertFalse(self.manager.tasks[task_id].done())
+        await self.manager.cancel_task(task_id)
+
+    async def test_unsigned_callbacks_only_wake_polling_when_allowed(self) -> None:
+        from app.config import get_settings
+        from app.models.schemas import ModelType, TaskStatus, VideoGenerationRequest
+
+        provider = _UnsignedCallbackProvider(self.app)
+        self._use_provider(provider)
+
+        with mock.patch.object(get_settings(), "VIDEO_WEBHOOK_SIGNED", False):
+            task_id = await self.manager.create_task(VideoGenerationRequest(model=ModelType.SORA2, prompt="a cat"))
+            await asyncio.wait_for(self.manager.tasks[task_id], timeout=2.0)
+            await provider.close()
+
+        result = await self.manager.get_task_status(task_id)
+        self.assertEqual(result.status, TaskStatus.COMPLETED)
+        # The final state comes from the status query, not from the unsigned body.
+        self.assertEqual(result.video_url, "https://cdn/polled.mp4")
+        self.assertGreater(provider.queried, 0)
+
+    async def test_caller_supplied_notify_hook_keeps_polling(self) -> None:
+        from app.models.schemas import ModelType, VideoGenerationRequest
+
+        provider = _FakeCallbackProvider(self.app)
+        self._use_provider(provider)
+
+        task_id = await self.manager.create_task(
+            VideoGenerationRequest(
+                model=ModelType.SORA2,
+                prompt="a cat",
+                extra_params={"notify_hook": "https://customer.example.com/hook"},
+            )
+        )
+        while not self.manager.poll_scheduler.watched:
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.05)
+
+        self.assertEqual(provider.notify_hooks, ["https://customer.example.com/hook"])
+        self.assertGreater(provider.queried, 0)
+        await self.manager.cancel_task(task_id)
+
+    async def test_rejects_bad_token_and_signature(self) -> None:
+        import httpx
+
+        from app.core.webhooks import SIGNATURE_HEADER, build_callback_url, sign_payload
+
+        url = build_callback_url("task-1", base_url=BASE_URL, secret=SECRET)
+        body = json.dumps({"status": "completed"}).encode()
+        transport = httpx.ASGITransport(app=self.app)
+        async with httpx.AsyncClient(transport=transport, base_url=BASE_URL) as client:
+            forged = await client.post(url.replace("task-1", "task-2"), content=body)
+            bad_signature = await client.post(url, content=body, headers={SIGNATURE_HEADER: sign_payload(body, "nope")})
+            unknown_task = await client.post(url, content=body, headers={SIGNATURE_HEADER: sign_payload(body, SECRET)})
+
+        self.assertEqual(forged.status_code, 403)
+        self.assertEqual(bad_signature.status_code, 401)
+        self.assertEqual(unknown_task.status_code, 200)
+        self.assertEqual(unknown_task.json(), {"accepted": False})
+
+
+if __name__ == "__main__":
+    unittest.main()